@@ -3,6 +3,7 @@ from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
+from config import Config
 from routes import api_bp
 from socket_handlers import register_socket_handlers
 
@@ -11,9 +12,12 @@ load_dotenv()
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
 app.config['MONGO_URI'] = os.getenv('MONGO_URI', 'mongodb://localhost:27017/sports_commentator')
+# Let the fronting web server stream audio files itself
+app.config['USE_X_SENDFILE'] = Config.AUDIO_X_SENDFILE
 
 # Initialize extensions
-socketio = SocketIO(app, cors_allowed_origins="*")
+# The message queue lets Celery workers emit to clients connected here
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=Config.SOCKETIO_MESSAGE_QUEUE)
 CORS(app)
 
 # Register blueprints
@@ -21,12 +21,24 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60,  # 25 minutes
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    beat_schedule={
+        # Finished and idle games are compacted into archives, keeping the hot collections bounded
+        'archive-finished-games': {
+            'task': 'tasks.archive_tasks.archive_finished_games',
+            'schedule': Config.ARCHIVE_SWEEP_SECONDS,
+        },
+    },
 )
 
 # Import tasks
-from tasks import data_ingestion_tasks, commentary_tasks
+from tasks import data_ingestion_tasks, commentary_tasks, archive_tasks, tts_tasks
 
 # Register tasks
 celery_app.register_task(data_ingestion_tasks.poll_scoreboard)
 celery_app.register_task(data_ingestion_tasks.poll_game_updates)
 celery_app.register_task(commentary_tasks.generate_commentary_task)
+celery_app.register_task(commentary_tasks.auto_commentary_on_event)
+celery_app.register_task(commentary_tasks.commentary_feed_on_plays)
+celery_app.register_task(archive_tasks.archive_finished_games)
+celery_app.register_task(archive_tasks.archive_game)
+celery_app.register_task(tts_tasks.prewarm_game_audio)
@@ -8,6 +8,9 @@ class Config:
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/sports_commentator')
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     
+    # Storage backend: 'mongo' (default) or 'memory' (embedded, no external services)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
+    
     # SportsDataIO API
     SPORTSDATA_API_KEY = os.getenv('SPORTSDATA_API_KEY')
     SPORTSDATA_BASE_URL = 'https://api.sportsdata.io/v3/nba'
@@ -15,8 +18,61 @@ class Config:
     # Google AI
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     
+    # Shared Gemini client (bounded concurrency, per-call deadlines, p95 hedging)
+    GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+    GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', 8))
+    GEMINI_TIMEOUT_SECONDS = float(os.getenv('GEMINI_TIMEOUT_SECONDS', 10))
+    GEMINI_HEDGE = os.getenv('GEMINI_HEDGE', 'true').lower() == 'true'
+    GEMINI_HEDGE_MIN_SAMPLES = int(os.getenv('GEMINI_HEDGE_MIN_SAMPLES', 20))
+    # Point at a local stand-in (e.g. http://127.0.0.1:5101 from run_fake_services.py); uses the REST transport
+    GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT')
+    
     # ElevenLabs TTS
     ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY')
+    ELEVENLABS_BASE_URL = os.getenv('ELEVENLABS_BASE_URL', 'https://api.elevenlabs.io/v1')
+    # elevenlabs, local (offline stand-in: espeak if installed, else timed MP3 silence) or auto (local without a key)
+    TTS_BACKEND = os.getenv('TTS_BACKEND', 'elevenlabs')
+    LOCAL_TTS_CHARACTERS_PER_SECOND = float(os.getenv('LOCAL_TTS_CHARACTERS_PER_SECOND', 15))
+    
+    # Content-addressed TTS audio cache (one file per text/voice/model/settings, LRU-evicted by size)
+    AUDIO_CACHE_DIR = os.getenv('AUDIO_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'audio'))
+    AUDIO_CACHE_MAX_MB = int(os.getenv('AUDIO_CACHE_MAX_MB', 512))
+    AUDIO_CACHE_LOW_WATERMARK = float(os.getenv('AUDIO_CACHE_LOW_WATERMARK', 0.9))  # evict down to this share of the cap
+    # Clips are served by /api/audio (Range, ETag, immutable caching); behind nginx/Apache set AUDIO_X_SENDFILE
+    AUDIO_URL_PREFIX = os.getenv('AUDIO_URL_PREFIX', '/api/audio')
+    AUDIO_CACHE_MAX_AGE_SECONDS = int(os.getenv('AUDIO_CACHE_MAX_AGE_SECONDS', 31536000))
+    AUDIO_X_SENDFILE = os.getenv('AUDIO_X_SENDFILE', 'false').lower() == 'true'
+    
+    # Long texts are split into sentences and synthesized concurrently, then joined in order
+    TTS_PARALLEL_WORKERS = int(os.getenv('TTS_PARALLEL_WORKERS', 4))
+    TTS_PARALLEL_MIN_CHARS = int(os.getenv('TTS_PARALLEL_MIN_CHARS', 120))
+    # Quality when a client sends no preference or network hints: standard, medium, low or opus
+    TTS_DEFAULT_QUALITY = os.getenv('TTS_DEFAULT_QUALITY', 'standard')
+    
+    # Post-processing of synthesized MP3s (trimmed silence, loudness matched across voices), in a process pool.
+    # Works on the coded frames like mp3gain: global_gain steps are 1.5 dB, no decode or re-encode.
+    TTS_POSTPROCESS_ENABLED = os.getenv('TTS_POSTPROCESS_ENABLED', 'false').lower() == 'true'
+    TTS_POSTPROCESS_WORKERS = int(os.getenv('TTS_POSTPROCESS_WORKERS', 2))
+    TTS_POSTPROCESS_TIMEOUT_SECONDS = float(os.getenv('TTS_POSTPROCESS_TIMEOUT_SECONDS', 5))
+    TTS_SILENCE_GLOBAL_GAIN = int(os.getenv('TTS_SILENCE_GLOBAL_GAIN', 90))  # granules quantized at or below this are silence
+    TTS_TRIM_PAD_FRAMES = int(os.getenv('TTS_TRIM_PAD_FRAMES', 4))  # ~100 ms of air kept at each end
+    TTS_LOUDNESS_TARGET_GAIN = int(os.getenv('TTS_LOUDNESS_TARGET_GAIN', 150))  # median global_gain to aim for; 0 disables
+    TTS_LOUDNESS_MAX_BOOST = int(os.getenv('TTS_LOUDNESS_MAX_BOOST', 4))
+    TTS_LOUDNESS_MAX_CUT = int(os.getenv('TTS_LOUDNESS_MAX_CUT', 8))
+    
+    # Predictable lines (fallbacks, per-player and per-team template calls) are voiced before tip-off
+    TTS_PREWARM_ENABLED = os.getenv('TTS_PREWARM_ENABLED', 'true').lower() == 'true'
+    TTS_PREWARM_MAX_PHRASES = int(os.getenv('TTS_PREWARM_MAX_PHRASES', 400))
+    TTS_PREWARM_WORKERS = int(os.getenv('TTS_PREWARM_WORKERS', 2))
+    
+    # Per-game radio stream: commentary clips spliced into one live MP3 stream shared by all listeners
+    RADIO_BUFFER_SECONDS = float(os.getenv('RADIO_BUFFER_SECONDS', 30))  # ring buffer a slow listener can lag by
+    RADIO_PREBUFFER_SECONDS = float(os.getenv('RADIO_PREBUFFER_SECONDS', 2))  # sent at once to a new listener
+    RADIO_MAX_BACKLOG_SECONDS = float(os.getenv('RADIO_MAX_BACKLOG_SECONDS', 20))  # older queued lines are dropped
+    RADIO_LEAD_SECONDS = float(os.getenv('RADIO_LEAD_SECONDS', 0.5))
+    RADIO_TICK_SECONDS = float(os.getenv('RADIO_TICK_SECONDS', 0.1))
+    RADIO_POLL_SECONDS = float(os.getenv('RADIO_POLL_SECONDS', 1.0))
+    RADIO_IDLE_SECONDS = float(os.getenv('RADIO_IDLE_SECONDS', 60))
     
     # Polling intervals
     SCOREBOARD_POLL_INTERVAL = 5  # seconds
@@ -25,3 +81,57 @@ class Config:
     # Commentary settings
     COMMENTARY_CONFIDENCE_THRESHOLD = 0.7
     MAX_COMMENTARY_LENGTH = 280  # characters (expanded for smoother on-air reads)
+    
+    # Shared commentary fan-out (one generation per play/persona/preference bucket)
+    COMMENTARY_FANOUT_TTL_SECONDS = int(os.getenv('COMMENTARY_FANOUT_TTL_SECONDS', 900))
+    COMMENTARY_FANOUT_MAX_ENTRIES = int(os.getenv('COMMENTARY_FANOUT_MAX_ENTRIES', 5000))
+    COMMENTARY_FANOUT_WAIT_SECONDS = float(os.getenv('COMMENTARY_FANOUT_WAIT_SECONDS', 20))
+    
+    # Batched generation (several plays x personas per Gemini call)
+    COMMENTARY_BATCH_MAX_PLAYS = int(os.getenv('COMMENTARY_BATCH_MAX_PLAYS', 8))
+    
+    # Automatic commentary under load (significance scoring + per-game priority queue)
+    COMMENTARY_MIN_SIGNIFICANCE = float(os.getenv('COMMENTARY_MIN_SIGNIFICANCE', 0.2))
+    COMMENTARY_SLO_SECONDS = float(os.getenv('COMMENTARY_SLO_SECONDS', 8))
+    COMMENTARY_QUEUE_MAX_PER_GAME = int(os.getenv('COMMENTARY_QUEUE_MAX_PER_GAME', 20))
+    COMMENTARY_CONTEXT_TIMEOUT_SECONDS = float(os.getenv('COMMENTARY_CONTEXT_TIMEOUT_SECONDS', 0.5))
+    
+    # Server-driven commentary feed: ingestion generates new plays' lines and pushes them to game:<id> rooms.
+    # Workers outside the web process publish through this Socket.IO message queue (e.g. the Redis URL).
+    COMMENTARY_FEED_ENABLED = os.getenv('COMMENTARY_FEED_ENABLED', 'true').lower() == 'true'
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None
+    
+    # Commentary tier routing (full prompt -> compressed prompt -> template) from live model health
+    MODEL_ROUTER_WINDOW_SECONDS = float(os.getenv('MODEL_ROUTER_WINDOW_SECONDS', 60))
+    MODEL_ROUTER_MAX_ERROR_RATE = float(os.getenv('MODEL_ROUTER_MAX_ERROR_RATE', 0.3))
+    MODEL_ROUTER_MAX_P95_SECONDS = float(os.getenv('MODEL_ROUTER_MAX_P95_SECONDS', 4))
+    MODEL_ROUTER_TOKENS_PER_MINUTE = int(os.getenv('MODEL_ROUTER_TOKENS_PER_MINUTE', 0))  # 0 = no budget
+    MODEL_ROUTER_COOLDOWN_SECONDS = float(os.getenv('MODEL_ROUTER_COOLDOWN_SECONDS', 30))
+    MODEL_ROUTER_MIN_SAMPLES = int(os.getenv('MODEL_ROUTER_MIN_SAMPLES', 5))
+    
+    # Context budget for Gemini prompts (deduplicated rules, structured game state, ranked plays)
+    PROMPT_BUDGET_ENABLED = os.getenv('PROMPT_BUDGET_ENABLED', 'true').lower() == 'true'
+    PROMPT_TOKEN_BUDGET_COMMENTARY = int(os.getenv('PROMPT_TOKEN_BUDGET_COMMENTARY', 500))
+    PROMPT_TOKEN_BUDGET_VOICE = int(os.getenv('PROMPT_TOKEN_BUDGET_VOICE', 450))
+    PROMPT_RECENT_PLAYS = int(os.getenv('PROMPT_RECENT_PLAYS', 5))
+    PROMPT_RECENT_PLAY_CANDIDATES = int(os.getenv('PROMPT_RECENT_PLAY_CANDIDATES', 15))
+    
+    # Voice questions the intent parser fully understands (score, player stats, triple-double watch, game status)
+    # are answered from stored game state without a model call; anything below the confidence floor goes to Gemini
+    VOICE_FAST_PATH_ENABLED = os.getenv('VOICE_FAST_PATH_ENABLED', 'true').lower() == 'true'
+    VOICE_FAST_PATH_MIN_CONFIDENCE = float(os.getenv('VOICE_FAST_PATH_MIN_CONFIDENCE', 0.9))
+    
+    # Archival of finished games: games the schedule reports final are archived right away; a periodic sweep
+    # also archives any game whose hot rows have been idle this long (game docs expire after 24 hours)
+    ARCHIVE_SWEEP_SECONDS = int(os.getenv('ARCHIVE_SWEEP_SECONDS', 3600))
+    ARCHIVE_IDLE_HOURS = float(os.getenv('ARCHIVE_IDLE_HOURS', 6))
+    
+    # Per-stage latency histograms (samples kept per stage/tag series for p50/p95/p99)
+    LATENCY_SAMPLES_PER_SERIES = int(os.getenv('LATENCY_SAMPLES_PER_SERIES', 1000))
+    # Internal stats endpoint (/api/stats): requests must send this as X-Stats-Token; unset keeps it closed
+    STATS_TOKEN = os.getenv('STATS_TOKEN')
+    
+    # Gemini response cache (LRU+TTL in-process, optional Redis tier shared across workers)
+    RESPONSE_CACHE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 600))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 2048))
+    RESPONSE_CACHE_REDIS = os.getenv('RESPONSE_CACHE_REDIS', 'false').lower() == 'true'
@@ -1,12 +1,12 @@
-from pymongo import MongoClient
 from config import Config
+from storage import create_client
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Database:
     def __init__(self):
-        self.client = MongoClient(Config.MONGO_URI)
+        self.client = create_client()
         self.db = self.client.sports_commentator
         
         # Collections
@@ -16,6 +16,7 @@ class Database:
         self.statlines = self.db.statlines
         self.commentary = self.db.commentary
         self.user_contexts = self.db.user_contexts
+        self.archives = self.db.archives
         
         self._create_indexes()
     
@@ -30,6 +31,20 @@ class Database:
             # Events indexes
             self.events.create_index([("game_id", 1), ("timestamp", 1)])
             self.events.create_index("type")
+            # One stored event per play: concurrent polls can't both insert the same play
+            try:
+                self.events.drop_index("game_id_1_payload.play_id_1")
+            except:
+                pass  # Replaced by the unique index below
+            try:
+                self.events.create_index(
+                    [("game_id", 1), ("payload.play_id", 1)],
+                    name="game_id_1_play_id_unique",
+                    unique=True,
+                    partialFilterExpression={"payload.play_id": {"$type": "number"}}
+                )
+            except Exception as e:
+                logger.error(f"Error creating unique play index (duplicate plays already stored?): {e}")
             
             # Statlines indexes
             self.statlines.create_index([("game_id", 1), ("player_id", 1)], unique=True)
@@ -37,10 +52,14 @@ class Database:
             # Commentary indexes
             self.commentary.create_index([("game_id", 1), ("timestamp", 1)])
             self.commentary.create_index("persona")
+            self.commentary.create_index([("game_id", 1), ("play_id", 1), ("persona", 1), ("bucket", 1)])
 
             # User contexts indexes
             self.user_contexts.create_index("updated_at")
             
+            # Archive indexes (one compressed document per finished game)
+            self.archives.create_index("game_id", unique=True)
+            
             # TTL indexes for automatic cleanup (drop existing first to avoid conflicts)
             try:
                 self.games.drop_index("updated_at_1")
@@ -59,5 +78,5 @@ class Database:
         except Exception as e:
             logger.error(f"Error creating indexes: {e}")
 
-# Global database instance
+# Global database instance (backend chosen by Config.STORAGE_BACKEND)
 db = Database()
@@ -0,0 +1,48 @@
+"""Local stand-ins for Gemini and ElevenLabs, for offline benchmarking and tests."""
+
+import threading
+from typing import Optional
+
+from werkzeug.serving import make_server
+
+from fakes.faults import FaultProfile
+from fakes.gemini import create_gemini_app
+from fakes.elevenlabs import create_elevenlabs_app
+
+
+class FakeServices:
+    """Both fakes running on background threads; ports default to free ephemeral ports."""
+
+    def __init__(self, host: str = '127.0.0.1', gemini_port: int = 0, elevenlabs_port: int = 0, gemini_profile: Optional[FaultProfile] = None, elevenlabs_profile: Optional[FaultProfile] = None) -> None:
+        self.gemini_app = create_gemini_app(gemini_profile)
+        self.elevenlabs_app = create_elevenlabs_app(elevenlabs_profile)
+        self._servers = [
+            make_server(host, gemini_port, self.gemini_app, threaded=True),
+            make_server(host, elevenlabs_port, self.elevenlabs_app, threaded=True),
+        ]
+        self.gemini_url = f"http://{host}:{self._servers[0].server_port}"
+        self.elevenlabs_url = f"http://{host}:{self._servers[1].server_port}/v1"
+
+    @property
+    def gemini_profile(self) -> FaultProfile:
+        return self.gemini_app.config['profile']
+
+    @property
+    def elevenlabs_profile(self) -> FaultProfile:
+        return self.elevenlabs_app.config['profile']
+
+    def start(self) -> 'FakeServices':
+        for server in self._servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def shutdown(self) -> None:
+        for server in self._servers:
+            server.shutdown()
+
+
+def start_fake_services(**kwargs) -> FakeServices:
+    return FakeServices(**kwargs).start()
+
+
+__all__ = ['FaultProfile', 'FakeServices', 'create_gemini_app', 'create_elevenlabs_app', 'start_fake_services']
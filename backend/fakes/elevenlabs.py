@@ -0,0 +1,106 @@
+import threading
+import time
+from typing import Optional
+
+from flask import Flask, Response, jsonify, request
+
+from fakes.faults import FaultProfile
+from services.audio_formats import mp3_params
+from services.audio_utils import iter_mp3_frames, silent_mp3
+
+
+# Typical read speed of a commentator voice
+CHARACTERS_PER_SECOND = 15
+
+_VOICES = [
+    {'voice_id': 'pNInz6obpgDQGcFmaJgB', 'name': 'Adam', 'category': 'premade', 'labels': {'accent': 'american'}},
+    {'voice_id': 'gnPxliFHTp6OK6tcoA6i', 'name': 'Commentator', 'category': 'cloned', 'labels': {'use case': 'sports'}},
+    {'voice_id': 'VR6AewLTigWG4xSOukaG', 'name': 'Josh', 'category': 'premade', 'labels': {'accent': 'american'}},
+    {'voice_id': 'AZnzlk1XvdvUeBnXmlld', 'name': 'Domi', 'category': 'premade', 'labels': {'accent': 'american'}},
+]
+
+
+def create_elevenlabs_app(profile: Optional[FaultProfile] = None) -> Flask:
+    """Flask app implementing the ElevenLabs endpoints the backend uses, returning silent MP3s."""
+    app = Flask('fake_elevenlabs')
+    # tokens_per_second is read as characters synthesised per second
+    app.config['profile'] = profile or FaultProfile.from_env('ELEVENLABS')
+    stats = {'requests': 0, 'streams': 0, 'injected_errors': 0, 'characters': 0, 'audio_bytes': 0}
+    lock = threading.Lock()
+
+    def profile_() -> FaultProfile:
+        return app.config['profile']
+
+    def check(text_required=True):
+        with lock:
+            stats['requests'] += 1
+        if not request.headers.get('xi-api-key'):
+            return jsonify({'detail': {'status': 'invalid_api_key', 'message': 'Invalid API key'}}), 401
+        status = profile_().sample_error()
+        time.sleep(profile_().sample_latency())
+        if status is not None:
+            with lock:
+                stats['injected_errors'] += 1
+            detail = 'quota_exceeded' if status == 429 else 'server_error'
+            return jsonify({'detail': {'status': detail, 'message': f"Injected {status}"}}), status
+        if text_required and not (request.get_json(force=True, silent=True) or {}).get('text'):
+            return jsonify({'detail': {'status': 'invalid_request', 'message': 'text is required'}}), 422
+        return None
+
+    def synthesize():
+        text = request.get_json(force=True)['text']
+        bitrate, sample_rate = mp3_params(request.args.get('output_format'))
+        audio = silent_mp3(max(0.5, len(text) / CHARACTERS_PER_SECOND), bitrate, sample_rate)
+        with lock:
+            stats['characters'] += len(text)
+            stats['audio_bytes'] += len(audio)
+        return text, audio
+
+    @app.route('/v1/text-to-speech/<voice_id>', methods=['POST'])
+    def text_to_speech(voice_id):
+        error = check()
+        if error:
+            return error
+        text, audio = synthesize()
+        time.sleep(profile_().seconds_for_tokens(len(text)))
+        return Response(audio, mimetype='audio/mpeg')
+
+    @app.route('/v1/text-to-speech/<voice_id>/stream', methods=['POST'])
+    def text_to_speech_stream(voice_id):
+        error = check()
+        if error:
+            return error
+        text, audio = synthesize()
+        frames = list(iter_mp3_frames(audio))
+        with lock:
+            stats['streams'] += 1
+
+        def generate():
+            # Audio is released in ~0.5s slices at the configured synthesis speed
+            step = 20
+            chars_per_slice = len(text) * step / max(1, len(frames))
+            for i in range(0, len(frames), step):
+                if i:
+                    time.sleep(profile_().seconds_for_tokens(int(chars_per_slice)))
+                yield b''.join(frames[i:i + step])
+        return Response(generate(), mimetype='audio/mpeg')
+
+    @app.route('/v1/voices', methods=['GET'])
+    def voices():
+        error = check(text_required=False)
+        if error:
+            return error
+        return jsonify({'voices': _VOICES})
+
+    @app.route('/_fake/config', methods=['GET', 'POST'])
+    def fake_config():
+        if request.method == 'POST':
+            profile_().update(**(request.get_json(force=True) or {}))
+        return jsonify(profile_().to_dict())
+
+    @app.route('/_fake/stats', methods=['GET'])
+    def fake_stats():
+        with lock:
+            return jsonify(dict(stats))
+
+    return app
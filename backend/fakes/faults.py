@@ -0,0 +1,77 @@
+import math
+import os
+import random
+import threading
+from typing import Any, Dict, Optional
+
+
+class FaultProfile:
+    """Latency, throughput and error injection settings for a fake upstream.
+
+    - Latency is log-normal, described by its median and p95 in milliseconds
+    - Streaming and long replies are paced at tokens_per_second
+    - A fraction of requests fail with 429 (quota) or 5xx (server) errors
+    """
+
+    def __init__(self, latency_ms: float = 300, latency_p95_ms: Optional[float] = None, tokens_per_second: float = 80, error_rate_429: float = 0.0, error_rate_5xx: float = 0.0, seed: Optional[int] = None) -> None:
+        self.latency_ms = latency_ms
+        self.latency_p95_ms = latency_p95_ms
+        self.tokens_per_second = tokens_per_second
+        self.error_rate_429 = error_rate_429
+        self.error_rate_5xx = error_rate_5xx
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix: str) -> 'FaultProfile':
+        """Read FAKE_<PREFIX>_LATENCY_MS, _LATENCY_P95_MS, _TOKENS_PER_SECOND, _ERROR_RATE_429, _ERROR_RATE_5XX."""
+        def env(name, default):
+            value = os.getenv(f"FAKE_{prefix}_{name}")
+            return float(value) if value not in (None, '') else default
+        return cls(
+            latency_ms=env('LATENCY_MS', 300),
+            latency_p95_ms=env('LATENCY_P95_MS', None),
+            tokens_per_second=env('TOKENS_PER_SECOND', 80),
+            error_rate_429=env('ERROR_RATE_429', 0.0),
+            error_rate_5xx=env('ERROR_RATE_5XX', 0.0),
+        )
+
+    def update(self, **settings: Any) -> None:
+        with self._lock:
+            for key, value in settings.items():
+                if key in self.to_dict():
+                    setattr(self, key, None if value is None else float(value))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'latency_ms': self.latency_ms,
+            'latency_p95_ms': self.latency_p95_ms,
+            'tokens_per_second': self.tokens_per_second,
+            'error_rate_429': self.error_rate_429,
+            'error_rate_5xx': self.error_rate_5xx,
+        }
+
+    def sample_latency(self) -> float:
+        """Seconds to wait before the first byte."""
+        with self._lock:
+            median = max(0.0, self.latency_ms) / 1000
+            if not median:
+                return 0.0
+            if not self.latency_p95_ms or self.latency_p95_ms <= self.latency_ms:
+                return median
+            sigma = math.log(self.latency_p95_ms / self.latency_ms) / 1.645
+            return self._random.lognormvariate(math.log(median), sigma)
+
+    def sample_error(self) -> Optional[int]:
+        """HTTP status to fail this request with, or None to succeed."""
+        with self._lock:
+            roll = self._random.random()
+            if roll < self.error_rate_429:
+                return 429
+            if roll < self.error_rate_429 + self.error_rate_5xx:
+                return self._random.choice((500, 503))
+            return None
+
+    def seconds_for_tokens(self, tokens: int) -> float:
+        with self._lock:
+            return tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
@@ -0,0 +1,185 @@
+import json
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, Response, jsonify, request
+
+from fakes.faults import FaultProfile
+from services.prompt_compiler import estimate_tokens
+from services.template_commentary import template_commentary
+
+
+_PLAY = re.compile(r'Raw Play-by-Play Event: "(.*)"')
+_BATCH_PLAY = re.compile(r'^(\d+)\. "(.*)"$', re.M)
+_BATCH_PERSONA = re.compile(r'^- (\w+): .+ style with', re.M)
+_STYLES = {'analytical and data-driven': 'nerdy', 'straightforward and factual': 'raw'}
+
+# google.ai.generativelanguage enums are sent as integers ($alt=json;enum-encoding=int)
+_FINISH_STOP = 1
+_FILE_PROCESSING = 1
+_FILE_ACTIVE = 2
+
+_ERRORS = {
+    429: ('RESOURCE_EXHAUSTED', 'Resource has been exhausted (e.g. check quota).'),
+    500: ('INTERNAL', 'An internal error has occurred.'),
+    503: ('UNAVAILABLE', 'The model is overloaded. Please try again later.'),
+}
+
+
+def _reply_for(contents: List[Dict[str, Any]]) -> str:
+    """Deterministic, prompt-aware stand-in for a model reply."""
+    parts = [p for c in contents for p in c.get('parts', [])]
+    if any('fileData' in p or 'file_data' in p for p in parts):
+        return "What's the score right now?"
+    prompt = '\n'.join(p.get('text', '') for p in parts)
+
+    if 'Plays to call' in prompt:
+        plays = _BATCH_PLAY.findall(prompt)
+        personas = _BATCH_PERSONA.findall(prompt) or ['passionate']
+        lines = [
+            {'play': int(index), 'persona': persona, 'text': template_commentary.render(description, persona)}
+            for index, description in plays for persona in personas
+        ]
+        return "```json\n" + json.dumps(lines) + "\n```"
+
+    play = _PLAY.search(prompt)
+    if play:
+        style = re.search(r'commentator with a (.+?) style', prompt)
+        persona = _STYLES.get(style.group(1), 'passionate') if style else 'passionate'
+        return template_commentary.render(play.group(1), persona)
+    return "Great question! Both teams are trading buckets and the energy in the building is electric."
+
+
+def _response_body(text: str, prompt_tokens: int, final: bool = True) -> Dict[str, Any]:
+    candidate: Dict[str, Any] = {'content': {'parts': [{'text': text}], 'role': 'model'}, 'index': 0}
+    if final:
+        candidate['finishReason'] = _FINISH_STOP
+    return {
+        'candidates': [candidate],
+        'usageMetadata': {
+            'promptTokenCount': prompt_tokens,
+            'candidatesTokenCount': estimate_tokens(text),
+            'totalTokenCount': prompt_tokens + estimate_tokens(text),
+        },
+    }
+
+
+def create_gemini_app(profile: Optional[FaultProfile] = None) -> Flask:
+    """Flask app implementing the Gemini REST endpoints the backend uses."""
+    app = Flask('fake_gemini')
+    app.config['profile'] = profile or FaultProfile.from_env('GEMINI')
+    files: Dict[str, Dict[str, Any]] = {}
+    stats = {'requests': 0, 'streams': 0, 'injected_errors': 0, 'prompt_tokens': 0, 'output_tokens': 0}
+    lock = threading.Lock()
+
+    def profile_() -> FaultProfile:
+        return app.config['profile']
+
+    def fail_or_wait():
+        with lock:
+            stats['requests'] += 1
+        status = profile_().sample_error()
+        time.sleep(profile_().sample_latency())
+        if status is None:
+            return None
+        with lock:
+            stats['injected_errors'] += 1
+        name, message = _ERRORS.get(status, _ERRORS[500])
+        return jsonify({'error': {'code': status, 'message': message, 'status': name}}), status
+
+    @app.route('/v1beta/models/<model>:generateContent', methods=['POST'])
+    def generate_content(model):
+        error = fail_or_wait()
+        if error:
+            return error
+        body = request.get_json(force=True) or {}
+        contents = body.get('contents', [])
+        text = _reply_for(contents)
+        prompt_tokens = estimate_tokens(json.dumps(contents))
+        time.sleep(profile_().seconds_for_tokens(estimate_tokens(text)))
+        with lock:
+            stats['prompt_tokens'] += prompt_tokens
+            stats['output_tokens'] += estimate_tokens(text)
+        return jsonify(_response_body(text, prompt_tokens))
+
+    @app.route('/v1beta/models/<model>:streamGenerateContent', methods=['POST'])
+    def stream_generate_content(model):
+        error = fail_or_wait()
+        if error:
+            return error
+        body = request.get_json(force=True) or {}
+        contents = body.get('contents', [])
+        text = _reply_for(contents)
+        prompt_tokens = estimate_tokens(json.dumps(contents))
+        words = text.split(' ')
+        pieces = [' '.join(words[i:i + 4]) + (' ' if i + 4 < len(words) else '') for i in range(0, len(words), 4)]
+        with lock:
+            stats['streams'] += 1
+            stats['prompt_tokens'] += prompt_tokens
+            stats['output_tokens'] += estimate_tokens(text)
+
+        def generate():
+            # A JSON array written incrementally, as the REST transport expects
+            yield '['
+            for i, piece in enumerate(pieces):
+                if i:
+                    time.sleep(profile_().seconds_for_tokens(estimate_tokens(piece)))
+                    yield ',\r\n'
+                yield json.dumps(_response_body(piece, prompt_tokens, final=i == len(pieces) - 1))
+            yield ']'
+        return Response(generate(), mimetype='application/json')
+
+    # ------------- Files (audio transcription) -------------
+    @app.route('/upload/v1beta/files', methods=['POST'])
+    def upload_file():
+        error = fail_or_wait()
+        if error:
+            return error
+        name = f"files/{uuid.uuid4().hex[:12]}"
+        upload = request.files.get('file')
+        data = upload.read() if upload else request.get_data()
+        mime_type = (upload.mimetype if upload else request.content_type) or 'application/octet-stream'
+        files[name] = {
+            'name': name,
+            'mimeType': mime_type,
+            'sizeBytes': str(len(data)),
+            'uri': f"{request.host_url}v1beta/{name}",
+            'state': _FILE_PROCESSING,
+            'ready_at': time.monotonic() + profile_().sample_latency(),
+        }
+        return jsonify({'file': _file_view(files[name])})
+
+    @app.route('/v1beta/files/<file_id>', methods=['GET'])
+    def get_file(file_id):
+        record = files.get(f"files/{file_id}")
+        if not record:
+            return jsonify({'error': {'code': 404, 'message': 'File not found.', 'status': 'NOT_FOUND'}}), 404
+        if record['state'] == _FILE_PROCESSING and time.monotonic() >= record['ready_at']:
+            record['state'] = _FILE_ACTIVE
+        return jsonify(_file_view(record))
+
+    @app.route('/v1beta/files/<file_id>', methods=['DELETE'])
+    def delete_file(file_id):
+        files.pop(f"files/{file_id}", None)
+        return jsonify({})
+
+    # ------------- Control -------------
+    @app.route('/_fake/config', methods=['GET', 'POST'])
+    def fake_config():
+        if request.method == 'POST':
+            profile_().update(**(request.get_json(force=True) or {}))
+        return jsonify(profile_().to_dict())
+
+    @app.route('/_fake/stats', methods=['GET'])
+    def fake_stats():
+        with lock:
+            return jsonify({**stats, 'files': len(files)})
+
+    return app
+
+
+def _file_view(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in record.items() if k != 'ready_at'}
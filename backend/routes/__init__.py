@@ -6,8 +6,14 @@ from .nba_routes import nba_bp
 from .commentary_routes import commentary_bp
 from .voice_routes import voice_bp
 from .user_routes import user_bp
+from .stats_routes import stats_bp
+from .audio_routes import audio_bp
+from .radio_routes import radio_bp
 
 api_bp.register_blueprint(nba_bp, url_prefix='/nba')
 api_bp.register_blueprint(commentary_bp, url_prefix='/commentary')
 api_bp.register_blueprint(voice_bp, url_prefix='/voice')
 api_bp.register_blueprint(user_bp, url_prefix='/user')
+api_bp.register_blueprint(stats_bp, url_prefix='/stats')
+api_bp.register_blueprint(audio_bp, url_prefix='/audio')
+api_bp.register_blueprint(radio_bp, url_prefix='/radio')
@@ -0,0 +1,47 @@
+from flask import Blueprint, abort, send_file
+from config import Config
+from services.audio_cache import audio_cache
+from services.audio_formats import mimetype
+import logging
+import os
+import re
+
+audio_bp = Blueprint('audio', __name__)
+logger = logging.getLogger(__name__)
+
+# tts_<sha256>[_<output_format>].mp3|ogg is content-addressed; audio_<uuid>.mp3 clips predate the cache
+_CLIP_NAME = re.compile(r'^(?P<kind>tts|audio)_(?P<key>[0-9a-f]{32,64}(?:_(?P<format>(?:mp3|opus)_\d+_\d+))?)\.(?:mp3|ogg)$')
+
+
+@audio_bp.route('/<name>', methods=['GET'])
+def serve_audio(name):
+    """Serve a clip with Range support, a strong ETag and cache headers a CDN can hold on to
+
+    The ETag hashes the file's bytes, so a clip re-synthesized after eviction
+    never validates against an older copy (If-Range, If-None-Match). Clips are
+    marked immutable for a year; the body goes out through the server's sendfile path.
+    """
+    match = _CLIP_NAME.match(name)
+    if not match or (match.group('kind') == 'tts' and audio_cache.filename(match.group('key')) != name):
+        abort(404)
+    path = os.path.join(audio_cache.directory, name)
+    if not os.path.isfile(path):
+        abort(404)
+
+    immutable = match.group('kind') == 'tts'
+    etag = match.group('key')
+    if immutable:
+        audio_cache.touch(match.group('key'))
+        etag = audio_cache.etag(match.group('key'))
+        if etag is None:
+            abort(404)
+    response = send_file(
+        path,
+        mimetype=mimetype(match.group('format')),
+        conditional=True,
+        etag=etag,
+        max_age=Config.AUDIO_CACHE_MAX_AGE_SECONDS if immutable else 3600
+    )
+    if immutable:
+        response.headers['Cache-Control'] = f"public, max-age={Config.AUDIO_CACHE_MAX_AGE_SECONDS}, immutable"
+    return response
@@ -1,11 +1,15 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from services.commentary_service import CommentaryService
+from services.commentary_fanout import CommentaryFanout, preference_bucket
+from socket_handlers import emit_commentary_chunk
 import logging
+import uuid
 
 commentary_bp = Blueprint('commentary', __name__)
 logger = logging.getLogger(__name__)
 
 commentary_service = CommentaryService()
+commentary_fanout = CommentaryFanout(commentary_service)
 
 @commentary_bp.route('/emit', methods=['POST'])
 def emit_commentary():
@@ -17,6 +21,7 @@ def emit_commentary():
         persona = data.get('persona', 'passionate')
         play_description = data.get('play_description', '')
         user_context = data.get('user_context', {})
+        play_id = data.get('play_id')
         
         if not game_id:
             return jsonify({
@@ -24,13 +29,24 @@ def emit_commentary():
                 "error": "game_id is required"
             }), 400
         
-        commentary = commentary_service.generate_commentary(
-            game_id=game_id,
-            event_type=event_type,
-            persona=persona,
-            play_description=play_description,
-            user_context=user_context
-        )
+        if play_id is not None:
+            # Shared across every viewer of this play in the same preference bucket
+            commentary = commentary_fanout.get_commentary(
+                game_id=game_id,
+                play_id=play_id,
+                event_type=event_type,
+                persona=persona,
+                play_description=play_description,
+                user_context=user_context
+            )
+        else:
+            commentary = commentary_service.generate_commentary(
+                game_id=game_id,
+                event_type=event_type,
+                persona=persona,
+                play_description=play_description,
+                user_context=user_context
+            )
         
         return jsonify({
             "success": True,
@@ -43,6 +59,107 @@ def emit_commentary():
             "error": str(e)
         }), 500
 
+@commentary_bp.route('/stream', methods=['POST'])
+def stream_commentary():
+    """Start streamed commentary; sentences and their audio arrive as 'commentary_chunk' socket events"""
+    try:
+        data = request.get_json()
+        game_id = data.get('game_id')
+        if not game_id:
+            return jsonify({
+                "success": False,
+                "error": "game_id is required"
+            }), 400
+
+        # Everyone watching the game gets this stream, so it is never personalized;
+        # a viewer's own stream is started with the 'stream_commentary' socket event.
+        # One stream per play and persona: later requests join the one already on its way to the room
+        play_id = data.get('play_id')
+        stream_id = uuid.uuid4().hex
+        running = commentary_fanout.claim_stream(
+            game_id,
+            play_id if play_id is not None else data.get('play_description', ''),
+            data.get('persona', 'passionate'),
+            None,
+            stream_id
+        )
+        if running is not None:
+            return jsonify({
+                "success": True,
+                "stream_id": running,
+                "shared": True
+            }), 202
+
+        start_commentary_stream(current_app.extensions['socketio'], data, None, stream_id=stream_id)
+
+        return jsonify({
+            "success": True,
+            "stream_id": stream_id,
+            "shared": False
+        }), 202
+    except Exception as e:
+        logger.error(f"Error starting commentary stream: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+def start_commentary_stream(socketio, data, user_context, to=None, stream_id=None):
+    """Stream a line in the background to one socket (to) or, when shared, the game room; returns the stream id"""
+    game_id = data['game_id']
+    stream_id = stream_id or uuid.uuid4().hex
+    play_id = data.get('play_id')
+
+    def on_chunk(chunk):
+        emit_commentary_chunk(socketio, game_id, {**chunk, 'stream_id': stream_id, 'game_id': game_id}, to=to)
+
+    socketio.start_background_task(
+        commentary_service.stream_commentary,
+        game_id=game_id,
+        event_type=data.get('event_type', 'generic'),
+        persona=data.get('persona', 'passionate'),
+        play_description=data.get('play_description', ''),
+        user_context=user_context,
+        on_chunk=on_chunk,
+        play_id=str(play_id) if play_id is not None else None,
+        bucket=preference_bucket(user_context)
+    )
+    return stream_id
+
+@commentary_bp.route('/emit_batch', methods=['POST'])
+def emit_commentary_batch():
+    """Generate commentary for several plays (and personas) in one model call"""
+    try:
+        data = request.get_json()
+        game_id = data.get('game_id')
+        plays = data.get('plays') or []
+        personas = data.get('personas') or [data.get('persona', 'passionate')]
+        user_context = data.get('user_context', {})
+
+        if not game_id or not isinstance(plays, list) or not plays:
+            return jsonify({
+                "success": False,
+                "error": "game_id and a non-empty plays list are required"
+            }), 400
+
+        results = commentary_service.generate_commentary_batch(
+            game_id=game_id,
+            plays=plays,
+            personas=personas,
+            user_context=user_context
+        )
+
+        return jsonify({
+            "success": True,
+            "commentary": results
+        })
+    except Exception as e:
+        logger.error(f"Error generating batch commentary: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @commentary_bp.route('/history/<game_id>')
 def get_commentary_history(game_id):
     """Get commentary history for a game"""
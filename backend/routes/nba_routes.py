@@ -1,7 +1,9 @@
 from flask import Blueprint, jsonify, request
 from services.sportsdata_service import SportsDataService
 from services.game_service import GameService
+from services.archive_service import ArchiveService
 from database import db
+from config import Config
 import logging
 
 nba_bp = Blueprint('nba', __name__)
@@ -9,6 +11,7 @@ logger = logging.getLogger(__name__)
 
 sportsdata_service = SportsDataService()
 game_service = GameService()
+archive_service = ArchiveService()
 
 @nba_bp.route('/scoreboard')
 def get_scoreboard():
@@ -49,7 +52,15 @@ def get_game_snapshot(game_id):
         logger.info(f"/game/{game_id}/snapshot -> clock={game_data.get('TimeRemainingMinutes')}:{game_data.get('TimeRemainingSeconds')} q={game_data.get('Quarter')} plays={len(play_by_play) if isinstance(play_by_play, list) else 'n/a'}")
         
         # Update database
-        game_service.update_game_data(game_id, game_data, box_score, play_by_play)
+        new_events = game_service.update_game_data(game_id, game_data, box_score, play_by_play)
+        
+        # Plays first seen through this request get their commentary like polled ones
+        if new_events and Config.COMMENTARY_FEED_ENABLED:
+            try:
+                from tasks.commentary_tasks import commentary_feed_on_plays
+                commentary_feed_on_plays.delay(game_id, new_events)
+            except Exception as e:
+                logger.error(f"Error queueing commentary for {len(new_events)} new plays in {game_id}: {e}")
         
         return jsonify({
             "success": True,
@@ -80,3 +91,25 @@ def get_triple_double_progress(game_id, player_id):
             "success": False,
             "error": str(e)
         }), 500
+
+@nba_bp.route('/game/<game_id>/archive')
+def get_game_archive(game_id):
+    """Get an archived (finished) game for recaps: game, events, statlines and commentary"""
+    try:
+        archive = archive_service.load_archive(game_id)
+        if not archive:
+            return jsonify({
+                "success": False,
+                "error": f"No archive found for game {game_id}"
+            }), 404
+        return jsonify({
+            "success": True,
+            "game_id": game_id,
+            "archive": archive
+        })
+    except Exception as e:
+        logger.error(f"Error loading archive for {game_id}: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
@@ -0,0 +1,47 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from services.radio_service import RADIO_PERSONAS, radio_service
+import logging
+
+radio_bp = Blueprint('radio', __name__)
+logger = logging.getLogger(__name__)
+
+
+@radio_bp.route('/<game_id>', methods=['GET'])
+def listen(game_id):
+    """Continuous MP3 stream of a game's commentary for one persona (?persona=nerdy).
+
+    Usable directly as an <audio> src; every listener of a game and persona
+    shares one station, so each clip is spliced once however many are tuned in.
+    """
+    persona = request.args.get('persona', 'passionate')
+    if persona not in RADIO_PERSONAS:
+        return jsonify({
+            "success": False,
+            "error": f"persona must be one of {', '.join(RADIO_PERSONAS)}"
+        }), 400
+
+    station = radio_service.station(game_id, persona)
+    return Response(stream_with_context(station.listen()), mimetype='audio/mpeg', headers={
+        'Cache-Control': 'no-cache, no-store',
+        # Keep reverse proxies from buffering the stream
+        'X-Accel-Buffering': 'no',
+        'icy-name': f"{game_id} ({persona})"
+    })
+
+
+@radio_bp.route('/<game_id>/status', methods=['GET'])
+def status(game_id):
+    """Live stations for a game with their listener and clip counters"""
+    try:
+        stations = {key.split('/', 1)[1]: snapshot for key, snapshot in radio_service.stats().items() if key.split('/', 1)[0] == game_id}
+        return jsonify({
+            "success": True,
+            "game_id": game_id,
+            "stations": stations
+        })
+    except Exception as e:
+        logger.error(f"Error getting radio status for game {game_id}: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
@@ -0,0 +1,61 @@
+from flask import Blueprint, jsonify, request
+from config import Config
+from services.audio_cache import audio_cache
+from services.audio_processing import audio_postprocessor
+from services.latency import latency
+from services.gemini_client import gemini_client
+from services.intent_parser import intent_parser
+from services.model_router import model_router
+from services.prompt_compiler import prompt_compiler
+from services.radio_service import radio_service
+from services.response_cache import response_cache
+from routes.commentary_routes import commentary_fanout
+import hmac
+import logging
+
+stats_bp = Blueprint('stats', __name__)
+logger = logging.getLogger(__name__)
+
+
+@stats_bp.before_request
+def require_token():
+    # Closed unless a token is configured; stats expose traffic and cache contents
+    token = request.headers.get('X-Stats-Token') or ''
+    if not Config.STATS_TOKEN or not hmac.compare_digest(token, Config.STATS_TOKEN):
+        return jsonify({"success": False, "error": "forbidden"}), 403
+
+
+@stats_bp.route('/', methods=['GET'])
+def get_stats():
+    """Internal pipeline stats for this web process: per-stage latency percentiles plus cache, audio, fan-out and model counters"""
+    try:
+        return jsonify({
+            "success": True,
+            "latency": latency.stats(),
+            "gemini": gemini_client.stats(),
+            "model_router": model_router.stats(),
+            "prompt_compiler": prompt_compiler.stats(),
+            "response_cache": response_cache.stats(),
+            "intent_parser": dict(intent_parser.stats),
+            "audio_cache": audio_cache.stats(),
+            "audio_postprocess": audio_postprocessor.snapshot(),
+            "commentary_fanout": dict(commentary_fanout.stats),
+            "radio": radio_service.stats()
+        })
+    except Exception as e:
+        logger.error(f"Error collecting stats: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@stats_bp.route('/latency', methods=['GET'])
+def get_latency():
+    """Per-stage latency only; ?stage=commentary. filters by prefix"""
+    prefix = request.args.get('stage', '')
+    stages = {name: summary for name, summary in latency.stats().items() if name.startswith(prefix)}
+    return jsonify({
+        "success": True,
+        "latency": stages
+    })
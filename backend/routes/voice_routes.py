@@ -1,11 +1,12 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from services.voice_service import VoiceService
+from services import audio_formats
+from services.gemini_client import gemini_client
 from database import db
 import logging
 import tempfile
 import os
 import time
-import google.generativeai as genai
 from config import Config
 
 voice_bp = Blueprint('voice', __name__)
@@ -13,6 +14,9 @@ logger = logging.getLogger(__name__)
 
 voice_service = VoiceService()
 
+# Audio understanding is slower than text generation
+TRANSCRIBE_TIMEOUT_SECONDS = 30
+
 @voice_bp.route('/', methods=['GET'])
 def voice_health():
     """Health/info endpoint for voice API (GET-friendly)."""
@@ -87,46 +91,84 @@ def process_voice_query():
 def process_voice_query_no_slash():
     return process_voice_query()
 
+def _tts_options(data):
+    """(text, persona, generate_audio kwargs) from a TTS request, filling voice/language/quality from stored preferences"""
+    text = (data.get('text') or '').strip()
+    persona = data.get('persona', 'passionate')
+    language = data.get('language')
+    voice_id = data.get('voice_id')
+    quality = data.get('quality') or data.get('output_format')
+    # Fallback to stored user preferences when options not explicitly provided
+    try:
+        if (not voice_id or not language or not quality):
+            user_id = request.headers.get('X-User-Id') or request.args.get('user_id')
+            if user_id:
+                user_doc = db.users.find_one({'_id': user_id}) or {}
+                prefs = user_doc.get('preferences') or {}
+                voice_id = voice_id or prefs.get('voiceId') or prefs.get('voice_id')
+                language = language or prefs.get('language')
+                quality = quality or prefs.get('audioQuality')
+    except Exception:
+        pass
+    # No preference: cellular/data-saver clients get a smaller encoding
+    output_format = audio_formats.negotiate(
+        quality,
+        accept=request.headers.get('Accept'),
+        save_data=request.headers.get('Save-Data'),
+        ect=request.headers.get('ECT')
+    )
+    return text, persona, {
+        'voice_id': voice_id,
+        'model_id': data.get('model_id'),
+        'language': language,
+        'voice_settings': data.get('voice_settings'),
+        'output_format': output_format
+    }
+
 @voice_bp.route('/tts', methods=['POST'])
 def speak_tts():
     """Generate TTS audio for provided text (no Gemini)."""
     try:
-        data = request.get_json() or {}
-        text = data.get('text', '').strip()
-        persona = data.get('persona', 'passionate')
-        language = data.get('language')
-        voice_id = data.get('voice_id')
-        model_id = data.get('model_id')
-        voice_settings = data.get('voice_settings')
+        text, persona, options = _tts_options(request.get_json() or {})
         if not text:
             return jsonify({ 'success': False, 'error': 'text is required' }), 400
-        # Fallback to stored user preferences when options not explicitly provided
-        try:
-            if (not voice_id or not language):
-                user_id = request.headers.get('X-User-Id') or request.args.get('user_id')
-                if user_id:
-                    user_doc = db.users.find_one({'_id': user_id}) or {}
-                    prefs = user_doc.get('preferences') or {}
-                    voice_id = voice_id or prefs.get('voiceId') or prefs.get('voice_id')
-                    language = language or prefs.get('language')
-        except Exception:
-            pass
 
-        audio_url = voice_service.tts_service.generate_audio(
-            text,
-            persona,
-            voice_id=voice_id,
-            model_id=model_id,
-            language=language,
-            voice_settings=voice_settings
-        )
+        audio_url = voice_service.tts_service.generate_audio(text, persona, **options)
         if not audio_url:
             return jsonify({ 'success': False, 'error': 'Failed to generate audio' }), 500
-        return jsonify({ 'success': True, 'audio_url': audio_url })
+        return jsonify({ 'success': True, 'audio_url': audio_url, 'mimetype': audio_formats.mimetype(options['output_format']) })
     except Exception as e:
         logger.error(f"Error generating TTS: {e}")
         return jsonify({ 'success': False, 'error': str(e) }), 500
 
+@voice_bp.route('/tts/stream', methods=['GET', 'POST'])
+def stream_tts():
+    """Stream TTS audio for provided text as chunked audio/mpeg.
+
+    GET with query parameters can be used directly as an <audio> src, so the
+    browser plays audio as ElevenLabs produces it with no second request for a file.
+    """
+    try:
+        data = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args.to_dict()
+        text, persona, options = _tts_options(data)
+        if not text:
+            return jsonify({ 'success': False, 'error': 'text is required' }), 400
+
+        stream = voice_service.tts_service.stream_audio(text, persona, **options)
+        if not stream:
+            return jsonify({ 'success': False, 'error': 'Failed to generate audio' }), 502
+        chunks, cache = stream
+        return Response(stream_with_context(chunks), mimetype=audio_formats.mimetype(options['output_format']), headers={
+            'X-Audio-Cache': cache,
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept, Save-Data, ECT',
+            # Keep reverse proxies from buffering the stream
+            'X-Accel-Buffering': 'no'
+        })
+    except Exception as e:
+        logger.error(f"Error streaming TTS: {e}")
+        return jsonify({ 'success': False, 'error': str(e) }), 500
+
 @voice_bp.route('/voices', methods=['GET'])
 def list_voices():
     """List available ElevenLabs voices."""
@@ -278,14 +320,10 @@ def transcribe_audio():
         logger.info(f"Saved audio file: {temp_file_path}, content_type: {content_type}, filename: {filename}")
         
         try:
-            # Configure Gemini
-            genai.configure(api_key=Config.GEMINI_API_KEY)
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            
             # Upload audio file to Gemini
             logger.info(f"Uploading audio file: {temp_file_path}")
             try:
-                audio_file_obj = genai.upload_file(temp_file_path)
+                audio_file_obj = gemini_client.upload_file(temp_file_path)
                 logger.info(f"File uploaded with ID: {audio_file_obj.name}")
             except Exception as upload_error:
                 logger.error(f"Failed to upload file to Gemini: {upload_error}")
@@ -298,7 +336,7 @@ def transcribe_audio():
             elapsed_time = 0
             
             while elapsed_time < max_wait_time:
-                file_info = genai.get_file(audio_file_obj.name)
+                file_info = gemini_client.get_file(audio_file_obj.name)
                 logger.info(f"File state: {file_info.state}")
                 
                 if file_info.state.name == 'ACTIVE':
@@ -314,26 +352,27 @@ def transcribe_audio():
             
             # Generate transcription
             logger.info("Generating transcription...")
+            # Uploads take far longer than text prompts: never hedge them, and keep them out of the hedging p95
             try:
                 # Try first with a simple prompt
-                response = model.generate_content([
+                response = gemini_client.generate_content([
                     "Transcribe the spoken words in this audio:",
                     audio_file_obj
-                ])
+                ], timeout=TRANSCRIBE_TIMEOUT_SECONDS, hedge=False, record_latency=False)
             except Exception as transcribe_error:
                 logger.warning(f"First transcription attempt failed: {transcribe_error}")
                 # Try with an even simpler prompt
-                response = model.generate_content([
+                response = gemini_client.generate_content([
                     "What words are spoken in this audio file?",
                     audio_file_obj
-                ])
+                ], timeout=TRANSCRIBE_TIMEOUT_SECONDS, hedge=False, record_latency=False)
             
             transcript = response.text.strip()
             logger.info(f"Transcription completed: {transcript[:100]}...")
             
             # Clean up: delete the uploaded file and temporary file
             try:
-                genai.delete_file(audio_file_obj.name)
+                gemini_client.delete_file(audio_file_obj.name)
                 logger.info("Uploaded file deleted from Gemini")
             except Exception as cleanup_error:
                 logger.warning(f"Failed to delete uploaded file: {cleanup_error}")
@@ -354,7 +393,7 @@ def transcribe_audio():
             # Also try to clean up any uploaded file
             try:
                 if 'audio_file_obj' in locals():
-                    genai.delete_file(audio_file_obj.name)
+                    gemini_client.delete_file(audio_file_obj.name)
                     logger.info("Uploaded file deleted from Gemini after error")
             except Exception as cleanup_error:
                 logger.warning(f"Failed to delete uploaded file after error: {cleanup_error}")
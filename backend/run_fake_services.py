@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Local fake Gemini and ElevenLabs servers for offline benchmarking
+
+Usage:
+    python run_fake_services.py --gemini-latency-ms 400 --gemini-p95-ms 1500 --gemini-429 0.05
+    # then start the backend against them:
+    GEMINI_API_ENDPOINT=http://127.0.0.1:5101 GEMINI_API_KEY=fake \\
+    ELEVENLABS_BASE_URL=http://127.0.0.1:5102/v1 ELEVENLABS_API_KEY=fake python run.py
+
+Fault settings can be changed while running with POST /_fake/config on either server,
+and request counters are available at GET /_fake/stats.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FaultProfile, start_fake_services
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fake Gemini and ElevenLabs servers")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--gemini-port', type=int, default=5101)
+    parser.add_argument('--elevenlabs-port', type=int, default=5102)
+    for name, latency, throughput in (('gemini', 300, 80), ('elevenlabs', 250, 400)):
+        parser.add_argument(f'--{name}-latency-ms', type=float, default=latency, help='median time to first byte')
+        parser.add_argument(f'--{name}-p95-ms', type=float, default=None, help='p95 time to first byte (log-normal spread)')
+        parser.add_argument(f'--{name}-throughput', type=float, default=throughput, help='tokens (Gemini) or characters (ElevenLabs) per second')
+        parser.add_argument(f'--{name}-429', type=float, default=0.0, help='fraction of requests failing with 429')
+        parser.add_argument(f'--{name}-5xx', type=float, default=0.0, help='fraction of requests failing with 5xx')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    def profile(name):
+        return FaultProfile(
+            latency_ms=getattr(args, f'{name}_latency_ms'),
+            latency_p95_ms=getattr(args, f'{name}_p95_ms'),
+            tokens_per_second=getattr(args, f'{name}_throughput'),
+            error_rate_429=getattr(args, f'{name}_429'),
+            error_rate_5xx=getattr(args, f'{name}_5xx'),
+            seed=args.seed,
+        )
+
+    services = start_fake_services(
+        host=args.host,
+        gemini_port=args.gemini_port,
+        elevenlabs_port=args.elevenlabs_port,
+        gemini_profile=profile('gemini'),
+        elevenlabs_profile=profile('elevenlabs'),
+    )
+    print("🧪 Fake upstream services running")
+    print(f"   GEMINI_API_ENDPOINT={services.gemini_url}")
+    print(f"   ELEVENLABS_BASE_URL={services.elevenlabs_url}")
+    print("   (any non-empty GEMINI_API_KEY / ELEVENLABS_API_KEY is accepted)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        services.shutdown()
+
+
+if __name__ == "__main__":
+    main()
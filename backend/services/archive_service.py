@@ -0,0 +1,230 @@
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from config import Config
+from database import db
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT_VERSION = 2  # 2: rows missing a field are recorded per column ('absent')
+FINAL_STATUSES = ('Final', 'F/OT', 'Closed')
+
+
+class ArchiveService:
+    """Compacts finished games into one compressed, columnar archive document.
+
+    - Events, statlines and commentary are flattened into per-field columns
+      (repeated game ids, teams and clocks compress extremely well with zlib)
+    - Duplicate play events from repeated snapshots are collapsed by play_id
+    - Hot rows are removed once the archive is written, keeping the working set small
+    - An archived game is loaded back with a single find_one
+    """
+
+    def __init__(self) -> None:
+        self.db = db
+
+    # ------------- Compaction -------------
+    def archive_game(self, game_id: str) -> Optional[Dict[str, Any]]:
+        cutoff = datetime.now()
+        game = self.db.games.find_one({'game_id': game_id})
+        events = self._dedupe_events(list(self.db.events.find({'game_id': game_id}).sort('timestamp', 1)))
+        statlines = list(self.db.statlines.find({'game_id': game_id}))
+        commentary = list(self.db.commentary.find({'game_id': game_id}).sort('timestamp', 1))
+
+        if not (game or events or statlines or commentary):
+            logger.info(f"Nothing to archive for game {game_id}")
+            return None
+
+        existing = self.db.archives.find_one({'game_id': game_id})
+        if existing:
+            # Merge with a previous archive so late-arriving rows are not lost
+            previous = self._decode(existing['blob'])
+            game = game or previous.get('game')
+            events = self._dedupe_events(previous.get('events', []) + events)
+            statlines = statlines or previous.get('statlines', [])
+            commentary = previous.get('commentary', []) + commentary
+
+        payload = {
+            'game': self._encode_row(game) if game else None,
+            'events': self._to_columns(events),
+            'statlines': self._to_columns(statlines),
+            'commentary': self._to_columns(commentary),
+        }
+        raw = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+        blob = zlib.compress(raw, 9)
+
+        archive_doc = {
+            'game_id': game_id,
+            'version': ARCHIVE_FORMAT_VERSION,
+            'codec': 'zlib',
+            'archived_at': cutoff,
+            'counts': {
+                'events': len(events),
+                'statlines': len(statlines),
+                'commentary': len(commentary),
+            },
+            'raw_bytes': len(raw),
+            'compressed_bytes': len(blob),
+            'blob': blob,
+        }
+        self.db.archives.update_one({'game_id': game_id}, {'$set': archive_doc}, upsert=True)
+
+        # Only drop rows that existed before the archive snapshot was taken
+        self.db.events.delete_many({'game_id': game_id, 'timestamp': {'$lte': cutoff}})
+        self.db.commentary.delete_many({'game_id': game_id, 'timestamp': {'$lte': cutoff}})
+        self.db.statlines.delete_many({'game_id': game_id, 'updated_at': {'$lte': cutoff}})
+        if game:
+            self.db.games.delete_one({'game_id': game_id, 'updated_at': {'$lte': cutoff}})
+
+        logger.info(
+            f"Archived game {game_id}: {archive_doc['counts']} raw={len(raw)}B compressed={len(blob)}B"
+        )
+        return {k: v for k, v in archive_doc.items() if k != 'blob'}
+
+    def archive_finished_games(self) -> List[str]:
+        """Archive every game that is final or whose hot rows have gone idle."""
+        archived = []
+        for game_id in self.find_archivable_games():
+            try:
+                if self.archive_game(game_id):
+                    archived.append(game_id)
+            except Exception as e:
+                logger.error(f"Error archiving game {game_id}: {e}")
+        return archived
+
+    def find_archivable_games(self, now: Optional[datetime] = None) -> List[str]:
+        """Games still marked final, plus games with no event or commentary newer than ARCHIVE_IDLE_HOURS.
+
+        Game docs expire after 24 hours, so idle rows are found from events and
+        commentary themselves; otherwise they would outlive their game and never be compacted.
+        """
+        cutoff = (now or datetime.now()) - timedelta(hours=Config.ARCHIVE_IDLE_HOURS)
+        candidates = list(self.db.games.distinct('game_id', {'status': {'$in': list(FINAL_STATUSES)}}))
+        stale = set()
+        for collection in (self.db.events, self.db.commentary):
+            stale.update(collection.distinct('game_id', {'timestamp': {'$lt': cutoff}}))
+        for game_id in sorted(stale, key=str):
+            if game_id in candidates:
+                continue
+            if any(collection.find_one({'game_id': game_id, 'timestamp': {'$gte': cutoff}}) for collection in (self.db.events, self.db.commentary)):
+                continue
+            candidates.append(game_id)
+        return candidates
+
+    # ------------- Cold reads -------------
+    def load_archive(self, game_id: str) -> Optional[Dict[str, Any]]:
+        doc = self.db.archives.find_one({'game_id': game_id})
+        if not doc:
+            return None
+        data = self._decode(doc['blob'])
+        data['archived_at'] = doc.get('archived_at')
+        data['counts'] = doc.get('counts', {})
+        return data
+
+    def get_archive_info(self, game_id: str) -> Optional[Dict[str, Any]]:
+        return self.db.archives.find_one({'game_id': game_id}, {'blob': 0, '_id': 0})
+
+    # ------------- Encoding -------------
+    def _decode(self, blob: bytes) -> Dict[str, Any]:
+        payload = json.loads(zlib.decompress(bytes(blob)).decode('utf-8'))
+        return {
+            'game': self._decode_row(payload['game']) if payload.get('game') else None,
+            'events': self._from_columns(payload['events']),
+            'statlines': self._from_columns(payload['statlines']),
+            'commentary': self._from_columns(payload['commentary']),
+        }
+
+    def _dedupe_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        latest: Dict[Any, Dict[str, Any]] = {}
+        unkeyed = []
+        for event in events:
+            play_id = (event.get('payload') or {}).get('play_id')
+            if play_id is None:
+                unkeyed.append(event)
+            else:
+                latest[play_id] = event
+        return list(latest.values()) + unkeyed
+
+    def _flatten(self, row: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+        flat: Dict[str, Any] = {}
+        for key, value in row.items():
+            if key == '_id' and not prefix:
+                continue
+            path = f"{prefix}{key}"
+            if isinstance(value, dict) and value:
+                flat.update(self._flatten(value, f"{path}."))
+            else:
+                flat[path] = value
+        return flat
+
+    def _unflatten(self, flat: Dict[str, Any]) -> Dict[str, Any]:
+        row: Dict[str, Any] = {}
+        for path, value in flat.items():
+            current = row
+            parts = path.split('.')
+            for part in parts[:-1]:
+                current = current.setdefault(part, {})
+            current[parts[-1]] = value
+        return row
+
+    def _to_columns(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        flat_rows = [self._flatten(r) for r in rows]
+        keys: List[str] = []
+        seen = set()
+        for flat in flat_rows:
+            for key in flat:
+                if key not in seen:
+                    seen.add(key)
+                    keys.append(key)
+
+        columns: Dict[str, List[Any]] = {}
+        types: Dict[str, str] = {}
+        absent: Dict[str, List[int]] = {}
+        for key in keys:
+            values = [flat.get(key) for flat in flat_rows]
+            # A field a row doesn't have is not the same as a stored null
+            missing = [i for i, flat in enumerate(flat_rows) if key not in flat]
+            if missing:
+                absent[key] = missing
+            present = [v for v in values if v is not None]
+            if present and all(isinstance(v, datetime) for v in present):
+                types[key] = 'datetime'
+                values = [v.isoformat() if v is not None else None for v in values]
+            elif present and all(isinstance(v, ObjectId) for v in present):
+                types[key] = 'objectid'
+                values = [str(v) if v is not None else None for v in values]
+            columns[key] = values
+        return {'count': len(rows), 'columns': columns, 'types': types, 'absent': absent}
+
+    def _from_columns(self, block: Dict[str, Any]) -> List[Dict[str, Any]]:
+        count = block.get('count', 0)
+        columns = block.get('columns', {})
+        types = block.get('types', {})
+        absent = {key: set(rows) for key, rows in block.get('absent', {}).items()}
+        decoded = {key: [self._decode_value(v, types.get(key)) for v in values] for key, values in columns.items()}
+        return [
+            self._unflatten({key: values[i] for key, values in decoded.items() if i not in absent.get(key, ())})
+            for i in range(count)
+        ]
+
+    def _encode_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return self._to_columns([row])
+
+    def _decode_row(self, block: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        rows = self._from_columns(block)
+        return rows[0] if rows else None
+
+    def _decode_value(self, value: Any, kind: Optional[str]) -> Any:
+        if value is None or kind is None:
+            return value
+        if kind == 'datetime':
+            return datetime.fromisoformat(value)
+        if kind == 'objectid':
+            return ObjectId(value)
+        return value
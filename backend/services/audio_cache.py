@@ -0,0 +1,281 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import Config
+from services.audio_formats import extension
+
+
+logger = logging.getLogger(__name__)
+
+
+class AudioCache:
+    """Content-addressed MP3 cache under static/audio, bounded by total size.
+
+    Clips are addressed as AUDIO_URL_PREFIX/tts_<hash>.mp3 (served by routes/audio_routes.py).
+
+    - A clip's file name is the hash of (text, voice_id, model_id, voice_settings),
+      so identical lines are synthesized once and shared by every user
+    - Concurrent misses for the same clip wait for one synthesis (single flight)
+    - LRU by last use; a background thread evicts down to the low watermark
+      once the directory goes over AUDIO_CACHE_MAX_MB
+    - Lower-bitrate and Opus variants of a clip are cached next to it under the same hash
+    - Files already in the directory (including legacy audio_<uuid>.mp3) are
+      adopted on startup, oldest first, so they age out too
+    """
+
+    PREFIX = 'tts_'
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None, low_watermark: Optional[float] = None, url_prefix: Optional[str] = None) -> None:
+        self.directory = directory or Config.AUDIO_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.AUDIO_CACHE_MAX_MB * 1024 * 1024
+        self.low_watermark = low_watermark if low_watermark is not None else Config.AUDIO_CACHE_LOW_WATERMARK
+        self.url_prefix = url_prefix or Config.AUDIO_URL_PREFIX
+        self._lock = threading.Lock()
+        # file name -> size in bytes, least recently used first
+        self._files: 'OrderedDict[str, int]' = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, threading.Event] = {}
+        # file name -> (mtime_ns, size, digest of the bytes on disk)
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        self._loaded = False
+        self._evict_wakeup = threading.Event()
+        self._evictor: Optional[threading.Thread] = None
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'writes': 0,
+            'write_errors': 0,
+            'evictions': 0,
+            'evicted_bytes': 0,
+        }
+
+    # ------------- Keys -------------
+    def make_key(self, text: str, voice_id: str, model_id: str, voice_settings: Optional[Dict[str, Any]] = None, output_format: Optional[str] = None, processing: Optional[str] = None) -> str:
+        """Content hash of the clip, suffixed with the output format for non-default encodings.
+
+        Every encoding of a line shares the hash, so its variants sit side by side
+        (tts_<hash>.mp3, tts_<hash>_mp3_44100_32.mp3, tts_<hash>_opus_48000_32.ogg).
+        processing identifies post-processing settings, so processed clips never
+        collide with raw ones.
+        """
+        fields = {'text': text, 'voice_id': voice_id, 'model_id': model_id, 'voice_settings': voice_settings or {}}
+        if processing:
+            fields['processing'] = processing
+        canonical = json.dumps(fields, sort_keys=True, separators=(',', ':'))
+        digest = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        return f"{digest}_{output_format}" if output_format else digest
+
+    def filename(self, key: str) -> str:
+        return f"{self.PREFIX}{key}.{extension(key.partition('_')[2])}"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, self.filename(key))
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{self.filename(key)}"
+
+    # ------------- Access -------------
+    def get(self, key: str) -> Optional[str]:
+        """URL of a cached clip (marking it recently used), or None."""
+        self._ensure_loaded()
+        name = self.filename(key)
+        with self._lock:
+            if name in self._files:
+                if os.path.exists(self.path(key)):
+                    self._files.move_to_end(name)
+                    self._counters['hits'] += 1
+                    return self.url(key)
+                # Deleted behind our back
+                self._bytes -= self._files.pop(name)
+                self._digests.pop(name, None)
+            self._counters['misses'] += 1
+        return None
+
+    def touch(self, key: str) -> None:
+        """Mark a clip as recently used (e.g. when it is served) without counting a lookup."""
+        self._ensure_loaded()
+        with self._lock:
+            name = self.filename(key)
+            if name in self._files:
+                self._files.move_to_end(name)
+
+    def etag(self, key: str) -> Optional[str]:
+        """Strong validator for a cached clip: a hash of the bytes on disk, not of the synthesis inputs.
+
+        A clip synthesized again after eviction comes back under the same key but
+        not necessarily the same bytes, so it must not match the old copy's ETag.
+        Hashes are remembered per file version (mtime and size).
+        """
+        name = self.filename(key)
+        path = self.path(key)
+        try:
+            stat = os.stat(path)
+            with self._lock:
+                known = self._digests.get(name)
+            if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+                return known[2]
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()[:32]
+        except OSError:
+            return None
+        with self._lock:
+            self._digests[name] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def contains(self, key: str) -> bool:
+        """Whether a clip is cached, without counting a lookup or refreshing its recency."""
+        self._ensure_loaded()
+        with self._lock:
+            return self.filename(key) in self._files
+
+    def put(self, key: str, data: bytes) -> Optional[str]:
+        """Store a clip atomically and return its URL (None if the write failed)."""
+        if not data:
+            return None
+        self._ensure_loaded()
+        path = self.path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'wb') as out:
+                out.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error writing cached audio {path}: {e}")
+            with self._lock:
+                self._counters['write_errors'] += 1
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+
+        name = self.filename(key)
+        with self._lock:
+            self._bytes += len(data) - self._files.pop(name, 0)
+            self._files[name] = len(data)
+            self._counters['writes'] += 1
+            over = self._bytes > self.max_bytes
+        if over:
+            self._schedule_eviction()
+        return self.url(key)
+
+    def get_or_create(self, key: str, synthesize: Callable[[], Optional[bytes]]) -> Optional[str]:
+        """Cached URL for a clip, synthesizing it once however many callers miss at the same time."""
+        url = self.get(key)
+        if url is not None:
+            return url
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = threading.Event()
+                owner = True
+            else:
+                self._counters['coalesced'] += 1
+                owner = False
+        if not owner:
+            pending.wait()
+            url = self.get(key)
+            if url is not None:
+                return url
+            # The owner failed; callers don't retry a provider error in lockstep
+            return None
+        try:
+            data = synthesize()
+            return self.put(key, data) if data else None
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.set()
+
+    def evict(self) -> int:
+        """Delete least recently used clips until the cache is under the low watermark; returns files removed."""
+        self._ensure_loaded()
+        target = int(self.max_bytes * self.low_watermark)
+        removed = 0
+        while True:
+            with self._lock:
+                if self._bytes <= target or not self._files:
+                    return removed
+                name, size = self._files.popitem(last=False)
+                self._bytes -= size
+                self._digests.pop(name, None)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not evict cached audio {name}: {e}")
+                continue
+            removed += 1
+            with self._lock:
+                self._counters['evictions'] += 1
+                self._counters['evicted_bytes'] += size
+
+    def stats(self) -> Dict[str, Any]:
+        self._ensure_loaded()
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'files': len(self._files),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'usage': round(self._bytes / self.max_bytes, 3) if self.max_bytes else None,
+                'hit_rate': round(self._counters['hits'] / lookups, 3) if lookups else 0.0,
+            }
+
+    # ------------- Internals -------------
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                entries = []
+                for entry in os.scandir(self.directory):
+                    if entry.is_file() and entry.name.endswith(('.mp3', '.ogg')):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name, stat.st_size))
+                for _, name, size in sorted(entries):
+                    self._files[name] = size
+                    self._bytes += size
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not scan audio cache directory {self.directory}: {e}")
+            self._loaded = True
+            over = self._bytes > self.max_bytes
+        if over:
+            self._schedule_eviction()
+
+    def _schedule_eviction(self) -> None:
+        with self._lock:
+            if self._evictor is None or not self._evictor.is_alive():
+                self._evictor = threading.Thread(target=self._evict_loop, name='audio-cache-evictor', daemon=True)
+                self._evictor.start()
+        self._evict_wakeup.set()
+
+    def _evict_loop(self) -> None:
+        while True:
+            self._evict_wakeup.wait()
+            self._evict_wakeup.clear()
+            try:
+                removed = self.evict()
+                if removed:
+                    logger.info(f"Evicted {removed} cached audio files ({self._bytes} bytes in use)")
+            except Exception as e:
+                logger.error(f"Audio cache eviction failed: {e}")
+            time.sleep(0.1)
+
+
+# Shared by every TTS caller in the process
+audio_cache = AudioCache()
@@ -0,0 +1,75 @@
+from typing import Optional, Tuple
+
+from config import Config
+
+
+# Named qualities a client can ask for, mapped to ElevenLabs output_format values.
+# 'standard' sends no output_format (the provider default, MP3 44.1 kHz 128 kbps),
+# so clips cached before formats were negotiable keep their keys.
+AUDIO_FORMATS = {
+    'standard': None,
+    'medium': 'mp3_44100_64',
+    'low': 'mp3_44100_32',
+    'opus': 'opus_48000_32',
+}
+
+# Effective connection types (ECT client hint) that get a smaller variant
+_CONSTRAINED_NETWORKS = {'slow-2g': 'low', '2g': 'low', '3g': 'medium'}
+
+
+def is_mp3(output_format: Optional[str]) -> bool:
+    return not output_format or output_format.startswith('mp3_')
+
+
+def mimetype(output_format: Optional[str]) -> str:
+    return 'audio/mpeg' if is_mp3(output_format) else 'audio/ogg'
+
+
+def extension(output_format: Optional[str]) -> str:
+    return 'mp3' if is_mp3(output_format) else 'ogg'
+
+
+def mp3_params(output_format: Optional[str]) -> Tuple[int, int]:
+    """(bitrate kbps, sample rate) of an MP3 output_format such as mp3_44100_128; the provider default otherwise."""
+    bitrate, sample_rate = 128, 44100
+    if output_format and output_format.startswith('mp3_'):
+        try:
+            _, rate, kbps = output_format.split('_')
+            if int(rate) in (32000, 44100, 48000):
+                sample_rate = int(rate)
+            if int(kbps) in (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320):
+                bitrate = int(kbps)
+        except ValueError:
+            pass
+    return bitrate, sample_rate
+
+
+def resolve(quality: Optional[str]) -> Optional[str]:
+    """output_format for a quality name or a raw supported output_format; None means the default."""
+    if not quality:
+        return None
+    quality = quality.strip().lower()
+    if quality in AUDIO_FORMATS:
+        return AUDIO_FORMATS[quality]
+    if quality in AUDIO_FORMATS.values():
+        return quality
+    return None
+
+
+def negotiate(preference: Optional[str] = None, accept: Optional[str] = None, save_data: Optional[str] = None, ect: Optional[str] = None) -> Optional[str]:
+    """Pick an output_format for a client.
+
+    An explicit preference wins. Otherwise Save-Data or a slow ECT client hint
+    picks a lower-bitrate MP3, upgraded to Opus when the client explicitly
+    accepts Ogg audio (a wildcard isn't enough - Safari can't play it).
+    """
+    if resolve(preference) or (preference or '').strip().lower() == 'standard':
+        return resolve(preference)
+
+    if save_data and save_data.strip().lower() == 'on':
+        quality = 'low'
+    else:
+        quality = _CONSTRAINED_NETWORKS.get((ect or '').strip().lower(), Config.TTS_DEFAULT_QUALITY)
+    if quality != 'standard' and accept and any(kind in accept.lower() for kind in ('audio/ogg', 'audio/opus')):
+        quality = 'opus'
+    return resolve(quality)
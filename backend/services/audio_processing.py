@@ -0,0 +1,186 @@
+import logging
+import multiprocessing
+import statistics
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from services.audio_utils import iter_mp3_frames
+
+
+logger = logging.getLogger(__name__)
+
+# Side info layout of an MPEG-1 Layer III frame (ISO 11172-3, 2.4.1.7)
+_GRANULE_BITS = 59  # part2_3_length(12) big_values(9) global_gain(8) ... per granule and channel
+_GLOBAL_GAIN_OFFSET = 21
+
+
+def _layout(frame: bytes) -> Tuple[int, int, int]:
+    """(side info offset, side info length, channels)"""
+    mono = (frame[3] >> 6) == 0b11
+    crc = 2 if not frame[1] & 1 else 0
+    return 4 + crc, 17 if mono else 32, 1 if mono else 2
+
+
+def _granules(frame: bytes) -> Iterator[Tuple[int, int, int]]:
+    """(bit position of global_gain within the side info, part2_3_length, global_gain) per granule and channel"""
+    offset, length, channels = _layout(frame)
+    side = int.from_bytes(frame[offset:offset + length], 'big')
+    total = length * 8
+    position = 9 + (5 if channels == 1 else 3) + 4 * channels  # main_data_begin, private_bits, scfsi
+    for _ in range(2 * channels):
+        part2_3_length = (side >> (total - position - 12)) & 0xFFF
+        gain_position = position + _GLOBAL_GAIN_OFFSET
+        yield gain_position, part2_3_length, (side >> (total - gain_position - 8)) & 0xFF
+        position += _GRANULE_BITS
+
+
+def main_data_begin(frame: bytes) -> int:
+    """Bytes of this frame's audio data held in earlier frames (the bit reservoir)."""
+    offset, _, _ = _layout(frame)
+    return (frame[offset] << 1) | (frame[offset + 1] >> 7)
+
+
+def _payload(frame: bytes) -> int:
+    offset, length, _ = _layout(frame)
+    return len(frame) - offset - length
+
+
+def is_silent(frame: bytes, silence_gain: int) -> bool:
+    """No coded audio in any granule, or every granule quantized below the silence floor."""
+    return all(part2_3_length == 0 or gain <= silence_gain for _, part2_3_length, gain in _granules(frame))
+
+
+def set_gain(frame: bytes, steps: int) -> bytes:
+    """Shift every coded granule's global_gain by steps (1.5 dB each); the audio data is untouched."""
+    if not steps:
+        return frame
+    offset, length, _ = _layout(frame)
+    side = int.from_bytes(frame[offset:offset + length], 'big')
+    total = length * 8
+    for gain_position, part2_3_length, gain in list(_granules(frame)):
+        if not part2_3_length:
+            continue
+        shift = total - gain_position - 8
+        side = (side & ~(0xFF << shift)) | (max(0, min(255, gain + steps)) << shift)
+    return frame[:offset] + side.to_bytes(length, 'big') + frame[offset + length:]
+
+
+def trim_silence(frames: List[bytes], silence_gain: int, pad_frames: int) -> List[bytes]:
+    """Drop leading and trailing silent frames, keeping pad_frames of air and any reservoir the first sound needs."""
+    loud = [i for i, frame in enumerate(frames) if not is_silent(frame, silence_gain)]
+    if not loud:
+        return frames
+    start = max(0, loud[0] - pad_frames)
+    end = min(len(frames), loud[-1] + 1 + pad_frames)
+    # Keep enough earlier frames to hold the bit reservoir the first sound reads from
+    needed = main_data_begin(frames[loud[0]]) - sum(_payload(frame) for frame in frames[start:loud[0]])
+    while start > 0 and needed > 0:
+        start -= 1
+        needed -= _payload(frames[start])
+    return frames[start:end]
+
+
+def loudness(frames: List[bytes], silence_gain: int) -> Optional[float]:
+    """Median global_gain of coded granules - a codec-domain stand-in for clip loudness."""
+    gains = [gain for frame in frames for _, part2_3_length, gain in _granules(frame) if part2_3_length and gain > silence_gain]
+    return statistics.median(gains) if gains else None
+
+
+def is_info_frame(frame: bytes) -> bool:
+    """LAME/Xing header frame: silent, and its frame count is wrong once frames are trimmed."""
+    offset, length, _ = _layout(frame)
+    return frame[offset + length:offset + length + 4] in (b'Xing', b'Info')
+
+
+def postprocess_mp3(data: bytes, target_gain: Optional[int], silence_gain: int, pad_frames: int, max_boost: int, max_cut: int) -> bytes:
+    """Trim silence and move the clip's loudness to target_gain, mp3gain-style (no decode or re-encode).
+
+    Module-level so it can run in a worker process.
+    """
+    frames = [frame for i, frame in enumerate(iter_mp3_frames(data)) if i or not is_info_frame(frame)]
+    if not frames:
+        return data
+    frames = trim_silence(frames, silence_gain, pad_frames)
+    level = loudness(frames, silence_gain) if target_gain else None
+    steps = max(-max_cut, min(max_boost, round(target_gain - level))) if level is not None else 0
+    return b''.join(set_gain(frame, steps) for frame in frames)
+
+
+class AudioPostProcessor:
+    """Runs postprocess_mp3 in a small process pool, falling back to inline when no pool can be started.
+
+    Celery's prefork workers are daemonic and can't have child processes, so the
+    first failure switches this process to inline processing for good. Workers
+    are spawned, not forked, so they never inherit the web server's threads and
+    locks; a clip that takes longer than TTS_POSTPROCESS_TIMEOUT_SECONDS is
+    served unprocessed.
+    """
+
+    def __init__(self) -> None:
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inline = False
+        self._lock = threading.Lock()
+        self.stats = {
+            'clips': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'bytes_in': 0,
+            'bytes_out': 0,
+        }
+
+    @property
+    def tag(self) -> str:
+        """Identifies the settings a processed clip was made with (part of its cache key)."""
+        return (f"trim{Config.TTS_SILENCE_GLOBAL_GAIN}:{Config.TTS_TRIM_PAD_FRAMES}"
+                f"/gain{Config.TTS_LOUDNESS_TARGET_GAIN}:+{Config.TTS_LOUDNESS_MAX_BOOST}:-{Config.TTS_LOUDNESS_MAX_CUT}")
+
+    def process(self, data: Optional[bytes]) -> Optional[bytes]:
+        if not data:
+            return data
+        args = (data, Config.TTS_LOUDNESS_TARGET_GAIN, Config.TTS_SILENCE_GLOBAL_GAIN, Config.TTS_TRIM_PAD_FRAMES, Config.TTS_LOUDNESS_MAX_BOOST, Config.TTS_LOUDNESS_MAX_CUT)
+        try:
+            pool = self._get_pool()
+            if pool:
+                future = pool.submit(postprocess_mp3, *args)
+                try:
+                    processed = future.result(timeout=Config.TTS_POSTPROCESS_TIMEOUT_SECONDS)
+                except FutureTimeout:
+                    future.cancel()
+                    logger.warning(f"Audio post-processing took over {Config.TTS_POSTPROCESS_TIMEOUT_SECONDS}s, keeping the original clip")
+                    with self._lock:
+                        self.stats['timeouts'] += 1
+                    return data
+            else:
+                processed = postprocess_mp3(*args)
+        except Exception as e:
+            logger.error(f"Audio post-processing failed, keeping the original clip: {e}")
+            with self._lock:
+                self.stats['failures'] += 1
+            return data
+        with self._lock:
+            self.stats['clips'] += 1
+            self.stats['bytes_in'] += len(data)
+            self.stats['bytes_out'] += len(processed)
+        return processed
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        with self._lock:
+            if self._pool is None and not self._inline:
+                try:
+                    self._pool = ProcessPoolExecutor(max_workers=Config.TTS_POSTPROCESS_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+                    # Fails here rather than mid-request if this process can't start workers
+                    self._pool.submit(int).result(timeout=30)
+                except Exception as e:
+                    logger.warning(f"Audio post-processing pool unavailable, processing inline: {e}")
+                    self._pool = None
+                    self._inline = True
+            return self._pool
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'bytes_saved': self.stats['bytes_in'] - self.stats['bytes_out'], 'inline': self._inline}
+
+
+audio_postprocessor = AudioPostProcessor()
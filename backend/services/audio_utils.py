@@ -0,0 +1,77 @@
+from typing import Iterable, Iterator, Optional, Tuple
+
+
+# MPEG-1 Layer III tables
+_BITRATES_KBPS = (None, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_SAMPLE_RATES = (44100, 48000, 32000)
+SAMPLES_PER_FRAME = 1152
+
+
+def _frame_length(bitrate_kbps: int, sample_rate: int, padding: int = 0) -> int:
+    return 144 * bitrate_kbps * 1000 // sample_rate + padding
+
+
+def mp3_frame_header(bitrate_kbps: int = 128, sample_rate: int = 44100, mono: bool = True) -> bytes:
+    """Four-byte MPEG-1 Layer III frame header (no CRC, no padding)."""
+    bitrate_index = _BITRATES_KBPS.index(bitrate_kbps)
+    rate_index = _SAMPLE_RATES.index(sample_rate)
+    channel_mode = 0b11 if mono else 0b00
+    return bytes([
+        0xFF,
+        0xFB,
+        (bitrate_index << 4) | (rate_index << 2),
+        (channel_mode << 6) | 0b100,  # "original" bit set
+    ])
+
+
+def silent_mp3(duration_seconds: float, bitrate_kbps: int = 128, sample_rate: int = 44100) -> bytes:
+    """A valid MP3 of digital silence; every frame is a header followed by zeroed side info and data."""
+    frame_count = max(1, round(duration_seconds * sample_rate / SAMPLES_PER_FRAME))
+    frame = mp3_frame_header(bitrate_kbps, sample_rate)
+    frame += b'\x00' * (_frame_length(bitrate_kbps, sample_rate) - len(frame))
+    return frame * frame_count
+
+
+def parse_frame_header(header: bytes) -> Optional[Tuple[int, int, int]]:
+    """(frame length, bitrate kbps, sample rate) for an MPEG-1 Layer III header, else None."""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xFE) != 0xFA:
+        return None
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0b11
+    if bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    padding = (header[2] >> 1) & 1
+    bitrate = _BITRATES_KBPS[bitrate_index]
+    sample_rate = _SAMPLE_RATES[rate_index]
+    return _frame_length(bitrate, sample_rate, padding), bitrate, sample_rate
+
+
+def iter_mp3_frames(data: bytes) -> Iterator[bytes]:
+    """Yield whole MPEG-1 Layer III frames, skipping ID3 tags and any bytes between frames."""
+    position = 0
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = ((data[6] & 0x7F) << 21) | ((data[7] & 0x7F) << 14) | ((data[8] & 0x7F) << 7) | (data[9] & 0x7F)
+        position = 10 + size
+    while position + 4 <= len(data):
+        parsed = parse_frame_header(data[position:position + 4])
+        if parsed is None:
+            position += 1
+            continue
+        length = parsed[0]
+        if position + length > len(data):
+            break
+        yield data[position:position + length]
+        position += length
+
+
+def mp3_duration(data: bytes) -> float:
+    """Playback length in seconds, counted from the frames themselves."""
+    seconds = 0.0
+    for frame in iter_mp3_frames(data):
+        seconds += SAMPLES_PER_FRAME / parse_frame_header(frame)[2]
+    return seconds
+
+
+def join_mp3(parts: Iterable[bytes]) -> bytes:
+    """Concatenate clips into one playable stream, keeping only their frames (ID3 tags are dropped)."""
+    return b''.join(frame for part in parts for frame in iter_mp3_frames(part))
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+from database import db
+
+
+logger = logging.getLogger(__name__)
+
+
+def _band(value: Any, edges: Tuple[int, ...]) -> Optional[int]:
+    """Index of the band a 0-100 slider value falls in (edges are inclusive lower bounds)."""
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    band = 0
+    for i, edge in enumerate(edges, start=1):
+        if value >= edge:
+            band = i
+    return band
+
+
+def preference_bucket(user_context: Optional[Dict[str, Any]]) -> str:
+    """Quantise a user context to the bands that actually change the prompt, temperature or voice.
+
+    Slider edges mirror the thresholds in CommentaryService (prompt wording and
+    generation temperature), so every user in a bucket would have received an
+    equivalent line anyway.
+    """
+    if not isinstance(user_context, dict):
+        return 'default'
+    prefs = user_context.get('preferences') or {}
+    favorite = prefs.get('favoriteTeam')
+    if isinstance(favorite, dict):
+        favorite = favorite.get('name')
+
+    bucket = {
+        'energy': _band(prefs.get('energyLevel'), (31, 40, 60, 80)),
+        'comedy': _band(prefs.get('comedyLevel'), (21, 40, 70)),
+        'stats': _band(prefs.get('statFocus'), (40, 70)),
+        'bias': _band(prefs.get('biasLevel'), (40, 70)) if favorite else None,
+        'team': favorite or None,
+        'language': (prefs.get('language') or '').lower() or None,
+        'voice': prefs.get('voiceId') or prefs.get('voice_id'),
+        'interests': sorted(str(i).lower() for i in (user_context.get('interests') or [])),
+        'fantasy': user_context.get('fantasy_info') or None,
+        'custom': user_context.get('customInstructions') or None,
+    }
+    canonical = json.dumps(bucket, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+
+
+class CommentaryFanout:
+    """Generates commentary once per (game_id, play_id, persona, preference bucket).
+
+    - The first request for a key runs generation; concurrent requests wait on it
+    - Finished lines are kept in a bounded in-process LRU for later requests
+    - Other workers reuse lines already stored in the commentary collection
+    """
+
+    def __init__(self, commentary_service, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None) -> None:
+        self.db = db
+        self.commentary_service = commentary_service
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.COMMENTARY_FANOUT_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else Config.COMMENTARY_FANOUT_MAX_ENTRIES
+        self.wait_timeout = Config.COMMENTARY_FANOUT_WAIT_SECONDS
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[str, str, str, str], _Flight] = {}
+        self._results: 'OrderedDict[Tuple[str, str, str, str], Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._streams: 'OrderedDict[Tuple[str, str, str, str], Tuple[float, str]]' = OrderedDict()
+        self.stats = {'generated': 0, 'memory_hits': 0, 'store_hits': 0, 'waited': 0, 'streams_started': 0, 'streams_joined': 0}
+
+    def get_commentary(self, game_id, play_id, event_type='generic', persona='passionate', play_description='', user_context=None):
+        bucket = preference_bucket(user_context)
+        key = (str(game_id), str(play_id), persona, bucket)
+
+        with self._lock:
+            cached = self._get_cached(key)
+            if cached is not None:
+                self.stats['memory_hits'] += 1
+                return dict(cached)
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+
+        if not leader:
+            self.stats['waited'] += 1
+            if flight.event.wait(self.wait_timeout) and flight.result is not None:
+                return dict(flight.result)
+            logger.warning(f"Timed out waiting for shared commentary {key}; serving fallback")
+            return self.commentary_service._get_fallback_commentary(persona)
+
+        result = None
+        try:
+            result = self._load_stored(key)
+            if result is not None:
+                self.stats['store_hits'] += 1
+            else:
+                self.stats['generated'] += 1
+                result = self.commentary_service.generate_commentary(
+                    game_id=game_id,
+                    event_type=event_type,
+                    persona=persona,
+                    play_description=play_description,
+                    user_context=user_context,
+                    play_id=str(play_id),
+                    bucket=bucket
+                )
+            return dict(result)
+        finally:
+            with self._lock:
+                # Fallback lines are shared with current waiters but not cached
+                if result is not None and not result.get('fallback'):
+                    self._results[key] = (time.monotonic() + self.ttl_seconds, result)
+                    self._results.move_to_end(key)
+                    while len(self._results) > self.max_entries:
+                        self._results.popitem(last=False)
+                self._inflight.pop(key, None)
+            flight.result = result
+            flight.event.set()
+
+    def claim_stream(self, game_id, play_id, persona, user_context, stream_id):
+        """Register stream_id as the shared stream for this key; returns an already running stream's id, else None"""
+        key = (str(game_id), str(play_id), persona, preference_bucket(user_context))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._streams.get(key)
+            if entry is not None and entry[0] >= now:
+                self.stats['streams_joined'] += 1
+                return entry[1]
+            self._streams[key] = (now + self.ttl_seconds, stream_id)
+            self._streams.move_to_end(key)
+            while len(self._streams) > self.max_entries:
+                self._streams.popitem(last=False)
+            self.stats['streams_started'] += 1
+        return None
+
+    def _get_cached(self, key):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if expires < time.monotonic():
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return result
+
+    def _load_stored(self, key):
+        game_id, play_id, persona, bucket = key
+        try:
+            doc = self.db.commentary.find_one({
+                'game_id': game_id,
+                'play_id': play_id,
+                'persona': persona,
+                'bucket': bucket
+            })
+        except Exception as e:
+            logger.error(f"Error looking up shared commentary: {e}")
+            return None
+        if not doc:
+            return None
+        return {
+            'text': doc.get('text'),
+            'audio_url': doc.get('audio_url'),
+            'persona': doc.get('persona'),
+            'tier': doc.get('tier'),
+            'timestamp': doc.get('timestamp')
+        }
@@ -0,0 +1,109 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+class CommentaryScheduler:
+    """Per-game priority queue of plays waiting for commentary.
+
+    - Plays are ordered by significance score, highest first
+    - Each play carries a deadline (arrival + SLO); plays that cannot finish
+      before their deadline at the current model latency are dropped
+    - Lower-priority plays still in time are merged into the batch of the
+      play being generated instead of costing their own model call
+    - When a game's queue is full the least significant play is dropped
+    """
+
+    def __init__(self, slo_seconds: Optional[float] = None, max_queue: Optional[int] = None, max_batch: Optional[int] = None) -> None:
+        self.slo_seconds = slo_seconds if slo_seconds is not None else Config.COMMENTARY_SLO_SECONDS
+        self.max_queue = max_queue if max_queue is not None else Config.COMMENTARY_QUEUE_MAX_PER_GAME
+        self.max_batch = max_batch if max_batch is not None else Config.COMMENTARY_BATCH_MAX_PLAYS
+        self._queues: Dict[str, List[Any]] = {}
+        self._draining: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        # Expected seconds per generation, smoothed (seeded pessimistically)
+        self.expected_latency = 2.0
+        self.stats = {'submitted': 0, 'generated': 0, 'merged': 0, 'dropped_expired': 0, 'dropped_overflow': 0}
+
+    def submit(self, game_id: str, play: Dict[str, Any], score: float, deadline: Optional[float] = None) -> None:
+        entry = [-score, next(self._sequence), deadline or time.monotonic() + self.slo_seconds, play]
+        with self._lock:
+            queue = self._queues.setdefault(str(game_id), [])
+            heapq.heappush(queue, entry)
+            self.stats['submitted'] += 1
+            if len(queue) > self.max_queue:
+                # Drop the least significant (latest on ties) play
+                weakest = max(queue, key=lambda e: (e[0], e[1]))
+                queue.remove(weakest)
+                heapq.heapify(queue)
+                self.stats['dropped_overflow'] += 1
+
+    def next_batch(self, game_id: str) -> List[Dict[str, Any]]:
+        """Pop the most significant live play plus any others that can ride along with it."""
+        with self._lock:
+            return self._pop_batch(str(game_id))
+
+    def pending(self, game_id: str) -> int:
+        with self._lock:
+            return len(self._queues.get(str(game_id), []))
+
+    def drain(self, game_id: str, generate: Callable[[List[Dict[str, Any]]], Any]) -> int:
+        """Generate commentary until the game's queue is empty; returns the number of batches.
+
+        Only one caller drains a game at a time; others just leave their plays queued.
+        """
+        game_id = str(game_id)
+        with self._lock:
+            if self._draining.get(game_id):
+                return 0
+            self._draining[game_id] = True
+
+        batches = 0
+        try:
+            while True:
+                with self._lock:
+                    batch = self._pop_batch(game_id)
+                    if not batch:
+                        # Released under the same lock so a concurrent submit is never stranded
+                        self._draining.pop(game_id, None)
+                        return batches
+                started = time.monotonic()
+                try:
+                    generate(batch)
+                except Exception as e:
+                    logger.error(f"Error generating queued commentary for game {game_id}: {e}")
+                self._observe(time.monotonic() - started)
+                batches += 1
+                self.stats['generated'] += len(batch)
+        finally:
+            with self._lock:
+                self._draining.pop(game_id, None)
+
+    def _pop_batch(self, game_id: str) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        queue = self._queues.get(game_id, [])
+        live = []
+        while queue:
+            entry = heapq.heappop(queue)
+            if entry[2] < now + self.expected_latency:
+                self.stats['dropped_expired'] += 1
+                continue
+            live.append(entry)
+            if len(live) >= self.max_batch:
+                break
+        if len(live) > 1:
+            self.stats['merged'] += len(live) - 1
+        # Plays are called in game order, not priority order
+        return [entry[3] for entry in sorted(live, key=lambda e: e[1])]
+
+    def _observe(self, seconds: float) -> None:
+        self.expected_latency = 0.8 * self.expected_latency + 0.2 * seconds
@@ -1,10 +1,22 @@
-import google.generativeai as genai
 from config import Config
 from database import db
 from services.game_service import GameService
 from services.tts_service import TTSService
+from services.archive_service import ArchiveService
+from services.prompt_compiler import prompt_compiler
+from services.response_cache import response_cache, normalize_text
+from services.commentary_fanout import preference_bucket
+from services.gemini_client import gemini_client
+from services.template_commentary import FALLBACK_LINES, IDLE_LINES, template_commentary
+from services.model_router import model_router, TIERS
+from services.prompt_compiler import estimate_tokens
+from services.latency import latency
+from services.sentence_splitter import SentenceBuffer, split_sentences
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +25,12 @@ class CommentaryService:
         self.db = db
         self.game_service = GameService()
         self.tts_service = TTSService()
+        self.archive_service = ArchiveService()
         
-        # Configure Gemini
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        # Shared Gemini client (drop-in for GenerativeModel.generate_content)
+        self.model = gemini_client
+        # Picks full prompt / compressed prompt / template per line from live model health
+        self.router = model_router
         
         # Commentary personas
         self.personas = {
@@ -37,285 +51,474 @@ class CommentaryService:
             }
         }
     
-    def generate_commentary(self, game_id, event_type='generic', persona='passionate', play_description='', user_context=None):
-        """Generate commentary for a specific play"""
+    def generate_commentary(self, game_id, event_type='generic', persona='passionate', play_description='', user_context=None, play_id=None, bucket=None, received_at=None, shared=False):
+        """Generate commentary for a specific play
+
+        play_id/bucket are stored with the line so CommentaryFanout can share it
+        across viewers in the same preference bucket. received_at (epoch seconds
+        when the play was ingested) feeds the play-to-audio latency histogram.
+        shared marks lines of the server-driven feed, which public outputs such
+        as the radio stations may carry.
+        """
+        with latency.span('commentary.total', persona=persona) as span:
+            result = self._generate_commentary(game_id, event_type, persona, play_description, user_context, play_id, bucket, received_at, shared)
+            span.update(tier=result.get('tier'), cache='hit' if result.get('tier') == 'cache' else 'miss')
+            return result
+
+    def _generate_commentary(self, game_id, event_type, persona, play_description, user_context, play_id, bucket, received_at, shared):
+        game_summary = None
         try:
             logger.info(f"Generating commentary for game_id={game_id}, event_type={event_type}, persona={persona}, play={play_description[:50]}...")
             
-            # Get game context - try database first, then direct API as fallback
-            game_summary = self.game_service.get_game_summary(game_id)
-            
-            if not game_summary:
-                logger.warning(f"No game summary found in database for {game_id}, creating minimal context")
-                # Create minimal game context for commentary generation
-                game_summary = self._create_minimal_game_context(game_id)
+            with latency.span('commentary.context', persona=persona):
+                game_summary = self._load_game_summary(game_id)
             
-            # Get persona style
-            persona_config = self.personas.get(persona, self.personas['passionate'])
+            if persona == 'raw':
+                # Factual play calls come straight from the template engine, no model call needed
+                commentary_text = template_commentary.render(play_description, 'raw', game_summary)
+                return self._finalize_commentary(game_id, commentary_text, persona, event_type, user_context, play_id, bucket, tier='template', received_at=received_at, shared=shared)
             
-            # Create prompt
-            prompt = self._create_commentary_prompt(game_summary, event_type, persona_config, play_description, user_context)
-            logger.info(f"Generated prompt for Gemini: {prompt[:200]}...")
-            
-            # Generate with Gemini using preference-influenced settings
-            # Adjust generation parameters based on user preferences
-            base_temp = 0.8  # Default for commentary (slightly more creative than chat)
-            max_tokens = 100
-            
-            if user_context and user_context.get('preferences'):
-                prefs = user_context['preferences']
-                energy = prefs.get('energyLevel', 50)
-                comedy = prefs.get('comedyLevel', 25)
-                stat_focus = prefs.get('statFocus', 50)
-                
-                # DEBUG: Log the actual preference values received
-                logger.info(f"[PREFERENCES DEBUG] Energy: {energy}, Comedy: {comedy}, StatFocus: {stat_focus}")
-                logger.info(f"[PREFERENCES DEBUG] Raw preferences object: {prefs}")
-                
-                # Higher energy/comedy = higher temperature (more varied responses)
-                if energy >= 80 or comedy >= 70:
-                    base_temp = 1.0  # Maximum creativity for high energy/comedy
-                    logger.info(f"[TEMP DEBUG] Using MAXIMUM creativity temp={base_temp} (energy={energy}, comedy={comedy})")
-                elif energy >= 60 or comedy >= 40:
-                    base_temp = 0.9  # High creativity
-                    logger.info(f"[TEMP DEBUG] Using medium creativity temp={base_temp} (energy={energy}, comedy={comedy})")
-                elif energy <= 30 and comedy <= 20:
-                    base_temp = 0.6  # More measured and consistent
-                    logger.info(f"[TEMP DEBUG] Using low creativity temp={base_temp} (energy={energy}, comedy={comedy})")
-                else:
-                    logger.info(f"[TEMP DEBUG] Using default temp={base_temp} (energy={energy}, comedy={comedy})")
-                
-                # Higher stat focus = more tokens for detailed analysis
-                if stat_focus >= 70:
-                    max_tokens = 150  # Allow more room for stats and analysis
-                    logger.info(f"[TOKENS DEBUG] Using extended tokens={max_tokens} for high stat focus ({stat_focus})")
+            # Same game version + play + persona + preference bucket -> reuse the earlier line
+            with latency.span('commentary.cache_lookup', persona=persona) as span:
+                cache_key = self._commentary_cache_key(game_summary, play_description, event_type, persona, user_context)
+                commentary_text = response_cache.get(cache_key)
+                span['cache'] = 'miss' if commentary_text is None else 'hit'
+            if commentary_text is None:
+                commentary_text, tier = self._generate_routed(game_summary, event_type, persona, play_description, user_context)
+                if tier != 'template':
+                    response_cache.set(cache_key, commentary_text)
             else:
-                logger.info("[PREFERENCES DEBUG] No user_context or preferences found, using defaults")
+                tier = 'cache'
+                logger.info(f"Gemini response cache hit: {commentary_text}")
             
-            generation_config = {
-                'max_output_tokens': max_tokens,
-                'temperature': base_temp,
-                'top_p': 0.95 if base_temp >= 1.0 else 0.9,  # Even more diverse for max creativity
-                'top_k': 40 if base_temp >= 1.0 else 50,  # More randomness for high energy/comedy
-            }
+            return self._finalize_commentary(game_id, commentary_text, persona, event_type, user_context, play_id, bucket, tier=tier, received_at=received_at, shared=shared)
             
-            response = self.model.generate_content(prompt, generation_config=generation_config)
-            commentary_text = response.text.strip()
-            logger.info(f"Gemini response (temp={base_temp}): {commentary_text}")
+        except Exception as e:
+            logger.error(f"Error generating commentary: {e}")
+            self.router.served_by('template')
+            # Throttled, slow or failing model: build an instant line from the play itself
+            if play_description or "quota" in str(e).lower() or "429" in str(e):
+                return self._get_smart_fallback_commentary(persona, play_description, event_type, game_summary)
+            return self._get_fallback_commentary(persona)
+    
+    def _generate_routed(self, game_summary, event_type, persona, play_description, user_context):
+        """Generate one line on the best tier the model router allows
+
+        Returns (text, tier). A quota error steps straight down to the next,
+        cheaper tier for this same line; any other failure, or every model
+        tier being out of rotation, serves the line from the template engine.
+        """
+        persona_config = self.personas.get(persona, self.personas['passionate'])
+        generation_config = self._generation_config(user_context)
+        tier = self.router.choose()
+        while tier != 'template':
+            with latency.span('commentary.prompt', persona=persona, tier=tier):
+                prompt = self._create_commentary_prompt(game_summary, event_type, persona_config, play_description, user_context, tier=tier)
+            logger.info(f"Compiled {tier} commentary prompt: tokens={prompt.tokens}")
+            started = time.monotonic()
+            try:
+                with latency.span('commentary.model', persona=persona, tier=tier):
+                    response = self.model.generate_content(prompt.text, generation_config=generation_config)
+                    commentary_text = response.text.strip()
+            except Exception as e:
+                kind = self.router.record_failure(tier, e, time.monotonic() - started)
+                logger.error(f"Gemini {tier} tier failed ({kind}): {e}")
+                next_tier = self.router.choose() if kind == 'quota' else 'template'
+                if TIERS.index(next_tier) <= TIERS.index(tier):
+                    next_tier = 'template'
+                tier = next_tier
+                continue
+            self.router.record_success(tier, time.monotonic() - started, self._tokens_used(response, prompt, commentary_text))
+            logger.info(f"Gemini {tier} response (temp={generation_config['temperature']}): {commentary_text}")
+            return commentary_text, tier
+        return self._template_text(persona, play_description, event_type, game_summary), 'template'
+
+    def _tokens_used(self, response, prompt, text):
+        usage = getattr(response, 'usage_metadata', None)
+        total = getattr(usage, 'total_token_count', None) if usage is not None else None
+        return total or prompt.tokens['total'] + estimate_tokens(text)
+
+    def _template_text(self, persona, play_description, event_type, game_summary):
+        return self._get_smart_fallback_commentary(persona, play_description, event_type, game_summary)['text']
+
+    def stream_commentary(self, game_id, event_type='generic', persona='passionate', play_description='', user_context=None, on_chunk=None, play_id=None, bucket=None):
+        """Stream commentary sentence by sentence
+
+        Gemini output is consumed as a stream and cut at sentence boundaries.
+        Each sentence is reported through on_chunk({'type': 'text', ...}) as soon
+        as it is complete and voiced on a TTS worker while the model keeps
+        generating, then reported again as {'type': 'audio', ...}. A final
+        {'type': 'done', ...} chunk carries the full line. Returns the same
+        dict as generate_commentary plus the ordered per-sentence audio_urls.
+        """
+        emit = on_chunk or (lambda chunk: None)
+        started = time.monotonic()
+        timings = {}
+        sentences = []
+        audio_futures = []
+        voice_id, language = self._voice_preferences(user_context)
+
+        # Sentences are voiced concurrently; audio chunks carry their index and audio_urls keep text order
+        with ThreadPoolExecutor(max_workers=Config.TTS_PARALLEL_WORKERS, thread_name_prefix='commentary-tts') as tts_pool:
+            def on_sentence(sentence):
+                index = len(sentences)
+                sentences.append(sentence)
+                timings.setdefault('first_text_ms', round((time.monotonic() - started) * 1000))
+                emit({'type': 'text', 'index': index, 'text': sentence, 'persona': persona})
+                audio_futures.append(tts_pool.submit(self._voice_sentence, index, sentence, persona, voice_id, language, emit, started, timings))
+
+            game_summary = None
+            try:
+                logger.info(f"Streaming commentary for game_id={game_id}, event_type={event_type}, persona={persona}, play={play_description[:50]}...")
+                game_summary = self._load_game_summary(game_id)
+                persona_config = self.personas.get(persona, self.personas['passionate'])
+                generation_config = self._generation_config(user_context)
+
+                cache_key = self._commentary_cache_key(game_summary, play_description, event_type, persona, user_context)
+                if persona == 'raw':
+                    tier = 'template'
+                    cached = template_commentary.render(play_description, 'raw', game_summary)
+                else:
+                    tier = 'cache'
+                    cached = response_cache.get(cache_key)
+                    if cached is None:
+                        tier = self.router.choose()
+                        if tier == 'template':
+                            cached = self._template_text(persona, play_description, event_type, game_summary)
+                if cached is not None:
+                    for sentence in split_sentences(cached):
+                        on_sentence(sentence)
+                else:
+                    prompt = self._create_commentary_prompt(game_summary, event_type, persona_config, play_description, user_context, tier=tier)
+                    buffer = SentenceBuffer()
+                    truncated = False
+                    stream_started = time.monotonic()
+                    try:
+                        for chunk in self.model.generate_content(prompt.text, generation_config=generation_config, stream=True):
+                            for sentence in buffer.feed(chunk.text):
+                                on_sentence(sentence)
+                            if sum(len(s) for s in sentences) >= Config.MAX_COMMENTARY_LENGTH:
+                                # Enough for one on-air read; stop paying for more tokens
+                                truncated = True
+                                break
+                    except Exception as e:
+                        self.router.record_failure(tier, e, time.monotonic() - stream_started)
+                        raise
+                    if not truncated:
+                        for sentence in buffer.flush():
+                            on_sentence(sentence)
+                    text = ' '.join(sentences)
+                    self.router.record_success(tier, time.monotonic() - stream_started, prompt.tokens['total'] + estimate_tokens(text))
+                    if sentences:
+                        response_cache.set(cache_key, text)
+
+                if not sentences:
+                    raise ValueError("Gemini stream returned no text")
+                audio_urls = [future.result() for future in audio_futures]
+            except Exception as e:
+                logger.error(f"Error streaming commentary: {e}")
+                self.router.served_by('template')
+                if play_description or "quota" in str(e).lower() or "429" in str(e):
+                    fallback = self._get_smart_fallback_commentary(persona, play_description, event_type, game_summary)
+                else:
+                    fallback = self._get_fallback_commentary(persona)
+                emit({'type': 'text', 'index': len(sentences), 'text': fallback['text'], 'persona': persona, 'fallback': True})
+                emit({'type': 'done', **fallback, 'timestamp': fallback['timestamp'].isoformat(), 'audio_urls': []})
+                return fallback
+
+        commentary_text = ' '.join(sentences)
+        first_audio = next((url for url in audio_urls if url), None)
+        commentary_doc = self._store_commentary(game_id, commentary_text, persona, event_type, first_audio, play_id, bucket, audio_urls=audio_urls, tier=tier)
+        self.router.served_by(tier)
+
+        result = {
+            'text': commentary_text,
+            'audio_url': commentary_doc['audio_url'],
+            'audio_urls': audio_urls,
+            'persona': persona,
+            'tier': tier,
+            'timestamp': commentary_doc['timestamp']
+        }
+        if tier == 'template' and persona != 'raw':
+            result['fallback'] = True
+        for stage in ('first_text', 'first_audio'):
+            if timings.get(f'{stage}_ms') is not None:
+                latency.observe(f'commentary.stream_{stage}', timings[f'{stage}_ms'] / 1000, persona=persona, tier=tier)
+        latency.observe('commentary.stream_total', time.monotonic() - started, persona=persona, tier=tier)
+        logger.info(f"Streamed {len(sentences)} sentences via {tier} tier (first text {timings.get('first_text_ms')}ms, first audio {timings.get('first_audio_ms')}ms)")
+        emit({'type': 'done', **result, 'timestamp': result['timestamp'].isoformat(), **timings})
+        return result
+
+    def _voice_sentence(self, index, sentence, persona, voice_id, language, emit, started, timings):
+        try:
+            audio_url = self.tts_service.generate_audio(sentence, persona, voice_id=voice_id, language=language)
+        except Exception as e:
+            logger.error(f"Error voicing sentence {index}: {e}")
+            audio_url = None
+        if audio_url:
+            timings.setdefault('first_audio_ms', round((time.monotonic() - started) * 1000))
+        emit({'type': 'audio', 'index': index, 'audio_url': audio_url, 'persona': persona})
+        return audio_url
+
+    def generate_commentary_batch(self, game_id, plays, personas=None, user_context=None, shared=False):
+        """Generate commentary for several plays and personas with a single Gemini call
+
+        plays: list of {'play_description', 'event_type'?, 'play_id'?} in game order.
+        Returns one result list per play, each holding one result per persona.
+        Lines the model leaves out of an otherwise good reply fall back to
+        per-play generate_commentary; when the batch call itself fails (or the
+        router has taken the model out of rotation) the missing lines come from
+        the template engine, so a struggling upstream isn't hit once per line.
+        """
+        personas = [p for p in (personas or ['passionate']) if p in self.personas] or ['passionate']
+        plays = list(plays)[:Config.COMMENTARY_BATCH_MAX_PLAYS]
+        if not plays:
+            return []
+
+        bucket = preference_bucket(user_context)
+        game_summary = self._load_game_summary(game_id)
+        lines = {}
+        batch_lines = set()
+
+        # Lines already generated for the same game version are not asked for again
+        pending = []
+        for index, play in enumerate(plays, start=1):
+            for persona in personas:
+                if persona == 'raw':
+                    lines[(index, persona)] = template_commentary.render(play.get('play_description', ''), 'raw', game_summary)
+                    continue
+                key = self._commentary_cache_key(game_summary, play.get('play_description', ''), play.get('event_type', 'generic'), persona, user_context)
+                cached = response_cache.get(key)
+                if cached is not None:
+                    lines[(index, persona)] = cached
+                else:
+                    pending.append((index, persona))
+
+        tier = self.router.choose() if pending else 'template'
+        batch_failed = tier == 'template'
+        if pending and tier != 'template':
+            started = time.monotonic()
+            try:
+                pending_plays = sorted({index for index, _ in pending})
+                pending_personas = [p for p in personas if any(persona == p for _, persona in pending)]
+                prompt = prompt_compiler.compile_commentary_batch(
+                    game_summary,
+                    [plays[i - 1] for i in pending_plays],
+                    {name: self.personas[name] for name in pending_personas},
+                    user_context
+                )
+                logger.info(f"Compiled batch commentary prompt: plays={len(pending_plays)} personas={len(pending_personas)} tokens={prompt.tokens}")
+
+                generation_config = self._generation_config(user_context)
+                # Room for every line in one response
+                generation_config['max_output_tokens'] = generation_config['max_output_tokens'] * len(pending) + 50
+                try:
+                    with latency.span('commentary.batch_model', tier=tier, plays=len(pending_plays)):
+                        response = self.model.generate_content(prompt.text, generation_config=generation_config)
+                except Exception as e:
+                    self.router.record_failure(tier, e, time.monotonic() - started)
+                    raise
+                self.router.record_success(tier, time.monotonic() - started, self._tokens_used(response, prompt, response.text))
+
+                for entry in self._parse_batch_response(response.text):
+                    position = entry['play']
+                    if not 1 <= position <= len(pending_plays) or entry['persona'] not in pending_personas:
+                        continue
+                    index = pending_plays[position - 1]
+                    if (index, entry['persona']) in lines:
+                        continue
+                    play = plays[index - 1]
+                    lines[(index, entry['persona'])] = entry['text']
+                    batch_lines.add((index, entry['persona']))
+                    response_cache.set(
+                        self._commentary_cache_key(game_summary, play.get('play_description', ''), play.get('event_type', 'generic'), entry['persona'], user_context),
+                        entry['text']
+                    )
+            except Exception as e:
+                logger.error(f"Error generating batch commentary: {e}")
+                batch_failed = True
+
+        results = []
+        for index, play in enumerate(plays, start=1):
+            play_results = []
+            for persona in personas:
+                event_type = play.get('event_type', 'generic')
+                play_id = str(play['play_id']) if play.get('play_id') is not None else None
+                text = lines.get((index, persona))
+                line_tier = 'template' if persona == 'raw' else ('cache' if (index, persona) not in batch_lines else tier)
+                if text is None and batch_failed:
+                    text = self._template_text(persona, play.get('play_description', ''), event_type, game_summary)
+                    line_tier = 'template'
+                elif text is None:
+                    logger.warning(f"Batch response missing play {index} persona {persona}, generating individually")
+                    play_results.append(self.generate_commentary(
+                        game_id=game_id,
+                        event_type=event_type,
+                        persona=persona,
+                        play_description=play.get('play_description', ''),
+                        user_context=user_context,
+                        play_id=play_id,
+                        bucket=bucket if play_id is not None else None,
+                        received_at=play.get('received_at'),
+                        shared=shared
+                    ))
+                    continue
+                try:
+                    play_results.append(self._finalize_commentary(game_id, text, persona, event_type, user_context, play_id, bucket if play_id is not None else None, tier=line_tier, received_at=play.get('received_at'), shared=shared))
+                except Exception as e:
+                    logger.error(f"Error storing batch commentary: {e}")
+                    play_results.append(self._get_fallback_commentary(persona))
+            results.append(play_results)
+        return results
+
+    def _parse_batch_response(self, text):
+        """Extract [{'play', 'persona', 'text'}] from a batch reply, tolerating code fences and stray prose"""
+        start, end = text.find('['), text.rfind(']')
+        if start == -1 or end <= start:
+            logger.warning("Batch commentary response contained no JSON array")
+            return []
+        try:
+            raw = json.loads(text[start:end + 1])
+        except ValueError as e:
+            logger.warning(f"Could not parse batch commentary response: {e}")
+            return []
+
+        entries = []
+        for item in raw if isinstance(raw, list) else []:
+            if not isinstance(item, dict):
+                continue
+            try:
+                play = int(item.get('play'))
+            except (TypeError, ValueError):
+                continue
+            persona = str(item.get('persona', '')).strip().lower()
+            line = str(item.get('text') or '').strip()
+            if line:
+                entries.append({'play': play, 'persona': persona, 'text': line})
+        return entries
+
+    def _load_game_summary(self, game_id):
+        # Get game context - try database first, then direct API as fallback
+        game_summary = self.game_service.get_game_summary(game_id)
+        
+        if not game_summary:
+            logger.warning(f"No game summary found in database for {game_id}, creating minimal context")
+            # Create minimal game context for commentary generation
+            game_summary = self._create_minimal_game_context(game_id)
+        return game_summary
+
+    def _generation_config(self, user_context):
+        # Adjust generation parameters based on user preferences
+        base_temp = 0.8  # Default for commentary (slightly more creative than chat)
+        max_tokens = 100
+        
+        if user_context and user_context.get('preferences'):
+            prefs = user_context['preferences']
+            energy = prefs.get('energyLevel', 50)
+            comedy = prefs.get('comedyLevel', 25)
+            stat_focus = prefs.get('statFocus', 50)
             
-            # Ensure length limit
-            if len(commentary_text) > Config.MAX_COMMENTARY_LENGTH:
-                commentary_text = commentary_text[:Config.MAX_COMMENTARY_LENGTH] + "..."
+            # Higher energy/comedy = higher temperature (more varied responses)
+            if energy >= 80 or comedy >= 70:
+                base_temp = 1.0  # Maximum creativity for high energy/comedy
+            elif energy >= 60 or comedy >= 40:
+                base_temp = 0.9  # High creativity
+            elif energy <= 30 and comedy <= 20:
+                base_temp = 0.6  # More measured and consistent
             
-            # Generate audio (respect user preferences if provided)
-            language = None
-            explicit_voice_id = None
-            if isinstance(user_context, dict):
-                prefs = user_context.get('preferences') or {}
-                language = prefs.get('language')
-                explicit_voice_id = prefs.get('voiceId') or prefs.get('voice_id')
+            # Higher stat focus = more tokens for detailed analysis
+            if stat_focus >= 70:
+                max_tokens = 150  # Allow more room for stats and analysis
+            logger.debug(f"Generation settings temp={base_temp} tokens={max_tokens} (energy={energy}, comedy={comedy}, stat_focus={stat_focus})")
+        
+        return {
+            'max_output_tokens': max_tokens,
+            'temperature': base_temp,
+            'top_p': 0.95 if base_temp >= 1.0 else 0.9,  # Even more diverse for max creativity
+            'top_k': 40 if base_temp >= 1.0 else 50,  # More randomness for high energy/comedy
+        }
+
+    def _commentary_cache_key(self, game_summary, play_description, event_type, persona, user_context):
+        game = game_summary['game']
+        return response_cache.make_key(
+            'commentary',
+            game_version={'score': game.get('score'), 'clock': game.get('clock'), 'status': game.get('status')},
+            play=normalize_text(play_description),
+            event_type=event_type,
+            persona=persona,
+            bucket=preference_bucket(user_context)
+        )
 
+    def _finalize_commentary(self, game_id, commentary_text, persona, event_type, user_context=None, play_id=None, bucket=None, tier=None, received_at=None, shared=False):
+        """Trim, voice and store a generated line; tier records which router tier produced it"""
+        # Ensure length limit
+        if len(commentary_text) > Config.MAX_COMMENTARY_LENGTH:
+            commentary_text = commentary_text[:Config.MAX_COMMENTARY_LENGTH] + "..."
+        
+        # Generate audio (respect user preferences if provided)
+        explicit_voice_id, language = self._voice_preferences(user_context)
+        with latency.span('commentary.tts', persona=persona):
             audio_url = self.tts_service.generate_audio(
                 commentary_text,
                 persona,
                 voice_id=explicit_voice_id,
                 language=language
             )
-            
-            # Store commentary
-            commentary_doc = {
-                'game_id': game_id,
-                'timestamp': datetime.now(),
-                'text': commentary_text,
-                'persona': persona,
-                'confidence': 0.8,  # Mock confidence
-                'audio_url': audio_url,
-                'event_type': event_type
-            }
-            
-            self.db.commentary.insert_one(commentary_doc)
-            
-            return {
-                'text': commentary_text,
-                'audio_url': audio_url,
-                'persona': persona,
-                'timestamp': commentary_doc['timestamp']
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating commentary: {e}")
-            # Check if it's a quota error and use smart fallback
-            if "quota" in str(e).lower() or "429" in str(e):
-                return self._get_smart_fallback_commentary(persona, play_description, event_type)
-            return self._get_fallback_commentary(persona)
-    
-    def _create_commentary_prompt(self, game_summary, event_type, persona_config, play_description='', user_context=None):
-        """Create prompt for Gemini"""
-        game = game_summary['game']
-        top_scorers = game_summary['top_scorers']
+        if received_at is not None:
+            latency.observe('commentary.play_to_audio', time.time() - received_at, persona=persona, tier=tier)
         
-        # Handle both database structure (no teams field) and minimal context structure (has teams field)
-        if 'teams' in game:
-            away_team = game['teams']['away']['name']
-            home_team = game['teams']['home']['name']
-        else:
-            # Default team names for mock game when no teams field
-            away_team = 'Los Angeles Lakers'
-            home_team = 'Portland Trail Blazers'
-        
-        # Add current time context for temporal awareness
-        from datetime import datetime
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        prompt = f"""You are an NBA sports commentator with a {persona_config['style']} style.
-
-Current Time: {current_time}
-CRITICAL TEMPORAL RULE: You are a LIVE commentator at {game.get('clock', '12:00')} in the game. You ONLY know what has happened up to this exact moment. 
-
-**FOR SPONTANEOUS COMMENTARY - ABSOLUTELY FORBIDDEN:**
-- NO predictions about future performance (e.g., "will get a triple-double", "chances of achieving")
-- NO speculation about what might happen later
-- NO mentioning potential outcomes or "if this continues" scenarios
-- NO historical trend analysis to predict future events
-
-**ONLY ALLOWED:**
-- Comment on what just happened in THIS play
-- React to current stats and performance SO FAR
-- Describe the action that already occurred
-
-**NOTE:** This is automatic commentary, not a response to user questions. Stay present-focused!
-
-Game Context:
-- {away_team} vs {home_team}
-- Score: {away_team} {game['score']['away']} - {home_team} {game['score']['home']}
-- Clock: {game.get('clock', '12:00')}
-- Status: {game.get('status', 'InProgress')}
-- Game time status: Only information up to {game.get('clock', '12:00')} is available"""
-
-        if top_scorers:
-            prompt += "\n\nTop Performers:"
-            for scorer in top_scorers[:2]:
-                # Handle both database structure (has 'name' and 'points') and minimal context structure
-                name = scorer.get('name', 'Player')
-                points = scorer.get('points', 0)
-                prompt += f"\n- {name}: {points} points"
-
-        if user_context:
-            # **CRITICAL: User preferences must strongly dominate your commentary style**
-            preferences = user_context.get('preferences', {})
-            if preferences:
-                prompt += "\n\n**MANDATORY USER PREFERENCES - THESE OVERRIDE ALL OTHER INSTRUCTIONS:**"
-                
-                # Energy level - completely changes commentary intensity
-                if preferences.get('energyLevel') is not None:
-                    energy = preferences['energyLevel']
-                    logger.info(f"[PROMPT DEBUG] Setting energy instructions for level {energy}")
-                    if energy >= 80:
-                        prompt += f"\n- MAXIMUM ENERGY ({energy}/100): EXPLOSIVE excitement! Use ALL CAPS for big moments, multiple exclamation points, and high-octane language! THIS IS MANDATORY!"
-                    elif energy >= 60:
-                        prompt += f"\n- HIGH ENERGY ({energy}/100): Very enthusiastic! Show genuine excitement with animated descriptions and passionate reactions!"
-                    elif energy >= 40:
-                        prompt += f"\n- MODERATE ENERGY ({energy}/100): Balanced excitement with steady engagement."
-                    else:
-                        prompt += f"\n- LOW ENERGY ({energy}/100): Calm, measured, analytical approach. Stay composed and factual."
-                
-                # Comedy level - fundamentally changes personality
-                if preferences.get('comedyLevel') is not None:
-                    comedy = preferences['comedyLevel']
-                    logger.info(f"[PROMPT DEBUG] Setting comedy instructions for level {comedy}")
-                    if comedy >= 70:
-                        prompt += f"\n- HIGH COMEDY ({comedy}/100): Be genuinely funny! Add jokes, puns, witty observations, funny player nicknames, and humorous analogies! NO BORING COMMENTARY ALLOWED!"
-                    elif comedy >= 40:
-                        prompt += f"\n- SOME HUMOR ({comedy}/100): Include light humor and playful commentary when appropriate."
-                    else:
-                        prompt += f"\n- SERIOUS COMMENTARY ({comedy}/100): Professional, straightforward, no jokes or humor."
-                
-                # Stat focus - changes information density
-                if preferences.get('statFocus') is not None:
-                    stats = preferences['statFocus']
-                    if stats >= 70:
-                        prompt += f"\n- HEAVY STATS ({stats}/100): Include detailed percentages, historical comparisons, advanced metrics, and analytical breakdowns!"
-                    elif stats >= 40:
-                        prompt += f"\n- MODERATE STATS ({stats}/100): Mention key relevant statistics."
-                    else:
-                        prompt += f"\n- EMOTION FOCUS ({stats}/100): Emphasize storylines, momentum, and feelings over numbers."
-                
-                # Team bias - affects favoritism and excitement
-                if preferences.get('biasLevel') is not None and preferences.get('favoriteTeam'):
-                    bias = preferences['biasLevel']
-                    team = preferences['favoriteTeam'].get('name', 'favorite team') if isinstance(preferences['favoriteTeam'], dict) else preferences['favoriteTeam']
-                    if bias >= 70:
-                        prompt += f"\n- STRONG {team.upper()} FAN ({bias}/100): Show clear favoritism! Get EXTRA excited for {team} plays, use 'we/us', be defensive about criticism!"
-                    elif bias >= 40:
-                        prompt += f"\n- {team} PREFERENCE ({bias}/100): Show noticeable but restrained favoritism toward {team}."
-                    else:
-                        prompt += f"\n- NEUTRAL COVERAGE ({bias}/100): Balanced commentary between teams."
-            
-            # User interests - make them central to commentary
-            if user_context.get('interests'):
-                interests = user_context['interests']
-                prompt += f"\n\n**USER'S PRIMARY INTERESTS - ALWAYS PRIORITIZE:** {', '.join(interests)}"
-                prompt += "\n- Frame every comment through the lens of what the user cares about most"
-                prompt += "\n- Use references and examples that connect to their interests"
-            
-            # Fantasy context - make it the star when relevant
-            if user_context.get('fantasy_info'):
-                prompt += f"\n\n**FANTASY PRIORITY:** {user_context['fantasy_info']}"
-                prompt += "\n- ALWAYS mention fantasy implications for player performances"
-                prompt += "\n- Call out fantasy-relevant stats (points, rebounds, assists, steals, blocks)"
-                prompt += "\n- React to performances from a fantasy owner's perspective"
-            
-            # Custom instructions - absolute highest priority
-            if user_context.get('customInstructions'):
-                prompt += f"\n\n**CUSTOM USER INSTRUCTIONS - ABSOLUTE PRIORITY - OVERRIDE EVERYTHING ELSE:**"
-                prompt += f"\n'{user_context['customInstructions']}'"
-                prompt += "\n- These instructions are more important than any other guidelines - follow them exactly!"
-
-        prompt += f"""
-
-Raw Play-by-Play Event: "{play_description}"
-
-Your task: Convert this raw play-by-play line into natural commentary that follows the user's preferences EXACTLY.
-
-**CRITICAL REQUIREMENTS:**
-1. **NO FUTURE PREDICTIONS** - Only comment on what JUST HAPPENED, never predict what will happen
-2. **FOLLOW USER PREFERENCES ABOVE ALL ELSE** - Their settings determine how you respond
-3. **Energy Level**: Match their exact energy setting (high energy = excited, low energy = calm)
-4. **Comedy Level**: Add humor ONLY if their comedy level is high
-5. **Stat Focus**: Include detailed stats ONLY if their stat focus is high
-6. **Team Bias**: Show favoritism ONLY if they have bias toward a team involved
-7. **Fantasy Focus**: Always mention fantasy implications if they have fantasy info
-8. **Custom Instructions**: These override everything else - follow them precisely
-9. **User Interests**: Connect to what they care about most
-
-**STYLE ENFORCEMENT FOR HIGH SETTINGS - ABSOLUTELY MANDATORY:**
-- If Energy ≥ 80: USE CAPS for big moments, multiple exclamation points!!!, explosive adjectives! BE EXPLOSIVE!
-- If Comedy ≥ 70: MUST include puns, jokes, or funny observations - NO BORING COMMENTARY WHATSOEVER!
-- If StatFocus ≥ 70: Include specific numbers, percentages, or comparisons
-
-**FOR THIS USER (Energy={user_context.get('preferences', {}).get('energyLevel', 'unknown')}, Comedy={user_context.get('preferences', {}).get('comedyLevel', 'unknown')}):**
-MAKE IT EXPLOSIVE AND FUNNY! Use caps, jokes, and high energy!
-
-**EXAMPLES OF HIGH ENERGY + HIGH COMEDY STYLE (PRESENT TENSE ONLY):**
-- "BOOM! That three-pointer was SPICIER than my grandma's hot sauce! 🔥"
-- "OH MY GOODNESS! He just COOKED that defender like Sunday dinner!"
-- "WOWZA! That dunk was so nasty it needs a parental advisory warning!"
-- "Murray's got 8 points already - he's COOKING with GAS tonight!"
-- "LeBron just picked up his 3rd assist - the King is DEALING right now!"
-
-**BAD EXAMPLES (NEVER DO THIS):**
-- "If this continues, LeBron will get a triple-double" ❌
-- "Murray's chances of a big game are looking good" ❌
-- "This trend suggests..." ❌
-
-Base persona style: {persona_config['style']} with tone: {persona_config['tone']}
-But ADAPT this persona to match their exact preference settings!
-
-Keep it about 1 max 2 sentences while being authentic to their personalized style.
-
-Commentary:"""
+        with latency.span('commentary.store', persona=persona):
+            commentary_doc = self._store_commentary(game_id, commentary_text, persona, event_type, audio_url, play_id, bucket, tier=tier, shared=shared)
+        if tier:
+            self.router.served_by(tier)
+        result = {
+            'text': commentary_text,
+            'audio_url': audio_url,
+            'persona': persona,
+            'tier': tier,
+            'timestamp': commentary_doc['timestamp']
+        }
+        if tier == 'template' and persona != 'raw':
+            # Model was throttled, slow or failing; the line came from the template engine
+            result['fallback'] = True
+        return result
+
+    def _voice_preferences(self, user_context):
+        """(voice_id, language) requested in the user's preferences, if any"""
+        if not isinstance(user_context, dict):
+            return None, None
+        prefs = user_context.get('preferences') or {}
+        return prefs.get('voiceId') or prefs.get('voice_id'), prefs.get('language')
+
+    def _store_commentary(self, game_id, commentary_text, persona, event_type, audio_url, play_id=None, bucket=None, audio_urls=None, tier=None, shared=False):
+        commentary_doc = {
+            'game_id': game_id,
+            'timestamp': datetime.now(),
+            'text': commentary_text,
+            'persona': persona,
+            'confidence': 0.8,  # Mock confidence
+            'audio_url': audio_url,
+            'event_type': event_type
+        }
+        if play_id is not None:
+            commentary_doc['play_id'] = play_id
+        if play_id is not None or bucket is not None:
+            commentary_doc['bucket'] = bucket
+        if audio_urls is not None:
+            commentary_doc['audio_urls'] = audio_urls
+        if tier is not None:
+            commentary_doc['tier'] = tier
+        if shared:
+            commentary_doc['shared'] = True
         
-        return prompt
+        self.db.commentary.insert_one(commentary_doc)
+        return commentary_doc
+    
+    def _create_commentary_prompt(self, game_summary, event_type, persona_config, play_description='', user_context=None, tier='full'):
+        """Create prompt for Gemini from precompiled persona and cached preference fragments"""
+        if tier == 'compressed':
+            return prompt_compiler.compile_commentary_compact(game_summary, persona_config, play_description, user_context)
+        return prompt_compiler.compile_commentary(game_summary, persona_config, play_description, user_context)
     
     def _create_minimal_game_context(self, game_id):
         """Create minimal game context when database lookup fails"""
@@ -383,62 +586,32 @@ Commentary:"""
                 'score_difference': 0
             }
     
-    def _get_smart_fallback_commentary(self, persona, play_description, event_type):
-        """Generate contextual commentary without Gemini when quota exceeded"""
-        import re
-        
-        # Extract key info from play description
-        player_match = re.search(r'(\w+)\s+(?:3PT|3-pt|Jump Shot|Layup|Dunk|Free Throw)', play_description, re.IGNORECASE)
-        player_name = player_match.group(1) if player_match else None
-        
-        points_match = re.search(r'\((\d+)\s+PTS?\)', play_description, re.IGNORECASE)
-        points = points_match.group(1) if points_match else None
-        
-        # Generate contextual commentary based on event type and persona
-        if 'shot' in event_type.lower() or 'basket' in event_type.lower():
-            if persona == 'passionate':
-                if '3PT' in play_description or '3-pt' in play_description:
-                    commentary = f"What a shot from beyond the arc!" if player_name else "Three-pointer connects!"
-                else:
-                    commentary = f"Beautiful basket!" if player_name else "Great shot!"
-            else:  # nerdy
-                if '3PT' in play_description or '3-pt' in play_description:
-                    commentary = f"Three-point field goal successfully converted" if player_name else "Long-range shooting efficiency on display"
-                else:
-                    commentary = f"Field goal percentage improving" if player_name else "Efficient scoring"
-        elif 'foul' in event_type.lower():
-            commentary = "Referee's whistle stops play" if persona == 'nerdy' else "Foul called on the play!"
-        elif 'turnover' in event_type.lower():
-            commentary = "Possession changes hands" if persona == 'nerdy' else "Turnover! What a mistake!"
+    def _get_smart_fallback_commentary(self, persona, play_description, event_type, game_summary=None):
+        """Generate play-specific commentary without Gemini (quota exceeded, timeout or error)"""
+        if play_description:
+            commentary = template_commentary.render(play_description, persona, game_summary)
         else:
             # Default based on persona
-            fallbacks = {
-                'nerdy': "Game statistics continue to develop",
-                'passionate': "The action continues!",
-                'raw': "Play continues"
-            }
-            commentary = fallbacks.get(persona, fallbacks['passionate'])
+            commentary = IDLE_LINES.get(persona, IDLE_LINES['passionate'])
         
         return {
             'text': commentary,
             'audio_url': None,
             'persona': persona,
-            'timestamp': datetime.now()
+            'tier': 'template',
+            'timestamp': datetime.now(),
+            'fallback': True
         }
 
     def _get_fallback_commentary(self, persona):
         """Return fallback commentary if generation fails"""
-        fallbacks = {
-            'nerdy': "The statistical analysis shows interesting trends in this matchup.",
-            'passionate': "What an incredible game we're witnessing!",
-            'raw': "The game continues with competitive play."
-        }
-        
         return {
-            'text': fallbacks.get(persona, fallbacks['passionate']),
+            'text': FALLBACK_LINES.get(persona, FALLBACK_LINES['passionate']),
             'audio_url': None,
             'persona': persona,
-            'timestamp': datetime.now()
+            'tier': 'template',
+            'timestamp': datetime.now(),
+            'fallback': True
         }
     
     def get_commentary_history(self, game_id, limit=20):
@@ -448,6 +621,12 @@ Commentary:"""
                 {'game_id': game_id}
             ).sort('timestamp', -1).limit(limit))
             
+            if not commentary:
+                # Finished games live in the compressed archive once compacted
+                archive = self.archive_service.load_archive(game_id)
+                if archive:
+                    commentary = sorted(archive['commentary'], key=lambda c: c.get('timestamp') or datetime.min, reverse=True)[:limit]
+            
             return commentary
             
         except Exception as e:
@@ -0,0 +1,79 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from services.significance import score_play
+
+
+Sections = List[Tuple[str, str]]
+# (section name, replacement text or callable producing it); '' drops the section
+Reduction = Tuple[str, Union[str, Callable[[], str]]]
+
+_WORD = re.compile(r"[a-z][a-z'-]+")
+_STOPWORDS = {
+    'the', 'and', 'for', 'how', 'what', 'whats', "what's", 'who', 'whos', "who's", 'has', 'have', 'does', 'did',
+    'is', 'are', 'was', 'this', 'that', 'game', 'many', 'much', 'right', 'now', 'tonight', 'with', 'his', 'her',
+}
+
+
+def fit_sections(sections: Sections, budget: Optional[int], reductions: Sequence[Reduction], estimate: Callable[[str], int]) -> Tuple[Sections, List[str]]:
+    """Apply reductions in order until the rendered sections fit the token budget.
+
+    Each reduction rewrites every section with the given name. Returns the
+    reduced sections and the names of the reductions that were needed.
+    """
+    applied: List[str] = []
+    if not budget:
+        return sections, applied
+    for name, replacement in reductions:
+        if estimate(''.join(text for _, text in sections)) <= budget:
+            break
+        text = replacement() if callable(replacement) else replacement
+        sections = [(section, text if section == name else body) for section, body in sections]
+        applied.append(name)
+    return sections, applied
+
+
+def commentary_game_state(game_summary: Dict[str, Any], top_scorers: bool = True) -> str:
+    """One structured line of game state instead of the prose context block."""
+    game = game_summary['game']
+    teams = game.get('teams') or {}
+    away = (teams.get('away') or {}).get('name', 'Los Angeles Lakers')
+    home = (teams.get('home') or {}).get('name', 'Portland Trail Blazers')
+    clock = game.get('clock', '12:00')
+    line = f"\nGame: {away} {game['score']['away']} @ {home} {game['score']['home']} | clock {clock} | {game.get('status', 'InProgress')}"
+    scorers = (game_summary.get('top_scorers') or [])[:2] if top_scorers else []
+    if scorers:
+        line += " | top: " + ", ".join(f"{s.get('name', 'Player')} {s.get('points', 0)}" for s in scorers)
+    return line + "\n"
+
+
+def voice_game_state(game_ctx: Dict[str, Any], plays: Sequence[Dict[str, Any]]) -> str:
+    """Structured scoreboard, leaders and the selected recent plays for a voice answer."""
+    sb = game_ctx.get('scoreboard', {})
+    lines = [f"\nGame: {sb.get('away')} {sb.get('away_score')} @ {sb.get('home')} {sb.get('home_score')} | Q{sb.get('quarter')} {sb.get('clock')} (nothing after this is known)"]
+    leaders = game_ctx.get('leaders', {})
+    names = [f"{side} {leaders[side].get('name')} {leaders[side].get('points')}" for side in ('away', 'home') if (leaders.get(side) or {}).get('name')]
+    if names:
+        lines.append("Leaders: " + ", ".join(names))
+    if plays:
+        lines.append("Plays so far: " + "; ".join(f"{p.get('clock')} {p.get('team')}: {p.get('description')}" for p in plays))
+    return "\n".join(lines)
+
+
+def rank_plays(plays: Sequence[Dict[str, Any]], question: str, limit: int) -> List[Dict[str, Any]]:
+    """Keep the plays most relevant to a question, returned in game order.
+
+    Relevance = words shared with the question (player and team names) first,
+    then play significance, then recency.
+    """
+    if limit <= 0 or not plays:
+        return []
+    asked = {w for w in _WORD.findall((question or '').lower()) if w not in _STOPWORDS}
+    scored = []
+    for index, play in enumerate(plays):
+        words = set(_WORD.findall(f"{play.get('description') or ''} {play.get('team') or ''}".lower()))
+        significance, _ = score_play({'description': play.get('description') or '', 'points': play.get('points')})
+        recency = (index + 1) / len(plays)
+        scored.append((2.0 * len(asked & words) + significance + 0.5 * recency, index))
+    keep = sorted(index for _, index in sorted(scored, reverse=True)[:limit])
+    return [plays[index] for index in keep]
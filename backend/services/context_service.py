@@ -54,7 +54,7 @@ class ContextService:
         self.db.user_contexts.update_one({'_id': user_id}, {'$set': update_doc}, upsert=True)
 
     # ------------- Game Context Composition -------------
-    def get_game_context(self, game_id: Optional[str]) -> Dict[str, Any]:
+    def get_game_context(self, game_id: Optional[str], recent_limit: int = 5) -> Dict[str, Any]:
         if not game_id:
             return {}
         try:
@@ -77,8 +77,8 @@ class ContextService:
             # Calculate current remaining seconds for filtering
             current_remaining_seconds = int(trm) * 60 + int(trs)
 
-            # Recent plays (last 5) - only include plays that have already happened
-            recent = self._simplify_recent_plays(pbp, limit=5, current_remaining_seconds=current_remaining_seconds)
+            # Recent plays (last recent_limit) - only include plays that have already happened
+            recent = self._simplify_recent_plays(pbp, limit=recent_limit, current_remaining_seconds=current_remaining_seconds)
 
             return {
                 'scoreboard': {
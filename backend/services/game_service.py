@@ -1,5 +1,7 @@
 from database import db
 from datetime import datetime
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,7 +11,7 @@ class GameService:
         self.db = db
     
     def update_game_data(self, game_id, game_data, box_score, play_by_play):
-        """Update game data in database"""
+        """Update game data in database; returns the play events not seen in earlier polls"""
         try:
             # Update game
             game_doc = {
@@ -21,6 +23,10 @@ class GameService:
                     'home': game_data.get('HomeTeamScore'),
                     'away': game_data.get('AwayTeamScore')
                 },
+                'teams': {
+                    'home': {'name': game_data.get('HomeTeam')},
+                    'away': {'name': game_data.get('AwayTeam')}
+                },
                 'updated_at': datetime.now()
             }
             
@@ -30,8 +36,9 @@ class GameService:
                 upsert=True
             )
             
-            # Update statlines
+            # Update statlines in one round trip
             if 'Players' in box_score:
+                statline_ops = []
                 for player in box_score['Players']:
                     statline = {
                         'game_id': game_id,
@@ -47,14 +54,20 @@ class GameService:
                         'updated_at': datetime.now()
                     }
                     
-                    self.db.statlines.update_one(
+                    statline_ops.append(UpdateOne(
                         {'game_id': game_id, 'player_id': player.get('PlayerID')},
                         {'$set': statline},
                         upsert=True
-                    )
+                    ))
+                
+                if statline_ops:
+                    self.db.statlines.bulk_write(statline_ops, ordered=False)
             
-            # Store events from play-by-play
+            # Store events from play-by-play; plays already stored are skipped
+            new_events = []
             if isinstance(play_by_play, list):
+                events = []
+                event_ops = []
                 for play in play_by_play:
                     event = {
                         'game_id': game_id,
@@ -66,13 +79,38 @@ class GameService:
                             'clock': play.get('Clock'),
                             'description': play.get('Description'),
                             'player_id': play.get('PlayerID'),
-                            'team': play.get('Team')
+                            'team': play.get('Team'),
+                            'points': play.get('Points'),
+                            'home_score': play.get('HomeTeamScore'),
+                            'away_score': play.get('AwayTeamScore')
                         }
                     }
-                    
-                    self.db.events.insert_one(event)
+                    if event['payload']['play_id'] is None:
+                        event_ops.append(InsertOne(event))
+                        continue
+                    events.append(event)
+                    event_ops.append(UpdateOne(
+                        {'game_id': game_id, 'payload.play_id': event['payload']['play_id']},
+                        {'$setOnInsert': event},
+                        upsert=True
+                    ))
+                
+                if event_ops:
+                    try:
+                        result = self.db.events.bulk_write(event_ops, ordered=False)
+                        # Upserted positions are the plays this poll saw for the first time
+                        upserted = set(result.upserted_ids)
+                    except BulkWriteError as e:
+                        # A concurrent poll inserted some of these plays first; the unique play index
+                        # rejects our copies (duplicate key), so they count as already seen
+                        if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                            raise
+                        upserted = {u['index'] for u in e.details.get('upserted', [])}
+                    positions = [i for i, op in enumerate(event_ops) if isinstance(op, UpdateOne)]
+                    new_events = [event for position, event in zip(positions, events) if position in upserted]
             
-            logger.info(f"Updated game data for {game_id}")
+            logger.info(f"Updated game data for {game_id}: {len(new_events)} new plays")
+            return new_events
             
         except Exception as e:
             logger.error(f"Error updating game data for {game_id}: {e}")
@@ -0,0 +1,238 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, Optional
+
+import google.generativeai as genai
+import requests
+
+from config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiTimeout(TimeoutError):
+    """A Gemini call did not finish within its deadline."""
+
+
+class GeminiClient:
+    """Process-wide gateway to Gemini shared by every service and route.
+
+    - genai is configured once and GenerativeModel instances are cached per model name
+    - Calls run on a small worker pool behind a concurrency semaphore, so a slow
+      model never holds more than GEMINI_MAX_CONCURRENCY requests open at once
+    - Every call has a deadline; callers get GeminiTimeout instead of blocking
+      a web worker thread indefinitely
+    - Optional hedging: when a call outlives the observed p95 latency a second
+      identical request is fired and the first answer wins
+    - generate_content() mirrors GenerativeModel.generate_content, so the
+      client is a drop-in replacement for a model object
+    """
+
+    def __init__(self, model_name: Optional[str] = None, max_concurrency: Optional[int] = None, timeout: Optional[float] = None, hedge: Optional[bool] = None) -> None:
+        self.model_name = model_name or Config.GEMINI_MODEL
+        self.max_concurrency = max_concurrency or Config.GEMINI_MAX_CONCURRENCY
+        self.timeout = timeout or Config.GEMINI_TIMEOUT_SECONDS
+        self.hedge = Config.GEMINI_HEDGE if hedge is None else hedge
+        self._configured = False
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        # Headroom for hedges and calls that are queued on the semaphore
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency * 2 + 2, thread_name_prefix='gemini')
+        self._latencies: deque = deque(maxlen=200)
+        self.in_flight = 0
+        self.queued = 0
+        self._counters = {'calls': 0, 'errors': 0, 'timeouts': 0, 'hedges': 0, 'hedge_wins': 0, 'hedges_skipped': 0}
+
+    # ------------- Models -------------
+    def model(self, name: Optional[str] = None):
+        name = name or self.model_name
+        with self._lock:
+            if not self._configured:
+                if Config.GEMINI_API_ENDPOINT:
+                    # Local stand-in (fakes/gemini.py) speaks the REST protocol only
+                    genai.configure(api_key=Config.GEMINI_API_KEY, transport='rest', client_options={'api_endpoint': Config.GEMINI_API_ENDPOINT})
+                else:
+                    genai.configure(api_key=Config.GEMINI_API_KEY)
+                self._configured = True
+            model = self._models.get(name)
+            if model is None:
+                model = genai.GenerativeModel(name)
+                self._models[name] = model
+            return model
+
+    # ------------- Generation -------------
+    def generate_content(self, contents, generation_config=None, stream: bool = False, timeout: Optional[float] = None, hedge: Optional[bool] = None, model: Optional[str] = None, record_latency: bool = True):
+        """Run one Gemini call within the concurrency limit and deadline.
+
+        Calls whose latency is not representative of text prompts (audio
+        transcription) pass record_latency=False so they don't skew the p95
+        that hedging waits for.
+        """
+        timeout = timeout or self.timeout
+        if stream:
+            return self._stream(contents, generation_config, timeout, model)
+
+        with self._lock:
+            self._counters['calls'] += 1
+        deadline = time.monotonic() + timeout
+        futures = [self._executor.submit(self._call, model, contents, generation_config, deadline, True, record_latency)]
+
+        hedge_after = self._hedge_delay() if (self.hedge if hedge is None else hedge) else None
+        if hedge_after is not None and hedge_after < timeout:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                futures.append(self._executor.submit(self._call, model, contents, generation_config, deadline, False, record_latency))
+
+        error = None
+        pending = list(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                pending.remove(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if response is None:
+                    continue  # Hedge skipped for lack of a free slot
+                if future is not futures[0]:
+                    with self._lock:
+                        self._counters['hedge_wins'] += 1
+                return response
+
+        if error is not None and not pending:
+            with self._lock:
+                self._counters['errors'] += 1
+            raise error
+        with self._lock:
+            self._counters['timeouts'] += 1
+        raise GeminiTimeout(f"Gemini call timed out after {timeout:.1f}s")
+
+    def _call(self, model_name, contents, generation_config, deadline, primary, record_latency=True):
+        if primary:
+            with self._lock:
+                self.queued += 1
+            acquired = self._slots.acquire(timeout=max(0.0, deadline - time.monotonic()))
+            with self._lock:
+                self.queued -= 1
+            if not acquired:
+                raise GeminiTimeout("Timed out waiting for a free Gemini slot")
+        else:
+            # A hedge is only worth sending if it does not have to queue
+            if not self._slots.acquire(blocking=False):
+                with self._lock:
+                    self._counters['hedges_skipped'] += 1
+                return None
+            with self._lock:
+                self._counters['hedges'] += 1
+
+        with self._lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            response = self.model(model_name).generate_content(
+                contents,
+                generation_config=generation_config,
+                request_options={'timeout': max(1.0, deadline - started)}
+            )
+            if record_latency:
+                self._latencies.append(time.monotonic() - started)
+            return response
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def _stream(self, contents, generation_config, timeout, model_name) -> Iterator[Any]:
+        # Streams hold a slot for their whole duration and are never hedged
+        with self._lock:
+            self._counters['calls'] += 1
+            self.queued += 1
+        acquired = self._slots.acquire(timeout=timeout)
+        with self._lock:
+            self.queued -= 1
+        if not acquired:
+            with self._lock:
+                self._counters['timeouts'] += 1
+            raise GeminiTimeout("Timed out waiting for a free Gemini slot")
+
+        with self._lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            response = self.model(model_name).generate_content(
+                contents,
+                generation_config=generation_config,
+                stream=True,
+                request_options={'timeout': timeout}
+            )
+            for chunk in response:
+                yield chunk
+            self._latencies.append(time.monotonic() - started)
+        except Exception:
+            with self._lock:
+                self._counters['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    # ------------- Files (audio transcription) -------------
+    def upload_file(self, path: str):
+        self.model()
+        if Config.GEMINI_API_ENDPOINT:
+            # genai uploads through Google's discovery document, which a custom endpoint cannot serve
+            with open(path, 'rb') as f:
+                response = requests.post(
+                    f"{Config.GEMINI_API_ENDPOINT.rstrip('/')}/upload/v1beta/files",
+                    files={'file': (os.path.basename(path), f)},
+                    headers={'x-goog-api-key': Config.GEMINI_API_KEY or ''},
+                    timeout=self.timeout
+                )
+            response.raise_for_status()
+            return genai.get_file(response.json()['file']['name'])
+        return genai.upload_file(path)
+
+    def get_file(self, name: str):
+        self.model()
+        return genai.get_file(name)
+
+    def delete_file(self, name: str) -> None:
+        self.model()
+        genai.delete_file(name)
+
+    # ------------- Metrics -------------
+    def _hedge_delay(self) -> Optional[float]:
+        if len(self._latencies) < Config.GEMINI_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return max(0.2, ordered[int(len(ordered) * 0.95) - 1])
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self._latencies)
+        with self._lock:
+            return {
+                **self._counters,
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'max_concurrency': self.max_concurrency,
+                'latency_p50_ms': round(ordered[len(ordered) // 2] * 1000) if ordered else None,
+                'latency_p95_ms': round(ordered[int(len(ordered) * 0.95) - 1] * 1000) if ordered else None,
+            }
+
+
+# Shared by CommentaryService, VoiceService and the transcription route
+gemini_client = GeminiClient()
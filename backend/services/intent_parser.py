@@ -0,0 +1,146 @@
+import re
+import threading
+from typing import Any, Dict, Optional
+
+
+# Spoken stat names -> statline fields
+STAT_ALIASES = {
+    'points': 'points', 'point': 'points', 'pts': 'points', 'buckets': 'points',
+    'rebounds': 'rebounds', 'rebound': 'rebounds', 'boards': 'rebounds', 'rebs': 'rebounds',
+    'assists': 'assists', 'assist': 'assists', 'dimes': 'assists', 'ast': 'assists',
+    'steals': 'steals', 'steal': 'steals',
+    'blocks': 'blocks', 'block': 'blocks',
+    'turnovers': 'turnovers', 'turnover': 'turnovers',
+}
+
+_STAT = r"(?P<stat>" + '|'.join(sorted(STAT_ALIASES, key=len, reverse=True)) + r")"
+_PLAYER = r"(?P<player>[a-z][a-z.'\- ]{0,40}?)"
+_NOW = r"(?: right now| now| so far| tonight| in this game| this game)?"
+
+# Words that must appear for any structured intent; everything else goes straight to the model
+_TRIGGERS = {
+    'score': ('score', 'winning', 'ahead', 'leading', 'up', 'losing'),
+    'player_stats': tuple(STAT_ALIASES) + ('stats', 'statline', 'line'),
+    'triple_double': ('triple',),
+    'game_status': ('happening', 'going', 'status', 'quarter', 'time', 'clock'),
+}
+
+# Whole-question templates: a full match is a structured question the stored game state answers exactly
+_TEMPLATES = {
+    'score': (
+        rf"(?:what(?:'s| is) the )?(?:current )?score{_NOW}",
+        rf"who(?:'s| is) (?:winning|ahead|leading|up){_NOW}",
+    ),
+    'player_stats': (
+        rf"how many {_STAT} (?:does|did|has) {_PLAYER}(?: have| got| get| scored?| had)?{_NOW}",
+        rf"how many {_STAT} for {_PLAYER}{_NOW}",
+        rf"what(?:'s| is| are) {_PLAYER}(?:'s)? (?:stats|statline|stat line|line){_NOW}",
+        rf"{_PLAYER}(?:'s)? (?:stats|statline|stat line){_NOW}",
+        rf"{_PLAYER}(?:'s)? {_STAT}{_NOW}",
+    ),
+    'triple_double': (
+        rf"how (?:close|far) is {_PLAYER} (?:from|to) (?:a )?triple.?double",
+        rf"is {_PLAYER} (?:close to|near|getting) (?:a )?triple.?double",
+        rf"{_PLAYER}(?:'s)? triple.?double (?:progress|status|watch)",
+    ),
+    'game_status': (
+        r"what(?:'s| is) (?:happening|going on)(?: in the game)?",
+        r"(?:game status|how much time is left|how much time left|what quarter is it|what(?:'s| is) the clock)",
+    ),
+}
+
+# The original loose patterns: a match anywhere is a guess, good enough when there is no model to ask
+_KEYWORD_PATTERNS = {
+    'triple_double': (
+        rf"how (?:close|far) is {_PLAYER} from (?:a )?triple.?double",
+        rf"{_PLAYER} triple.?double (?:progress|status)",
+        rf"is {_PLAYER} close to (?:a )?triple.?double",
+    ),
+    'score': (r"what'?s the score", r"current score", r"who'?s winning"),
+    'player_stats': (
+        rf"how many {_STAT} does {_PLAYER} have",
+        rf"{_PLAYER} {_STAT}\b",
+        rf"what are {_PLAYER} stats",
+    ),
+    'game_status': (r"what'?s happening in the game", r"game status", r"what'?s going on"),
+}
+
+_FILLER = re.compile(r"^(?:(?:hey|ok|okay|so|yo|um|uh|and|hi|please|quick question|tell me|can you tell me|do you know)[, ]+)+")
+_PUNCTUATION = re.compile(r"[^a-z0-9'.\- ]+")
+_SPACES = re.compile(r"\s+")
+
+
+class IntentParser:
+    """Compiled intent classifier and slot extractor for voice questions.
+
+    - One trigger regex over every intent keyword decides which intents are
+      worth trying; questions with none of them skip all templates
+    - Per-intent templates are compiled once and must match the whole
+      (normalized) question for a confident result
+    - Slots are the player as spoken and the stat as a statline field
+    """
+
+    STRUCTURED_CONFIDENCE = 1.0
+    KEYWORD_CONFIDENCE = 0.5
+
+    def __init__(self) -> None:
+        keyword_intent = {word: intent for intent, words in _TRIGGERS.items() for word in words}
+        self._keyword_intent = keyword_intent
+        self._triggers = re.compile(r"\b(" + '|'.join(sorted(map(re.escape, keyword_intent), key=len, reverse=True)) + r")\b")
+        self._templates = {intent: [re.compile(p) for p in patterns] for intent, patterns in _TEMPLATES.items()}
+        self._keywords = {intent: [re.compile(p) for p in patterns] for intent, patterns in _KEYWORD_PATTERNS.items()}
+        self._lock = threading.Lock()
+        self.stats = {
+            'queries': 0,
+            'structured': 0,
+            'keyword': 0,
+            'open_ended': 0,
+        }
+
+    def normalize(self, transcript: str) -> str:
+        text = (transcript or '').lower().replace('’', "'")
+        text = _SPACES.sub(' ', _PUNCTUATION.sub(' ', text)).strip(" .'-")
+        return _FILLER.sub('', text)
+
+    def parse(self, transcript: str) -> Dict[str, Any]:
+        """{'intent', 'slots', 'confidence'}; intent is None for open-ended questions."""
+        text = self.normalize(transcript)
+        candidates = []
+        for match in self._triggers.finditer(text):
+            intent = self._keyword_intent[match.group(1)]
+            if intent not in candidates:
+                candidates.append(intent)
+
+        result = self._match(text, candidates, self._templates, re.Pattern.fullmatch, self.STRUCTURED_CONFIDENCE)
+        kind = 'structured'
+        if result is None:
+            result = self._match(text, list(self._keywords), self._keywords, re.Pattern.search, self.KEYWORD_CONFIDENCE)
+            kind = 'keyword'
+        if result is None:
+            result = {'intent': None, 'slots': {}, 'confidence': 0.0}
+            kind = 'open_ended'
+        with self._lock:
+            self.stats['queries'] += 1
+            self.stats[kind] += 1
+        return result
+
+    def _match(self, text, intents, table, method, confidence) -> Optional[Dict[str, Any]]:
+        for intent in intents:
+            for pattern in table[intent]:
+                match = method(pattern, text)
+                if match:
+                    return {'intent': intent, 'slots': self._slots(match), 'confidence': confidence}
+        return None
+
+    def _slots(self, match) -> Dict[str, Optional[str]]:
+        groups = match.groupdict()
+        slots = {}
+        if groups.get('player'):
+            player = groups['player'].strip(" .'-")
+            slots['player'] = player[:-2] if player.endswith("'s") else player
+        if groups.get('stat'):
+            slots['stat'] = STAT_ALIASES[groups['stat']]
+        return slots
+
+
+intent_parser = IntentParser()
@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+def to_epoch(value: Any) -> Optional[float]:
+    """Wall-clock seconds for a datetime, ISO string or epoch number (None if unusable)."""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+def _summary(samples: List[float], count: int, total: float, peak: float) -> Dict[str, Any]:
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> Optional[float]:
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 1)
+
+    return {
+        'count': count,
+        'mean_ms': round(total / count * 1000, 1) if count else None,
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(peak * 1000, 1) if count else None,
+    }
+
+
+class LatencyRecorder:
+    """Per-stage latency histograms for the commentary and voice pipelines.
+
+    - span(stage, **tags) times a block; the yielded tag dict can be updated
+      inside the block (e.g. cache='hit' once the lookup is done)
+    - A series is a stage plus its tags (persona, cache hit/miss, tier...)
+    - Each series keeps count/sum/max and its most recent samples for p50/p95/p99
+    """
+
+    def __init__(self, max_samples: Optional[int] = None) -> None:
+        self.max_samples = max_samples or Config.LATENCY_SAMPLES_PER_SERIES
+        self._lock = threading.Lock()
+        # (stage, tags) -> [samples, count, total seconds, max seconds]
+        self._series: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[Any]] = {}
+
+    @contextmanager
+    def span(self, stage: str, **tags: Any) -> Iterator[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            yield tags
+        except Exception:
+            tags['outcome'] = 'error'
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started, **tags)
+
+    def observe(self, stage: str, seconds: float, **tags: Any) -> None:
+        key = (stage, tuple(sorted((name, str(value)) for name, value in tags.items() if value is not None)))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [deque(maxlen=self.max_samples), 0, 0.0, 0.0]
+                self._series[key] = series
+            series[0].append(seconds)
+            series[1] += 1
+            series[2] += seconds
+            series[3] = max(series[3], seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """{stage: {'all': summary, 'by_tags': {'persona=nerdy,cache=miss': summary}}}, summaries in ms."""
+        with self._lock:
+            series = {key: (list(s[0]), s[1], s[2], s[3]) for key, s in self._series.items()}
+        stages: Dict[str, Any] = {}
+        merged: Dict[str, List[Any]] = {}
+        for (stage, tags), (samples, count, total, peak) in sorted(series.items()):
+            label = ','.join(f"{name}={value}" for name, value in tags) or 'untagged'
+            stages.setdefault(stage, {'all': None, 'by_tags': {}})['by_tags'][label] = _summary(samples, count, total, peak)
+            entry = merged.setdefault(stage, [[], 0, 0.0, 0.0])
+            entry[0].extend(samples)
+            entry[1] += count
+            entry[2] += total
+            entry[3] = max(entry[3], peak)
+        for stage, (samples, count, total, peak) in merged.items():
+            stages[stage]['all'] = _summary(samples, count, total, peak)
+        return stages
+
+
+# Shared by every pipeline in the process; read by the internal stats endpoint
+latency = LatencyRecorder()
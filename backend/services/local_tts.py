@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import shutil
+import subprocess
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import Config
+from services.audio_formats import is_mp3, mp3_params
+from services.audio_utils import silent_mp3
+
+
+logger = logging.getLogger(__name__)
+
+# espeak voice variants a voice id is mapped onto, so each persona keeps a distinct sound
+_ESPEAK_VARIANTS = ('en+m3', 'en+m1', 'en+m7', 'en+f3', 'en+f2', 'en+m4')
+
+
+class LocalTTSBackend:
+    """Offline stand-in for ElevenLabs, for development boxes and benchmarks.
+
+    - With espeak-ng/espeak and ffmpeg (or lame for MP3) installed, speaks the
+      text for real, with a voice variant picked from the voice id
+    - Otherwise emits deterministic MP3 silence as long as the line would take
+      to read (with a warning at startup), so caching, streaming, splicing and
+      serving behave as in production
+    - Same synthesize/stream interface as ElevenLabsBackend in services/tts_service.py
+    """
+
+    name = 'local'
+
+    def __init__(self) -> None:
+        self.characters_per_second = Config.LOCAL_TTS_CHARACTERS_PER_SECOND
+        self.espeak = shutil.which('espeak-ng') or shutil.which('espeak')
+        self.ffmpeg = shutil.which('ffmpeg')
+        self.lame = shutil.which('lame')
+        if self.engine == 'silence':
+            logger.warning(
+                "Local TTS: espeak-ng/espeak and ffmpeg/lame not found - every clip will be SILENT MP3 "
+                "of the line's reading length (install them for audible speech)"
+            )
+
+    def available(self) -> bool:
+        return True
+
+    @property
+    def engine(self) -> str:
+        """'espeak' when real speech can be encoded, else 'silence'."""
+        return 'espeak' if self.espeak and (self.ffmpeg or self.lame) else 'silence'
+
+    def list_voices(self, voice_ids: List[str]) -> List[Dict[str, Any]]:
+        return [{
+            'voice_id': voice_id,
+            'name': f"Local {self._variant(voice_id)}",
+            'category': 'local',
+            'labels': {'engine': self.engine},
+            'description': 'Offline stand-in voice'
+        } for voice_id in voice_ids]
+
+    def synthesize(self, spec: Dict[str, Any], persona: str) -> Optional[bytes]:
+        """Audio for a synthesis spec (text, voice_id, model_id, voice_settings, output_format)."""
+        text, output_format = spec['text'], spec.get('output_format')
+        if self.engine == 'espeak':
+            audio = self._speak(text, spec['voice_id'], output_format)
+            if audio:
+                return audio
+        if not is_mp3(output_format):
+            logger.warning(f"Local TTS can't produce {output_format} without espeak and ffmpeg")
+            return None
+        bitrate, sample_rate = mp3_params(output_format)
+        return silent_mp3(max(0.5, len(text) / self.characters_per_second), bitrate, sample_rate)
+
+    def stream(self, spec: Dict[str, Any], persona: str) -> Optional[Iterator[bytes]]:
+        audio = self.synthesize(spec, persona)
+        if not audio:
+            return None
+        return (audio[i:i + 4096] for i in range(0, len(audio), 4096))
+
+    def _variant(self, voice_id: str) -> str:
+        digest = hashlib.sha1((voice_id or '').encode('utf-8')).digest()
+        return _ESPEAK_VARIANTS[digest[0] % len(_ESPEAK_VARIANTS)]
+
+    def _speak(self, text: str, voice_id: str, output_format: Optional[str]) -> Optional[bytes]:
+        try:
+            wav = subprocess.run(
+                [self.espeak, '-v', self._variant(voice_id), '-s', str(int(self.characters_per_second * 12)), '--stdout', text],
+                capture_output=True, check=True, timeout=30
+            ).stdout
+            if not is_mp3(output_format):
+                if not self.ffmpeg:
+                    return None
+                command = [self.ffmpeg, '-loglevel', 'error', '-i', 'pipe:0', '-c:a', 'libopus', '-b:a', f"{output_format.rsplit('_', 1)[-1]}k", '-f', 'ogg', 'pipe:1']
+            else:
+                bitrate, sample_rate = mp3_params(output_format)
+                if self.ffmpeg:
+                    command = [self.ffmpeg, '-loglevel', 'error', '-i', 'pipe:0', '-f', 'mp3', '-b:a', f"{bitrate}k", '-ar', str(sample_rate), 'pipe:1']
+                else:
+                    command = [self.lame, '--quiet', '-b', str(bitrate), '--resample', str(sample_rate / 1000), '-', '-']
+            return subprocess.run(command, input=wav, capture_output=True, check=True, timeout=30).stdout or None
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Local speech synthesis failed, falling back to silence: {e}")
+            return None
@@ -0,0 +1,192 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config import Config
+from services.gemini_client import GeminiTimeout
+
+
+logger = logging.getLogger(__name__)
+
+# Highest quality first; 'template' never calls the model and is always available
+TIERS = ('full', 'compressed', 'template')
+MODEL_TIERS = TIERS[:-1]
+
+
+def classify_error(error: Exception) -> str:
+    """'quota', 'timeout' or 'error' for a failed model call."""
+    text = str(error).lower()
+    if '429' in text or 'quota' in text or 'resource has been exhausted' in text or type(error).__name__ in ('ResourceExhausted', 'TooManyRequests'):
+        return 'quota'
+    if isinstance(error, (GeminiTimeout, TimeoutError)) or 'timed out' in text or 'deadline' in text:
+        return 'timeout'
+    return 'error'
+
+
+class ModelRouter:
+    """Chooses which commentary tier serves the next line from live model health.
+
+    - Tiers: full prompt on the flash model, compressed prompt, local template engine
+    - Per tier it keeps a sliding window of outcomes (errors, latency, token spend)
+    - A tier is taken out of rotation on a quota error, when its error rate or p95
+      latency crosses the configured limit, or when token spend nears the budget;
+      traffic steps down to the next tier instead of failing
+    - After a cooldown one probe request is let through; success restores the
+      tier, failure doubles its cooldown
+    """
+
+    def __init__(self, window_seconds: Optional[float] = None, max_error_rate: Optional[float] = None, max_p95_seconds: Optional[float] = None, tokens_per_minute: Optional[int] = None, cooldown_seconds: Optional[float] = None, min_samples: Optional[int] = None) -> None:
+        self.window_seconds = window_seconds if window_seconds is not None else Config.MODEL_ROUTER_WINDOW_SECONDS
+        self.max_error_rate = max_error_rate if max_error_rate is not None else Config.MODEL_ROUTER_MAX_ERROR_RATE
+        self.max_p95_seconds = max_p95_seconds if max_p95_seconds is not None else Config.MODEL_ROUTER_MAX_P95_SECONDS
+        self.tokens_per_minute = tokens_per_minute if tokens_per_minute is not None else Config.MODEL_ROUTER_TOKENS_PER_MINUTE
+        self.cooldown_seconds = cooldown_seconds if cooldown_seconds is not None else Config.MODEL_ROUTER_COOLDOWN_SECONDS
+        self.min_samples = min_samples if min_samples is not None else Config.MODEL_ROUTER_MIN_SAMPLES
+        self._lock = threading.Lock()
+        # Per tier: (timestamp, ok, latency seconds, error kind) within the window
+        self._outcomes: Dict[str, deque] = {tier: deque() for tier in MODEL_TIERS}
+        self._open_until: Dict[str, float] = {tier: 0.0 for tier in MODEL_TIERS}
+        self._cooldown: Dict[str, float] = {tier: self.cooldown_seconds for tier in MODEL_TIERS}
+        self._probing: Dict[str, bool] = {tier: False for tier in MODEL_TIERS}
+        self._reasons: Dict[str, Optional[str]] = {tier: None for tier in MODEL_TIERS}
+        # (timestamp, tokens) for every model call, shared by both model tiers
+        self._spend: deque = deque()
+        self.total_tokens = 0
+        self.served = {tier: 0 for tier in TIERS + ('cache',)}
+        self.step_downs = 0
+        self.recoveries = 0
+
+    # ------------- Routing -------------
+    def choose(self) -> str:
+        """Best tier available right now (a recovering tier gets exactly one probe)."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            spent = self._tokens_in_window()
+            for tier in MODEL_TIERS:
+                if self._over_budget(tier, spent):
+                    continue
+                if self._open_until[tier] == 0.0:
+                    return tier
+                if now >= self._open_until[tier] and not self._probing[tier]:
+                    self._probing[tier] = True
+                    logger.info(f"Model router probing tier '{tier}' after {self._reasons[tier]}")
+                    return tier
+            return 'template'
+
+    def served_by(self, tier: str) -> None:
+        """Count a line as delivered by a tier (including 'template' and cache hits)."""
+        with self._lock:
+            self.served[tier] = self.served.get(tier, 0) + 1
+
+    def record_success(self, tier: str, latency: float, tokens: int = 0) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._spend.append((now, tokens))
+            self.total_tokens += tokens
+            if self._probing.get(tier):
+                self._close(tier)
+            self._outcomes[tier].append((now, True, latency, None))
+            self._evaluate(tier, now)
+
+    def record_failure(self, tier: str, error: Exception, latency: float = 0.0) -> str:
+        """Record a failed call; returns the error kind."""
+        kind = classify_error(error)
+        now = time.monotonic()
+        with self._lock:
+            if self._probing.get(tier):
+                self._probing[tier] = False
+                self._cooldown[tier] = min(self._cooldown[tier] * 2, 300.0)
+                self._open(tier, now, f"failed probe ({kind})")
+                return kind
+            self._outcomes[tier].append((now, False, latency, kind))
+            if kind == 'quota':
+                self._open(tier, now, 'quota exhausted')
+            else:
+                self._evaluate(tier, now)
+        return kind
+
+    # ------------- Health -------------
+    def _evaluate(self, tier: str, now: float) -> None:
+        if self._open_until[tier]:
+            return
+        self._trim(now)
+        outcomes = self._outcomes[tier]
+        if len(outcomes) < self.min_samples:
+            return
+        errors = sum(1 for _, ok, _, _ in outcomes if not ok)
+        if errors / len(outcomes) > self.max_error_rate:
+            self._open(tier, now, f"error rate {errors}/{len(outcomes)}")
+            return
+        latencies = sorted(latency for _, ok, latency, _ in outcomes if ok)
+        if latencies and latencies[int(len(latencies) * 0.95) - 1] > self.max_p95_seconds:
+            self._open(tier, now, f"p95 latency {latencies[int(len(latencies) * 0.95) - 1]:.1f}s")
+
+    def _over_budget(self, tier: str, spent: int) -> bool:
+        if not self.tokens_per_minute:
+            return False
+        budget = self.tokens_per_minute * self.window_seconds / 60.0
+        # Full prompts stop at 80% of the budget so compressed prompts keep lines flowing up to the limit
+        return spent >= budget * (0.8 if tier == 'full' else 1.0)
+
+    def _open(self, tier: str, now: float, reason: str) -> None:
+        if not self._open_until[tier]:
+            self.step_downs += 1
+        self._open_until[tier] = now + self._cooldown[tier]
+        self._reasons[tier] = reason
+        # Start the next health window clean so stale failures do not re-trip a recovered tier
+        self._outcomes[tier].clear()
+        logger.warning(f"Model router stepping down from tier '{tier}' for {self._cooldown[tier]:.0f}s: {reason}")
+
+    def _close(self, tier: str) -> None:
+        self._probing[tier] = False
+        self._open_until[tier] = 0.0
+        self._cooldown[tier] = self.cooldown_seconds
+        self._reasons[tier] = None
+        self._outcomes[tier].clear()
+        self.recoveries += 1
+        logger.info(f"Model router recovered tier '{tier}'")
+
+    def _trim(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        for outcomes in self._outcomes.values():
+            while outcomes and outcomes[0][0] < horizon:
+                outcomes.popleft()
+        while self._spend and self._spend[0][0] < horizon:
+            self._spend.popleft()
+
+    def _tokens_in_window(self) -> int:
+        return sum(tokens for _, tokens in self._spend)
+
+    # ------------- Metrics -------------
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            tiers = {}
+            for tier in MODEL_TIERS:
+                outcomes = self._outcomes[tier]
+                latencies = sorted(latency for _, ok, latency, _ in outcomes if ok)
+                tiers[tier] = {
+                    'state': 'probing' if self._probing[tier] else ('open' if self._open_until[tier] else 'closed'),
+                    'reason': self._reasons[tier],
+                    'retry_in_seconds': round(max(0.0, self._open_until[tier] - now), 1) if self._open_until[tier] else None,
+                    'calls_in_window': len(outcomes),
+                    'errors_in_window': sum(1 for _, ok, _, _ in outcomes if not ok),
+                    'latency_p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000) if latencies else None,
+                }
+            return {
+                'tiers': tiers,
+                'served': dict(self.served),
+                'tokens_in_window': self._tokens_in_window(),
+                'tokens_per_minute_budget': self.tokens_per_minute or None,
+                'total_tokens': self.total_tokens,
+                'step_downs': self.step_downs,
+                'recoveries': self.recoveries,
+            }
+
+
+# Shared by every commentary path so all workers in the process see the same health
+model_router = ModelRouter()
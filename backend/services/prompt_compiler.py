@@ -0,0 +1,629 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+from services.context_budget import commentary_game_state, fit_sections, rank_plays, voice_game_state
+
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap Gemini token estimate (~4 characters per token for English prose)."""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+def preferences_hash(user_context: Optional[Dict[str, Any]]) -> str:
+    """Stable hash of the user-context fields that shape the preference section."""
+    if not isinstance(user_context, dict):
+        return 'none'
+    relevant = {k: user_context.get(k) for k in ('preferences', 'interests', 'fantasy_info', 'customInstructions')}
+    canonical = json.dumps(relevant, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+class CompiledPrompt:
+    """Rendered prompt plus per-section token estimates.
+
+    baseline_tokens is the size of the unbudgeted layout for the same inputs,
+    so tokens_saved shows what the context budget removed.
+    """
+
+    def __init__(self, sections: List[Tuple[str, str]], baseline_tokens: Optional[int] = None, reductions: Optional[List[str]] = None) -> None:
+        self.sections = sections
+        self.text = ''.join(text for _, text in sections)
+        self.tokens: Dict[str, int] = {}
+        for name, text in sections:
+            self.tokens[name] = self.tokens.get(name, 0) + estimate_tokens(text)
+        self.tokens['total'] = estimate_tokens(self.text)
+        self.baseline_tokens = baseline_tokens if baseline_tokens is not None else self.tokens['total']
+        self.tokens_saved = max(0, self.baseline_tokens - self.tokens['total'])
+        self.reductions = reductions or []
+
+    def __str__(self) -> str:
+        return self.text
+
+
+# ------------- Commentary prompt fragments -------------
+_COMMENTARY_HEAD = """You are an NBA sports commentator with a {style} style.
+"""
+
+_COMMENTARY_RULES = """
+Current Time: {current_time}
+CRITICAL TEMPORAL RULE: You are a LIVE commentator at {clock} in the game. You ONLY know what has happened up to this exact moment. 
+
+**FOR SPONTANEOUS COMMENTARY - ABSOLUTELY FORBIDDEN:**
+- NO predictions about future performance (e.g., "will get a triple-double", "chances of achieving")
+- NO speculation about what might happen later
+- NO mentioning potential outcomes or "if this continues" scenarios
+- NO historical trend analysis to predict future events
+
+**ONLY ALLOWED:**
+- Comment on what just happened in THIS play
+- React to current stats and performance SO FAR
+- Describe the action that already occurred
+
+**NOTE:** This is automatic commentary, not a response to user questions. Stay present-focused!
+"""
+
+_COMMENTARY_BATCH_HEAD = """You are a booth of NBA sports commentators. Every line must be voiced in the persona it is requested for.
+"""
+
+_COMMENTARY_GAME = """
+Game Context:
+- {away_team} vs {home_team}
+- Score: {away_team} {away_score} - {home_team} {home_score}
+- Clock: {clock}
+- Status: {status}
+- Game time status: Only information up to {clock} is available"""
+
+_COMMENTARY_PLAY = """
+
+Raw Play-by-Play Event: "{play_description}"
+"""
+
+_COMMENTARY_REQUIREMENTS = """
+Your task: Convert this raw play-by-play line into natural commentary that follows the user's preferences EXACTLY.
+
+**CRITICAL REQUIREMENTS:**
+1. **NO FUTURE PREDICTIONS** - Only comment on what JUST HAPPENED, never predict what will happen
+2. **FOLLOW USER PREFERENCES ABOVE ALL ELSE** - Their settings determine how you respond
+3. **Energy Level**: Match their exact energy setting (high energy = excited, low energy = calm)
+4. **Comedy Level**: Add humor ONLY if their comedy level is high
+5. **Stat Focus**: Include detailed stats ONLY if their stat focus is high
+6. **Team Bias**: Show favoritism ONLY if they have bias toward a team involved
+7. **Fantasy Focus**: Always mention fantasy implications if they have fantasy info
+8. **Custom Instructions**: These override everything else - follow them precisely
+9. **User Interests**: Connect to what they care about most
+
+**STYLE ENFORCEMENT FOR HIGH SETTINGS - ABSOLUTELY MANDATORY:**
+- If Energy ≥ 80: USE CAPS for big moments, multiple exclamation points!!!, explosive adjectives! BE EXPLOSIVE!
+- If Comedy ≥ 70: MUST include puns, jokes, or funny observations - NO BORING COMMENTARY WHATSOEVER!
+- If StatFocus ≥ 70: Include specific numbers, percentages, or comparisons
+"""
+
+_COMMENTARY_BATCH_TASK = """
+Your task: For EVERY play and EVERY persona above, convert the raw play-by-play line into natural commentary that follows the user's preferences EXACTLY.
+- NO FUTURE PREDICTIONS - only comment on what JUST HAPPENED in that play
+- Adapt each persona to the user's preference settings
+- Keep each line about 1 max 2 sentences
+- Plays happened in the order listed; later lines may reference earlier plays
+
+Respond with ONLY a JSON array and no other text, one object per play and persona:
+[{"play": 1, "persona": "passionate", "text": "..."}]
+"""
+
+_COMMENTARY_COMPACT_HEAD = """You are a live NBA commentator, {style} style, {tone} tone. Call only what just happened; no predictions.
+"""
+
+_COMMENTARY_COMPACT_TASK = """
+One or two sentences, in persona, matching the listener settings.
+Commentary:"""
+
+_COMMENTARY_FOR_USER = """
+**FOR THIS USER (Energy={energy}, Comedy={comedy}):**
+MAKE IT EXPLOSIVE AND FUNNY! Use caps, jokes, and high energy!
+"""
+
+_COMMENTARY_EXAMPLES = """
+**EXAMPLES OF HIGH ENERGY + HIGH COMEDY STYLE (PRESENT TENSE ONLY):**
+- "BOOM! That three-pointer was SPICIER than my grandma's hot sauce! 🔥"
+- "OH MY GOODNESS! He just COOKED that defender like Sunday dinner!"
+- "WOWZA! That dunk was so nasty it needs a parental advisory warning!"
+- "Murray's got 8 points already - he's COOKING with GAS tonight!"
+- "LeBron just picked up his 3rd assist - the King is DEALING right now!"
+
+**BAD EXAMPLES (NEVER DO THIS):**
+- "If this continues, LeBron will get a triple-double" ❌
+- "Murray's chances of a big game are looking good" ❌
+- "This trend suggests..." ❌
+"""
+
+_COMMENTARY_TAIL = """
+Base persona style: {style} with tone: {tone}
+But ADAPT this persona to match their exact preference settings!
+
+Keep it about 1 max 2 sentences while being authentic to their personalized style.
+
+Commentary:"""
+
+
+# ------------- Budgeted layout (deduplicated instructions, structured state) -------------
+_BUDGET_COMMENTARY_RULES = """LIVE at {clock}: comment only on what just happened in this play and on stats so far. No predictions, speculation or "if this continues" talk.
+"""
+
+_BUDGET_COMMENTARY_TASK = """
+Task: turn the raw play into natural commentary in a {style} style with a {tone} tone. The listener settings above override the persona; custom instructions override everything. About 1, max 2 sentences.
+Commentary:"""
+
+_BUDGET_VOICE_RULES = """
+Only events up to the game clock below are known. Predict only if explicitly asked, and say it is speculation."""
+
+_BUDGET_VOICE_TAIL = """
+
+Answer in 2-3 sentences, in persona, following the listener settings above (custom instructions win).
+Response:"""
+
+
+# ------------- Voice prompt fragments -------------
+_VOICE_TEMPORAL = [
+    "CRITICAL TEMPORAL RULE: You only know information about events that have already happened up to the current game time.",
+    "PREDICTION POLICY: If user EXPLICITLY asks for predictions/speculation, you may provide analysis based on current performance, but always acknowledge uncertainty and that it's speculation.",
+    "NEVER spontaneously make predictions in commentary - only when directly asked by the user.",
+]
+
+_VOICE_TAIL = """
+
+**RESPONSE REQUIREMENTS:**
+1. STRICTLY follow all user preferences listed above
+2. Adapt your energy, humor, stat focus, and team bias to match their exact settings
+3. If they have custom instructions, those are the HIGHEST priority
+4. If they have fantasy interests, make sure to mention fantasy implications
+5. Connect your response to their stated interests whenever possible
+6. Keep response concise (2-3 sentences max) but personality-rich
+7. Sound natural and authentic to your commentator persona while following their preferences
+
+**IF USER ASKS FOR PREDICTIONS/SPECULATION:**
+- Acknowledge it's speculation with fun phrases like "Crystal ball time!" or "If I had to guess..."
+- Base analysis on CURRENT performance only (what's happened so far)
+- Use your high energy/comedy style while being honest about uncertainty
+- Example: "OHHH you want me to play fortune teller! Based on LeBron's 4 assists already, he's DEALING tonight - but basketball's crazy, anything can happen!"
+
+Response:"""
+
+
+def _team_name(preferences: Dict[str, Any]) -> str:
+    favorite = preferences['favoriteTeam']
+    return favorite.get('name', 'favorite team') if isinstance(favorite, dict) else favorite
+
+
+class PromptCompiler:
+    """Builds Gemini prompts from precompiled fragments.
+
+    - Persona blocks are compiled once per persona style
+    - The preference section is rendered once per user-preference hash (LRU)
+    - Only per-game and per-play slots are filled at request time
+    - Rendered token estimates are tracked per section for prompt-size tuning
+    """
+
+    def __init__(self, max_cached_preferences: int = 2048) -> None:
+        self._lock = threading.Lock()
+        self._persona_blocks: Dict[Tuple[str, ...], Tuple[str, str]] = {}
+        self._preference_cache: 'OrderedDict[Tuple[str, str], Any]' = OrderedDict()
+        self._max_cached = max_cached_preferences
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self.preference_hits = 0
+        self.preference_misses = 0
+
+    # ------------- Commentary -------------
+    def compile_commentary(self, game_summary: Dict[str, Any], persona_config: Dict[str, Any], play_description: str = '', user_context: Optional[Dict[str, Any]] = None) -> CompiledPrompt:
+        head, tail = self._commentary_persona_block(persona_config)
+        clock, game_text = self.compile_game_section(game_summary)
+
+        preference_text, for_user_text = self._cached_preferences('commentary', user_context, self._render_commentary_preferences)
+
+        sections = [
+            ('persona', head.format(current_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), clock=clock)),
+            ('game', game_text),
+            ('preferences', preference_text),
+            ('play', _COMMENTARY_PLAY.format(play_description=play_description)),
+            ('instructions', _COMMENTARY_REQUIREMENTS),
+            ('preferences', for_user_text),
+            ('examples', _COMMENTARY_EXAMPLES),
+            ('persona', tail),
+        ]
+        if not Config.PROMPT_BUDGET_ENABLED:
+            return self._record('commentary', CompiledPrompt(sections))
+
+        # Same inputs, one statement of each rule, game state as one structured line
+        preferences = (user_context or {}).get('preferences') or {}
+        loud = (preferences.get('energyLevel') or 0) >= 80 or (preferences.get('comedyLevel') or 0) >= 70
+        budgeted = [
+            ('persona', _COMMENTARY_HEAD.format(style=persona_config['style'])),
+            ('rules', _BUDGET_COMMENTARY_RULES.format(clock=clock)),
+            ('game', commentary_game_state(game_summary)),
+            ('preferences', preference_text),
+            ('play', _COMMENTARY_PLAY.format(play_description=play_description)),
+            # The examples only illustrate the high-energy / high-comedy register
+            ('examples', _COMMENTARY_EXAMPLES if loud else ''),
+            ('instructions', _BUDGET_COMMENTARY_TASK.format(style=persona_config['style'], tone=persona_config.get('tone', ''))),
+        ]
+        budgeted, applied = fit_sections(budgeted, Config.PROMPT_TOKEN_BUDGET_COMMENTARY, [
+            ('examples', ''),
+            ('preferences', lambda: self._cached_preferences('compact', user_context, self._render_compact_preferences)),
+            ('game', lambda: commentary_game_state(game_summary, top_scorers=False)),
+        ], estimate_tokens)
+        baseline = estimate_tokens(''.join(text for _, text in sections))
+        return self._record('commentary', CompiledPrompt(budgeted, baseline, applied))
+
+    def compile_commentary_batch(self, game_summary: Dict[str, Any], plays: List[Dict[str, Any]], personas: Dict[str, Dict[str, Any]], user_context: Optional[Dict[str, Any]] = None) -> CompiledPrompt:
+        """One structured prompt covering several plays and personas (reply is a JSON array)."""
+        game = game_summary['game']
+        clock = game.get('clock', '12:00')
+        _, game_text = self.compile_game_section(game_summary)
+        preference_text, for_user_text = self._cached_preferences('commentary', user_context, self._render_commentary_preferences)
+
+        play_lines = ["\n\nPlays to call (in order):"]
+        for index, play in enumerate(plays, start=1):
+            play_lines.append(f"\n{index}. \"{play.get('play_description', '')}\"")
+        persona_lines = ["\n\nPersonas:"]
+        for name, config in personas.items():
+            persona_lines.append(f"\n- {name}: {config['style']} style with {config.get('tone', '')} tone")
+
+        sections = [
+            ('persona', _COMMENTARY_BATCH_HEAD + _COMMENTARY_RULES.format(current_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), clock=clock)),
+            ('game', game_text),
+            ('preferences', preference_text),
+            ('play', ''.join(play_lines)),
+            ('persona', ''.join(persona_lines) + "\n"),
+            ('instructions', _COMMENTARY_BATCH_TASK),
+            ('preferences', for_user_text),
+        ]
+        return self._record('commentary_batch', CompiledPrompt(sections))
+
+    def compile_commentary_compact(self, game_summary: Dict[str, Any], persona_config: Dict[str, Any], play_description: str = '', user_context: Optional[Dict[str, Any]] = None) -> CompiledPrompt:
+        """Short commentary prompt for when the model is throttled: score, play and one preference line."""
+        game = game_summary['game']
+        teams = game.get('teams') or {}
+        away_team = (teams.get('away') or {}).get('name', 'Los Angeles Lakers')
+        home_team = (teams.get('home') or {}).get('name', 'Portland Trail Blazers')
+        game_text = f"{away_team} {game['score']['away']} - {home_team} {game['score']['home']}, {game.get('clock', '12:00')}\n"
+
+        sections = [
+            ('persona', _COMMENTARY_COMPACT_HEAD.format(style=persona_config['style'], tone=persona_config.get('tone', ''))),
+            ('game', game_text),
+            ('preferences', self._cached_preferences('compact', user_context, self._render_compact_preferences)),
+            ('play', f'Play: "{play_description}"\n'),
+            ('instructions', _COMMENTARY_COMPACT_TASK),
+        ]
+        return self._record('commentary_compact', CompiledPrompt(sections))
+
+    def _render_compact_preferences(self, user_context: Optional[Dict[str, Any]]) -> str:
+        if not isinstance(user_context, dict):
+            return ''
+        preferences = user_context.get('preferences') or {}
+        settings = [f"{label} {preferences[key]}/100" for key, label in (('energyLevel', 'energy'), ('comedyLevel', 'comedy'), ('statFocus', 'stats')) if preferences.get(key) is not None]
+        if preferences.get('favoriteTeam') and (preferences.get('biasLevel') or 0) >= 40:
+            settings.append(f"favors {_team_name(preferences)}")
+        if user_context.get('interests'):
+            settings.append(f"into {', '.join(user_context['interests'])}")
+        if user_context.get('fantasy_info'):
+            settings.append(f"fantasy: {user_context['fantasy_info']}")
+        line = f"Listener: {', '.join(settings)}.\n" if settings else ''
+        if user_context.get('customInstructions'):
+            line += f"Must follow: '{user_context['customInstructions']}'\n"
+        return line
+
+    def compile_game_section(self, game_summary: Dict[str, Any]) -> Tuple[str, str]:
+        """Return (clock, rendered game context) for a game summary."""
+        game = game_summary['game']
+        clock = game.get('clock', '12:00')
+
+        # Handle both database structure (no teams field) and minimal context structure (has teams field)
+        if 'teams' in game:
+            away_team = game['teams']['away']['name']
+            home_team = game['teams']['home']['name']
+        else:
+            # Default team names for mock game when no teams field
+            away_team = 'Los Angeles Lakers'
+            home_team = 'Portland Trail Blazers'
+
+        game_text = _COMMENTARY_GAME.format(
+            away_team=away_team,
+            home_team=home_team,
+            away_score=game['score']['away'],
+            home_score=game['score']['home'],
+            clock=clock,
+            status=game.get('status', 'InProgress')
+        )
+        top_scorers = game_summary.get('top_scorers') or []
+        if top_scorers:
+            game_text += "\n\nTop Performers:"
+            for scorer in top_scorers[:2]:
+                game_text += f"\n- {scorer.get('name', 'Player')}: {scorer.get('points', 0)} points"
+        return clock, game_text
+
+    def _commentary_persona_block(self, persona_config: Dict[str, Any]) -> Tuple[str, str]:
+        key = ('commentary', persona_config['style'], persona_config.get('tone', ''))
+        block = self._persona_blocks.get(key)
+        if block is None:
+            block = (
+                _COMMENTARY_HEAD.format(style=persona_config['style']) + _COMMENTARY_RULES,
+                _COMMENTARY_TAIL.format(style=persona_config['style'], tone=persona_config.get('tone', ''))
+            )
+            self._persona_blocks[key] = block
+        return block
+
+    def _render_commentary_preferences(self, user_context: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+        parts: List[str] = []
+        if user_context:
+            preferences = user_context.get('preferences', {})
+            if preferences:
+                parts.append("\n\n**MANDATORY USER PREFERENCES - THESE OVERRIDE ALL OTHER INSTRUCTIONS:**")
+
+                if preferences.get('energyLevel') is not None:
+                    energy = preferences['energyLevel']
+                    if energy >= 80:
+                        parts.append(f"\n- MAXIMUM ENERGY ({energy}/100): EXPLOSIVE excitement! Use ALL CAPS for big moments, multiple exclamation points, and high-octane language! THIS IS MANDATORY!")
+                    elif energy >= 60:
+                        parts.append(f"\n- HIGH ENERGY ({energy}/100): Very enthusiastic! Show genuine excitement with animated descriptions and passionate reactions!")
+                    elif energy >= 40:
+                        parts.append(f"\n- MODERATE ENERGY ({energy}/100): Balanced excitement with steady engagement.")
+                    else:
+                        parts.append(f"\n- LOW ENERGY ({energy}/100): Calm, measured, analytical approach. Stay composed and factual.")
+
+                if preferences.get('comedyLevel') is not None:
+                    comedy = preferences['comedyLevel']
+                    if comedy >= 70:
+                        parts.append(f"\n- HIGH COMEDY ({comedy}/100): Be genuinely funny! Add jokes, puns, witty observations, funny player nicknames, and humorous analogies! NO BORING COMMENTARY ALLOWED!")
+                    elif comedy >= 40:
+                        parts.append(f"\n- SOME HUMOR ({comedy}/100): Include light humor and playful commentary when appropriate.")
+                    else:
+                        parts.append(f"\n- SERIOUS COMMENTARY ({comedy}/100): Professional, straightforward, no jokes or humor.")
+
+                if preferences.get('statFocus') is not None:
+                    stats = preferences['statFocus']
+                    if stats >= 70:
+                        parts.append(f"\n- HEAVY STATS ({stats}/100): Include detailed percentages, historical comparisons, advanced metrics, and analytical breakdowns!")
+                    elif stats >= 40:
+                        parts.append(f"\n- MODERATE STATS ({stats}/100): Mention key relevant statistics.")
+                    else:
+                        parts.append(f"\n- EMOTION FOCUS ({stats}/100): Emphasize storylines, momentum, and feelings over numbers.")
+
+                if preferences.get('biasLevel') is not None and preferences.get('favoriteTeam'):
+                    bias = preferences['biasLevel']
+                    team = _team_name(preferences)
+                    if bias >= 70:
+                        parts.append(f"\n- STRONG {team.upper()} FAN ({bias}/100): Show clear favoritism! Get EXTRA excited for {team} plays, use 'we/us', be defensive about criticism!")
+                    elif bias >= 40:
+                        parts.append(f"\n- {team} PREFERENCE ({bias}/100): Show noticeable but restrained favoritism toward {team}.")
+                    else:
+                        parts.append(f"\n- NEUTRAL COVERAGE ({bias}/100): Balanced commentary between teams.")
+
+            if user_context.get('interests'):
+                parts.append(f"\n\n**USER'S PRIMARY INTERESTS - ALWAYS PRIORITIZE:** {', '.join(user_context['interests'])}")
+                parts.append("\n- Frame every comment through the lens of what the user cares about most")
+                parts.append("\n- Use references and examples that connect to their interests")
+
+            if user_context.get('fantasy_info'):
+                parts.append(f"\n\n**FANTASY PRIORITY:** {user_context['fantasy_info']}")
+                parts.append("\n- ALWAYS mention fantasy implications for player performances")
+                parts.append("\n- Call out fantasy-relevant stats (points, rebounds, assists, steals, blocks)")
+                parts.append("\n- React to performances from a fantasy owner's perspective")
+
+            if user_context.get('customInstructions'):
+                parts.append("\n\n**CUSTOM USER INSTRUCTIONS - ABSOLUTE PRIORITY - OVERRIDE EVERYTHING ELSE:**")
+                parts.append(f"\n'{user_context['customInstructions']}'")
+                parts.append("\n- These instructions are more important than any other guidelines - follow them exactly!")
+
+        prefs = (user_context or {}).get('preferences', {}) or {}
+        for_user = _COMMENTARY_FOR_USER.format(
+            energy=prefs.get('energyLevel', 'unknown'),
+            comedy=prefs.get('comedyLevel', 'unknown')
+        )
+        return ''.join(parts), for_user
+
+    # ------------- Voice Q&A -------------
+    def compile_voice(self, transcript: str, persona_config: Dict[str, Any], user_context: Optional[Dict[str, Any]] = None, game_ctx: Optional[Dict[str, Any]] = None) -> CompiledPrompt:
+        head = self._voice_persona_block(persona_config)
+        preference_lines = self._cached_preferences('voice', user_context, self._render_voice_preferences)
+
+        temporal = [f"Current time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"] + _VOICE_TEMPORAL
+        game_lines = self._render_voice_game(game_ctx)
+
+        sections = [
+            ('persona', head),
+            ('preferences', preference_lines),
+            ('instructions', "\n" + "\n".join(temporal)),
+            ('game', ("\n" + "\n".join(game_lines)) if game_lines else ''),
+            ('question', f"\n\nUser question: {transcript}"),
+            ('instructions', _VOICE_TAIL),
+        ]
+        if not Config.PROMPT_BUDGET_ENABLED:
+            return self._record('voice', CompiledPrompt(sections))
+
+        recent = (game_ctx or {}).get('recent_plays') or []
+
+        def game_state(limit):
+            return voice_game_state(game_ctx, rank_plays(recent, transcript, limit)) if game_ctx else ''
+
+        budgeted = [
+            ('persona', head),
+            ('preferences', preference_lines),
+            ('rules', _BUDGET_VOICE_RULES),
+            ('game', game_state(Config.PROMPT_RECENT_PLAYS)),
+            ('question', f"\n\nUser question: {transcript}"),
+            ('instructions', _BUDGET_VOICE_TAIL),
+        ]
+        budgeted, applied = fit_sections(budgeted, Config.PROMPT_TOKEN_BUDGET_VOICE, [
+            ('game', lambda: game_state(3)),
+            ('preferences', lambda: "\n" + self._cached_preferences('compact', user_context, self._render_compact_preferences)),
+            ('game', lambda: game_state(1)),
+            ('game', lambda: game_state(0)),
+        ], estimate_tokens)
+        baseline = estimate_tokens(''.join(text for _, text in sections))
+        return self._record('voice', CompiledPrompt(budgeted, baseline, applied))
+
+    def _voice_persona_block(self, persona_config: Dict[str, Any]) -> str:
+        key = ('voice', persona_config['description'], persona_config['style'])
+        block = self._persona_blocks.get(key)
+        if block is None:
+            block = "\n".join([
+                f"You are a {persona_config['description']}.",
+                f"Your communication style should be {persona_config['style']}.",
+                "Keep your response concise and engaging (2-3 sentences max).",
+            ])
+            self._persona_blocks[key] = block
+        return block
+
+    def _render_voice_preferences(self, user_ctx: Optional[Dict[str, Any]]) -> str:
+        lines: List[str] = []
+        if user_ctx:
+            preferences = user_ctx.get('preferences', {})
+            if preferences:
+                lines.append("\n**IMPORTANT USER PREFERENCES - FOLLOW THESE CLOSELY:**")
+
+                if preferences.get('energyLevel') is not None:
+                    energy = preferences['energyLevel']
+                    if energy >= 80:
+                        lines.append(f"- MAXIMUM ENERGY ({energy}/100): Be extremely enthusiastic, use exclamation points, high-energy language, and passionate reactions!")
+                    elif energy >= 60:
+                        lines.append(f"- HIGH ENERGY ({energy}/100): Be very excited and enthusiastic with animated descriptions!")
+                    elif energy >= 40:
+                        lines.append(f"- MODERATE ENERGY ({energy}/100): Balanced enthusiasm with steady excitement.")
+                    else:
+                        lines.append(f"- LOW ENERGY ({energy}/100): Stay calm, analytical, and measured in your responses.")
+
+                if preferences.get('comedyLevel') is not None:
+                    comedy = preferences['comedyLevel']
+                    if comedy >= 70:
+                        lines.append(f"- HIGH COMEDY ({comedy}/100): Include jokes, funny observations, witty remarks, and humorous analogies!")
+                    elif comedy >= 40:
+                        lines.append(f"- MODERATE COMEDY ({comedy}/100): Add some light humor and playful comments.")
+                    else:
+                        lines.append(f"- SERIOUS TONE ({comedy}/100): Keep responses professional and focused on facts.")
+
+                if preferences.get('statFocus') is not None:
+                    stats = preferences['statFocus']
+                    if stats >= 70:
+                        lines.append(f"- HIGH STAT FOCUS ({stats}/100): Include detailed statistics, percentages, historical comparisons, and analytical insights!")
+                    elif stats >= 40:
+                        lines.append(f"- MODERATE STATS ({stats}/100): Mention relevant key statistics when appropriate.")
+                    else:
+                        lines.append(f"- LOW STATS ({stats}/100): Focus on storylines and emotions rather than numbers.")
+
+                if preferences.get('biasLevel') is not None and preferences.get('favoriteTeam'):
+                    bias = preferences['biasLevel']
+                    team = _team_name(preferences)
+                    if bias >= 70:
+                        lines.append(f"- STRONG TEAM BIAS ({bias}/100): Show clear favoritism toward {team}! Get extra excited for their plays and defensive about criticism!")
+                    elif bias >= 40:
+                        lines.append(f"- MODERATE BIAS ({bias}/100): Show some preference for {team} while staying somewhat balanced.")
+                    else:
+                        lines.append(f"- NEUTRAL APPROACH ({bias}/100): Stay balanced between teams.")
+
+            if user_ctx.get('interests'):
+                lines.append(f"\n**USER INTERESTS - PRIORITIZE THESE TOPICS:** {', '.join(user_ctx['interests'])}")
+                lines.append("- Always relate responses back to these interests when possible")
+                lines.append("- Use examples and references that connect to what the user cares about")
+
+            if user_ctx.get('fantasy_info'):
+                lines.append(f"\n**FANTASY SPORTS PRIORITY:** {user_ctx['fantasy_info']}")
+                lines.append("- ALWAYS mention fantasy implications when discussing player performances")
+                lines.append("- Highlight players relevant to their fantasy team/league")
+
+            if user_ctx.get('customInstructions'):
+                lines.append("\n**CUSTOM USER INSTRUCTIONS - HIGHEST PRIORITY:**")
+                lines.append(f"'{user_ctx['customInstructions']}'")
+                lines.append("- These custom instructions override all other guidelines - follow them precisely!")
+
+        return ("\n" + "\n".join(lines)) if lines else ''
+
+    def _render_voice_game(self, game_ctx: Optional[Dict[str, Any]]) -> List[str]:
+        if not game_ctx:
+            return []
+        lines: List[str] = []
+        sb = game_ctx.get('scoreboard', {})
+        lines.append(f"Current game: {sb.get('away')} @ {sb.get('home')}")
+        lines.append(f"Score: {sb.get('away_score')} - {sb.get('home_score')} | Q{sb.get('quarter')} {sb.get('clock')}")
+        lines.append(f"Game time status: Only information up to {sb.get('clock')} in Q{sb.get('quarter')} is available")
+        leaders = game_ctx.get('leaders', {})
+        if leaders:
+            la = leaders.get('away', {})
+            lh = leaders.get('home', {})
+            if la.get('name'):
+                lines.append(f"Away leader: {la.get('name')} {la.get('points')} pts")
+            if lh.get('name'):
+                lines.append(f"Home leader: {lh.get('name')} {lh.get('points')} pts")
+        recent = (game_ctx.get('recent_plays') or [])[-Config.PROMPT_RECENT_PLAYS:]
+        if recent:
+            lines.append("Recent plays: " + "; ".join([f"{p.get('clock')} {p.get('team')}: {p.get('description')}" for p in recent]))
+            lines.append("(Only plays that have already occurred are shown above)")
+        return lines
+
+    # ------------- Caching and stats -------------
+    def _cached_preferences(self, kind: str, user_context: Optional[Dict[str, Any]], render) -> Any:
+        key = (kind, preferences_hash(user_context))
+        with self._lock:
+            cached = self._preference_cache.get(key)
+            if cached is not None:
+                self._preference_cache.move_to_end(key)
+                self.preference_hits += 1
+                return cached
+        rendered = render(user_context)
+        with self._lock:
+            self.preference_misses += 1
+            self._preference_cache[key] = rendered
+            while len(self._preference_cache) > self._max_cached:
+                self._preference_cache.popitem(last=False)
+        return rendered
+
+    def _record(self, kind: str, compiled: CompiledPrompt) -> CompiledPrompt:
+        with self._lock:
+            stats = self._stats.setdefault(kind, {'prompts': 0, 'total_tokens': 0, 'max_tokens': 0, 'section_tokens': {}, 'tokens_saved': 0, 'reductions': {}})
+            stats['prompts'] += 1
+            stats['total_tokens'] += compiled.tokens['total']
+            stats['tokens_saved'] += compiled.tokens_saved
+            for name in compiled.reductions:
+                stats['reductions'][name] = stats['reductions'].get(name, 0) + 1
+            stats['max_tokens'] = max(stats['max_tokens'], compiled.tokens['total'])
+            for name, count in compiled.tokens.items():
+                if name != 'total':
+                    stats['section_tokens'][name] = stats['section_tokens'].get(name, 0) + count
+        logger.debug(f"Compiled {kind} prompt tokens={compiled.tokens}")
+        return compiled
+
+    def stats(self) -> Dict[str, Any]:
+        """Average/max rendered token counts per prompt kind and section, plus cache hit rate."""
+        with self._lock:
+            out: Dict[str, Any] = {}
+            for kind, s in self._stats.items():
+                n = max(s['prompts'], 1)
+                out[kind] = {
+                    'prompts': s['prompts'],
+                    'avg_tokens': round(s['total_tokens'] / n, 1),
+                    'max_tokens': s['max_tokens'],
+                    'avg_section_tokens': {k: round(v / n, 1) for k, v in s['section_tokens'].items()},
+                    'tokens_saved': s['tokens_saved'],
+                    'avg_tokens_saved': round(s['tokens_saved'] / n, 1),
+                    'budget_reductions': dict(s['reductions']),
+                }
+            lookups = self.preference_hits + self.preference_misses
+            out['preference_cache'] = {
+                'entries': len(self._preference_cache),
+                'hits': self.preference_hits,
+                'misses': self.preference_misses,
+                'hit_rate': round(self.preference_hits / lookups, 3) if lookups else 0.0,
+            }
+            return out
+
+
+# Shared compiler (persona blocks and preference fragments are process-wide)
+prompt_compiler = PromptCompiler()
@@ -0,0 +1,251 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from database import db
+from services.audio_cache import audio_cache
+from services.audio_utils import SAMPLES_PER_FRAME, iter_mp3_frames, parse_frame_header, silent_mp3
+
+
+logger = logging.getLogger(__name__)
+
+# Voices a station can carry (TTSService.voice_configs)
+RADIO_PERSONAS = ('passionate', 'nerdy', 'funny', 'raw')
+
+
+class RadioStation:
+    """One game's continuous MP3 stream for one persona, shared by every listener.
+
+    - A pacer thread emits frames in real time into a ring buffer: commentary
+      clips spliced frame by frame (no re-encoding), silence between them
+    - New lines are picked up from the commentary collection, so clips voiced
+      by Celery workers reach stations running in the web process
+    - Listeners just copy frames out of the ring from their own cursor; one
+      that falls behind the ring skips ahead to the oldest frame still held
+    """
+
+    def __init__(self, game_id: str, persona: str, database: Any = None, on_stop: Optional[Any] = None) -> None:
+        self.game_id = game_id
+        self.persona = persona
+        self.db = database if database is not None else db
+        self._on_stop = on_stop
+        self._cond = threading.Condition()
+        self._ring: Deque[bytes] = deque(maxlen=self._frames_for(Config.RADIO_BUFFER_SECONDS))
+        self._next_seq = 0  # sequence number of the next frame written to the ring
+        self._clips: Deque[List[bytes]] = deque()
+        self._current: Deque[bytes] = deque()
+        self._silence = silent_mp3(0)
+        self._silence_params = (128, 44100)
+        self._since = datetime.now()
+        self._listeners = 0
+        self._idle_since = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self.stats = {
+            'clips': 0,
+            'clips_dropped': 0,
+            'clip_frames': 0,
+            'silence_frames': 0,
+            'listeners_total': 0,
+            'listener_skips': 0,
+        }
+
+    # ------------- Listening -------------
+    def listen(self) -> Iterator[bytes]:
+        """Yield the live stream, starting RADIO_PREBUFFER_SECONDS behind the live edge."""
+        with self._cond:
+            self._listeners += 1
+            self.stats['listeners_total'] += 1
+            cursor = max(self._oldest_seq(), self._next_seq - self._frames_for(Config.RADIO_PREBUFFER_SECONDS))
+        self.start()
+        try:
+            while True:
+                with self._cond:
+                    while self._next_seq <= cursor and self._running:
+                        self._cond.wait(timeout=1.0)
+                    if not self._running:
+                        return
+                    if cursor < self._oldest_seq():
+                        self.stats['listener_skips'] += 1
+                        cursor = self._oldest_seq()
+                    chunk = b''.join(islice(self._ring, cursor - self._oldest_seq(), None))
+                    cursor = self._next_seq
+                yield chunk
+        finally:
+            with self._cond:
+                self._listeners -= 1
+                if not self._listeners:
+                    self._idle_since = time.monotonic()
+
+    def enqueue(self, audio: bytes) -> int:
+        """Queue a clip to be spliced in after those already waiting; returns its frame count."""
+        frames = list(iter_mp3_frames(audio)) if audio else []
+        if not frames:
+            return 0
+        with self._cond:
+            self._clips.append(frames)
+            self.stats['clips'] += 1
+            # Live radio stays live: the oldest waiting lines go once the backlog is too long to catch up
+            while len(self._clips) > 1 and self._queued_frames() > self._frames_for(Config.RADIO_MAX_BACKLOG_SECONDS):
+                self._clips.popleft()
+                self.stats['clips_dropped'] += 1
+        return len(frames)
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._idle_since = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name=f"radio-{self.game_id}-{self.persona}", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    @property
+    def listeners(self) -> int:
+        return self._listeners
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.stats,
+                'listeners': self._listeners,
+                'queued_seconds': round(self._queued_frames() * SAMPLES_PER_FRAME / 44100, 1),
+                'running': self._running,
+            }
+
+    # ------------- Internals -------------
+    def _run(self) -> None:
+        frame_seconds = SAMPLES_PER_FRAME / 44100
+        stream_clock = time.monotonic()
+        next_poll = 0.0
+        try:
+            while True:
+                now = time.monotonic()
+                with self._cond:
+                    if not self._running:
+                        return
+                    if not self._listeners and now - self._idle_since > Config.RADIO_IDLE_SECONDS:
+                        self._running = False
+                        self._cond.notify_all()
+                        return
+                if now >= next_poll:
+                    self._poll()
+                    next_poll = now + Config.RADIO_POLL_SECONDS
+                if stream_clock < now - 1.0:
+                    # Stalled (e.g. a long poll); don't burst the backlog out to listeners
+                    stream_clock = now
+                with self._cond:
+                    while stream_clock < now + Config.RADIO_LEAD_SECONDS:
+                        frame = self._next_frame()
+                        header = parse_frame_header(frame[:4])
+                        self._ring.append(frame)
+                        self._next_seq += 1
+                        stream_clock += SAMPLES_PER_FRAME / header[2] if header else frame_seconds
+                    self._cond.notify_all()
+                time.sleep(Config.RADIO_TICK_SECONDS)
+        except Exception as e:
+            logger.error(f"Radio station {self.game_id}/{self.persona} stopped: {e}")
+            self.stop()
+        finally:
+            if self._on_stop:
+                self._on_stop(self)
+
+    def _next_frame(self) -> bytes:
+        if not self._current and self._clips:
+            self._current = deque(self._clips.popleft())
+        if self._current:
+            frame = self._current.popleft()
+            self.stats['clip_frames'] += 1
+            header = parse_frame_header(frame[:4])
+            if header:
+                # Fill gaps with silence in the format of the last clip so decoders don't reset
+                if header[1:] != self._silence_params:
+                    self._silence_params = header[1:]
+                    self._silence = silent_mp3(0, *self._silence_params)
+            return frame
+        self.stats['silence_frames'] += 1
+        return self._silence
+
+    def _poll(self) -> None:
+        """Queue feed lines voiced for this game and persona since the last poll.
+
+        Only lines the server-driven feed marked shared are aired; anything a
+        viewer generated (custom instructions, team bias, chosen voice) stays private.
+        """
+        try:
+            docs = list(self.db.commentary.find({
+                'game_id': self.game_id,
+                'persona': self.persona,
+                'timestamp': {'$gt': self._since},
+                'shared': True,
+                'bucket': 'default',
+            }).sort('timestamp', 1))
+        except Exception as e:
+            logger.warning(f"Radio poll failed for game {self.game_id}: {e}")
+            return
+        for doc in docs:
+            self._since = max(self._since, doc['timestamp'])
+            for url in doc.get('audio_urls') or [doc.get('audio_url')]:
+                audio = self._load(url)
+                if audio:
+                    self.enqueue(audio)
+
+    def _load(self, url: Optional[str]) -> Optional[bytes]:
+        if not url:
+            return None
+        try:
+            with open(os.path.join(audio_cache.directory, os.path.basename(url)), 'rb') as f:
+                return f.read()
+        except OSError as e:
+            logger.warning(f"Radio clip {url} unavailable: {e}")
+            return None
+
+    def _oldest_seq(self) -> int:
+        return self._next_seq - len(self._ring)
+
+    def _queued_frames(self) -> int:
+        return len(self._current) + sum(len(clip) for clip in self._clips)
+
+    @staticmethod
+    def _frames_for(seconds: float) -> int:
+        return max(1, int(seconds * 44100 / SAMPLES_PER_FRAME))
+
+
+class RadioService:
+    """Registry of live stations; a station starts with its first listener and stops once idle."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stations: Dict[Tuple[str, str], RadioStation] = {}
+
+    def station(self, game_id: str, persona: str) -> RadioStation:
+        with self._lock:
+            station = self._stations.get((game_id, persona))
+            if station is None:
+                station = self._stations[(game_id, persona)] = RadioStation(game_id, persona, on_stop=self._remove)
+            return station
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stations = dict(self._stations)
+        return {f"{game_id}/{persona}": station.snapshot() for (game_id, persona), station in stations.items()}
+
+    def _remove(self, station: RadioStation) -> None:
+        with self._lock:
+            # A listener may have restarted it while it was shutting down
+            if self._stations.get((station.game_id, station.persona)) is station and not station.snapshot()['running']:
+                del self._stations[(station.game_id, station.persona)]
+
+
+radio_service = RadioService()
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase, strip punctuation and collapse whitespace so trivially different phrasings share a key."""
+    if not text:
+        return ''
+    text = text.lower().replace("'", '')
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class ResponseCache:
+    """Two-tier cache for Gemini responses keyed on semantic inputs, not raw prompt strings.
+
+    - L1: in-process LRU with per-entry TTL
+    - L2 (optional): Redis shared across workers, enabled with RESPONSE_CACHE_REDIS
+    - Hit/miss/eviction counters for monitoring
+    """
+
+    def __init__(self, namespace: str = 'gemini', ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None, redis_url: Optional[str] = None) -> None:
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.RESPONSE_CACHE_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else Config.RESPONSE_CACHE_MAX_ENTRIES
+        self.redis_url = redis_url if redis_url is not None else (Config.REDIS_URL if Config.RESPONSE_CACHE_REDIS else None)
+        self._entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_retry_at = 0.0
+        self._counters = {
+            'l1_hits': 0,
+            'l2_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'redis_errors': 0,
+        }
+
+    # ------------- Keys -------------
+    def make_key(self, kind: str, **inputs: Any) -> str:
+        canonical = json.dumps({'kind': kind, **inputs}, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    # ------------- Access -------------
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires >= now:
+                    self._entries.move_to_end(key)
+                    self._counters['l1_hits'] += 1
+                    return value
+                del self._entries[key]
+                self._counters['expirations'] += 1
+
+        client = self._redis_client()
+        if client is not None:
+            try:
+                value = client.get(self._redis_key(key))
+                if value is not None:
+                    value = value.decode('utf-8') if isinstance(value, bytes) else value
+                    self._store_local(key, value)
+                    with self._lock:
+                        self._counters['l2_hits'] += 1
+                    return value
+            except Exception as e:
+                self._redis_failed(e)
+
+        with self._lock:
+            self._counters['misses'] += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        if not value:
+            return
+        self._store_local(key, value)
+        with self._lock:
+            self._counters['sets'] += 1
+        client = self._redis_client()
+        if client is not None:
+            try:
+                client.setex(self._redis_key(key), self.ttl_seconds, value)
+            except Exception as e:
+                self._redis_failed(e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._counters['l1_hits'] + self._counters['l2_hits']
+            lookups = hits + self._counters['misses']
+            return {
+                **self._counters,
+                'entries': len(self._entries),
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+                'redis_enabled': bool(self.redis_url),
+            }
+
+    # ------------- Internals -------------
+    def _store_local(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def _redis_key(self, key: str) -> str:
+        return f"respcache:{self.namespace}:{key}"
+
+    def _redis_client(self):
+        if not self.redis_url or time.monotonic() < self._redis_retry_at:
+            return None
+        if self._redis is None:
+            try:
+                import redis
+                # Short timeouts: a slow cache must never be slower than the model call it saves
+                self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=0.1, socket_connect_timeout=0.1)
+            except Exception as e:
+                self._redis_failed(e)
+                return None
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        with self._lock:
+            self._counters['redis_errors'] += 1
+        # Back off for a while instead of paying the timeout on every request
+        self._redis_retry_at = time.monotonic() + 30
+        self._redis = None
+        logger.warning(f"Response cache Redis tier unavailable, using local tier only for 30s: {error}")
+
+
+# Shared across CommentaryService and VoiceService
+response_cache = ResponseCache()
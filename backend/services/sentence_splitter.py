@@ -0,0 +1,52 @@
+import re
+from typing import List
+
+
+# Abbreviations that end in a period without ending the sentence
+_ABBREVIATIONS = ('vs', 'jr', 'sr', 'st', 'mr', 'dr', 'no', 'pt', 'pts', 'reb', 'ast', 'approx')
+_BOUNDARY = re.compile(r'([.!?…]+["\')\]]*)(\s+)')
+
+
+class SentenceBuffer:
+    """Accumulates streamed text and releases complete sentences as soon as they end.
+
+    A sentence is complete once its terminal punctuation is followed by whitespace,
+    so "3.5" or a period at the very end of a chunk is held until more text arrives.
+    """
+
+    def __init__(self, min_chars: int = 12) -> None:
+        self.min_chars = min_chars
+        self._buffer = ''
+
+    def feed(self, text: str) -> List[str]:
+        if not text:
+            return []
+        self._buffer += text
+        sentences: List[str] = []
+        start = 0
+        for match in _BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start:match.end(1)].strip()
+            if len(candidate) < self.min_chars or self._ends_with_abbreviation(candidate):
+                # Too short to voice on its own ("Wow!") or not a real boundary - keep going
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest = self._buffer.strip()
+        self._buffer = ''
+        return [rest] if rest else []
+
+    def _ends_with_abbreviation(self, candidate: str) -> bool:
+        if not candidate.endswith('.'):
+            return False
+        last_word = candidate[:-1].rsplit(None, 1)[-1].lower() if candidate[:-1].strip() else ''
+        return last_word in _ABBREVIATIONS
+
+
+def split_sentences(text: str, min_chars: int = 12) -> List[str]:
+    """Split a complete text with the same rules used for streamed output."""
+    buffer = SentenceBuffer(min_chars)
+    return buffer.feed(text) + buffer.flush()
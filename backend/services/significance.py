@@ -0,0 +1,122 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Base weight per play kind, checked in order (first match wins)
+_PLAY_WEIGHTS: List[Tuple[str, re.Pattern, float]] = [
+    ('substitution', re.compile(r'^sub:', re.I), 0.0),
+    ('violation', re.compile(r'violation', re.I), 0.05),
+    ('timeout', re.compile(r'timeout', re.I), 0.05),
+    ('missed_free_throw', re.compile(r'^miss\b.*free throw', re.I), 0.05),
+    ('missed_three', re.compile(r'^miss\b.*(3pt|three)', re.I), 0.15),
+    ('miss', re.compile(r'^miss\b', re.I), 0.1),
+    ('free_throw', re.compile(r'free throw', re.I), 0.15),
+    ('dunk', re.compile(r'dunk', re.I), 0.55),
+    ('three', re.compile(r'3pt|three', re.I), 0.5),
+    ('block', re.compile(r'block', re.I), 0.45),
+    ('steal', re.compile(r'steal', re.I), 0.4),
+    ('turnover', re.compile(r'turnover', re.I), 0.2),
+    ('rebound', re.compile(r'rebound', re.I), 0.1),
+    ('foul', re.compile(r'foul', re.I), 0.1),
+    ('layup', re.compile(r'layup|putback|hook', re.I), 0.3),
+    ('shot', re.compile(r'shot|jumper', re.I), 0.25),
+]
+
+_POINTS = re.compile(r'\((\d+) PTS\)')
+
+
+def play_kind(description: str) -> Tuple[str, float]:
+    for kind, pattern, weight in _PLAY_WEIGHTS:
+        if pattern.search(description or ''):
+            return kind, weight
+    return 'other', 0.1
+
+
+def play_points(payload: Dict[str, Any]) -> int:
+    """Points scored on a play, from the feed when present, otherwise from its description."""
+    if payload.get('points') is not None:
+        return int(payload['points'])
+    description = payload.get('description') or ''
+    if description.upper().startswith('MISS') or not _POINTS.search(description):
+        return 0
+    if re.search(r'free throw', description, re.I):
+        return 1
+    return 3 if re.search(r'3pt|three', description, re.I) else 2
+
+
+def _seconds(clock: Optional[str]) -> Optional[int]:
+    if not clock or ':' not in str(clock):
+        return None
+    try:
+        minutes, seconds = str(clock).split(':')[:2]
+        return int(minutes) * 60 + int(float(seconds))
+    except ValueError:
+        return None
+
+
+def score_play(payload: Dict[str, Any], game: Optional[Dict[str, Any]] = None, recent: Iterable[Dict[str, Any]] = (), star_player_ids: Iterable[Any] = ()) -> Tuple[float, Dict[str, float]]:
+    """Score how much a play deserves commentary, 0.0 (skip) to 1.0 (must call).
+
+    payload: event payload (description, period, clock, team, player_id, points)
+    game: game document with the current score
+    recent: earlier play payloads of the same game, oldest first
+    Returns (score, contributing factors) so callers can log why a play ranked.
+    """
+    kind, base = play_kind(payload.get('description', ''))
+    factors: Dict[str, float] = {'base': base}
+    if base == 0.0:
+        return 0.0, factors
+
+    points = play_points(payload)
+    multiplier = 1.0
+
+    # Late in the game every possession matters more
+    period = payload.get('period') or 1
+    remaining = _seconds(payload.get('clock'))
+    if period >= 4 and remaining is not None and remaining <= 300:
+        factors['clutch'] = 0.6 if remaining <= 60 else 0.35
+    elif period > 4:
+        factors['clutch'] = 0.35
+    if 'clutch' in factors:
+        multiplier += factors['clutch']
+
+    # Close games, ties and lead changes
+    score_after = None
+    if payload.get('home_score') is not None and payload.get('away_score') is not None:
+        score_after = (payload['home_score'], payload['away_score'])
+    elif game and isinstance(game.get('score'), dict):
+        score_after = (game['score'].get('home') or 0, game['score'].get('away') or 0)
+    if score_after:
+        home, away = score_after
+        margin = abs(home - away)
+        if margin <= 5:
+            factors['close_game'] = 0.25
+            multiplier += 0.25
+        elif margin >= 20:
+            factors['blowout'] = -0.3
+            multiplier -= 0.3
+        if points and margin <= points:
+            # This basket most likely tied the game or flipped the lead
+            factors['lead_change'] = 0.4
+            multiplier += 0.4
+
+    # Scoring runs: consecutive unanswered points by the scoring team
+    if points and payload.get('team'):
+        run = points
+        for previous in reversed(list(recent)):
+            previous_points = play_points(previous)
+            if not previous_points:
+                continue
+            if previous.get('team') != payload['team']:
+                break
+            run += previous_points
+        if run >= 8:
+            factors['run'] = min(0.5, 0.05 * run)
+            multiplier += factors['run']
+
+    if payload.get('player_id') is not None and payload.get('player_id') in set(star_player_ids):
+        factors['star'] = 0.25
+        multiplier += 0.25
+
+    score = max(0.0, min(1.0, base * multiplier))
+    return round(score, 3), factors
@@ -0,0 +1,255 @@
+import re
+import zlib
+from typing import Any, Dict, Optional
+
+
+_NAME = r"(?P<player>[A-Z]\.\s?[A-Z][\w'-]+|[A-Z][\w'-]+)"
+_ASSIST = re.compile(r"\((?P<assister>[^()]+?)\s+(?P<assists>\d+)\s+AST\)")
+_POINTS = re.compile(r"\((?P<points>\d+)\s+PTS\)")
+_DISTANCE = re.compile(r"(?P<distance>\d+)'")
+_FREE_THROW = re.compile(r"Free Throw (?P<n>\d+) of (?P<of>\d+)", re.I)
+_SUBSTITUTION = re.compile(r"^SUB:\s*(?P<incoming>.+?)\s+FOR\s+(?P<outgoing>.+)$", re.I)
+_TIMEOUT = re.compile(r"^(?P<team>.+?)\s+Timeout", re.I)
+_TURNOVER = re.compile(r"^" + _NAME + r"\s+(?P<reason>.+?)\s+Turnover", re.I)
+_SUFFIXES = {'jr', 'jr.', 'sr', 'sr.', 'ii', 'iii', 'iv', 'v'}
+
+_SHOT_NAMES = [
+    ('dunk', re.compile(r'dunk', re.I), 'dunk'),
+    ('layup', re.compile(r'layup|putback|finger roll', re.I), 'layup'),
+    ('hook', re.compile(r'hook', re.I), 'hook shot'),
+    ('three', re.compile(r'3PT|three', re.I), 'three'),
+    ('jumper', re.compile(r'jump shot|jumper|fadeaway|pullup|step back', re.I), 'jumper'),
+]
+
+_HYPE = ['Bang!', 'Oh yes!', 'Look at that!', 'Wow!', 'Here we go!']
+
+# Fixed lines per persona: when there is no play to describe, and when generation fails outright
+IDLE_LINES = {
+    'nerdy': "Game statistics continue to develop",
+    'passionate': "The action continues!",
+    'raw': "Play continues"
+}
+FALLBACK_LINES = {
+    'nerdy': "The statistical analysis shows interesting trends in this matchup.",
+    'passionate': "What an incredible game we're witnessing!",
+    'raw': "The game continues with competitive play."
+}
+
+
+def play_name(full_name: str) -> Optional[str]:
+    """How play-by-play refers to a player: the last name, ignoring suffixes ("Zach Jemison III" -> "Jemison")."""
+    words = [w for w in re.split(r'\s+', (full_name or '').strip()) if w]
+    while len(words) > 1 and words[-1].lower() in _SUFFIXES:
+        words.pop()
+    return words[-1] if words else None
+
+
+def parse_play(description: str) -> Dict[str, Any]:
+    """Turn a raw play-by-play line into structured fields (kind, player, shot, assister...)."""
+    text = (description or '').strip()
+    play: Dict[str, Any] = {'kind': 'other', 'description': text}
+
+    substitution = _SUBSTITUTION.match(text)
+    if substitution:
+        play.update(kind='substitution', incoming=substitution.group('incoming'), outgoing=substitution.group('outgoing'))
+        return play
+
+    timeout = _TIMEOUT.match(text)
+    if timeout:
+        play.update(kind='timeout', team=timeout.group('team').title())
+        return play
+
+    turnover = _TURNOVER.match(text)
+    if turnover:
+        play.update(kind='turnover', player=turnover.group('player'), reason=turnover.group('reason').lower())
+        return play
+
+    missed = text.upper().startswith('MISS ')
+    body = text[5:] if missed else text
+    name = re.match(_NAME, body)
+    play['player'] = name.group('player') if name else None
+
+    points = _POINTS.search(body)
+    if points:
+        play['player_points'] = int(points.group('points'))
+    assist = _ASSIST.search(body)
+    if assist:
+        play.update(assister=assist.group('assister').strip(), assists=int(assist.group('assists')))
+    distance = _DISTANCE.search(body)
+    if distance:
+        play['distance'] = int(distance.group('distance'))
+
+    upper = body.upper()
+    free_throw = _FREE_THROW.search(body)
+    if free_throw:
+        play.update(kind='free_throw', made=not missed, n=int(free_throw.group('n')), of=int(free_throw.group('of')))
+    elif 'REBOUND' in upper:
+        play['kind'] = 'rebound'
+        # Team rebounds are written in capitals ("TRAIL BLAZERS Rebound")
+        if not name or body.split()[0].isupper():
+            play.update(player=None, team=body.split(' Rebound')[0].split(' REBOUND')[0].title())
+    elif 'STEAL' in upper:
+        play['kind'] = 'steal'
+    elif 'BLOCK' in upper:
+        play['kind'] = 'block'
+    elif 'FOUL' in upper:
+        play.update(kind='foul', shooting='S.FOUL' in upper or 'SHOOTING' in upper)
+    elif 'VIOLATION' in upper:
+        play['kind'] = 'violation'
+    else:
+        for shot, pattern, label in _SHOT_NAMES:
+            if pattern.search(body):
+                play.update(kind='shot', shot=shot, shot_label=label, made=not missed)
+                break
+        else:
+            if 'SHOT' in upper:
+                play.update(kind='shot', shot='jumper', shot_label='jumper', made=not missed)
+    return play
+
+
+class TemplateCommentary:
+    """Deterministic commentary built from structured play and game state, no model call.
+
+    - Serves the factual "raw" persona directly
+    - Gives every persona an instant, play-specific line when the model is
+      throttled, slow or failing
+    - Variants are picked from a hash of the play, so the same play always
+      reads the same way
+    """
+
+    def render(self, play_description: str, persona: str = 'raw', game_summary: Optional[Dict[str, Any]] = None, run: Optional[int] = None) -> str:
+        play = parse_play(play_description)
+        if persona == 'nerdy':
+            line = self._nerdy(play)
+        elif persona == 'raw':
+            line = self._raw(play)
+        else:
+            line = self._passionate(play)
+
+        extras = []
+        scored = play['kind'] in ('shot', 'free_throw') and play.get('made')
+        if scored and run and run >= 6 and persona != 'raw':
+            article = 'an' if str(run).startswith(('8', '11', '18')) else 'a'
+            extras.append(f"That's {article} {run}-0 run{'.' if persona == 'nerdy' else '!'}")
+        score = self._score_line(game_summary) if scored else None
+        if score:
+            extras.append(score)
+        return ' '.join([line] + extras)
+
+    # ------------- Personas -------------
+    def _raw(self, play: Dict[str, Any]) -> str:
+        kind = play['kind']
+        player = play.get('player') or 'The player'
+        if kind == 'shot':
+            shot = self._shot_phrase(play)
+            line = f"{player} makes {shot}" if play['made'] else f"{player} misses {shot}"
+            if play['made'] and play.get('assister'):
+                line += f", assist by {play['assister']}"
+            return line + '.'
+        if kind == 'free_throw':
+            verb = 'makes' if play['made'] else 'misses'
+            return f"{player} {verb} free throw {play['n']} of {play['of']}."
+        if kind == 'rebound':
+            return f"{play.get('player') or play.get('team', 'Team')} rebound."
+        if kind == 'steal':
+            return f"{player} with the steal."
+        if kind == 'block':
+            return f"{player} blocks the shot."
+        if kind == 'turnover':
+            return f"Turnover by {player}, {play['reason']}."
+        if kind == 'foul':
+            return f"{'Shooting' if play.get('shooting') else 'Personal'} foul on {player}."
+        if kind == 'timeout':
+            return f"Timeout, {play['team']}."
+        if kind == 'substitution':
+            return f"{play['incoming']} checks in for {play['outgoing']}."
+        if kind == 'violation':
+            return f"Violation on {player}."
+        return play['description'].rstrip('.') + '.' if play['description'] else 'Play continues.'
+
+    def _passionate(self, play: Dict[str, Any]) -> str:
+        kind = play['kind']
+        player = play.get('player') or 'He'
+        hype = self._pick(_HYPE, play)
+        if kind == 'shot' and play['made']:
+            verbs = {
+                'dunk': f"{player} throws it DOWN!",
+                'layup': f"{player} lays it in!",
+                'three': f"{player} buries the three!" if not play.get('distance') or play['distance'] < 27 else f"{player} drains it from {play['distance']} feet!",
+                'hook': f"{player} with the hook, and it's good!",
+                'jumper': f"{player} knocks down the jumper!",
+            }
+            line = f"{hype} {verbs[play['shot']]}"
+            if play.get('assister'):
+                line += f" Great feed from {play['assister']}!"
+            return line
+        if kind == 'shot':
+            return f"{player} can't get the {play['shot_label']} to fall!"
+        if kind == 'free_throw':
+            return f"{player} cashes in at the line!" if play['made'] else f"{player} leaves one short at the line!"
+        if kind == 'steal':
+            return f"{hype} {player} picks his pocket!"
+        if kind == 'block':
+            return f"REJECTED! {player} sends it back!"
+        if kind == 'turnover':
+            return f"Ooh, {player} gives it away!"
+        if kind == 'foul':
+            return f"Whistle! Foul on {player}!"
+        if kind == 'rebound':
+            return f"{play['player']} cleans up the glass!" if play.get('player') else f"{play.get('team', 'They')} come up with the board!"
+        return self._raw(play)
+
+    def _nerdy(self, play: Dict[str, Any]) -> str:
+        kind = play['kind']
+        player = play.get('player') or 'The player'
+        if kind == 'shot' and play['made']:
+            line = f"{player} converts {self._shot_phrase(play)}"
+            if play.get('player_points') is not None:
+                line += f", bringing him to {play['player_points']} points"
+            if play.get('assister'):
+                line += f"; {play['assister']} records assist number {play['assists']}"
+            return line + '.'
+        if kind == 'shot':
+            return f"{player} misses {self._shot_phrase(play)}; that attempt counts against his field goal percentage."
+        if kind == 'free_throw':
+            line = f"{player} {'converts' if play['made'] else 'misses'} free throw {play['n']} of {play['of']}"
+            if play['made'] and play.get('player_points') is not None:
+                line += f" for {play['player_points']} points"
+            return line + '.'
+        if kind == 'steal':
+            return f"{player} records a steal, creating an extra possession."
+        if kind == 'block':
+            return f"{player} registers a block at the rim."
+        if kind == 'turnover':
+            return f"{player} commits a {play['reason']} turnover, giving up the possession."
+        return self._raw(play)
+
+    # ------------- Helpers -------------
+    def _shot_phrase(self, play: Dict[str, Any]) -> str:
+        label = play.get('shot_label', 'shot')
+        if play.get('distance') and play['shot'] in ('three', 'jumper'):
+            return f"a {play['distance']}-foot {label}"
+        article = 'an' if label[0] in 'aeiou' else 'a'
+        return f"{article} {label}"
+
+    def _score_line(self, game_summary: Optional[Dict[str, Any]]) -> Optional[str]:
+        if not game_summary:
+            return None
+        game = game_summary.get('game', {})
+        score = game.get('score') or {}
+        home, away = score.get('home'), score.get('away')
+        if home is None or away is None:
+            return None
+        teams = game.get('teams') or {}
+        home_name = (teams.get('home') or {}).get('name', 'Home')
+        away_name = (teams.get('away') or {}).get('name', 'Away')
+        if home == away:
+            return f"Tied at {home}."
+        leader, high, low = (home_name, home, away) if home > away else (away_name, away, home)
+        return f"{leader} lead {high}-{low}."
+
+    def _pick(self, options, play: Dict[str, Any]) -> str:
+        return options[zlib.crc32(play['description'].encode('utf-8')) % len(options)]
+
+
+template_commentary = TemplateCommentary()
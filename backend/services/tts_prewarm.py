@@ -0,0 +1,118 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+from database import db
+from services.template_commentary import FALLBACK_LINES, IDLE_LINES, play_name, template_commentary
+from services.tts_service import TTSService
+
+
+logger = logging.getLogger(__name__)
+
+# Play-by-play lines whose template calls never include the score, so the voiced clip is reusable all game
+_PLAYER_PLAYS = (
+    '{name} REBOUND',
+    '{name} STEAL',
+    '{name} BLOCK',
+    '{name} Bad Pass Turnover',
+    '{name} Traveling Turnover',
+    '{name} S.FOUL',
+    '{name} P.FOUL',
+    'MISS {name} 3PT Jump Shot',
+    'MISS {name} Driving Layup',
+    'MISS {name} Jump Shot',
+)
+_TEAM_PLAYS = (
+    '{team} Timeout: Regular',
+    '{team_upper} Rebound',
+)
+
+
+def team_nickname(team_name: str) -> Optional[str]:
+    """How play-by-play refers to a team ("Portland Trail Blazers" -> "Trail Blazers"); None for bare abbreviations."""
+    name = (team_name or '').strip()
+    if not name or (name.isupper() and len(name) <= 3):
+        return None
+    if name.lower().endswith('trail blazers'):
+        return 'Trail Blazers'
+    return name.split()[-1]
+
+
+def predictable_phrases(personas: Iterable[str], teams: Iterable[str] = (), players: Iterable[str] = (), limit: Optional[int] = None) -> List[Tuple[str, str]]:
+    """(persona, text) pairs a game is likely to voice, most broadly useful first.
+
+    Fixed fallback lines come first, then team lines, then per-player lines in
+    roster order. Template personas other than nerdy and raw read as passionate.
+    """
+    descriptions = []
+    for team in teams:
+        if team:
+            descriptions.extend(play.format(team=team, team_upper=team.upper()) for play in _TEAM_PLAYS)
+    for name in players:
+        if name:
+            descriptions.extend(play.format(name=name) for play in _PLAYER_PLAYS)
+
+    personas = list(personas)
+    phrases: List[Tuple[str, str]] = []
+    seen = set()
+
+    def add(persona: str, text: str) -> None:
+        if text and (persona, text) not in seen:
+            seen.add((persona, text))
+            phrases.append((persona, text))
+
+    for persona in personas:
+        add(persona, IDLE_LINES.get(persona, IDLE_LINES['passionate']))
+        add(persona, FALLBACK_LINES.get(persona, FALLBACK_LINES['passionate']))
+    for description in descriptions:
+        for persona in personas:
+            add(persona, template_commentary.render(description, persona if persona in ('nerdy', 'raw') else 'passionate'))
+    return phrases[:limit] if limit else phrases
+
+
+class TTSPrewarmService:
+    """Voices a game's predictable lines before tip-off so early and throttled periods play from cache.
+
+    - One run per game: claimed on the game document so repeated schedules skip it
+    - Every persona voice in TTSService.voice_configs is warmed
+    - Lines already in the audio cache cost nothing; the rest go through a small pool
+    """
+
+    def __init__(self, tts_service: Optional[TTSService] = None) -> None:
+        self.db = db
+        self.tts_service = tts_service or TTSService()
+
+    def claim(self, game_id: str) -> bool:
+        """Mark a game as pre-warmed; False if another run already did."""
+        now = datetime.now()
+        if self.db.games.update_one({'game_id': game_id, 'tts_prewarmed_at': None}, {'$set': {'tts_prewarmed_at': now}}).matched_count:
+            return True
+        if self.db.games.find_one({'game_id': game_id}):
+            return False
+        try:
+            # Scheduled games may not have been polled into the games collection yet
+            self.db.games.insert_one({'game_id': game_id, 'tts_prewarmed_at': now, 'updated_at': now})
+            return True
+        except Exception:
+            return False
+
+    def prewarm_game(self, game_id: str, teams: Optional[Iterable[str]] = None, roster: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Voice the phrase set for a game; teams are full team names, roster is box score players."""
+        nicknames = [nickname for nickname in (team_nickname(team) for team in teams or []) if nickname]
+        players = []
+        for player in roster or self._roster(game_id):
+            name = play_name(player.get('Name') or player.get('name') or '')
+            if name and name not in players:
+                players.append(name)
+        phrases = predictable_phrases(self.tts_service.voice_configs, nicknames, players, Config.TTS_PREWARM_MAX_PHRASES)
+        counts = self.tts_service.prewarm(phrases)
+        logger.info(f"Pre-warmed TTS for game {game_id}: {len(phrases)} phrases for {len(players)} players {counts}")
+        return {'phrases': len(phrases), 'players': len(players), **counts}
+
+    def _roster(self, game_id: str) -> List[Dict[str, Any]]:
+        try:
+            return list(self.db.statlines.find({'game_id': game_id}))
+        except Exception as e:
+            logger.warning(f"Could not load roster for game {game_id}: {e}")
+            return []
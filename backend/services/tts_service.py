@@ -1,53 +1,45 @@
 import requests
 from config import Config
+from concurrent.futures import ThreadPoolExecutor
+from services.audio_cache import audio_cache
+from services.audio_formats import is_mp3, mimetype
+from services.audio_processing import audio_postprocessor
+from services.audio_utils import join_mp3
+from services.latency import latency
+from services.sentence_splitter import split_sentences
 import logging
-import uuid
-import os
+import threading
 import time
 
 logger = logging.getLogger(__name__)
 
-class TTSService:
+# Sentence synthesis is shared by every TTSService so concurrent ElevenLabs requests stay bounded
+_sentence_pool = None
+_sentence_pool_lock = threading.Lock()
+
+def _get_sentence_pool():
+    global _sentence_pool
+    with _sentence_pool_lock:
+        if _sentence_pool is None:
+            _sentence_pool = ThreadPoolExecutor(max_workers=Config.TTS_PARALLEL_WORKERS, thread_name_prefix='tts-sentence')
+        return _sentence_pool
+
+class ElevenLabsBackend:
+    """Synthesis over the ElevenLabs REST API"""
+
+    name = 'elevenlabs'
+
     def __init__(self):
         self.api_key = Config.ELEVENLABS_API_KEY
-        self.base_url = "https://api.elevenlabs.io/v1"
+        self.base_url = Config.ELEVENLABS_BASE_URL
         self._voices_cache = {
             'timestamp': 0.0,
             'voices': []
         }
-        
-        # ElevenLabs voice configurations for different personas
-        self.voice_configs = {
-            'nerdy': {
-                'voice_id': 'pNInz6obpgDQGcFmaJgB',  # Adam - analytical male voice
-                'stability': 0.75,
-                'similarity_boost': 0.75,
-                'style': 0.0,
-                'use_speaker_boost': True
-            },
-            'passionate': {
-                'voice_id': 'gnPxliFHTp6OK6tcoA6i',  # Default commentator voice
-                'stability': 0.5,
-                'similarity_boost': 0.75,
-                'style': 0.0,
-                'use_speaker_boost': True
-            },
-            'funny': {
-                'voice_id': 'VR6AewLTigWG4xSOukaG',  # Josh - expressive male voice
-                'stability': 0.4,
-                'similarity_boost': 0.8,
-                'style': 0.2,
-                'use_speaker_boost': True
-            },
-            'raw': {
-                'voice_id': 'AZnzlk1XvdvUeBnXmlld',  # Domi - clear female voice
-                'stability': 0.8,
-                'similarity_boost': 0.6,
-                'style': 0.0,
-                'use_speaker_boost': False
-            }
-        }
-    
+
+    def available(self):
+        return bool(self.api_key)
+
     def list_voices(self, force_refresh: bool = False):
         """Return available ElevenLabs voices (cached)."""
         try:
@@ -87,7 +79,106 @@ class TTSService:
             logger.error(f"Error listing ElevenLabs voices: {e}")
             return []
 
-    def generate_audio(self, text, persona: str = 'passionate', *, voice_id: str | None = None, model_id: str | None = None, language: str | None = None, voice_settings: dict | None = None):
+    def synthesize(self, spec, persona):
+        """One synthesis request; MP3 bytes or None"""
+        url, headers, data = self._request(spec)
+        with latency.span('tts.request', persona=persona, model=data['model_id']):
+            response = requests.post(url, json=data, headers=headers)
+        if response.status_code == 200:
+            return response.content
+        logger.error(f"ElevenLabs API error: {response.status_code} - {response.text}")
+        return None
+
+    def stream(self, spec, persona):
+        """Chunks from the streaming endpoint as they arrive, or None if the request failed"""
+        url, headers, data = self._request(spec, stream=True)
+        response = requests.post(url, json=data, headers=headers, stream=True)
+        if response.status_code != 200:
+            logger.error(f"ElevenLabs streaming API error: {response.status_code} - {response.text}")
+            response.close()
+            return None
+        return self._iter_response(response)
+
+    def _request(self, spec, stream=False):
+        """(url, headers, payload) for a synthesis spec; stream targets the streaming endpoint"""
+        url = f"{self.base_url}/text-to-speech/{spec['voice_id']}"
+        if stream:
+            url += "/stream"
+        if spec['output_format']:
+            url += f"?output_format={spec['output_format']}"
+        headers = {
+            "Accept": mimetype(spec['output_format']),
+            "Content-Type": "application/json",
+            "xi-api-key": self.api_key
+        }
+        data = {
+            "text": spec['text'],
+            "model_id": spec['model_id'],
+            "voice_settings": spec['voice_settings']
+        }
+        return url, headers, data
+
+    def _iter_response(self, response):
+        try:
+            for chunk in response.iter_content(chunk_size=4096):
+                if chunk:
+                    yield chunk
+        finally:
+            response.close()
+
+
+def get_tts_backend():
+    """Synthesis backend for Config.TTS_BACKEND: elevenlabs, local, or auto (local without an API key)"""
+    choice = (Config.TTS_BACKEND or 'elevenlabs').lower()
+    if choice == 'local' or (choice == 'auto' and not Config.ELEVENLABS_API_KEY):
+        from services.local_tts import LocalTTSBackend
+        return LocalTTSBackend()
+    return ElevenLabsBackend()
+
+class TTSService:
+    def __init__(self, backend=None):
+        self.backend = backend or get_tts_backend()
+        self.audio_cache = audio_cache
+        
+        # ElevenLabs voice configurations for different personas
+        self.voice_configs = {
+            'nerdy': {
+                'voice_id': 'pNInz6obpgDQGcFmaJgB',  # Adam - analytical male voice
+                'stability': 0.75,
+                'similarity_boost': 0.75,
+                'style': 0.0,
+                'use_speaker_boost': True
+            },
+            'passionate': {
+                'voice_id': 'gnPxliFHTp6OK6tcoA6i',  # Default commentator voice
+                'stability': 0.5,
+                'similarity_boost': 0.75,
+                'style': 0.0,
+                'use_speaker_boost': True
+            },
+            'funny': {
+                'voice_id': 'VR6AewLTigWG4xSOukaG',  # Josh - expressive male voice
+                'stability': 0.4,
+                'similarity_boost': 0.8,
+                'style': 0.2,
+                'use_speaker_boost': True
+            },
+            'raw': {
+                'voice_id': 'AZnzlk1XvdvUeBnXmlld',  # Domi - clear female voice
+                'stability': 0.8,
+                'similarity_boost': 0.6,
+                'style': 0.0,
+                'use_speaker_boost': False
+            }
+        }
+    
+    def list_voices(self, force_refresh: bool = False):
+        """Return available voices for the active backend (ElevenLabs voices are cached)."""
+        if self.backend.name == 'local':
+            return self.backend.list_voices([config['voice_id'] for config in self.voice_configs.values()])
+        return self.backend.list_voices(force_refresh)
+
+    def generate_audio(self, text, persona: str = 'passionate', *, voice_id: str | None = None, model_id: str | None = None, language: str | None = None, voice_settings: dict | None = None, output_format: str | None = None):
         """Generate audio from text using ElevenLabs TTS.
 
         Args:
@@ -97,70 +188,216 @@ class TTSService:
             model_id: explicit model id; if None, auto-select based on language
             language: ISO language code (e.g., 'en', 'es'); used to pick multilingual model
             voice_settings: optional override for voice_settings
+            output_format: ElevenLabs output_format (see services.audio_formats); None for the default MP3
         """
         try:
-            if not self.api_key:
-                logger.warning("ElevenLabs API key not configured")
+            if not self.backend.available():
+                self._log_unavailable()
                 return None
             
-            voice_config = self.voice_configs.get(persona, self.voice_configs['passionate'])
+            spec, cache_key = self._build_request(text, persona, voice_id, model_id, language, voice_settings, output_format)
+            sentences = self._split_for_synthesis(text, output_format)
+            if len(sentences) > 1:
+                # Long answers: sentences are synthesized concurrently and joined in order into one clip
+                synthesize = lambda: self._synthesize_sentences(sentences, persona, voice_id, model_id, language, voice_settings, output_format)
+            else:
+                synthesize = lambda: self._synthesize(spec, persona)
             
-            # Prefer explicit voice_id when provided
-            selected_voice_id = voice_id or voice_config['voice_id']
+            # Identical text/voice/model/settings are synthesized once and served from disk after that
+            return self.audio_cache.get_or_create(cache_key, synthesize)
+            
+        except Exception as e:
+            logger.error(f"Error generating {self.backend.name} TTS audio: {e}")
+            return None
 
-            # ElevenLabs API endpoint
-            url = f"{self.base_url}/text-to-speech/{selected_voice_id}"
+    def stream_audio(self, text, persona: str = 'passionate', *, voice_id: str | None = None, model_id: str | None = None, language: str | None = None, voice_settings: dict | None = None, output_format: str | None = None):
+        """Stream MP3 bytes for text as ElevenLabs produces them.
+
+        Returns (chunks, cache) where cache is 'hit' or 'miss', or None if the
+        audio can't be produced. Cached clips are read from disk; long texts are
+        voiced sentence by sentence in parallel and released in order; otherwise
+        the provider's streaming endpoint is proxied. Once a stream completes the
+        full clip is written to the audio cache (a client that disconnects early
+        leaves nothing behind).
+        """
+        try:
+            if not self.backend.available():
+                self._log_unavailable()
+                return None
             
-            # Headers
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": self.api_key
-            }
+            spec, cache_key = self._build_request(text, persona, voice_id, model_id, language, voice_settings, output_format)
             
-            # Choose model: if language specified and not English, use multilingual
-            effective_model_id = model_id
-            if not effective_model_id:
-                if language and language.lower() != 'en':
-                    effective_model_id = "eleven_multilingual_v2"
-                else:
-                    effective_model_id = "eleven_monolingual_v1"
-
-            # Voice settings
-            vs = voice_settings or {
-                "stability": voice_config['stability'],
-                "similarity_boost": voice_config['similarity_boost'],
-                "style": voice_config['style'],
-                "use_speaker_boost": voice_config['use_speaker_boost']
-            }
-
-            # Request payload
-            data = {
-                "text": text,
-                "model_id": effective_model_id,
-                "voice_settings": vs
-            }
+            if self.audio_cache.get(cache_key):
+                try:
+                    # Opened now so a concurrent eviction can't pull the file out from under the stream
+                    cached = open(self.audio_cache.path(cache_key), 'rb')
+                    return self._read_cached(cached), 'hit'
+                except FileNotFoundError:
+                    pass
             
-            # Make API request
-            response = requests.post(url, json=data, headers=headers)
+            sentences = self._split_for_synthesis(text, output_format)
+            if len(sentences) > 1:
+                return self._stream_sentences(sentences, cache_key, persona, voice_id, model_id, language, voice_settings, output_format), 'miss'
             
-            if response.status_code == 200:
-                # Save audio file
-                audio_filename = f"audio_{uuid.uuid4().hex}.mp3"
-                audio_path = os.path.join('static', 'audio', audio_filename)
-                
-                # Ensure directory exists
-                os.makedirs(os.path.dirname(audio_path), exist_ok=True)
-                
-                with open(audio_path, 'wb') as out:
-                    out.write(response.content)
-                
-                # Return URL path
-                return f"/static/audio/{audio_filename}"
-            else:
-                logger.error(f"ElevenLabs API error: {response.status_code} - {response.text}")
+            started = time.perf_counter()
+            chunks = self.backend.stream(spec, persona)
+            if chunks is None:
                 return None
+            return self._tee_stream(chunks, cache_key, persona, spec, started), 'miss'
             
         except Exception as e:
-            logger.error(f"Error generating ElevenLabs TTS audio: {e}")
+            logger.error(f"Error streaming {self.backend.name} TTS audio: {e}")
             return None
+
+    def _log_unavailable(self):
+        if self.backend.name == 'elevenlabs':
+            logger.warning("ElevenLabs API key not configured")
+        else:
+            logger.warning(f"TTS backend '{self.backend.name}' is unavailable")
+
+    def prewarm(self, phrases, max_workers: int | None = None):
+        """Synthesize (persona, text) pairs into the audio cache ahead of time with each persona's default voice.
+
+        Returns {'cached', 'synthesized', 'failed'} counts. Runs on its own small
+        pool so pre-warming never competes with live sentence synthesis.
+        """
+        counts = {'cached': 0, 'synthesized': 0, 'failed': 0}
+        if not self.backend.available():
+            self._log_unavailable()
+            return counts
+        
+        pending = []
+        with ThreadPoolExecutor(max_workers=max_workers or Config.TTS_PREWARM_WORKERS, thread_name_prefix='tts-prewarm') as pool:
+            for persona, text in phrases:
+                _, cache_key = self._build_request(text, persona, None, None, None, None)
+                if self.audio_cache.contains(cache_key):
+                    counts['cached'] += 1
+                    continue
+                pending.append(pool.submit(self.generate_audio, text, persona))
+            for future in pending:
+                counts['synthesized' if future.result() else 'failed'] += 1
+        return counts
+
+    def _build_request(self, text, persona, voice_id, model_id, language, voice_settings, output_format=None):
+        """(synthesis spec, cache key) for a request; the spec is what backends synthesize from"""
+        voice_config = self.voice_configs.get(persona, self.voice_configs['passionate'])
+        
+        # Choose model: if language specified and not English, use multilingual
+        effective_model_id = model_id
+        if not effective_model_id:
+            if language and language.lower() != 'en':
+                effective_model_id = "eleven_multilingual_v2"
+            else:
+                effective_model_id = "eleven_monolingual_v1"
+
+        spec = {
+            "text": text,
+            # Prefer explicit voice_id when provided
+            "voice_id": voice_id or voice_config['voice_id'],
+            "model_id": effective_model_id,
+            "voice_settings": voice_settings or {
+                "stability": voice_config['stability'],
+                "similarity_boost": voice_config['similarity_boost'],
+                "style": voice_config['style'],
+                "use_speaker_boost": voice_config['use_speaker_boost']
+            },
+            "output_format": output_format
+        }
+        return spec, self.audio_cache.make_key(text, spec['voice_id'], effective_model_id, spec['voice_settings'], output_format, self._processing(output_format))
+
+    def _processing(self, output_format):
+        """Post-processing tag for clips in this format, or None when they are stored as synthesized"""
+        if Config.TTS_POSTPROCESS_ENABLED and is_mp3(output_format):
+            return audio_postprocessor.tag
+        return None
+
+    def _synthesize(self, spec, persona):
+        """Backend audio for a spec, trimmed and loudness-normalized when post-processing is on"""
+        return self._postprocess(self.backend.synthesize(spec, persona), spec, persona)
+
+    def _postprocess(self, audio, spec, persona):
+        if not audio or not self._processing(spec['output_format']):
+            return audio
+        with latency.span('tts.postprocess', persona=persona):
+            return audio_postprocessor.process(audio)
+
+    def _split_for_synthesis(self, text, output_format=None):
+        """Sentences to synthesize in parallel, or [text] when it is too short to be worth splitting"""
+        # Only MP3 can be joined frame by frame; Opus clips are synthesized whole
+        if len(text) < Config.TTS_PARALLEL_MIN_CHARS or not is_mp3(output_format):
+            return [text]
+        return split_sentences(text) or [text]
+
+    def _synthesize_clip(self, text, persona, voice_id, model_id, language, voice_settings, output_format):
+        """Bytes for one sentence, cached under its own key so repeated sentences are shared too"""
+        spec, cache_key = self._build_request(text, persona, voice_id, model_id, language, voice_settings, output_format)
+        if not self.audio_cache.get_or_create(cache_key, lambda: self._synthesize(spec, persona)):
+            return None
+        with open(self.audio_cache.path(cache_key), 'rb') as f:
+            return f.read()
+
+    def _submit_sentences(self, sentences, persona, voice_id, model_id, language, voice_settings, output_format):
+        pool = _get_sentence_pool()
+        return [pool.submit(self._synthesize_clip, sentence, persona, voice_id, model_id, language, voice_settings, output_format) for sentence in sentences]
+
+    def _synthesize_sentences(self, sentences, persona, voice_id, model_id, language, voice_settings, output_format=None):
+        """Synthesize sentences concurrently and reassemble them in order (None if any sentence failed)"""
+        with latency.span('tts.parallel', persona=persona, sentences=len(sentences)):
+            parts = [future.result() for future in self._submit_sentences(sentences, persona, voice_id, model_id, language, voice_settings, output_format)]
+        if not all(parts):
+            return None
+        return join_mp3(parts) or b''.join(parts)
+
+    def _stream_sentences(self, sentences, cache_key, persona, voice_id, model_id, language, voice_settings, output_format=None):
+        """Yield each sentence's audio in order as soon as it and those before it are ready"""
+        started = time.perf_counter()
+        futures = self._submit_sentences(sentences, persona, voice_id, model_id, language, voice_settings, output_format)
+        parts = []
+        try:
+            for future in futures:
+                part = future.result()
+                if not part:
+                    logger.error(f"Sentence {len(parts)} of a streamed clip failed to synthesize; ending stream")
+                    return
+                if not parts:
+                    latency.observe('tts.stream_first_byte', time.perf_counter() - started, persona=persona, sentences=len(sentences))
+                parts.append(part)
+                # Non-MP3 formats (PCM, WAV) have no frames to re-join and pass through as they are
+                yield join_mp3([part]) or part
+            latency.observe('tts.stream_total', time.perf_counter() - started, persona=persona, sentences=len(sentences))
+            audio = join_mp3(parts) or b''.join(parts)
+            if audio:
+                self.audio_cache.put(cache_key, audio)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _read_cached(self, audio_file, chunk_size: int = 16384):
+        with audio_file:
+            while True:
+                chunk = audio_file.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def _tee_stream(self, source, cache_key, persona, spec, started):
+        """Yield the backend's chunks to the client while collecting them for the cache
+
+        The live stream is passed through as is; the cached copy is post-processed.
+        """
+        model_id = spec['model_id']
+        chunks = []
+        complete = False
+        try:
+            for chunk in source:
+                if not chunks:
+                    latency.observe('tts.stream_first_byte', time.perf_counter() - started, persona=persona, model=model_id)
+                chunks.append(chunk)
+                yield chunk
+            complete = True
+        finally:
+            if hasattr(source, 'close'):
+                source.close()
+            if complete and chunks:
+                latency.observe('tts.stream_total', time.perf_counter() - started, persona=persona, model=model_id)
+                self.audio_cache.put(cache_key, self._postprocess(b''.join(chunks), spec, persona))
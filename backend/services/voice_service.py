@@ -1,10 +1,15 @@
-import re
 import logging
-import google.generativeai as genai
 from services.game_service import GameService
 from services.context_service import ContextService
 from services.commentary_service import CommentaryService
 from services.tts_service import TTSService
+from services.prompt_compiler import prompt_compiler
+from services.response_cache import response_cache, normalize_text
+from services.commentary_fanout import preference_bucket
+from services.gemini_client import gemini_client
+from services.latency import latency
+from services.intent_parser import intent_parser
+from services.template_commentary import play_name
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -18,9 +23,8 @@ class VoiceService:
         
         # Initialize Gemini AI
         if Config.GEMINI_API_KEY:
-            genai.configure(api_key=Config.GEMINI_API_KEY)
-            # Use Gemini 1.5 Flash - stable and reliable
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            # Shared client: one configured model, bounded concurrency and deadlines
+            self.model = gemini_client
         else:
             self.model = None
             logger.warning("Gemini API key not configured")
@@ -48,43 +52,27 @@ class VoiceService:
                 'style': 'factual'
             }
         }
-        
-        # Intent patterns for basic queries
-        self.intent_patterns = {
-            'triple_double': [
-                r'how (close|far) is (.+) from (a )?triple.?double',
-                r'(.+) triple.?double (progress|status)',
-                r'is (.+) close to (a )?triple.?double'
-            ],
-            'score': [
-                r'what\'?s the score',
-                r'current score',
-                r'who\'?s winning'
-            ],
-            'player_stats': [
-                r'how many (points|rebounds|assists) does (.+) have',
-                r'(.+) (points|rebounds|assists)',
-                r'what are (.+) stats'
-            ],
-            'game_status': [
-                r'what\'?s happening in the game',
-                r'game status',
-                r'what\'?s going on'
-            ]
-        }
+
     
     def process_query(self, transcript, game_id=None, persona='passionate', user_context=None):
         """Process voice query and return response with Gemini AI integration"""
+        with latency.span('voice.total', persona=persona):
+            return self._process_query(transcript, game_id, persona, user_context)
+
+    def _process_query(self, transcript, game_id, persona, user_context):
         try:
             # Get persona configuration
             persona_config = self.personas.get(persona, self.personas['passionate'])
             
+            # Structured questions are answered straight from stored game state
+            response_text = self._answer_from_game_state(transcript, game_id) if Config.VOICE_FAST_PATH_ENABLED else None
+            
             # Try Gemini AI first for enhanced responses
-            if self.model:
+            if not response_text and self.model:
                 response_text = self._generate_gemini_response(
                     transcript, game_id, persona_config, user_context
                 )
-            else:
+            elif not response_text:
                 # Fallback to rule-based responses
                 response_text = self._generate_rule_based_response(transcript, game_id, persona)
             
@@ -97,12 +85,13 @@ class VoiceService:
                 language = prefs.get('language')
                 explicit_voice_id = prefs.get('voiceId') or prefs.get('voice_id')
 
-            audio_url = self.tts_service.generate_audio(
-                response_text,
-                voice_config,
-                voice_id=explicit_voice_id,
-                language=language
-            )
+            with latency.span('voice.tts', persona=persona):
+                audio_url = self.tts_service.generate_audio(
+                    response_text,
+                    voice_config,
+                    voice_id=explicit_voice_id,
+                    language=language
+                )
             
             return {
                 'text': response_text,
@@ -119,143 +108,36 @@ class VoiceService:
     def _generate_gemini_response(self, transcript, game_id, persona_config, user_context):
         """Generate response using Gemini AI with persona and context"""
         try:
-            # Build context for Gemini
-            context_parts = []
-            
-            # Add persona context
-            context_parts.append(f"You are a {persona_config['description']}.")
-            context_parts.append(f"Your communication style should be {persona_config['style']}.")
-            context_parts.append("Keep your response concise and engaging (2-3 sentences max).")
-            
             # Merge persisted user context if a user_id is present
             persisted = None
-            if isinstance(user_context, dict) and user_context.get('user_id'):
-                persisted = self.context_service.get_user_context(user_context['user_id'])
-                # Update persisted with incoming deltas (non-destructive)
-                updates = {k: v for k, v in user_context.items() if k in ['interests', 'preferences', 'fantasy_info', 'persona']}
-                if updates:
-                    self.context_service.upsert_user_context(user_context['user_id'], updates)
-
-            effective_user_ctx = {**(persisted or {}), **(user_context or {})}
-            if effective_user_ctx:
-                # **CRITICAL: User preferences must strongly influence your response style and content**
-                preferences = effective_user_ctx.get('preferences', {})
-                if preferences:
-                    context_parts.append("\n**IMPORTANT USER PREFERENCES - FOLLOW THESE CLOSELY:**")
-                    
-                    # Energy level - strongly affects enthusiasm and excitement
-                    if preferences.get('energyLevel') is not None:
-                        energy = preferences['energyLevel']
-                        if energy >= 80:
-                            context_parts.append(f"- MAXIMUM ENERGY ({energy}/100): Be extremely enthusiastic, use exclamation points, high-energy language, and passionate reactions!")
-                        elif energy >= 60:
-                            context_parts.append(f"- HIGH ENERGY ({energy}/100): Be very excited and enthusiastic with animated descriptions!")
-                        elif energy >= 40:
-                            context_parts.append(f"- MODERATE ENERGY ({energy}/100): Balanced enthusiasm with steady excitement.")
-                        else:
-                            context_parts.append(f"- LOW ENERGY ({energy}/100): Stay calm, analytical, and measured in your responses.")
-                    
-                    # Comedy level - affects humor and personality
-                    if preferences.get('comedyLevel') is not None:
-                        comedy = preferences['comedyLevel']
-                        if comedy >= 70:
-                            context_parts.append(f"- HIGH COMEDY ({comedy}/100): Include jokes, funny observations, witty remarks, and humorous analogies!")
-                        elif comedy >= 40:
-                            context_parts.append(f"- MODERATE COMEDY ({comedy}/100): Add some light humor and playful comments.")
-                        else:
-                            context_parts.append(f"- SERIOUS TONE ({comedy}/100): Keep responses professional and focused on facts.")
-                    
-                    # Stat focus - affects technical depth
-                    if preferences.get('statFocus') is not None:
-                        stats = preferences['statFocus']
-                        if stats >= 70:
-                            context_parts.append(f"- HIGH STAT FOCUS ({stats}/100): Include detailed statistics, percentages, historical comparisons, and analytical insights!")
-                        elif stats >= 40:
-                            context_parts.append(f"- MODERATE STATS ({stats}/100): Mention relevant key statistics when appropriate.")
-                        else:
-                            context_parts.append(f"- LOW STATS ({stats}/100): Focus on storylines and emotions rather than numbers.")
-                    
-                    # Team bias - affects favoritism
-                    if preferences.get('biasLevel') is not None and preferences.get('favoriteTeam'):
-                        bias = preferences['biasLevel']
-                        team = preferences['favoriteTeam'].get('name', 'favorite team') if isinstance(preferences['favoriteTeam'], dict) else preferences['favoriteTeam']
-                        if bias >= 70:
-                            context_parts.append(f"- STRONG TEAM BIAS ({bias}/100): Show clear favoritism toward {team}! Get extra excited for their plays and defensive about criticism!")
-                        elif bias >= 40:
-                            context_parts.append(f"- MODERATE BIAS ({bias}/100): Show some preference for {team} while staying somewhat balanced.")
-                        else:
-                            context_parts.append(f"- NEUTRAL APPROACH ({bias}/100): Stay balanced between teams.")
-                
-                # User interests - tailor content to what they care about
-                if effective_user_ctx.get('interests'):
-                    interests = effective_user_ctx['interests']
-                    context_parts.append(f"\n**USER INTERESTS - PRIORITIZE THESE TOPICS:** {', '.join(interests)}")
-                    context_parts.append("- Always relate responses back to these interests when possible")
-                    context_parts.append("- Use examples and references that connect to what the user cares about")
-                
-                # Fantasy context - make it highly relevant
-                if effective_user_ctx.get('fantasy_info'):
-                    context_parts.append(f"\n**FANTASY SPORTS PRIORITY:** {effective_user_ctx['fantasy_info']}")
-                    context_parts.append("- ALWAYS mention fantasy implications when discussing player performances")
-                    context_parts.append("- Highlight players relevant to their fantasy team/league")
-                
-                # Custom instructions - highest priority
-                if effective_user_ctx.get('customInstructions'):
-                    context_parts.append(f"\n**CUSTOM USER INSTRUCTIONS - HIGHEST PRIORITY:**")
-                    context_parts.append(f"'{effective_user_ctx['customInstructions']}'")
-                    context_parts.append("- These custom instructions override all other guidelines - follow them precisely!")
-            
-            # Add current time context for temporal awareness
-            from datetime import datetime
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            context_parts.append(f"Current time: {current_time}")
-            context_parts.append("CRITICAL TEMPORAL RULE: You only know information about events that have already happened up to the current game time.")
-            context_parts.append("PREDICTION POLICY: If user EXPLICITLY asks for predictions/speculation, you may provide analysis based on current performance, but always acknowledge uncertainty and that it's speculation.")
-            context_parts.append("NEVER spontaneously make predictions in commentary - only when directly asked by the user.")
+            with latency.span('voice.user_context'):
+                if isinstance(user_context, dict) and user_context.get('user_id'):
+                    persisted = self.context_service.get_user_context(user_context['user_id'])
+                    # Update persisted with incoming deltas (non-destructive)
+                    updates = {k: v for k, v in user_context.items() if k in ['interests', 'preferences', 'fantasy_info', 'persona']}
+                    if updates:
+                        self.context_service.upsert_user_context(user_context['user_id'], updates)
 
-            # Add game context if available
-            if game_id:
-                game_ctx = self.context_service.get_game_context(game_id)
-                if game_ctx:
-                    sb = game_ctx.get('scoreboard', {})
-                    context_parts.append(f"Current game: {sb.get('away')} @ {sb.get('home')}")
-                    context_parts.append(f"Score: {sb.get('away_score')} - {sb.get('home_score')} | Q{sb.get('quarter')} {sb.get('clock')}")
-                    context_parts.append(f"Game time status: Only information up to {sb.get('clock')} in Q{sb.get('quarter')} is available")
-                    leaders = game_ctx.get('leaders', {})
-                    if leaders:
-                        la = leaders.get('away', {})
-                        lh = leaders.get('home', {})
-                        if la.get('name'):
-                            context_parts.append(f"Away leader: {la.get('name')} {la.get('points')} pts")
-                        if lh.get('name'):
-                            context_parts.append(f"Home leader: {lh.get('name')} {lh.get('points')} pts")
-                    recent = game_ctx.get('recent_plays') or []
-                    if recent:
-                        context_parts.append("Recent plays: " + "; ".join([f"{p.get('clock')} {p.get('team')}: {p.get('description')}" for p in recent]))
-                        context_parts.append("(Only plays that have already occurred are shown above)")
+                effective_user_ctx = {**(persisted or {}), **(user_context or {})}
+            with latency.span('voice.game_context'):
+                # With a context budget, a wider pool of plays is fetched and ranked by relevance to the question
+                recent_limit = Config.PROMPT_RECENT_PLAY_CANDIDATES if Config.PROMPT_BUDGET_ENABLED else Config.PROMPT_RECENT_PLAYS
+                game_ctx = self.context_service.get_game_context(game_id, recent_limit=recent_limit) if game_id else None
             
-            # Build the prompt
-            context = "\n".join(context_parts)
-            prompt = f"""{context}
-
-User question: {transcript}
-
-**RESPONSE REQUIREMENTS:**
-1. STRICTLY follow all user preferences listed above
-2. Adapt your energy, humor, stat focus, and team bias to match their exact settings
-3. If they have custom instructions, those are the HIGHEST priority
-4. If they have fantasy interests, make sure to mention fantasy implications
-5. Connect your response to their stated interests whenever possible
-6. Keep response concise (2-3 sentences max) but personality-rich
-7. Sound natural and authentic to your commentator persona while following their preferences
-
-**IF USER ASKS FOR PREDICTIONS/SPECULATION:**
-- Acknowledge it's speculation with fun phrases like "Crystal ball time!" or "If I had to guess..."
-- Base analysis on CURRENT performance only (what's happened so far)
-- Use your high energy/comedy style while being honest about uncertainty
-- Example: "OHHH you want me to play fortune teller! Based on LeBron's 4 assists already, he's DEALING tonight - but basketball's crazy, anything can happen!"
-
-Response:"""
+            # Repeated questions within the same game version are answered from cache, before any prompt is built
+            cache_key = response_cache.make_key(
+                'voice',
+                game_version=self._game_version(game_ctx),
+                question=normalize_text(transcript),
+                persona=persona_config['description'],
+                bucket=preference_bucket(effective_user_ctx)
+            )
+            with latency.span('voice.cache_lookup') as span:
+                cached = response_cache.get(cache_key)
+                span['cache'] = 'miss' if cached is None else 'hit'
+            if cached is not None:
+                logger.info("Gemini voice response cache hit")
+                return cached
             
             # Generate response with preference-influenced settings
             # Adjust temperature based on user's energy and comedy levels
@@ -277,10 +159,16 @@ Response:"""
                 'top_p': 0.8,              # Focus on likely responses
             }
             
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config
-            )
+            # Build the prompt from precompiled persona and cached preference fragments
+            with latency.span('voice.prompt'):
+                prompt = prompt_compiler.compile_voice(transcript, persona_config, effective_user_ctx, game_ctx)
+            logger.info(f"Compiled voice prompt: tokens={prompt.tokens}")
+            
+            with latency.span('voice.model'):
+                response = self.model.generate_content(
+                    prompt.text,
+                    generation_config=generation_config
+                )
             
             # Clean up the response
             response_text = response.text.strip()
@@ -289,60 +177,82 @@ Response:"""
             if len(response_text) > 500:  # If too long, truncate
                 response_text = response_text[:500] + "..."
             
+            response_cache.set(cache_key, response_text)
             return response_text
             
         except Exception as e:
             logger.error(f"Error generating Gemini response: {e}")
             return self._generate_rule_based_response(transcript, game_id, persona_config['voice_config'])
     
+    def _game_version(self, game_ctx):
+        """Identify the game state an answer was grounded in (scoreboard plus latest play)"""
+        if not game_ctx:
+            return None
+        recent = game_ctx.get('recent_plays') or []
+        return {
+            'scoreboard': game_ctx.get('scoreboard'),
+            'last_play': recent[-1] if recent else None
+        }
+    
+    def _answer_from_game_state(self, transcript, game_id):
+        """Answer a confidently parsed stat question without the model; None sends it to Gemini"""
+        with latency.span('voice.fast_path') as span:
+            parsed = intent_parser.parse(transcript)
+            span['intent'] = parsed['intent'] or 'open_ended'
+            if not game_id or parsed['confidence'] < Config.VOICE_FAST_PATH_MIN_CONFIDENCE:
+                span['outcome'] = 'model'
+                return None
+            # Missing game state or an unknown player is left to the model rather than answered with an error
+            response_text = self._answer_intent(parsed['intent'], parsed['slots'], game_id)
+            span['outcome'] = 'answered' if response_text else 'model'
+            return response_text
+    
     def _generate_rule_based_response(self, transcript, game_id, persona):
         """Generate response using rule-based patterns (fallback)"""
         # Parse intent
-        intent, entities = self._parse_intent(transcript)
+        intent, slots = self._parse_intent(transcript)
         
         if not intent:
             return self._get_fallback_response(persona)
         
-        # Generate response based on intent
+        if not game_id:
+            return "I need to know which game you're asking about."
+        
+        response_text = self._answer_intent(intent, slots, game_id)
+        if response_text:
+            return response_text
+        
+        player_name = slots.get('player')
+        if intent in ('triple_double', 'player_stats'):
+            if not player_name:
+                return "I need to know which player you're asking about."
+            return f"I couldn't find stats for {player_name} in this game."
+        return "I couldn't find the current game information."
+    
+    def _parse_intent(self, transcript):
+        """Parse intent and slots (player, stat) from transcript"""
+        parsed = intent_parser.parse(transcript)
+        return parsed['intent'], parsed['slots']
+    
+    def _answer_intent(self, intent, slots, game_id):
+        """Response text for a parsed intent, or None when the game state can't answer it"""
         if intent == 'triple_double':
-            response_text = self._handle_triple_double_query(entities, game_id)
+            return self._handle_triple_double_query(slots, game_id)
         elif intent == 'score':
-            response_text = self._handle_score_query(game_id)
+            return self._handle_score_query(game_id)
         elif intent == 'player_stats':
-            response_text = self._handle_player_stats_query(entities, game_id)
+            return self._handle_player_stats_query(slots, game_id)
         elif intent == 'game_status':
-            response_text = self._handle_game_status_query(game_id)
-        else:
-            response_text = self._get_fallback_response(persona)
-        
-        return response_text
-    
-    def _parse_intent(self, transcript):
-        """Parse intent and entities from transcript"""
-        transcript_lower = transcript.lower()
-        
-        for intent, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, transcript_lower)
-                if match:
-                    entities = match.groups()
-                    return intent, entities
-        
-        return None, None
+            return self._handle_game_status_query(game_id)
+        return None
     
-    def _handle_triple_double_query(self, entities, game_id):
+    def _handle_triple_double_query(self, slots, game_id):
         """Handle triple-double queries"""
-        if not game_id or len(entities) < 2:
-            return "I need to know which game and player you're asking about."
-        
-        player_name = entities[1].strip()
-        
-        # For demo, use mock player ID
-        player_id = self._get_player_id_by_name(player_name)
-        if not player_id:
-            return f"I couldn't find information about {player_name}."
+        statline = self._find_statline(game_id, slots.get('player'))
+        if not statline:
+            return None
         
-        progress = self.game_service.get_triple_double_progress(game_id, player_id)
+        progress = self.game_service.get_triple_double_progress(game_id, statline['player_id'])
         
         if progress['is_triple_double']:
             return f"{progress['player_name']} has already achieved a triple-double!"
@@ -356,57 +266,70 @@ Response:"""
         if needs['assists'] > 0:
             needs_list.append(f"{needs['assists']} assists")
         
-        if needs_list:
-            return f"{progress['player_name']} needs {', '.join(needs_list)} for a triple-double."
-        else:
-            return f"{progress['player_name']} has already achieved a triple-double!"
+        return f"{progress['player_name']} needs {', '.join(needs_list)} for a triple-double."
     
     def _handle_score_query(self, game_id):
         """Handle score queries"""
-        if not game_id:
-            return "I need to know which game you're asking about."
+        game = self._find_game(game_id)
+        if not game:
+            return None
         
-        game_summary = self.game_service.get_game_summary(game_id)
-        if not game_summary:
-            return "I couldn't find the current game information."
-        
-        game = game_summary['game']
-        return f"The score is {game['teams']['away']['name']} {game['score']['away']}, {game['teams']['home']['name']} {game['score']['home']}."
+        return f"The score is {self._scoreline(game)}."
     
-    def _handle_player_stats_query(self, entities, game_id):
-        """Handle player stats queries"""
-        if not game_id or len(entities) < 2:
-            return "I need to know which player and stat you're asking about."
-        
-        stat_type = entities[0].strip()
-        player_name = entities[1].strip()
-        
-        player_id = self._get_player_id_by_name(player_name)
-        if not player_id:
-            return f"I couldn't find information about {player_name}."
-        
-        statline = self.game_service.db.statlines.find_one({
-            'game_id': game_id,
-            'player_id': player_id
-        })
-        
+    def _handle_player_stats_query(self, slots, game_id):
+        """Handle player stats queries; without a stat, reads the whole line"""
+        statline = self._find_statline(game_id, slots.get('player'))
         if not statline:
-            return f"I couldn't find stats for {player_name} in this game."
+            return None
         
-        stat_value = statline.get(stat_type.lower(), 0)
-        return f"{player_name} has {stat_value} {stat_type}."
+        player_name = statline.get('name') or slots['player'].title()
+        stat_type = slots.get('stat')
+        if stat_type:
+            return f"{player_name} has {statline.get(stat_type, 0)} {stat_type}."
+        return (f"{player_name} has {statline.get('points', 0)} points, {statline.get('rebounds', 0)} rebounds "
+                f"and {statline.get('assists', 0)} assists.")
     
     def _handle_game_status_query(self, game_id):
         """Handle game status queries"""
-        if not game_id:
-            return "I need to know which game you're asking about."
+        game = self._find_game(game_id)
+        if not game:
+            return None
         
-        game_summary = self.game_service.get_game_summary(game_id)
-        if not game_summary:
-            return "I couldn't find the current game information."
+        if game.get('status') and game.get('clock'):
+            return f"The game is {game['status']} with {game['clock']} remaining. {self._scoreline(game)}."
+        return f"{self._scoreline(game)}."
+    
+    def _find_game(self, game_id):
+        """Stored game doc with a score to report, or None"""
+        game = self.game_service.db.games.find_one({'game_id': game_id})
+        score = (game or {}).get('score') or {}
+        if score.get('home') is None or score.get('away') is None:
+            return None
+        return game
+    
+    def _scoreline(self, game):
+        """'Away 88, Home 90' with team names when the game doc has them"""
+        teams = game.get('teams') or {}
+        away = (teams.get('away') or {}).get('name') or 'Away'
+        home = (teams.get('home') or {}).get('name') or 'Home'
+        return f"{away} {game['score']['away']}, {home} {game['score']['home']}"
+    
+    def _find_statline(self, game_id, player_name):
+        """This game's statline for a spoken player name (full or last name), or None"""
+        if not player_name:
+            return None
+        name = player_name.lower()
+        statlines = list(self.game_service.db.statlines.find({'game_id': game_id}))
+        for statline in statlines:
+            full_name = (statline.get('name') or '').lower()
+            if full_name and name in (full_name, (play_name(full_name) or '').lower()):
+                return statline
         
-        game = game_summary['game']
-        return f"The game is {game['status']} with {game['clock']} remaining. {game['teams']['away']['name']} {game['score']['away']}, {game['teams']['home']['name']} {game['score']['home']}."
+        player_id = self._get_player_id_by_name(player_name)
+        for statline in statlines:
+            if player_id is not None and statline.get('player_id') == player_id:
+                return statline
+        return None
     
     def _get_player_id_by_name(self, player_name):
         """Get player ID by name (real Lakers vs Trail Blazers April 13, 2025)"""
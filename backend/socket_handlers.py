@@ -1,9 +1,12 @@
-from flask_socketio import emit, join_room, leave_room
-from flask import request
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from flask import current_app, has_app_context, request
+from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 
+_external_socketio = None
+
 def register_socket_handlers(socketio):
     """Register all socket event handlers"""
     
@@ -32,6 +35,17 @@ def register_socket_handlers(socketio):
             logger.info(f"Client {request.sid} left game {game_id}")
             emit('left_game', {'game_id': game_id})
     
+    @socketio.on('stream_commentary')
+    def handle_stream_commentary(data):
+        """Personalized streamed commentary; chunks go only to the socket that asked"""
+        game_id = (data or {}).get('game_id')
+        if not game_id:
+            return {'success': False, 'error': 'game_id is required'}
+        from routes.commentary_routes import start_commentary_stream
+        stream_id = start_commentary_stream(socketio, data, data.get('user_context') or {}, to=request.sid)
+        logger.info(f"Client {request.sid} started commentary stream {stream_id} for game {game_id}")
+        return {'success': True, 'stream_id': stream_id}
+    
     @socketio.on('join_scoreboard')
     def handle_join_scoreboard():
         join_room('scoreboard')
@@ -56,3 +70,26 @@ def emit_scoreboard_update(socketio, data):
 def emit_commentary(socketio, game_id, commentary_data):
     """Emit new commentary to game watchers"""
     socketio.emit('new_commentary', commentary_data, room=f"game:{game_id}")
+
+def emit_commentary_chunk(socketio, game_id, chunk, to=None):
+    """Emit one streamed commentary chunk (text, audio or done) to a client or game watchers"""
+    socketio.emit('commentary_chunk', chunk, room=to or f"game:{game_id}")
+
+def get_feed_socketio():
+    """Socket.IO server to publish the commentary feed through, or None if clients can't be reached
+
+    Inside the web process this is the app's own server; Celery workers use a
+    write-only emitter on SOCKETIO_MESSAGE_QUEUE.
+    """
+    global _external_socketio
+    if has_app_context() and 'socketio' in current_app.extensions:
+        return current_app.extensions['socketio']
+    if not Config.SOCKETIO_MESSAGE_QUEUE:
+        return None
+    if _external_socketio is None:
+        try:
+            _external_socketio = SocketIO(message_queue=Config.SOCKETIO_MESSAGE_QUEUE)
+        except Exception as e:
+            logger.error(f"Could not connect Socket.IO emitter to {Config.SOCKETIO_MESSAGE_QUEUE}: {e}")
+            return None
+    return _external_socketio
@@ -0,0 +1,18 @@
+"""Pluggable storage backends exposing the pymongo collection API used by the services."""
+
+from config import Config
+from .memory import MemoryClient, MemoryCollection
+
+
+def create_client():
+    """Return a client for the configured STORAGE_BACKEND ('mongo' or 'memory')."""
+    backend = (Config.STORAGE_BACKEND or 'mongo').lower()
+    if backend == 'memory':
+        return MemoryClient()
+    if backend != 'mongo':
+        raise ValueError(f"Unknown STORAGE_BACKEND '{Config.STORAGE_BACKEND}' (expected 'mongo' or 'memory')")
+    from pymongo import MongoClient
+    return MongoClient(Config.MONGO_URI)
+
+
+__all__ = ['MemoryClient', 'MemoryCollection', 'create_client']
@@ -0,0 +1,633 @@
+import copy
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+# ------------- Results (mirror the pymongo result attributes we rely on) -------------
+class InsertOneResult:
+    def __init__(self, inserted_id: Any) -> None:
+        self.inserted_id = inserted_id
+        self.acknowledged = True
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids: List[Any]) -> None:
+        self.inserted_ids = inserted_ids
+        self.acknowledged = True
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id: Any = None) -> None:
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.acknowledged = True
+
+
+class DeleteResult:
+    def __init__(self, deleted_count: int) -> None:
+        self.deleted_count = deleted_count
+        self.acknowledged = True
+
+
+class BulkWriteResult:
+    def __init__(self) -> None:
+        self.inserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.upserted_count = 0
+        self.upserted_ids: Dict[int, Any] = {}
+        self.acknowledged = True
+
+
+# ------------- Document helpers -------------
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    current: Any = doc
+    for part in path.split('.'):
+        if isinstance(current, dict) and part in current:
+            current = current[part]
+        else:
+            return _MISSING
+    return current
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split('.')
+    current = doc
+    for part in parts[:-1]:
+        nxt = current.get(part)
+        if not isinstance(nxt, dict):
+            nxt = {}
+            current[part] = nxt
+        current = nxt
+    current[parts[-1]] = value
+
+
+def _unset_path(doc: Dict[str, Any], path: str) -> None:
+    parts = path.split('.')
+    current = doc
+    for part in parts[:-1]:
+        current = current.get(part)
+        if not isinstance(current, dict):
+            return
+    current.pop(parts[-1], None)
+
+
+def _compare(a: Any, b: Any, op: str) -> bool:
+    try:
+        if op == '$gt':
+            return a > b
+        if op == '$gte':
+            return a >= b
+        if op == '$lt':
+            return a < b
+        if op == '$lte':
+            return a <= b
+    except TypeError:
+        return False
+    return False
+
+
+_TYPES = {
+    'double': (float,), 'int': (int,), 'long': (int,), 'number': (int, float),
+    'string': (str,), 'object': (dict,), 'array': (list,), 'bool': (bool,),
+    'date': (datetime,), 'null': (type(None),),
+}
+
+
+def _is_type(value: Any, name: str) -> bool:
+    if name not in _TYPES:
+        raise OperationFailure(f"Unsupported $type for memory backend: {name}")
+    if isinstance(value, bool) and name != 'bool':
+        return False
+    return isinstance(value, _TYPES[name])
+
+
+def _match_condition(value: Any, cond: Any) -> bool:
+    if isinstance(cond, dict) and cond and all(k.startswith('$') for k in cond):
+        for op, arg in cond.items():
+            if op == '$eq':
+                if not _match_condition(value, arg):
+                    return False
+            elif op == '$ne':
+                if _match_condition(value, arg):
+                    return False
+            elif op in ('$gt', '$gte', '$lt', '$lte'):
+                if value is _MISSING or not _compare(value, arg, op):
+                    return False
+            elif op == '$in':
+                if not any(_match_condition(value, a) for a in arg):
+                    return False
+            elif op == '$nin':
+                if any(_match_condition(value, a) for a in arg):
+                    return False
+            elif op == '$exists':
+                if (value is not _MISSING) != bool(arg):
+                    return False
+            elif op == '$type':
+                if value is _MISSING or not any(_is_type(value, t) for t in (arg if isinstance(arg, list) else [arg])):
+                    return False
+            else:
+                raise OperationFailure(f"Unsupported query operator for memory backend: {op}")
+        return True
+
+    if value is _MISSING:
+        return cond is None
+    if isinstance(value, list) and not isinstance(cond, list):
+        return cond in value
+    return value == cond
+
+
+def _matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    if not query:
+        return True
+    for key, cond in query.items():
+        if key == '$and':
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        elif key == '$or':
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif not _match_condition(_get_path(doc, key), cond):
+            return False
+    return True
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    # Mongo orders missing/None before any concrete value
+    if value is _MISSING or value is None:
+        return (0, 0)
+    return (1, value)
+
+
+def _normalize_keys(keys: Any, direction: int = 1) -> List[Tuple[str, int]]:
+    if isinstance(keys, str):
+        return [(keys, direction)]
+    return [(k, d) for k, d in keys]
+
+
+# ------------- Indexes -------------
+class _Index:
+    """Hash index over one or more fields; enforces uniqueness and TTL like Mongo."""
+
+    def __init__(self, name: str, fields: List[str], unique: bool, expire_after: Optional[int], partial: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.fields = fields
+        self.unique = unique
+        self.expire_after = expire_after
+        self.partial = partial
+        self.entries: Dict[Tuple[Any, ...], set] = {}
+
+    def covers(self, doc: Dict[str, Any]) -> bool:
+        """Partial indexes only hold (and only enforce uniqueness on) documents matching their filter."""
+        return self.partial is None or _matches(doc, self.partial)
+
+    def key_for(self, doc: Dict[str, Any]) -> Tuple[Any, ...]:
+        values = []
+        for field in self.fields:
+            value = _get_path(doc, field)
+            values.append(None if value is _MISSING else _hashable(value))
+        return tuple(values)
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        if self.covers(doc):
+            self.entries.setdefault(self.key_for(doc), set()).add(doc['_id'])
+
+    def remove(self, doc: Dict[str, Any]) -> None:
+        key = self.key_for(doc)
+        ids = self.entries.get(key)
+        if ids is not None:
+            ids.discard(doc['_id'])
+            if not ids:
+                del self.entries[key]
+
+    def lookup(self, query: Dict[str, Any]) -> Optional[set]:
+        """Return candidate ids when every indexed field is pinned by equality in the query."""
+        if self.partial is not None:
+            return None
+        values = []
+        for field in self.fields:
+            if field not in query:
+                return None
+            cond = query[field]
+            if isinstance(cond, dict) and any(k.startswith('$') for k in cond):
+                return None
+            values.append(_hashable(cond))
+        return self.entries.get(tuple(values), set())
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+# ------------- Cursor -------------
+class MemoryCursor:
+    def __init__(self, collection: 'MemoryCollection', query: Optional[Dict[str, Any]], projection: Optional[Dict[str, Any]] = None) -> None:
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._limit = 0
+        self._skip = 0
+
+    def sort(self, key_or_list: Any, direction: int = 1) -> 'MemoryCursor':
+        self._sort = _normalize_keys(key_or_list, direction)
+        return self
+
+    def limit(self, limit: int) -> 'MemoryCursor':
+        self._limit = limit
+        return self
+
+    def skip(self, skip: int) -> 'MemoryCursor':
+        self._skip = skip
+        return self
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        docs = self._collection._select(self._query)
+        # Stable multi-key sort: apply keys from least to most significant
+        for field, direction in reversed(self._sort):
+            docs.sort(key=lambda d: _sort_key(_get_path(d, field)), reverse=direction < 0)
+        if self._skip:
+            docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        for doc in docs:
+            yield self._collection._project(doc, self._projection)
+
+
+# ------------- Collection / Database / Client -------------
+class MemoryCollection:
+    """In-process collection exposing the subset of the pymongo API used by the services."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._docs: Dict[Any, Dict[str, Any]] = {}
+        self._indexes: Dict[str, _Index] = {}
+        self._lock = threading.RLock()
+        self._last_expiry = 0.0
+
+    # ------------- Indexes -------------
+    def create_index(self, keys: Any, unique: bool = False, expireAfterSeconds: Optional[int] = None, name: Optional[str] = None, **kwargs: Any) -> str:
+        fields = _normalize_keys(keys)
+        index_name = name or '_'.join(f"{field}_{direction}" for field, direction in fields)
+        with self._lock:
+            if index_name in self._indexes:
+                return index_name
+            index = _Index(index_name, [f for f, _ in fields], unique, expireAfterSeconds, kwargs.get('partialFilterExpression'))
+            for doc in self._docs.values():
+                if unique and index.covers(doc) and index.key_for(doc) in index.entries:
+                    raise DuplicateKeyError(f"E11000 duplicate key error building index {index_name}", 11000)
+                index.add(doc)
+            self._indexes[index_name] = index
+        return index_name
+
+    def drop_index(self, name: str) -> None:
+        with self._lock:
+            if name not in self._indexes:
+                raise OperationFailure(f"index not found with name [{name}]")
+            del self._indexes[name]
+
+    def index_information(self) -> Dict[str, Dict[str, Any]]:
+        info = {}
+        for name, idx in self._indexes.items():
+            info[name] = {'key': [(f, 1) for f in idx.fields], 'unique': idx.unique}
+            if idx.partial is not None:
+                info[name]['partialFilterExpression'] = idx.partial
+        return info
+
+    # ------------- Reads -------------
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> MemoryCursor:
+        return MemoryCursor(self, filter, projection)
+
+    def find_one(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, sort: Any = None) -> Optional[Dict[str, Any]]:
+        cursor = self.find(filter, projection)
+        if sort:
+            cursor.sort(sort)
+        for doc in cursor.limit(1):
+            return doc
+        return None
+
+    def count_documents(self, filter: Optional[Dict[str, Any]] = None) -> int:
+        return len(self._select(filter or {}))
+
+    def distinct(self, key: str, filter: Optional[Dict[str, Any]] = None) -> List[Any]:
+        values: List[Any] = []
+        seen = set()
+        for doc in self._select(filter or {}):
+            value = _get_path(doc, key)
+            if value is _MISSING:
+                continue
+            for item in value if isinstance(value, list) else [value]:
+                marker = _hashable(item)
+                if marker not in seen:
+                    seen.add(marker)
+                    values.append(copy.deepcopy(item))
+        return values
+
+    # ------------- Writes -------------
+    def insert_one(self, document: Dict[str, Any]) -> InsertOneResult:
+        with self._lock:
+            inserted_id = self._insert(document)
+        return InsertOneResult(inserted_id)
+
+    def insert_many(self, documents: Iterable[Dict[str, Any]], ordered: bool = True) -> InsertManyResult:
+        with self._lock:
+            ids = [self._insert(doc) for doc in documents]
+        return InsertManyResult(ids)
+
+    def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        with self._lock:
+            return self._update(filter, update, upsert, multi=False)
+
+    def update_many(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        with self._lock:
+            return self._update(filter, update, upsert, multi=True)
+
+    def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        with self._lock:
+            matches = self._select_raw(filter, limit=1)
+            if matches:
+                old = matches[0]
+                new = copy.deepcopy(replacement)
+                new['_id'] = old['_id']
+                self._replace(old, new)
+                return UpdateResult(1, 1)
+            if upsert:
+                doc = copy.deepcopy(replacement)
+                return UpdateResult(0, 0, self._insert(doc))
+            return UpdateResult(0, 0)
+
+    def delete_one(self, filter: Dict[str, Any]) -> DeleteResult:
+        with self._lock:
+            return DeleteResult(self._delete(filter, limit=1))
+
+    def delete_many(self, filter: Dict[str, Any]) -> DeleteResult:
+        with self._lock:
+            return DeleteResult(self._delete(filter, limit=0))
+
+    def bulk_write(self, requests: Iterable[Any], ordered: bool = True) -> BulkWriteResult:
+        result = BulkWriteResult()
+        write_errors = []
+        with self._lock:
+            for position, op in enumerate(requests):
+                try:
+                    self._bulk_op(result, position, op)
+                except DuplicateKeyError as e:
+                    # Like Mongo: record the error, and stop only when ordered
+                    write_errors.append({'index': position, 'code': 11000, 'errmsg': str(e)})
+                    if ordered:
+                        break
+        if write_errors:
+            raise BulkWriteError({
+                'writeErrors': write_errors,
+                'writeConcernErrors': [],
+                'nInserted': result.inserted_count,
+                'nUpserted': result.upserted_count,
+                'nMatched': result.matched_count,
+                'nModified': result.modified_count,
+                'nRemoved': result.deleted_count,
+                'upserted': [{'index': position, '_id': _id} for position, _id in result.upserted_ids.items()],
+            })
+        return result
+
+    def _bulk_op(self, result: BulkWriteResult, position: int, op: Any) -> None:
+        if isinstance(op, InsertOne):
+            self._insert(op._doc)
+            result.inserted_count += 1
+        elif isinstance(op, (UpdateOne, UpdateMany)):
+            res = self._update(op._filter, op._doc, op._upsert, multi=isinstance(op, UpdateMany))
+            result.matched_count += res.matched_count
+            result.modified_count += res.modified_count
+            if res.upserted_id is not None:
+                result.upserted_count += 1
+                result.upserted_ids[position] = res.upserted_id
+        elif isinstance(op, ReplaceOne):
+            res = self.replace_one(op._filter, op._doc, upsert=op._upsert)
+            result.matched_count += res.matched_count
+            result.modified_count += res.modified_count
+            if res.upserted_id is not None:
+                result.upserted_count += 1
+                result.upserted_ids[position] = res.upserted_id
+        elif isinstance(op, (DeleteOne, DeleteMany)):
+            result.deleted_count += self._delete(op._filter, limit=1 if isinstance(op, DeleteOne) else 0)
+        else:
+            raise OperationFailure(f"Unsupported bulk operation for memory backend: {type(op).__name__}")
+
+    # ------------- Internals -------------
+    def _expire(self) -> None:
+        """Apply TTL indexes lazily (Mongo's TTL monitor runs every 60s; we check at most once a second)."""
+        now = time.monotonic()
+        if now - self._last_expiry < 1.0:
+            return
+        self._last_expiry = now
+        for index in self._indexes.values():
+            if index.expire_after is None or len(index.fields) != 1:
+                continue
+            cutoff = datetime.now() - timedelta(seconds=index.expire_after)
+            expired = [
+                doc for doc in self._docs.values()
+                if isinstance(_get_path(doc, index.fields[0]), datetime) and _get_path(doc, index.fields[0]) < cutoff
+            ]
+            for doc in expired:
+                self._remove(doc)
+
+    def _candidates(self, query: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+        if '_id' in query and not isinstance(query['_id'], dict):
+            doc = self._docs.get(query['_id'])
+            return [doc] if doc is not None else []
+        best: Optional[set] = None
+        for index in self._indexes.values():
+            ids = index.lookup(query)
+            if ids is not None and (best is None or len(ids) < len(best)):
+                best = ids
+        if best is not None:
+            return [self._docs[i] for i in best if i in self._docs]
+        return list(self._docs.values())
+
+    def _select_raw(self, query: Optional[Dict[str, Any]], limit: int = 0) -> List[Dict[str, Any]]:
+        self._expire()
+        out = []
+        for doc in self._candidates(query or {}):
+            if _matches(doc, query):
+                out.append(doc)
+                if limit and len(out) >= limit:
+                    break
+        return out
+
+    def _select(self, query: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._select_raw(query)
+
+    def _project(self, doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not projection:
+            return copy.deepcopy(doc)
+        include = {k for k, v in projection.items() if v and k != '_id'}
+        if include:
+            out = {'_id': doc['_id']} if projection.get('_id', 1) else {}
+            for field in include:
+                value = _get_path(doc, field)
+                if value is not _MISSING:
+                    _set_path(out, field, copy.deepcopy(value))
+            return out
+        out = copy.deepcopy(doc)
+        for field, flag in projection.items():
+            if not flag:
+                _unset_path(out, field)
+        return out
+
+    def _check_unique(self, doc: Dict[str, Any], ignore_id: Any = _MISSING) -> None:
+        if doc['_id'] in self._docs and doc['_id'] != ignore_id:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_", 11000)
+        for index in self._indexes.values():
+            if not index.unique or not index.covers(doc):
+                continue
+            clash = index.entries.get(index.key_for(doc), set()) - {ignore_id}
+            if clash:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {index.name}", 11000)
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        if '_id' not in document:
+            # pymongo mutates the caller's document with the generated _id
+            document['_id'] = ObjectId()
+        doc = copy.deepcopy(document)
+        self._check_unique(doc)
+        self._docs[doc['_id']] = doc
+        for index in self._indexes.values():
+            index.add(doc)
+        return doc['_id']
+
+    def _remove(self, doc: Dict[str, Any]) -> None:
+        for index in self._indexes.values():
+            index.remove(doc)
+        self._docs.pop(doc['_id'], None)
+
+    def _replace(self, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        self._check_unique(new, ignore_id=old['_id'])
+        self._remove(old)
+        self._docs[new['_id']] = new
+        for index in self._indexes.values():
+            index.add(new)
+
+    def _delete(self, query: Dict[str, Any], limit: int) -> int:
+        matches = self._select_raw(query, limit=limit)
+        for doc in matches:
+            self._remove(doc)
+        return len(matches)
+
+    def _apply_update(self, doc: Dict[str, Any], update: Dict[str, Any], inserting: bool) -> None:
+        for op, fields in update.items():
+            if op == '$set' or (op == '$setOnInsert' and inserting):
+                for path, value in fields.items():
+                    _set_path(doc, path, copy.deepcopy(value))
+            elif op == '$setOnInsert':
+                continue
+            elif op == '$unset':
+                for path in fields:
+                    _unset_path(doc, path)
+            elif op == '$inc':
+                for path, amount in fields.items():
+                    current = _get_path(doc, path)
+                    _set_path(doc, path, (0 if current is _MISSING else current) + amount)
+            elif op == '$push':
+                for path, value in fields.items():
+                    current = _get_path(doc, path)
+                    items = [] if current is _MISSING else list(current)
+                    if isinstance(value, dict) and '$each' in value:
+                        items.extend(copy.deepcopy(value['$each']))
+                    else:
+                        items.append(copy.deepcopy(value))
+                    _set_path(doc, path, items)
+            else:
+                raise OperationFailure(f"Unsupported update operator for memory backend: {op}")
+
+    def _update(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool, multi: bool) -> UpdateResult:
+        matches = self._select_raw(query, limit=0 if multi else 1)
+        if matches:
+            modified = 0
+            for old in matches:
+                new = copy.deepcopy(old)
+                self._apply_update(new, update, inserting=False)
+                new['_id'] = old['_id']
+                if new != old:
+                    self._replace(old, new)
+                    modified += 1
+            return UpdateResult(len(matches), modified)
+        if not upsert:
+            return UpdateResult(0, 0)
+
+        # Seed the upserted document from equality clauses in the filter, as Mongo does
+        doc: Dict[str, Any] = {}
+        for key, cond in query.items():
+            if key.startswith('$'):
+                continue
+            if isinstance(cond, dict) and any(k.startswith('$') for k in cond):
+                if '$eq' in cond:
+                    _set_path(doc, key, copy.deepcopy(cond['$eq']))
+                continue
+            _set_path(doc, key, copy.deepcopy(cond))
+        self._apply_update(doc, update, inserting=True)
+        return UpdateResult(0, 0, self._insert(doc))
+
+
+class MemoryDatabase:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(name)
+            return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def list_collection_names(self) -> List[str]:
+        return list(self._collections.keys())
+
+    def drop_collection(self, name: str) -> None:
+        with self._lock:
+            self._collections.pop(name, None)
+
+
+class MemoryClient:
+    """Drop-in for ``MongoClient`` backed by process memory (single node, CI, benchmarks)."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._databases: Dict[str, MemoryDatabase] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = MemoryDatabase(name)
+            return self._databases[name]
+
+    def __getattr__(self, name: str) -> MemoryDatabase:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,30 @@
+from celery_app import celery_app
+from services.archive_service import ArchiveService
+import logging
+
+logger = logging.getLogger(__name__)
+
+archive_service = ArchiveService()
+
+@celery_app.task
+def archive_finished_games():
+    """Compact every finished game into a compressed archive and drop its hot rows"""
+    try:
+        archived = archive_service.archive_finished_games()
+        logger.info(f"Archived {len(archived)} finished games")
+        return {'success': True, 'archived': archived}
+        
+    except Exception as e:
+        logger.error(f"Error archiving finished games: {e}")
+        return {'success': False, 'error': str(e)}
+
+@celery_app.task
+def archive_game(game_id):
+    """Compact a single game on demand"""
+    try:
+        info = archive_service.archive_game(game_id)
+        return {'success': True, 'game_id': game_id, 'archived': info is not None}
+        
+    except Exception as e:
+        logger.error(f"Error archiving game {game_id}: {e}")
+        return {'success': False, 'error': str(e)}
@@ -1,11 +1,20 @@
 from celery_app import celery_app
+from config import Config
 from services.commentary_service import CommentaryService
-from socket_handlers import emit_commentary
+from services.commentary_scheduler import CommentaryScheduler
+from services.significance import play_kind, score_play
+from services.latency import to_epoch
+from socket_handlers import emit_commentary, get_feed_socketio
 import logging
+import time
+import pymongo
 
 logger = logging.getLogger(__name__)
 
 commentary_service = CommentaryService()
+commentary_scheduler = CommentaryScheduler()
+
+AUTO_COMMENTARY_PERSONAS = ['passionate', 'nerdy', 'raw']
 
 @celery_app.task
 def generate_commentary_task(game_id, event_type='generic', persona='passionate'):
@@ -18,7 +27,7 @@ def generate_commentary_task(game_id, event_type='generic', persona='passionate'
         )
         
         # Emit commentary to game subscribers
-        # emit_commentary(socketio, game_id, commentary)
+        _publish(game_id, [{'event_type': event_type}], [[commentary]])
         
         logger.info(f"Generated commentary for game {game_id}")
         return {'success': True, 'commentary': commentary}
@@ -29,38 +38,132 @@ def generate_commentary_task(game_id, event_type='generic', persona='passionate'
 
 @celery_app.task
 def auto_commentary_on_event(game_id, event_data):
-    """Automatically generate commentary when significant events occur"""
+    """Automatically generate commentary when significant events occur
+
+    Plays are ranked by significance and queued per game. Whoever drains the
+    queue generates the most significant play first, merging lower-priority
+    plays into the same batched call; plays that would miss the SLO are dropped.
+    Generated lines are pushed to the game's Socket.IO room.
+    """
     try:
-        event_type = event_data.get('type', 'generic')
+        score, queued = _queue_event(game_id, event_data)
+        if not queued:
+            return {'success': True, 'event_processed': True, 'queued': False, 'score': score}
         
-        # Determine if event is significant enough for commentary
-        if _is_significant_event(event_data):
-            # Generate commentary with different personas
-            personas = ['passionate', 'nerdy', 'raw']
-            
-            for persona in personas:
-                generate_commentary_task.apply_async(
-                    args=[game_id, event_type, persona],
-                    countdown=1  # Small delay to avoid spam
-                )
+        batches = _drain_feed(game_id)
         
-        return {'success': True, 'event_processed': True}
+        return {'success': True, 'event_processed': True, 'queued': True, 'score': score, 'batches': batches}
         
     except Exception as e:
         logger.error(f"Error processing event for commentary: {e}")
         return {'success': False, 'error': str(e)}
 
-def _is_significant_event(event_data):
-    """Determine if an event is significant enough for commentary"""
+@celery_app.task
+def commentary_feed_on_plays(game_id, events):
+    """Server-driven feed: queue every newly ingested play of a game, then generate and publish once
+
+    Commentary is generated once per game/persona for all viewers, stored, and
+    emitted as 'new_commentary' to game:<id>; clients only subscribe.
+    """
+    try:
+        queued = sum(1 for event in events if _queue_event(game_id, event)[1])
+        batches = _drain_feed(game_id) if queued else 0
+        
+        logger.info(f"Commentary feed for game {game_id}: {len(events)} new plays, {queued} queued, {batches} batches")
+        return {'success': True, 'plays': len(events), 'queued': queued, 'batches': batches}
+        
+    except Exception as e:
+        logger.error(f"Error running commentary feed for game {game_id}: {e}")
+        return {'success': False, 'error': str(e)}
+
+def _queue_event(game_id, event_data):
+    """Score a play and submit it to the game's queue if significant; returns (score, queued)"""
     payload = event_data.get('payload', {})
-    description = payload.get('description', '').lower()
+    event_type = event_data.get('type', 'generic')
+    if event_type == 'play':
+        # Ingested plays are typed by what happened (dunk, three, block...)
+        event_type, _ = play_kind(payload.get('description', ''))
+    score, factors = _score_event(commentary_service.db, game_id, payload)
     
-    # Significant event keywords
-    significant_keywords = [
-        'three', 'three-pointer', '3-pointer',
-        'dunk', 'block', 'steal',
-        'timeout', 'foul', 'free throw',
-        'lead', 'tie', 'overtime'
-    ]
+    # Determine if event is significant enough for commentary
+    if score < Config.COMMENTARY_MIN_SIGNIFICANCE:
+        return score, False
     
-    return any(keyword in description for keyword in significant_keywords)
+    logger.info(f"Queued play {payload.get('play_id')} for game {game_id} with score={score} {factors}")
+    commentary_scheduler.submit(game_id, {
+        'play_id': payload.get('play_id'),
+        'play_description': payload.get('description', ''),
+        'event_type': event_type,
+        # Play-to-audio latency is measured from ingestion when the event carries its timestamp
+        'received_at': to_epoch(event_data.get('timestamp')) or time.time()
+    }, score)
+    return score, True
+
+def _drain_feed(game_id):
+    """Generate the game's queued plays in batches and publish each batch as it completes"""
+    def generate(plays):
+        results = commentary_service.generate_commentary_batch(
+            game_id=game_id,
+            plays=plays,
+            personas=AUTO_COMMENTARY_PERSONAS,
+            shared=True
+        )
+        _publish(game_id, plays, results)
+        return results
+    return commentary_scheduler.drain(game_id, generate)
+
+def _publish(game_id, plays, results):
+    """Emit one 'new_commentary' per play and persona to everyone watching the game"""
+    socketio = get_feed_socketio()
+    if socketio is None:
+        logger.warning(f"No Socket.IO server or SOCKETIO_MESSAGE_QUEUE; commentary for game {game_id} stored but not pushed")
+        return 0
+    
+    published = 0
+    for play, lines in zip(plays, results):
+        for line in lines:
+            timestamp = line.get('timestamp')
+            try:
+                emit_commentary(socketio, game_id, {
+                    'game_id': game_id,
+                    'play_id': play.get('play_id'),
+                    'event_type': play.get('event_type', 'generic'),
+                    'play_description': play.get('play_description', ''),
+                    'text': line.get('text'),
+                    'audio_url': line.get('audio_url'),
+                    'persona': line.get('persona'),
+                    'tier': line.get('tier'),
+                    'timestamp': timestamp.isoformat() if hasattr(timestamp, 'isoformat') else timestamp
+                })
+                published += 1
+            except Exception as e:
+                logger.error(f"Error publishing commentary for game {game_id}: {e}")
+    return published
+
+def _score_event(db, game_id, payload):
+    """Significance of a play in the context of its game (score, clock, runs, stars)"""
+    game = None
+    recent = []
+    stars = []
+    try:
+        # Context only sharpens the score; a slow or unreachable database must not hold up the feed
+        with pymongo.timeout(Config.COMMENTARY_CONTEXT_TIMEOUT_SECONDS):
+            game = db.games.find_one({'game_id': game_id})
+            if payload.get('play_id') is not None:
+                earlier = db.events.find({'game_id': game_id, 'payload.play_id': {'$lt': payload['play_id']}}).sort('payload.play_id', -1).limit(24)
+                # Repeated snapshots may store a play more than once
+                by_play = {e['payload']['play_id']: e['payload'] for e in earlier}
+                recent = [by_play[play_id] for play_id in sorted(by_play)][-12:]
+            stars = [
+                s['player_id'] for s in db.statlines.find({'game_id': game_id}).sort('points', -1).limit(3)
+                if s.get('points', 0) >= 10
+            ]
+    except Exception as e:
+        # Without context the play is still ranked on its own merits
+        logger.warning(f"Could not load game context for scoring: {e}")
+    return score_play(payload, game, recent, stars)
+
+def _is_significant_event(event_data):
+    """Determine if an event is significant enough for commentary"""
+    score, _ = score_play(event_data.get('payload', {}))
+    return score >= Config.COMMENTARY_MIN_SIGNIFICANCE
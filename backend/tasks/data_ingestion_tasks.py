@@ -1,4 +1,5 @@
 from celery_app import celery_app
+from config import Config
 from services.sportsdata_service import SportsDataService
 from services.game_service import GameService
 from socket_handlers import emit_scoreboard_update, emit_game_update
@@ -36,7 +37,12 @@ def poll_game_updates(game_id):
         play_by_play = sportsdata_service.get_play_by_play(game_id)
         
         # Update database
-        game_service.update_game_data(game_id, game_data, box_score, play_by_play)
+        new_events = game_service.update_game_data(game_id, game_data, box_score, play_by_play)
+        
+        # The server owns the commentary feed: only plays never seen before are commented on
+        if new_events and Config.COMMENTARY_FEED_ENABLED:
+            from tasks.commentary_tasks import commentary_feed_on_plays
+            commentary_feed_on_plays.delay(game_id, new_events)
         
         # Emit update to game subscribers
         # emit_game_update(socketio, game_id, {
@@ -46,7 +52,7 @@ def poll_game_updates(game_id):
         # })
         
         logger.info(f"Updated game {game_id}")
-        return {'success': True, 'game_id': game_id}
+        return {'success': True, 'game_id': game_id, 'new_plays': len(new_events)}
         
     except Exception as e:
         logger.error(f"Error polling game updates for {game_id}: {e}")
@@ -59,7 +65,24 @@ def schedule_game_polling():
         games = sportsdata_service.get_todays_games()
         active_games = [game for game in games if game['status'] in ['InProgress', 'Scheduled']]
         
+        # Games the schedule reports over are compacted now rather than waiting for the sweep;
+        # finished games stay on the schedule all day, so ones already archived are skipped
+        from services.archive_service import FINAL_STATUSES
+        from tasks.archive_tasks import archive_game
+        finished = [game['game_id'] for game in games if game['status'] in FINAL_STATUSES]
+        archived = set(game_service.db.archives.distinct('game_id', {'game_id': {'$in': finished}})) if finished else set()
+        for game_id in finished:
+            if game_id not in archived:
+                archive_game.delay(game_id)
+        
         for game in active_games:
+            # Voice each game's predictable lines once, as soon as it shows up on the schedule
+            if Config.TTS_PREWARM_ENABLED:
+                from tasks.tts_tasks import prewarm_game_audio, tts_prewarm_service
+                if tts_prewarm_service.claim(game['game_id']):
+                    teams = [(game.get('teams', {}).get(side) or {}).get('name') for side in ('away', 'home')]
+                    prewarm_game_audio.delay(game['game_id'], teams)
+            
             poll_game_updates.apply_async(
                 args=[game['game_id']],
                 countdown=3  # Poll every 3 seconds
@@ -0,0 +1,21 @@
+from celery_app import celery_app
+from services.sportsdata_service import SportsDataService
+from services.tts_prewarm import TTSPrewarmService
+import logging
+
+logger = logging.getLogger(__name__)
+
+sportsdata_service = SportsDataService()
+tts_prewarm_service = TTSPrewarmService()
+
+@celery_app.task
+def prewarm_game_audio(game_id, teams=None):
+    """Voice a game's predictable lines (fallbacks, team and player calls) before they are needed"""
+    try:
+        box_score = sportsdata_service.get_box_score(game_id) or {}
+        info = tts_prewarm_service.prewarm_game(game_id, teams, box_score.get('Players'))
+        return {'success': True, 'game_id': game_id, **info}
+        
+    except Exception as e:
+        logger.error(f"Error pre-warming TTS for game {game_id}: {e}")
+        return {'success': False, 'error': str(e)}
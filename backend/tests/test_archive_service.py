@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script for finished-game archival
+Runs fully offline against the in-memory storage backend
+
+Usage:
+    python test_archive_service.py
+    python -m pytest test_archive_service.py
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from storage import MemoryClient
+from services.archive_service import ArchiveService
+
+
+def _service_with_game():
+    service = ArchiveService()
+    service.db = MemoryClient().sports_commentator
+    db = service.db
+    db.games.insert_one({'game_id': 'g1', 'status': 'Final', 'score': {'home': 101, 'away': 99}, 'updated_at': datetime.now()})
+    # Two snapshots of the same plays, as update_game_data produces
+    for _ in range(2):
+        for play_id in range(1, 51):
+            db.events.insert_one({
+                'game_id': 'g1', 'timestamp': datetime.now(), 'type': 'play',
+                'payload': {'play_id': play_id, 'period': 1, 'clock': '05:00', 'description': f'Play {play_id}', 'team': 'LAL'}
+            })
+    for pid in range(1, 11):
+        db.statlines.insert_one({'game_id': 'g1', 'player_id': pid, 'points': pid, 'updated_at': datetime.now()})
+    db.commentary.insert_one({'game_id': 'g1', 'timestamp': datetime.now(), 'text': 'What a finish!', 'persona': 'passionate', 'audio_url': None})
+    db.events.insert_one({'game_id': 'g2', 'timestamp': datetime.now(), 'type': 'play', 'payload': {'play_id': 1}})
+    return service
+
+
+def test_archive_round_trip():
+    """Archiving removes hot rows and a single read restores them"""
+    print("🗜️  Testing archive round trip...")
+    service = _service_with_game()
+    db = service.db
+
+    archived = service.archive_finished_games()
+    assert archived == ['g1']
+
+    assert db.events.count_documents({'game_id': 'g1'}) == 0
+    assert db.statlines.count_documents({'game_id': 'g1'}) == 0
+    assert db.commentary.count_documents({'game_id': 'g1'}) == 0
+    assert db.games.find_one({'game_id': 'g1'}) is None
+    assert db.events.count_documents({'game_id': 'g2'}) == 1
+
+    info = service.get_archive_info('g1')
+    assert info['counts'] == {'events': 50, 'statlines': 10, 'commentary': 1}
+    assert info['compressed_bytes'] < info['raw_bytes']
+
+    archive = service.load_archive('g1')
+    assert archive['game']['score'] == {'home': 101, 'away': 99}
+    assert sorted(e['payload']['play_id'] for e in archive['events']) == list(range(1, 51))
+    assert isinstance(archive['events'][0]['timestamp'], datetime)
+    assert archive['commentary'][0]['text'] == 'What a finish!'
+    print(f"✅ Archived {info['raw_bytes']}B -> {info['compressed_bytes']}B and restored")
+
+
+def test_heterogeneous_rows_round_trip():
+    """Fields missing from some rows stay missing, even where another row nests under the same path"""
+    print("🧩 Testing heterogeneous rows...")
+    service = ArchiveService()
+    rows = [
+        {'game_id': 'g1', 'text': 'Shared line', 'x': {}},
+        {'game_id': 'g1', 'text': 'Personal line', 'bucket': 'abc123', 'x': {'a': 1}},
+        {'game_id': 'g1', 'text': None, 'bucket': None},
+    ]
+    assert service._from_columns(service._to_columns(rows)) == rows
+    # Archives written before absent fields were tracked still decode
+    legacy = service._to_columns([{'game_id': 'g1', 'text': 'Old'}])
+    del legacy['absent']
+    assert service._from_columns(legacy) == [{'game_id': 'g1', 'text': 'Old'}]
+    print("✅ Heterogeneous rows restored exactly")
+
+
+def test_sweep_finds_games_whose_game_doc_expired():
+    """Idle events and commentary are archived even after the game doc is gone; live games are left alone"""
+    print("🧹 Testing the archive sweep...")
+    service = ArchiveService()
+    service.db = MemoryClient().sports_commentator
+    db = service.db
+    old = datetime.now() - timedelta(hours=30)
+    # Game doc expired (24 h TTL): only its events and commentary are left
+    db.events.insert_one({'game_id': 'orphan', 'timestamp': old, 'type': 'play', 'payload': {'play_id': 1}})
+    db.commentary.insert_one({'game_id': 'orphan', 'timestamp': old, 'text': 'Old line', 'persona': 'raw'})
+    # Live game: started hours ago, still producing plays
+    db.events.insert_one({'game_id': 'live', 'timestamp': old, 'type': 'play', 'payload': {'play_id': 1}})
+    db.events.insert_one({'game_id': 'live', 'timestamp': datetime.now(), 'type': 'play', 'payload': {'play_id': 2}})
+
+    assert service.find_archivable_games() == ['orphan']
+    assert service.archive_finished_games() == ['orphan']
+    assert db.events.count_documents({'game_id': 'orphan'}) == 0
+    assert db.commentary.count_documents({'game_id': 'orphan'}) == 0
+    assert service.load_archive('orphan')['commentary'][0]['text'] == 'Old line'
+    assert db.events.count_documents({'game_id': 'live'}) == 2
+    print("✅ Sweep archived the orphaned game only")
+
+
+def test_schedule_queues_each_finished_game_once():
+    """Finished games on the schedule are queued for archival until their archive exists"""
+    print("📅 Testing archival from the schedule...")
+    # celery_app must be imported before the task modules it registers
+    import celery_app  # noqa: F401
+    from tasks import archive_tasks, data_ingestion_tasks
+    db = MemoryClient().sports_commentator
+    db.archives.insert_one({'game_id': 'done', 'archived_at': datetime.now()})
+    queued = []
+    saved = (data_ingestion_tasks.game_service.db, data_ingestion_tasks.sportsdata_service.get_todays_games, archive_tasks.archive_game.delay)
+    data_ingestion_tasks.game_service.db = db
+    data_ingestion_tasks.sportsdata_service.get_todays_games = lambda: [
+        {'game_id': 'done', 'status': 'Final'},
+        {'game_id': 'new', 'status': 'F/OT'},
+    ]
+    archive_tasks.archive_game.delay = queued.append
+    try:
+        assert data_ingestion_tasks.schedule_game_polling()['success']
+    finally:
+        data_ingestion_tasks.game_service.db, data_ingestion_tasks.sportsdata_service.get_todays_games, archive_tasks.archive_game.delay = saved
+    assert queued == ['new']
+    print("✅ Already archived games were not queued again")
+
+
+def main():
+    """Run archive tests"""
+    print("🎯 Archive Service Test Suite")
+    print("=" * 50)
+    test_archive_round_trip()
+    test_heterogeneous_rows_round_trip()
+    test_sweep_finds_games_whose_game_doc_expired()
+    test_schedule_queues_each_finished_game_once()
+    print("\n🎉 Archive tests completed!")
+
+
+if __name__ == "__main__":
+    main()
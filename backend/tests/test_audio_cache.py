@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for the content-addressed TTS audio cache
+Runs fully offline against a temporary directory (no ElevenLabs calls)
+
+Usage:
+    python test_audio_cache.py
+    python -m pytest test_audio_cache.py
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from config import Config
+from services import tts_service as tts_module
+from services.audio_cache import AudioCache
+from services.tts_service import TTSService
+
+
+class StubResponse:
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+
+class StubRequests:
+    """Counts synthesis calls; each takes a moment so concurrent callers overlap"""
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, json=None, headers=None):
+        self.posts.append(json)
+        time.sleep(0.05)
+        return StubResponse(b'\xff\xfb' + json['text'].encode('utf-8'))
+
+
+def test_identical_lines_are_synthesized_once():
+    """Same text/voice/model/settings share one file, even for concurrent callers"""
+    print("🔁 Testing deduplicated synthesis...")
+    stub = StubRequests()
+    saved_requests, saved_key = tts_module.requests, Config.ELEVENLABS_API_KEY
+    tts_module.requests, Config.ELEVENLABS_API_KEY = stub, 'test-key'
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            tts = TTSService()
+            tts.audio_cache = AudioCache(directory=directory, max_bytes=1024 * 1024)
+            urls = []
+            threads = [threading.Thread(target=lambda: urls.append(tts.generate_audio("Hello! This is a test.", 'nerdy'))) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert len(stub.posts) == 1 and len(set(urls)) == 1
+            assert urls[0].startswith(Config.AUDIO_URL_PREFIX + '/tts_') and len(os.listdir(directory)) == 1
+
+            assert tts.generate_audio("Hello! This is a test.", 'passionate') != urls[0]  # different voice
+            assert tts.generate_audio("Hello! This is a test.", 'nerdy', language='es') not in urls  # different model
+            assert len(stub.posts) == 3
+            stats = tts.audio_cache.stats()
+            assert stats['writes'] == 3 and stats['files'] == 3 and stats['coalesced'] + stats['hits'] >= 4
+    finally:
+        tts_module.requests, Config.ELEVENLABS_API_KEY = saved_requests, saved_key
+    print("✅ One ElevenLabs request per distinct clip")
+
+
+def test_size_cap_evicts_least_recently_used():
+    """Going over the cap deletes the least recently used files down to the low watermark"""
+    print("\n🧹 Testing eviction...")
+    with tempfile.TemporaryDirectory() as directory:
+        legacy = os.path.join(directory, 'audio_0123.mp3')
+        with open(legacy, 'wb') as f:
+            f.write(b'x' * 100)
+        cache = AudioCache(directory=directory, max_bytes=400, low_watermark=0.5)
+        assert cache.stats()['bytes'] == 100  # adopted on startup
+
+        for name in ('a', 'b', 'c'):
+            cache.put(name, b'y' * 100)
+        assert cache.get('a')  # 'a' is now more recent than 'b' and 'c'
+        cache.put('d', b'z' * 100)  # 500 bytes > 400 cap
+
+        deadline = time.monotonic() + 2
+        while cache.stats()['bytes'] > 200 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        stats = cache.stats()
+        assert stats['bytes'] == 200 and stats['evictions'] == 3 and stats['evicted_bytes'] == 300
+        assert not os.path.exists(legacy) and cache.get('b') is None and cache.get('c') is None
+        assert cache.get('a') and cache.get('d')
+    print("✅ Disk usage stays under the cap, oldest clips go first")
+
+
+def main():
+    """Run all audio cache tests"""
+    print("🎯 Audio Cache Test Suite")
+    print("=" * 50)
+    test_identical_lines_are_synthesized_once()
+    test_size_cap_evicts_least_recently_used()
+    print("\n🎉 Audio cache tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test script for TTS audio post-processing (silence trimming and loudness matching on MP3 frames)
+Runs fully offline with synthetic frames and a stub TTS backend
+
+Usage:
+    python test_audio_processing.py
+    python -m pytest test_audio_processing.py
+"""
+
+import sys
+import os
+import tempfile
+from concurrent.futures import Future
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from config import Config
+from services import audio_processing
+from services.audio_cache import AudioCache
+from services.audio_utils import iter_mp3_frames, mp3_duration, silent_mp3
+from services.tts_service import TTSService
+
+SILENT = next(iter_mp3_frames(silent_mp3(0)))
+
+
+def _coded(gain, reservoir=0):
+    """A mono frame whose two granules carry coded audio at the given global_gain"""
+    side = int.from_bytes(SILENT[4:21], 'big')
+    side |= reservoir << (136 - 9)
+    for granule in range(2):
+        position = 18 + granule * 59
+        side |= 100 << (136 - position - 12)
+        side |= gain << (136 - position - 21 - 8)
+    return SILENT[:4] + side.to_bytes(17, 'big') + SILENT[21:]
+
+
+def _gains(data):
+    return [gain for frame in iter_mp3_frames(data) for _, length, gain in audio_processing._granules(frame) if length]
+
+
+def test_silence_is_trimmed_and_loudness_matched():
+    """Dead air goes, padding and the bit reservoir stay, and the level moves toward the target in 1.5 dB steps"""
+    print("✂️ Testing frame-level post-processing...")
+    clip = SILENT * 30 + _coded(140, reservoir=200) + _coded(140) * 20 + SILENT * 40
+    processed = audio_processing.postprocess_mp3(clip, 144, 90, 4, 4, 8)
+    assert len(list(iter_mp3_frames(processed))) == 21 + 4 + 4  # sound plus padding at each end
+    assert set(_gains(processed)) == {144} and mp3_duration(processed) < mp3_duration(clip) / 3
+    # Without padding, the frame holding the first sound's bit reservoir is kept
+    assert len(list(iter_mp3_frames(audio_processing.postprocess_mp3(clip, 144, 90, 0, 4, 8)))) == 21 + 1
+
+    # Boosts are capped, quiet clips of only silence are left alone
+    assert set(_gains(audio_processing.postprocess_mp3(_coded(100) * 5, 150, 90, 0, 4, 8))) == {104}
+    assert audio_processing.postprocess_mp3(SILENT * 5, 150, 90, 4, 4, 8) == SILENT * 5
+    print(f"✅ {len(clip)} bytes trimmed to {len(processed)}, level matched")
+
+
+class StubBackend:
+    """Two voices at different levels, both with dead air around the line"""
+    name = 'stub'
+
+    def __init__(self):
+        self.calls = 0
+
+    def available(self):
+        return True
+
+    def synthesize(self, spec, persona):
+        self.calls += 1
+        gain = 130 if persona == 'nerdy' else 160
+        return SILENT * 20 + _coded(gain) * 30 + SILENT * 20
+
+
+def test_tts_service_caches_processed_clips():
+    """With post-processing on, voices come out at one level and the processed clip is what gets cached"""
+    print("\n🎚️ Testing processed TTS clips...")
+    saved = {key: getattr(Config, key) for key in ('TTS_POSTPROCESS_ENABLED', 'TTS_LOUDNESS_TARGET_GAIN', 'TTS_LOUDNESS_MAX_BOOST', 'TTS_LOUDNESS_MAX_CUT')}
+    Config.TTS_POSTPROCESS_ENABLED, Config.TTS_LOUDNESS_TARGET_GAIN = True, 150
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            backend = StubBackend()
+            tts = TTSService(backend=backend)
+            tts.audio_cache = AudioCache(directory=directory)
+            levels = {}
+            for persona in ('nerdy', 'passionate'):
+                url = tts.generate_audio("Davis for the win!", persona)
+                with open(os.path.join(directory, os.path.basename(url)), 'rb') as f:
+                    audio = f.read()
+                assert len(list(iter_mp3_frames(audio))) == 30 + 2 * Config.TTS_TRIM_PAD_FRAMES
+                levels[persona] = set(_gains(audio))
+            assert levels == {'nerdy': {134}, 'passionate': {152}}  # 30 -> 18 steps apart, within the boost/cut caps
+            assert tts.generate_audio("Davis for the win!", 'nerdy') and backend.calls == 2
+
+            raw_key = tts._build_request("Davis for the win!", 'nerdy', None, None, None, None)[1]
+            for cap in ('TTS_LOUDNESS_MAX_BOOST', 'TTS_LOUDNESS_MAX_CUT'):
+                setattr(Config, cap, getattr(Config, cap) + 1)
+                assert tts._build_request("Davis for the win!", 'nerdy', None, None, None, None)[1] != raw_key  # new caps, new clips
+                setattr(Config, cap, saved[cap])
+            Config.TTS_POSTPROCESS_ENABLED = False
+            assert tts._build_request("Davis for the win!", 'nerdy', None, None, None, None)[1] != raw_key  # raw clips never collide
+            stats = audio_processing.audio_postprocessor.snapshot()
+            assert stats['clips'] >= 2 and stats['bytes_saved'] > 0
+    finally:
+        for key, value in saved.items():
+            setattr(Config, key, value)
+    print(f"✅ Voices normalized to {levels}, {stats['bytes_saved']} bytes of dead air removed")
+
+
+class _StuckPool:
+    """A pool whose workers never finish"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+def test_pool_is_spawned_and_slow_clips_fall_back_to_raw():
+    """Workers use the spawn start method; a clip past the timeout is served unprocessed"""
+    print("\n⏲️ Testing the post-processing pool...")
+    processor = audio_processing.AudioPostProcessor()
+    pool = processor._get_pool()
+    try:
+        assert pool is not None and pool._mp_context.get_start_method() == 'spawn'
+        clip = b''.join([SILENT] * 10 + [_coded(140)] * 10 + [SILENT] * 10)
+        assert len(processor.process(clip)) < len(clip)
+    finally:
+        pool.shutdown()
+
+    saved = Config.TTS_POSTPROCESS_TIMEOUT_SECONDS
+    Config.TTS_POSTPROCESS_TIMEOUT_SECONDS = 0.05
+    try:
+        processor._pool = stuck = _StuckPool()
+        assert processor.process(clip) == clip
+        assert stuck.futures[0].cancelled()
+        stats = processor.snapshot()
+        assert stats['timeouts'] == 1 and stats['failures'] == 0 and stats['clips'] == 1
+    finally:
+        Config.TTS_POSTPROCESS_TIMEOUT_SECONDS = saved
+    print("✅ Spawned workers, raw clip served after the timeout")
+
+
+def main():
+    """Run all audio processing tests"""
+    print("🎯 Audio Processing Test Suite")
+    print("=" * 50)
+    test_silence_is_trimmed_and_loudness_matched()
+    test_tts_service_caches_processed_clips()
+    test_pool_is_spawned_and_slow_clips_fall_back_to_raw()
+    print("\n🎉 Audio processing tests completed!")
+
+
+if __name__ == "__main__":
+    main()
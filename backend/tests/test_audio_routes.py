@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for the audio-serving route (Range requests, ETags, cache headers)
+Runs fully offline against a temporary audio cache directory
+
+Usage:
+    python test_audio_routes.py
+    python -m pytest test_audio_routes.py
+"""
+
+import sys
+import os
+import tempfile
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from flask import Flask
+from config import Config
+from services.audio_cache import AudioCache
+
+
+def _client(cache):
+    from routes import audio_routes
+    audio_routes.audio_cache = cache
+    app = Flask(__name__)
+    app.register_blueprint(audio_routes.audio_bp, url_prefix='/api/audio')
+    return app.test_client()
+
+
+def test_cached_clip_is_served_with_ranges_and_strong_etag():
+    """Full, partial and conditional requests for a content-addressed clip"""
+    print("📼 Testing audio serving...")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AudioCache(directory=directory)
+        key = cache.make_key("Davis with the slam!", 'voice', 'model')
+        data = bytes(range(256)) * 40
+        url = cache.put(key, data)
+        assert url.startswith(Config.AUDIO_URL_PREFIX + '/tts_')
+        client = _client(cache)
+
+        full = client.get(url)
+        assert full.status_code == 200 and full.data == data and full.mimetype == 'audio/mpeg'
+        etag = cache.etag(key)
+        assert full.headers['ETag'] == f'"{etag}"' and etag not in key and full.headers['Accept-Ranges'] == 'bytes'
+        assert full.headers['Cache-Control'] == f"public, max-age={Config.AUDIO_CACHE_MAX_AGE_SECONDS}, immutable"
+        full.close()
+
+        partial = client.get(url, headers={'Range': 'bytes=100-199'})
+        assert partial.status_code == 206 and partial.data == data[100:200]
+        assert partial.headers['Content-Range'] == f"bytes 100-199/{len(data)}"
+        partial.close()
+
+        tail = client.get(url, headers={'Range': 'bytes=-16'})
+        assert tail.status_code == 206 and tail.data == data[-16:]
+        tail.close()
+
+        unchanged = client.get(url, headers={'If-None-Match': f'"{etag}"'})
+        assert unchanged.status_code == 304 and not unchanged.data
+        assert cache.stats()['hits'] == 0  # serving is not a cache lookup
+
+        opus_key = cache.make_key("Davis with the slam!", 'voice', 'model', output_format='opus_48000_32')
+        opus = client.get(cache.put(opus_key, b'OggS' + data))
+        assert opus.status_code == 200 and opus.mimetype == 'audio/ogg' and opus.headers['ETag'] == f'"{cache.etag(opus_key)}"'
+        assert opus_key.startswith(key)  # variants share the content hash
+        opus.close()
+
+        # Re-synthesized after eviction: same key and URL, different bytes, so the old ETag must not match
+        cache.max_bytes = 0
+        cache.evict()
+        cache.max_bytes = 10 * 1024 * 1024
+        assert cache.put(key, data[::-1]) == url
+        resumed = client.get(url, headers={'Range': 'bytes=100-199', 'If-Range': f'"{etag}"'})
+        assert resumed.status_code == 200 and resumed.data == data[::-1]
+        assert resumed.headers['ETag'] != f'"{etag}"'
+        resumed.close()
+    print("✅ 200 / 206 / 304 with an ETag of the clip's bytes")
+
+
+def test_unknown_or_unsafe_names_are_not_found():
+    """Only clip names the cache writes are served"""
+    print("\n🚫 Testing rejected names...")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AudioCache(directory=directory)
+        with open(os.path.join(directory, 'notes.txt'), 'w') as f:
+            f.write('secret')
+        client = _client(cache)
+        for path in ('/api/audio/tts_' + 'a' * 64 + '.mp3', '/api/audio/notes.txt', '/api/audio/..%2Fconfig.py', '/api/audio/tts_abc.mp3'):
+            assert client.get(path).status_code == 404, path
+
+        legacy = 'audio_' + 'f' * 32 + '.mp3'
+        with open(os.path.join(directory, legacy), 'wb') as f:
+            f.write(b'\xff\xfb' * 8)
+        response = client.get('/api/audio/' + legacy)
+        assert response.status_code == 200 and 'immutable' not in response.headers['Cache-Control']
+        response.close()
+    print("✅ Missing, foreign and traversal paths return 404")
+
+
+def main():
+    """Run all audio route tests"""
+    print("🎯 Audio Route Test Suite")
+    print("=" * 50)
+    test_cached_clip_is_served_with_ranges_and_strong_etag()
+    test_unknown_or_unsafe_names_are_not_found()
+    print("\n🎉 Audio route tests completed!")
+
+
+if __name__ == "__main__":
+    main()
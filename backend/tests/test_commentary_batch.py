@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script for batched multi-play commentary generation
+Runs fully offline with a stub model and TTS (no Gemini/ElevenLabs calls)
+
+Usage:
+    python test_commentary_batch.py
+    python -m pytest test_commentary_batch.py
+"""
+
+import sys
+import os
+import json
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from storage import MemoryClient
+from services.commentary_service import CommentaryService
+from services.model_router import ModelRouter
+from services.response_cache import response_cache
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        return StubResponse(self.reply(prompt) if callable(self.reply) else self.reply)
+
+
+class StubTTS:
+    def generate_audio(self, text, persona, voice_id=None, language=None):
+        return None
+
+
+def _service(reply):
+    response_cache.clear()
+    service = CommentaryService()
+    service.db = MemoryClient().sports_commentator
+    service.game_service.get_game_summary = lambda game_id: None
+    service.tts_service = StubTTS()
+    service.model = StubModel(reply)
+    return service
+
+
+PLAYS = [
+    {'play_id': 101, 'play_description': 'Lillard makes 28-foot three point jumper', 'event_type': 'shot'},
+    {'play_id': 102, 'play_description': 'James driving layup', 'event_type': 'shot'},
+    {'play_id': 103, 'play_description': 'Davis blocks Ayton layup', 'event_type': 'block'},
+]
+
+
+def test_one_call_covers_every_play_and_persona():
+    """A fenced JSON reply is split into one stored line per play and persona"""
+    print("📦 Testing batched generation...")
+    grid = [
+        {'play': p, 'persona': persona, 'text': f"{persona} call {p}"}
+        for p in range(1, 4) for persona in ('passionate', 'nerdy')
+    ]
+    service = _service("```json\n" + json.dumps(grid) + "\n```")
+
+    results = service.generate_commentary_batch('g1', PLAYS, ['passionate', 'nerdy'])
+    assert len(service.model.prompts) == 1
+    assert [[r['text'] for r in row] for row in results] == [
+        ['passionate call 1', 'nerdy call 1'],
+        ['passionate call 2', 'nerdy call 2'],
+        ['passionate call 3', 'nerdy call 3'],
+    ]
+    assert service.db.commentary.count_documents({'game_id': 'g1', 'play_id': '102'}) == 2
+    assert service.db.commentary.count_documents({'shared': True}) == 0
+
+    # Feed batches are marked shared so public outputs (radio) may air them
+    service.generate_commentary_batch('g2', PLAYS[:1], ['passionate'], shared=True)
+    assert service.db.commentary.find_one({'game_id': 'g2'})['shared'] is True
+
+    # The same plays at the same game state are served from the response cache
+    service.generate_commentary_batch('g1', PLAYS, ['passionate', 'nerdy'])
+    assert len(service.model.prompts) == 1
+    print("✅ Six lines from one model call, reused on repeat")
+
+
+def test_missing_lines_fall_back_to_single_generation():
+    """Lines left out of the batch reply are generated individually"""
+    print("\n🩹 Testing partial batch replies...")
+
+    def reply(prompt):
+        if 'Plays to call' in prompt:
+            return json.dumps([{'play': 1, 'persona': 'passionate', 'text': 'Batch line'}])
+        return 'Single line'
+
+    service = _service(reply)
+    results = service.generate_commentary_batch('g1', PLAYS[:2], ['passionate'])
+    assert [row[0]['text'] for row in results] == ['Batch line', 'Single line']
+    assert len(service.model.prompts) == 2
+    print("✅ Missing lines are filled in by per-play generation")
+
+
+def test_failed_batch_falls_back_to_templates():
+    """A failed batch call fills every missing line from templates instead of one model call per line"""
+    print("\n🧯 Testing failed batch calls...")
+
+    def reply(prompt):
+        raise TimeoutError("Gemini deadline exceeded")
+
+    service = _service(reply)
+    service.router = ModelRouter()
+    results = service.generate_commentary_batch('g1', PLAYS, ['passionate', 'nerdy'])
+    assert len(service.model.prompts) == 1
+    assert all(result['tier'] == 'template' and result['text'] for row in results for result in row)
+    assert service.db.commentary.count_documents({'game_id': 'g1'}) == 6
+    print("✅ One failed call, six template lines")
+
+
+def main():
+    """Run all batch commentary tests"""
+    print("🎯 Batch Commentary Test Suite")
+    print("=" * 50)
+    test_one_call_covers_every_play_and_persona()
+    test_missing_lines_fall_back_to_single_generation()
+    test_failed_batch_falls_back_to_templates()
+    print("\n🎉 Batch commentary tests completed!")
+
+
+if __name__ == "__main__":
+    main()
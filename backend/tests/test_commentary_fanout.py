@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for shared commentary fan-out
+Runs fully offline with a stub generator (no Gemini/ElevenLabs calls)
+
+Usage:
+    python test_commentary_fanout.py
+    python -m pytest test_commentary_fanout.py
+"""
+
+import sys
+import os
+import threading
+import time
+from datetime import datetime
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from storage import MemoryClient
+from services.commentary_fanout import CommentaryFanout, preference_bucket
+
+
+class StubCommentaryService:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate_commentary(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+        time.sleep(0.05)  # Simulate a slow model call so requests overlap
+        return {'text': f"Line for {kwargs['play_id']}", 'audio_url': None, 'persona': kwargs['persona'], 'timestamp': datetime.now()}
+
+    def _get_fallback_commentary(self, persona):
+        return {'text': 'fallback', 'audio_url': None, 'persona': persona, 'timestamp': datetime.now(), 'fallback': True}
+
+
+def _fanout():
+    stub = StubCommentaryService()
+    fanout = CommentaryFanout(stub)
+    fanout.db = MemoryClient().sports_commentator
+    return stub, fanout
+
+
+def test_preference_bucket_quantises_sliders():
+    """Nearby slider values share a bucket; crossing a prompt threshold does not"""
+    print("🪣 Testing preference buckets...")
+    base = {'preferences': {'energyLevel': 85, 'comedyLevel': 75, 'statFocus': 50}}
+    near = {'preferences': {'energyLevel': 95, 'comedyLevel': 90, 'statFocus': 60}}
+    far = {'preferences': {'energyLevel': 65, 'comedyLevel': 75, 'statFocus': 50}}
+    assert preference_bucket(base) == preference_bucket(near)
+    assert preference_bucket(base) != preference_bucket(far)
+    print("✅ Buckets follow the prompt thresholds")
+
+
+def test_concurrent_viewers_share_one_generation():
+    """Many simultaneous requests for the same play trigger a single model call"""
+    print("\n📡 Testing concurrent fan-out...")
+    stub, fanout = _fanout()
+    ctx = {'preferences': {'energyLevel': 90, 'comedyLevel': 80}}
+    results = []
+
+    def viewer():
+        results.append(fanout.get_commentary('g1', 42, 'made_three', 'passionate', 'Knecht 3PT', ctx))
+
+    threads = [threading.Thread(target=viewer) for _ in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert stub.calls == 1
+    assert len(results) == 50 and all(r['text'] == 'Line for 42' for r in results)
+
+    # Later requests reuse the finished line; a new persona generates once more
+    fanout.get_commentary('g1', 42, 'made_three', 'passionate', 'Knecht 3PT', ctx)
+    fanout.get_commentary('g1', 42, 'made_three', 'nerdy', 'Knecht 3PT', ctx)
+    assert stub.calls == 2
+    print(f"✅ 50 viewers -> {stub.calls} generations ({fanout.stats})")
+
+
+def main():
+    """Run fan-out tests"""
+    print("🎯 Commentary Fan-out Test Suite")
+    print("=" * 50)
+    test_preference_bucket_quantises_sliders()
+    test_concurrent_viewers_share_one_generation()
+    print("\n🎉 Fan-out tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test script for the server-driven commentary feed (new-play detection and room pushes)
+Runs fully offline with a stub model, TTS and Socket.IO server
+
+Usage:
+    python test_commentary_feed.py
+    python -m pytest test_commentary_feed.py
+"""
+
+import sys
+import os
+import json
+import re
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from storage import MemoryClient
+from services.game_service import GameService
+from services.model_router import ModelRouter
+from services.response_cache import response_cache
+# celery_app must be imported before the task modules it registers
+import celery_app  # noqa: F401
+from tasks import commentary_tasks
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class BatchModel:
+    """Answers every batch prompt with one line per play and persona"""
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        plays = len(re.findall(r'\n\d+\. "', prompt))
+        lines = [{'play': i, 'persona': p, 'text': f"Line {i} {p}"} for i in range(1, plays + 1) for p in ('passionate', 'nerdy')]
+        return StubResponse(json.dumps(lines))
+
+
+class StubTTS:
+    def generate_audio(self, text, persona, voice_id=None, language=None):
+        return f"/static/audio/{persona}.mp3"
+
+
+class FakeSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, room=None):
+        self.emitted.append((event, data, room))
+
+
+def _play(play_id, description, points=0):
+    return {'PlayID': play_id, 'Period': 4, 'Clock': '02:10', 'Description': description, 'Team': 'LAL', 'Points': points, 'HomeTeamScore': 90, 'AwayTeamScore': 88}
+
+
+def test_ingestion_returns_only_new_plays():
+    """Repeated snapshots store each play once and report only the plays not seen before"""
+    print("🆕 Testing new-play detection...")
+    service = GameService()
+    service.db = MemoryClient().sports_commentator
+    game = {'Status': 'InProgress', 'Clock': '02:10', 'HomeTeamScore': 90, 'AwayTeamScore': 88}
+
+    first = service.update_game_data('g1', game, {}, [_play(1, 'Davis 2\' Dunk (20 PTS)', 2), _play(2, 'Simons Driving Layup', 2)])
+    second = service.update_game_data('g1', game, {}, [_play(1, 'Davis 2\' Dunk (20 PTS)', 2), _play(2, 'Simons Driving Layup', 2), _play(3, 'Knecht 26\' 3PT Jump Shot', 3)])
+    assert [e['payload']['play_id'] for e in first] == [1, 2]
+    assert [e['payload']['play_id'] for e in second] == [3]
+    assert service.db.events.count_documents({'game_id': 'g1'}) == 3
+    assert service.update_game_data('g1', game, {}, [_play(3, 'Knecht 26\' 3PT Jump Shot', 3)]) == []
+    print("✅ Plays are detected once, however often they are polled")
+
+
+class RacingEvents:
+    """Events collection where another poll inserts play 2 first: Mongo then rejects our upsert of it"""
+
+    def __init__(self, events):
+        self.events = events
+
+    def bulk_write(self, ops, ordered=True):
+        self.events.insert_one({'game_id': 'g3', 'type': 'play', 'payload': {'play_id': 2}})
+        raced = [i for i, op in enumerate(ops) if isinstance(op, UpdateOne) and op._filter.get('payload.play_id') == 2]
+        upserted = []
+        for position, op in enumerate(ops):
+            if position in raced:
+                continue
+            result = self.events.bulk_write([op])
+            upserted += [{'index': position, '_id': _id} for _id in result.upserted_ids.values()]
+        raise BulkWriteError({'writeErrors': [{'index': i, 'code': 11000, 'errmsg': 'E11000 duplicate key'} for i in raced], 'upserted': upserted})
+
+    def __getattr__(self, name):
+        return getattr(self.events, name)
+
+
+def test_concurrent_polls_store_and_report_a_play_once():
+    """A play inserted by a concurrent poll hits the unique play index and counts as already seen"""
+    print("\n🏁 Testing concurrent polls...")
+    service = GameService()
+    service.db = MemoryClient().sports_commentator
+    real_events = service.db.events
+    service.db.events = RacingEvents(real_events)
+    game = {'Status': 'InProgress', 'Clock': '01:00', 'HomeTeamScore': 92, 'AwayTeamScore': 88}
+
+    plays = [_play(1, 'Grant Jump Shot', 2), _play(2, 'Ayton Dunk', 2), _play(None, 'Timeout'), _play(3, 'Reaves Layup', 2)]
+    new_events = service.update_game_data('g3', game, {}, plays)
+    assert [e['payload']['play_id'] for e in new_events] == [1, 3]
+    assert real_events.count_documents({'game_id': 'g3', 'payload.play_id': 2}) == 1
+
+    # Any other write error is still raised
+    def rejected(ops, ordered=True):
+        raise BulkWriteError({'writeErrors': [{'index': 0, 'code': 121, 'errmsg': 'Document failed validation'}]})
+    service.db.events.bulk_write = rejected
+    try:
+        service.update_game_data('g3', game, {}, [_play(4, 'Simons Three', 3)])
+        assert False, "expected BulkWriteError"
+    except BulkWriteError:
+        pass
+    print("✅ Duplicate key from a concurrent poll treated as already seen")
+
+
+def test_snapshot_route_queues_commentary_for_new_plays():
+    """Plays first seen by the snapshot endpoint are handed to the feed, once"""
+    print("\n📸 Testing the snapshot route...")
+    from flask import Flask
+    from routes import nba_routes
+
+    queued = []
+    sportsdata = nba_routes.sportsdata_service
+    saved = (nba_routes.game_service.db, commentary_tasks.commentary_feed_on_plays.delay, sportsdata.get_game_details, sportsdata.get_box_score, sportsdata.get_play_by_play)
+    nba_routes.game_service.db = MemoryClient().sports_commentator
+    commentary_tasks.commentary_feed_on_plays.delay = lambda game_id, events: queued.append((game_id, [e['payload']['play_id'] for e in events]))
+    sportsdata.get_game_details = lambda game_id: {'Status': 'InProgress', 'Clock': '05:00', 'HomeTeamScore': 70, 'AwayTeamScore': 71}
+    sportsdata.get_box_score = lambda game_id: {}
+    sportsdata.get_play_by_play = lambda game_id: [_play(1, 'Davis Hook Shot', 2), _play(2, 'Simons Three', 3)]
+    try:
+        app = Flask(__name__)
+        app.register_blueprint(nba_routes.nba_bp, url_prefix='/api/nba')
+        client = app.test_client()
+        assert client.get('/api/nba/game/g4/snapshot').get_json()['success']
+        assert client.get('/api/nba/game/g4/snapshot').get_json()['success']
+    finally:
+        (nba_routes.game_service.db, commentary_tasks.commentary_feed_on_plays.delay, sportsdata.get_game_details, sportsdata.get_box_score, sportsdata.get_play_by_play) = saved
+    assert queued == [('g4', [1, 2])]
+    print("✅ Snapshot plays queued for commentary once")
+
+
+def test_feed_generates_once_and_pushes_to_room():
+    """New plays are generated in one batch for every persona and emitted to game:<id>"""
+    print("\n📣 Testing feed publishing...")
+    response_cache.clear()
+    service = commentary_tasks.commentary_service
+    service.db = MemoryClient().sports_commentator
+    service.game_service.get_game_summary = lambda game_id: None
+    service.tts_service = StubTTS()
+    service.model = BatchModel()
+    service.router = ModelRouter()
+    socketio = FakeSocketIO()
+    commentary_tasks.get_feed_socketio = lambda: socketio
+    # Scoring reads game context from the service's database, never the module-level one
+    scored = []
+    score_event = commentary_tasks._score_event
+    commentary_tasks._score_event = lambda db, game_id, payload: scored.append(db) or score_event(db, game_id, payload)
+
+    events = [
+        {'type': 'play', 'timestamp': '2026-10-19T20:00:00', 'payload': {'play_id': 7, 'description': 'Davis 2\' Dunk (20 PTS)', 'points': 2}},
+        {'type': 'play', 'timestamp': '2026-10-19T20:00:01', 'payload': {'play_id': 8, 'description': 'Henderson Bad Pass Turnover', 'points': 0}},
+        {'type': 'play', 'payload': {'play_id': 9, 'description': 'SUB: Reaves FOR James'}},
+    ]
+    try:
+        result = commentary_tasks.commentary_feed_on_plays('g2', events)
+    finally:
+        commentary_tasks._score_event = score_event
+    assert scored and all(db is service.db for db in scored)
+    assert result['success'] and result['queued'] == 2 and result['batches'] == 1
+    assert service.model.calls == 1
+
+    assert all(event == 'new_commentary' and room == 'game:g2' for event, _, room in socketio.emitted)
+    pushed = {(data['play_id'], data['persona']) for _, data, _ in socketio.emitted}
+    assert pushed == {(play_id, persona) for play_id in (7, 8) for persona in commentary_tasks.AUTO_COMMENTARY_PERSONAS}
+    dunk = next(data for _, data, _ in socketio.emitted if data['play_id'] == 7 and data['persona'] == 'nerdy')
+    assert dunk['event_type'] == 'dunk' and dunk['text'] == 'Line 1 nerdy' and dunk['audio_url'] == '/static/audio/nerdy.mp3'
+    assert isinstance(dunk['timestamp'], str)
+    assert service.db.commentary.count_documents({'game_id': 'g2'}) == 6
+    print(f"✅ {len(socketio.emitted)} lines generated in one call and pushed to the game room")
+
+
+def main():
+    """Run all commentary feed tests"""
+    print("🎯 Commentary Feed Test Suite")
+    print("=" * 50)
+    test_ingestion_returns_only_new_plays()
+    test_concurrent_polls_store_and_report_a_play_once()
+    test_snapshot_route_queues_commentary_for_new_plays()
+    test_feed_generates_once_and_pushes_to_room()
+    print("\n🎉 Commentary feed tests completed!")
+
+
+if __name__ == "__main__":
+    main()
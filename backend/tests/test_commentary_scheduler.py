@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for play significance scoring and the per-game commentary queue
+Runs fully offline - no MongoDB, Redis or API keys required
+
+Usage:
+    python test_commentary_scheduler.py
+    python -m pytest test_commentary_scheduler.py
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline for tests collected after this one
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from services.significance import score_play
+from services.commentary_scheduler import CommentaryScheduler
+
+
+def test_context_raises_significance():
+    """A go-ahead late three outranks an early free throw in a blowout"""
+    print("📈 Testing significance scoring...")
+    free_throw, _ = score_play(
+        {'description': 'Walker Free Throw 1 of 2 (1 PTS)', 'period': 1, 'clock': '09:00', 'team': 'POR'},
+        {'score': {'home': 30, 'away': 8}}
+    )
+    go_ahead, factors = score_play(
+        {'description': "Knecht 3PT Jump Shot (8 PTS)", 'period': 4, 'clock': '00:40', 'team': 'LAL', 'player_id': 7,
+         'home_score': 101, 'away_score': 102},
+        star_player_ids=[7]
+    )
+    substitution, _ = score_play({'description': 'SUB: Minaya FOR Banton'})
+    assert go_ahead > free_throw > substitution == 0.0
+    assert {'clutch', 'lead_change', 'star'} <= set(factors)
+
+    recent = [{'description': "Ayton Dunk (2 PTS)", 'team': 'POR'}, {'description': "Sharpe 3PT Jump Shot (3 PTS)", 'team': 'POR'}]
+    _, factors = score_play({'description': "Sharpe 3PT Jump Shot (6 PTS)", 'team': 'POR'}, recent=recent)
+    assert factors.get('run') == 0.4  # 8-0 run
+    print("✅ Clutch, lead changes, runs and stars raise the score")
+
+
+def test_queue_serves_priority_merges_and_drops_stale():
+    """Highest score first, others merged into its batch, expired plays dropped"""
+    print("\n🚦 Testing commentary queue...")
+    scheduler = CommentaryScheduler(slo_seconds=8, max_queue=4, max_batch=2)
+    scheduler.submit('g1', {'play_id': 1}, 0.2)
+    scheduler.submit('g1', {'play_id': 2}, 0.9)
+    scheduler.submit('g1', {'play_id': 3}, 0.5)
+    scheduler.submit('g1', {'play_id': 4}, 0.6)
+    scheduler.submit('g1', {'play_id': 5}, 1.0, deadline=time.monotonic() + 0.5)  # Queue full: play 1 is dropped
+    # Play 5 cannot be delivered before its deadline at the expected model latency
+
+    batches = []
+    scheduler.drain('g1', batches.append)
+    assert batches == [[{'play_id': 2}, {'play_id': 4}], [{'play_id': 3}]]
+    assert scheduler.stats['dropped_overflow'] == 1
+    assert scheduler.stats['dropped_expired'] == 1
+    assert scheduler.stats['merged'] == 1
+    assert scheduler.pending('g1') == 0
+    print("✅ Queue keeps commentary latency bounded")
+
+
+def main():
+    """Run all scheduler tests"""
+    print("🎯 Commentary Scheduler Test Suite")
+    print("=" * 50)
+    test_context_raises_significance()
+    test_queue_serves_priority_merges_and_drops_stale()
+    print("\n🎉 Commentary scheduler tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test script for streamed sentence-by-sentence commentary
+Runs fully offline with a stub streaming model and TTS (no Gemini/ElevenLabs calls)
+
+Usage:
+    python test_commentary_stream.py
+    python -m pytest test_commentary_stream.py
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from storage import MemoryClient
+from services.commentary_service import CommentaryService
+from services.response_cache import response_cache
+from services.sentence_splitter import SentenceBuffer, split_sentences
+
+
+class StubChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubStreamingModel:
+    def __init__(self, parts):
+        self.parts = parts
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        assert stream, "streaming path must request a stream"
+        self.calls += 1
+        for part in self.parts:
+            time.sleep(0.02)  # Tokens trickle in
+            yield StubChunk(part)
+
+
+class StubTTS:
+    def generate_audio(self, text, persona, voice_id=None, language=None):
+        return f"/static/audio/{len(text)}.mp3"
+
+
+def test_sentence_buffer_waits_for_real_boundaries():
+    """Decimals, abbreviations and chunk-final periods do not end a sentence"""
+    print("✂️  Testing sentence splitting...")
+    buffer = SentenceBuffer()
+    assert buffer.feed("He is shooting 45.") == []
+    assert buffer.feed("5 percent vs. Denver tonight. And") == ["He is shooting 45.5 percent vs. Denver tonight."]
+    assert buffer.flush() == ["And"]
+    assert split_sentences("Wow! What a dunk by Ayton!") == ["Wow! What a dunk by Ayton!"]
+    print("✅ Sentences are only released at real boundaries")
+
+
+def test_text_chunks_arrive_before_the_stream_finishes():
+    """Each sentence is emitted and voiced while the model is still generating"""
+    print("\n🌊 Testing streamed commentary...")
+    response_cache.clear()
+    service = CommentaryService()
+    service.db = MemoryClient().sports_commentator
+    service.game_service.get_game_summary = lambda game_id: None
+    service.tts_service = StubTTS()
+    service.model = StubStreamingModel(["BOOM! Lillard drills it", " from the logo! The crowd is", " losing its mind."])
+
+    chunks = []
+    result = service.stream_commentary('g1', persona='passionate', play_description='Lillard 30ft three', on_chunk=chunks.append)
+
+    texts = [c for c in chunks if c['type'] == 'text']
+    audio = sorted((c for c in chunks if c['type'] == 'audio'), key=lambda c: c['index'])
+    assert [c['text'] for c in texts] == ["BOOM! Lillard drills it from the logo!", "The crowd is losing its mind."]
+    assert chunks.index(texts[0]) < chunks.index(texts[1])  # First sentence did not wait for the last
+    assert [c['audio_url'] for c in audio] == result['audio_urls']
+    assert chunks[-1]['type'] == 'done' and chunks[-1]['text'] == result['text']
+    assert service.db.commentary.find_one({'game_id': 'g1'})['audio_urls'] == result['audio_urls']
+
+    # A repeat of the same play at the same game state is replayed from the response cache
+    service.stream_commentary('g1', persona='passionate', play_description='Lillard 30ft three')
+    assert service.model.calls == 1
+    print("✅ Sentences stream out ahead of the full response")
+
+
+class StubStreamService:
+    """Records each stream request and emits one text chunk"""
+
+    def __init__(self):
+        self.calls = []
+
+    def stream_commentary(self, on_chunk=None, **kwargs):
+        self.calls.append(kwargs)
+        on_chunk({'type': 'text', 'index': 0, 'text': 'Line', 'persona': kwargs['persona']})
+
+
+def test_personal_streams_reach_only_their_viewer():
+    """A socket-started stream goes to that socket alone; the HTTP stream is shared and unpersonalized"""
+    print("\n🔒 Testing stream delivery...")
+    from flask import Flask
+    from flask_socketio import SocketIO
+    from routes import commentary_routes
+    from socket_handlers import register_socket_handlers
+
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode='threading')
+    register_socket_handlers(socketio)
+    app.register_blueprint(commentary_routes.commentary_bp, url_prefix='/api/commentary')
+    saved = commentary_routes.commentary_service
+    commentary_routes.commentary_service = stub = StubStreamService()
+    try:
+        viewer, other = socketio.test_client(app), socketio.test_client(app)
+        for client in (viewer, other):
+            client.emit('join_game', {'game_id': 'g1'})
+            client.get_received()
+
+        context = {'customInstructions': 'Roast the Blazers', 'preferences': {'voiceId': 'v1'}}
+        ack = viewer.emit('stream_commentary', {'game_id': 'g1', 'play_id': 7, 'user_context': context}, callback=True)
+        assert ack['success']
+        time.sleep(0.1)
+        assert [e['name'] for e in viewer.get_received()] == ['commentary_chunk']
+        assert other.get_received() == []
+        assert stub.calls[-1]['user_context'] == context and stub.calls[-1]['bucket'] != 'default'
+
+        # A sid in the body is ignored: the HTTP stream goes to the whole game, built from default preferences
+        response = app.test_client().post('/api/commentary/stream', json={'game_id': 'g1', 'sid': 'someone-else', 'user_context': context})
+        assert response.status_code == 202
+        time.sleep(0.1)
+        assert len(viewer.get_received()) == 1 and len(other.get_received()) == 1
+        assert stub.calls[-1]['user_context'] is None and stub.calls[-1]['bucket'] == 'default'
+
+        # Further requests for the same play and persona join the running stream instead of starting another
+        calls = len(stub.calls)
+        first = app.test_client().post('/api/commentary/stream', json={'game_id': 'g1', 'play_id': 8}).get_json()
+        again = [app.test_client().post('/api/commentary/stream', json={'game_id': 'g1', 'play_id': 8}).get_json() for _ in range(3)]
+        time.sleep(0.1)
+        assert len(stub.calls) == calls + 1
+        assert not first['shared'] and all(r['shared'] and r['stream_id'] == first['stream_id'] for r in again)
+        assert len(viewer.get_received()) == 1 and len(other.get_received()) == 1
+    finally:
+        commentary_routes.commentary_service = saved
+    print("✅ Personalized chunks stayed with their viewer")
+
+
+def main():
+    """Run all streaming commentary tests"""
+    print("🎯 Streaming Commentary Test Suite")
+    print("=" * 50)
+    test_sentence_buffer_waits_for_real_boundaries()
+    test_text_chunks_arrive_before_the_stream_finishes()
+    test_personal_streams_reach_only_their_viewer()
+    print("\n🎉 Streaming commentary tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for the prompt context budget (deduplicated rules, structured state, ranked plays)
+Runs fully offline - prompts are compiled but never sent
+
+Usage:
+    python test_context_budget.py
+    python -m pytest test_context_budget.py
+"""
+
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from config import Config
+from services.context_budget import rank_plays
+from services.prompt_compiler import PromptCompiler
+
+
+GAME = {
+    'game': {
+        'teams': {'away': {'name': 'Los Angeles Lakers'}, 'home': {'name': 'Portland Trail Blazers'}},
+        'score': {'away': 88, 'home': 90},
+        'clock': '02:31',
+        'status': 'InProgress'
+    },
+    'top_scorers': [{'name': 'Davis', 'points': 20}, {'name': 'Simons', 'points': 18}]
+}
+
+PERSONA = {'style': 'energetic and enthusiastic', 'tone': 'exciting and dramatic'}
+
+LOUD_FAN = {
+    'preferences': {'energyLevel': 90, 'comedyLevel': 80, 'statFocus': 80, 'biasLevel': 80, 'favoriteTeam': 'Lakers'},
+    'interests': ['defense'],
+    'fantasy_info': 'Owns Knecht',
+    'customInstructions': 'Call LeBron the King'
+}
+
+PLAYS = [
+    {'clock': '06:10', 'team': 'POR', 'description': 'Simons Driving Layup (18 PTS)', 'points': 2},
+    {'clock': '05:44', 'team': 'LAL', 'description': 'Knecht 26\' 3PT Jump Shot (9 PTS)', 'points': 3},
+    {'clock': '05:20', 'team': 'POR', 'description': 'Clingan Defensive Rebound', 'points': 0},
+    {'clock': '04:58', 'team': 'LAL', 'description': 'SUB: Reaves FOR James', 'points': 0},
+    {'clock': '04:31', 'team': 'POR', 'description': 'Grant Personal Foul', 'points': 0},
+    {'clock': '03:05', 'team': 'LAL', 'description': 'Davis 2\' Dunk (20 PTS) (Reaves 5 AST)', 'points': 2},
+    {'clock': '02:40', 'team': 'POR', 'description': 'Henderson Bad Pass Turnover', 'points': 0},
+]
+
+
+def test_commentary_prompt_is_deduplicated_and_reports_savings():
+    """Budgeted commentary keeps the play, score and user rules but drops repeated instructions"""
+    print("🧮 Testing commentary budget...")
+    compiler = PromptCompiler()
+    plain = compiler.compile_commentary(GAME, PERSONA, "Knecht 26' 3PT Jump Shot (9 PTS)", None)
+    assert plain.tokens['total'] <= Config.PROMPT_TOKEN_BUDGET_COMMENTARY
+    assert plain.tokens_saved > plain.tokens['total']  # more than half of the old prompt was repetition
+    assert 'EXAMPLES' not in plain.text and 'MAKE IT EXPLOSIVE' not in plain.text
+    assert 'Knecht 26' in plain.text and 'Los Angeles Lakers 88 @ Portland Trail Blazers 90' in plain.text and 'Davis 20' in plain.text
+
+    loud = compiler.compile_commentary(GAME, PERSONA, "Knecht 26' 3PT Jump Shot (9 PTS)", LOUD_FAN)
+    assert loud.tokens['total'] <= Config.PROMPT_TOKEN_BUDGET_COMMENTARY
+    assert "Call LeBron the King" in loud.text and 'Owns Knecht' in loud.text
+    assert loud.reductions == ['examples']
+
+    stats = compiler.stats()['commentary']
+    assert stats['tokens_saved'] == plain.tokens_saved + loud.tokens_saved and stats['budget_reductions'] == {'examples': 1}
+    print(f"✅ Saved {plain.tokens_saved} and {loud.tokens_saved} tokens without losing the play or the user's rules")
+
+
+def test_recent_plays_are_ranked_and_trimmed():
+    """Plays the question is about survive trimming; the rest go by significance and recency"""
+    print("\n🏀 Testing recent play ranking...")
+    kept = rank_plays(PLAYS, "How many points does Knecht have?", 2)
+    assert [p['clock'] for p in kept] == ['05:44', '03:05']  # Knecht's three, then the dunk; game order kept
+    assert rank_plays(PLAYS, "score?", 0) == []
+
+    compiler = PromptCompiler()
+    game_ctx = {
+        'scoreboard': {'home': 'POR', 'away': 'LAL', 'home_score': 90, 'away_score': 88, 'quarter': '4', 'clock': '02:31'},
+        'leaders': {'home': {'name': 'Simons', 'points': 18}, 'away': {'name': 'Davis', 'points': 20}},
+        'recent_plays': PLAYS,
+    }
+    prompt = compiler.compile_voice("How many points does Knecht have?", {'description': 'Energetic commentator', 'style': 'energetic'}, LOUD_FAN, game_ctx)
+    assert prompt.tokens['total'] <= Config.PROMPT_TOKEN_BUDGET_VOICE and prompt.tokens_saved > 0
+    assert 'Knecht 26' in prompt.text and 'LAL 88 @ POR 90 | Q4 02:31' in prompt.text
+    assert 'SUB: Reaves' not in prompt.text
+    print("✅ Voice prompts carry the most relevant plays under budget")
+
+
+def main():
+    """Run all context budget tests"""
+    print("🎯 Context Budget Test Suite")
+    print("=" * 50)
+    test_commentary_prompt_is_deduplicated_and_reports_savings()
+    test_recent_plays_are_ranked_and_trimmed()
+    print("\n🎉 Context budget tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for the local fake Gemini and ElevenLabs servers
+Runs fully offline - the real genai client and TTSService talk to in-process fakes
+
+Usage:
+    python test_fake_services.py
+    python -m pytest test_fake_services.py
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from config import Config
+from fakes import FaultProfile, start_fake_services
+from services.audio_utils import mp3_duration
+from services.gemini_client import GeminiClient
+from services.tts_service import TTSService
+
+
+def _point_config_at(services):
+    saved = {k: getattr(Config, k) for k in ('GEMINI_API_ENDPOINT', 'GEMINI_API_KEY', 'ELEVENLABS_BASE_URL', 'ELEVENLABS_API_KEY')}
+    Config.GEMINI_API_ENDPOINT = services.gemini_url
+    Config.GEMINI_API_KEY = 'fake-key'
+    Config.ELEVENLABS_BASE_URL = services.elevenlabs_url
+    Config.ELEVENLABS_API_KEY = 'fake-key'
+    return saved
+
+
+def test_gemini_fake_serves_real_client():
+    """generate_content (plain and streamed) and 429 injection through the genai REST transport"""
+    print("🤖 Testing fake Gemini...")
+    services = start_fake_services(gemini_profile=FaultProfile(latency_ms=20, tokens_per_second=1000))
+    saved = _point_config_at(services)
+    try:
+        client = GeminiClient(hedge=False)
+        prompt = 'Raw Play-by-Play Event: "Koloko 4\' Cutting Dunk Shot (2 PTS)"\n'
+        assert 'Koloko' in client.generate_content(prompt).text
+        chunks = [chunk.text for chunk in client.generate_content(prompt, stream=True)]
+        assert len(chunks) > 1 and 'Koloko' in ''.join(chunks)
+
+        services.gemini_profile.update(error_rate_429=1.0)
+        try:
+            client.generate_content(prompt)
+            assert False, "expected an injected 429"
+        except Exception as e:
+            assert '429' in str(e) and 'quota' in str(e)
+    finally:
+        for key, value in saved.items():
+            setattr(Config, key, value)
+        services.shutdown()
+    print("✅ Fake Gemini answers the real client and injects quota errors")
+
+
+def test_elevenlabs_fake_returns_playable_mp3():
+    """TTSService writes a synthetic MP3 whose length tracks the text"""
+    print("\n🔊 Testing fake ElevenLabs...")
+    services = start_fake_services(elevenlabs_profile=FaultProfile(latency_ms=10, tokens_per_second=5000))
+    saved = _point_config_at(services)
+    try:
+        tts = TTSService()
+        started = time.monotonic()
+        url = tts.generate_audio("Knecht buries the three from the corner!", 'passionate')
+        assert url and time.monotonic() - started < 2
+        path = os.path.join(tts.audio_cache.directory, os.path.basename(url))
+        with open(path, 'rb') as f:
+            assert 2.0 < mp3_duration(f.read()) < 3.5
+        os.remove(path)
+        assert len(tts.list_voices()) == 4
+    finally:
+        for key, value in saved.items():
+            setattr(Config, key, value)
+        services.shutdown()
+    print("✅ Fake ElevenLabs returns timed silent audio")
+
+
+def main():
+    """Run all fake service tests"""
+    print("🎯 Fake Services Test Suite")
+    print("=" * 50)
+    test_gemini_fake_serves_real_client()
+    test_elevenlabs_fake_returns_playable_mp3()
+    print("\n🎉 Fake service tests completed!")
+
+
+if __name__ == "__main__":
+    main()
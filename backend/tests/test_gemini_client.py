@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared Gemini client (concurrency limit, deadlines, hedging)
+Runs fully offline with a stub model (no Gemini calls)
+
+Usage:
+    python test_gemini_client.py
+    python -m pytest test_gemini_client.py
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline for tests collected after this one
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from services.gemini_client import GeminiClient, GeminiTimeout
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Sleeps for the next scripted delay; tracks peak concurrency"""
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    def generate_content(self, contents, generation_config=None, request_options=None, stream=False):
+        with self.lock:
+            self.calls += 1
+            delay = self.delays.pop(0) if self.delays else 0.01
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(delay)
+        with self.lock:
+            self.active -= 1
+        return StubResponse(f"answer after {delay}s")
+
+
+def _client(model, **kwargs):
+    client = GeminiClient(model_name='stub', **kwargs)
+    client._configured = True
+    client._models['stub'] = model
+    return client
+
+
+def test_concurrency_is_bounded():
+    """No more than max_concurrency calls reach the model at once"""
+    print("🚧 Testing concurrency limit...")
+    model = StubModel([0.05] * 12)
+    client = _client(model, max_concurrency=3, timeout=5, hedge=False)
+    threads = [threading.Thread(target=client.generate_content, args=("hi",)) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert model.calls == 12 and model.peak <= 3
+    assert client.stats()['in_flight'] == 0 and client.stats()['queued'] == 0
+    print("✅ Concurrency stays within the limit")
+
+
+def test_deadline_raises_instead_of_blocking():
+    """A call slower than its deadline raises GeminiTimeout on time"""
+    print("\n⏱️  Testing deadlines...")
+    client = _client(StubModel([1.0]), max_concurrency=2, timeout=0.2, hedge=False)
+    started = time.monotonic()
+    try:
+        client.generate_content("hi")
+        assert False, "expected GeminiTimeout"
+    except GeminiTimeout:
+        pass
+    assert time.monotonic() - started < 0.5
+    assert client.stats()['timeouts'] == 1
+    print("✅ Slow calls time out instead of holding the worker")
+
+
+def test_hedge_wins_over_slow_primary():
+    """After enough samples, a call slower than p95 is hedged and the hedge answers"""
+    print("\n🏇 Testing hedged requests...")
+    model = StubModel([0.01] * 20 + [1.0, 0.01])
+    client = _client(model, max_concurrency=4, timeout=3, hedge=True)
+    for _ in range(20):
+        client.generate_content("warm up")
+    started = time.monotonic()
+    response = client.generate_content("slow one")
+    assert response.text == "answer after 0.01s"
+    assert time.monotonic() - started < 0.8
+    assert client.stats()['hedges'] == 1 and client.stats()['hedge_wins'] == 1
+    print("✅ Hedge returned before the slow primary")
+
+
+def test_untracked_calls_stay_out_of_the_hedge_window():
+    """Calls made with record_latency=False (audio) don't move the p95 text calls hedge after"""
+    print("\n🎧 Testing the latency window...")
+    model = StubModel([0.01] * 3 + [0.3])
+    client = _client(model, max_concurrency=2, timeout=3, hedge=False)
+    for _ in range(3):
+        client.generate_content("text")
+    client.generate_content(["transcribe", b"audio"], hedge=False, record_latency=False)
+    assert model.calls == 4 and len(client._latencies) == 3
+    assert client.stats()['latency_p95_ms'] < 100
+    print("✅ Audio calls left out of the hedge window")
+
+
+def main():
+    """Run all Gemini client tests"""
+    print("🎯 Gemini Client Test Suite")
+    print("=" * 50)
+    test_concurrency_is_bounded()
+    test_deadline_raises_instead_of_blocking()
+    test_hedge_wins_over_slow_primary()
+    test_untracked_calls_stay_out_of_the_hedge_window()
+    print("\n🎉 Gemini client tests completed!")
+
+
+if __name__ == "__main__":
+    main()
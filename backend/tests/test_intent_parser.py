@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled intent parser and the no-model voice fast path
+Runs fully offline against the in-memory storage backend
+
+Usage:
+    python test_intent_parser.py
+    python -m pytest test_intent_parser.py
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from database import db
+from services.intent_parser import IntentParser
+from services.latency import latency
+from services.voice_service import VoiceService
+
+
+class _NoModel:
+    """Stands in for the Gemini client; any call means the fast path was skipped"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, *args, **kwargs):
+        self.calls += 1
+        raise RuntimeError("model should not be called")
+
+
+def test_parse_structured_questions():
+    """Whole-question templates give confident intents with slots"""
+    print("🧭 Testing structured questions...")
+    parser = IntentParser()
+    cases = {
+        "What's the score?": ('score', {}),
+        "Hey, who's winning right now": ('score', {}),
+        "How many boards does LeBron James have?": ('player_stats', {'player': 'lebron james', 'stat': 'rebounds'}),
+        "how many dimes for Reaves tonight": ('player_stats', {'player': 'reaves', 'stat': 'assists'}),
+        "Simons' points": ('player_stats', {'player': 'simons', 'stat': 'points'}),
+        "What are Knecht's stats?": ('player_stats', {'player': 'knecht'}),
+        "How close is Davis to a triple double?": ('triple_double', {'player': 'davis'}),
+        "What quarter is it?": ('game_status', {}),
+    }
+    for question, (intent, slots) in cases.items():
+        parsed = parser.parse(question)
+        assert parsed['intent'] == intent, (question, parsed)
+        assert parsed['slots'] == slots, (question, parsed)
+        assert parsed['confidence'] == IntentParser.STRUCTURED_CONFIDENCE, (question, parsed)
+    print("✅ Structured questions parsed")
+
+
+def test_open_ended_questions_go_to_the_model():
+    """Anything beyond a template is low confidence or no intent at all"""
+    print("🤔 Testing open-ended questions...")
+    parser = IntentParser()
+    assert parser.parse("Why do the Lakers keep going small in the fourth?")['confidence'] < 0.9
+    assert parser.parse("Tell me a joke about the refs")['intent'] is None
+    keyword = parser.parse("What's the score and why are the Blazers collapsing?")
+    assert keyword['intent'] == 'score' and keyword['confidence'] == IntentParser.KEYWORD_CONFIDENCE
+    assert parser.stats['open_ended'] == 2 and parser.stats['keyword'] == 1
+    print("✅ Open-ended questions left to the model")
+
+
+def test_parse_is_fast():
+    """Parsing stays well under a millisecond per question"""
+    print("⏱️ Testing parse speed...")
+    parser = IntentParser()
+    questions = ["How many points does LeBron have?", "Why is the bench so quiet tonight?", "who's winning"] * 1000
+    started = time.perf_counter()
+    for question in questions:
+        parser.parse(question)
+    per_question = (time.perf_counter() - started) / len(questions)
+    print(f"   {per_question * 1e6:.1f} µs per question")
+    assert per_question < 0.001
+    print("✅ Parse speed ok")
+
+
+def test_fast_path_answers_without_the_model():
+    """Structured questions are answered from stored game state; the rest still reach the model"""
+    print("⚡ Testing the voice fast path...")
+    game_id = 'intent-fast-path'
+    db.games.insert_one({
+        'game_id': game_id, 'status': 'InProgress', 'clock': '4:12',
+        'score': {'home': 90, 'away': 88},
+        'teams': {'home': {'name': 'POR'}, 'away': {'name': 'LAL'}}
+    })
+    db.statlines.insert_one({
+        'game_id': game_id, 'player_id': 3, 'name': 'LeBron James', 'team': 'LAL',
+        'points': 24, 'rebounds': 9, 'assists': 8
+    })
+
+    service = VoiceService()
+    model = _NoModel()
+    service.model = model
+    service.tts_service.generate_audio = lambda *args, **kwargs: None
+    latency.reset()
+
+    assert service.process_query("How many rebounds does LeBron have?", game_id)['text'] == "LeBron James has 9 rebounds."
+    assert service.process_query("what's the score", game_id)['text'] == "The score is LAL 88, POR 90."
+    assert "1 rebounds, 2 assists" in service.process_query("How close is James to a triple-double?", game_id)['text']
+    assert model.calls == 0
+
+    # Unknown players and open-ended questions fall through to the model
+    service.process_query("How many points does Jokic have?", game_id)
+    service.process_query("Why can't the Lakers guard the corner three?", game_id)
+    assert model.calls == 2
+
+    labels = latency.stats()['voice.fast_path']['by_tags']
+    assert 'intent=player_stats,outcome=answered' in labels and 'intent=open_ended,outcome=model' in labels, labels
+    print("✅ Fast path skipped the model for stat questions")
+
+
+def main():
+    """Run all intent parser tests"""
+    print("🎯 Intent Parser Test Suite")
+    print("=" * 50)
+    test_parse_structured_questions()
+    test_open_ended_questions_go_to_the_model()
+    test_parse_is_fast()
+    test_fast_path_answers_without_the_model()
+    print("\n🎉 Intent parser tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for per-stage latency spans and the internal stats endpoint
+Runs fully offline with a stub model and TTS (no Gemini/ElevenLabs calls)
+
+Usage:
+    python test_latency.py
+    python -m pytest test_latency.py
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from flask import Flask
+from config import Config
+from storage import MemoryClient
+from services.commentary_service import CommentaryService
+from services.latency import LatencyRecorder, latency
+from services.model_router import ModelRouter
+from services.response_cache import response_cache
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class SlowModel:
+    def generate_content(self, prompt, generation_config=None):
+        time.sleep(0.05)
+        return StubResponse("Knecht from downtown!")
+
+
+class StubTTS:
+    def generate_audio(self, text, persona, voice_id=None, language=None):
+        return "/static/audio/stub.mp3"
+
+
+def test_spans_build_tagged_percentiles():
+    """Spans land in per-tag series; tags set inside the block and errors are kept"""
+    print("⏱️  Testing spans...")
+    recorder = LatencyRecorder(max_samples=100)
+    for ms in range(1, 101):
+        recorder.observe('model', ms / 1000, persona='nerdy')
+    with recorder.span('cache', persona='nerdy') as span:
+        span['cache'] = 'hit'
+    try:
+        with recorder.span('model', persona='raw'):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+
+    stats = recorder.stats()
+    nerdy = stats['model']['by_tags']['persona=nerdy']
+    assert nerdy['count'] == 100 and nerdy['p50_ms'] == 51.0 and nerdy['p95_ms'] == 96.0 and nerdy['p99_ms'] == 100.0
+    assert stats['model']['all']['count'] == 101
+    assert 'outcome=error,persona=raw' in stats['model']['by_tags']
+    assert 'cache=hit,persona=nerdy' in stats['cache']['by_tags']
+    print("✅ Percentiles per stage and tag")
+
+
+def test_commentary_stages_and_stats_endpoint():
+    """A generated line records every stage, play-to-audio latency, and shows up on /api/stats"""
+    print("\n📊 Testing pipeline instrumentation...")
+    response_cache.clear()
+    latency.reset()
+    service = CommentaryService()
+    service.db = MemoryClient().sports_commentator
+    service.game_service.get_game_summary = lambda game_id: None
+    service.tts_service = StubTTS()
+    service.model = SlowModel()
+    service.router = ModelRouter()
+
+    service.generate_commentary('g1', persona='passionate', play_description="Knecht 26' 3PT Jump Shot (9 PTS)", received_at=time.time() - 1.0)
+    service.generate_commentary('g1', persona='passionate', play_description="Knecht 26' 3PT Jump Shot (9 PTS)")
+
+    stages = latency.stats()
+    for stage in ('commentary.context', 'commentary.cache_lookup', 'commentary.prompt', 'commentary.model', 'commentary.tts', 'commentary.store', 'commentary.total'):
+        assert stage in stages, stage
+    assert stages['commentary.model']['all']['p50_ms'] >= 50
+    assert stages['commentary.play_to_audio']['all']['p50_ms'] >= 1000
+    totals = stages['commentary.total']['by_tags']
+    assert set(totals) == {'cache=miss,persona=passionate,tier=full', 'cache=hit,persona=passionate,tier=cache'}
+
+    from routes.stats_routes import stats_bp
+    app = Flask(__name__)
+    app.register_blueprint(stats_bp, url_prefix='/api/stats')
+    client = app.test_client()
+    saved = Config.STATS_TOKEN
+    try:
+        # Closed when no token is configured, and to requests without the right one
+        Config.STATS_TOKEN = None
+        assert client.get('/api/stats/').status_code == 403
+        Config.STATS_TOKEN = 'secret'
+        assert client.get('/api/stats/', headers={'X-Stats-Token': 'wrong'}).status_code == 403
+
+        headers = {'X-Stats-Token': 'secret'}
+        body = client.get('/api/stats/', headers=headers).get_json()
+        assert body['success'] and 'commentary.total' in body['latency']
+        assert {'gemini', 'model_router', 'prompt_compiler', 'response_cache', 'commentary_fanout'} <= set(body)
+        only_commentary = client.get('/api/stats/latency?stage=commentary.model', headers=headers).get_json()['latency']
+        assert list(only_commentary) == ['commentary.model']
+    finally:
+        Config.STATS_TOKEN = saved
+    print("✅ Stages, play-to-audio and the stats endpoint are populated")
+
+
+def main():
+    """Run all latency tests"""
+    print("🎯 Latency Instrumentation Test Suite")
+    print("=" * 50)
+    test_spans_build_tagged_percentiles()
+    test_commentary_stages_and_stats_endpoint()
+    print("\n🎉 Latency tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline local TTS backend (no ElevenLabs key or network)
+Runs fully offline against a temporary audio cache directory
+
+Usage:
+    python test_local_tts.py
+    python -m pytest test_local_tts.py
+"""
+
+import sys
+import os
+import logging
+import shutil
+import tempfile
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from flask import Flask
+from config import Config
+from services.audio_cache import AudioCache
+from services.audio_utils import iter_mp3_frames, mp3_duration, parse_frame_header
+from services import local_tts
+from services.local_tts import LocalTTSBackend
+from services.tts_service import ElevenLabsBackend, TTSService, get_tts_backend
+
+
+def test_backend_selection():
+    """auto falls back to the local backend only when no ElevenLabs key is configured"""
+    print("🔌 Testing backend selection...")
+    saved = (Config.TTS_BACKEND, Config.ELEVENLABS_API_KEY)
+    try:
+        Config.TTS_BACKEND, Config.ELEVENLABS_API_KEY = 'auto', None
+        assert isinstance(get_tts_backend(), LocalTTSBackend)
+        Config.ELEVENLABS_API_KEY = 'key'
+        assert isinstance(get_tts_backend(), ElevenLabsBackend)
+        Config.TTS_BACKEND = 'local'
+        assert isinstance(get_tts_backend(), LocalTTSBackend)
+        Config.TTS_BACKEND, Config.ELEVENLABS_API_KEY = 'elevenlabs', None
+        assert TTSService().generate_audio("No key, no audio", 'nerdy') is None
+    finally:
+        Config.TTS_BACKEND, Config.ELEVENLABS_API_KEY = saved
+    print("✅ TTS_BACKEND picks the synthesizer")
+
+
+def test_local_backend_runs_the_audio_pipeline():
+    """Clips, sentence splitting, streaming, output formats and serving all work without a provider"""
+    print("\n🔊 Testing local synthesis end to end...")
+    with tempfile.TemporaryDirectory() as directory:
+        backend = LocalTTSBackend()
+        backend.espeak = None  # deterministic output whatever is installed
+        tts = TTSService(backend=backend)
+        tts.audio_cache = AudioCache(directory=directory)
+
+        text = "Knecht buries the three from the corner!"
+        url = tts.generate_audio(text, 'passionate')
+        with open(os.path.join(directory, os.path.basename(url)), 'rb') as f:
+            audio = f.read()
+        assert abs(mp3_duration(audio) - len(text) / Config.LOCAL_TTS_CHARACTERS_PER_SECOND) < 0.1
+        assert tts.generate_audio(text, 'passionate') == url and tts.audio_cache.stats()['writes'] == 1
+
+        long_text = ' '.join([text, "Portland calls timeout to stop a seven to nothing Lakers run.", "Davis checks back in for the stretch."] * 2)
+        chunks, cache = tts.stream_audio(long_text, 'nerdy')
+        streamed = b''.join(chunks)
+        assert cache == 'miss' and len(list(iter_mp3_frames(streamed))) > 0
+        assert tts.stream_audio(long_text, 'nerdy')[1] == 'hit'
+
+        low = tts.generate_audio(text, 'passionate', output_format='mp3_44100_32')
+        with open(os.path.join(directory, os.path.basename(low)), 'rb') as f:
+            assert parse_frame_header(f.read(4))[1] == 32
+        assert tts.generate_audio(text, 'passionate', output_format='opus_48000_32') is None  # needs espeak + ffmpeg
+        assert len(tts.list_voices()) == len(tts.voice_configs)
+
+        from routes import audio_routes
+        saved_cache = audio_routes.audio_cache
+        audio_routes.audio_cache = tts.audio_cache
+        try:
+            app = Flask(__name__)
+            app.register_blueprint(audio_routes.audio_bp, url_prefix=Config.AUDIO_URL_PREFIX)
+            partial = app.test_client().get(url, headers={'Range': 'bytes=0-1'})
+            assert partial.status_code == 206 and partial.data == audio[:2]
+            partial.close()
+        finally:
+            audio_routes.audio_cache = saved_cache
+    print(f"✅ {mp3_duration(audio):.1f}s clip synthesized, cached, streamed and served offline")
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class _OfflineBackend:
+    name = 'offline-lab'
+
+    def available(self):
+        return False
+
+
+def test_silence_and_unavailable_backends_are_reported():
+    """Silent local output is called out, and an unavailable backend is logged under its own name"""
+    print("\n📣 Testing backend warnings...")
+    records = _Records()
+    logging.getLogger('services').addHandler(records)
+    saved_which = shutil.which
+    try:
+        local_tts.shutil.which = lambda name: None
+        assert LocalTTSBackend().engine == 'silence'
+        assert any('SILENT' in message for message in records.messages)
+
+        records.messages.clear()
+        tts = TTSService(backend=_OfflineBackend())
+        assert tts.generate_audio("Timeout on the floor", 'nerdy') is None
+        assert tts.stream_audio("Timeout on the floor", 'nerdy') is None
+        assert records.messages == ["TTS backend 'offline-lab' is unavailable"] * 2
+    finally:
+        local_tts.shutil.which = saved_which
+        logging.getLogger('services').removeHandler(records)
+    print("✅ Silent output and the unavailable backend named in the logs")
+
+
+def main():
+    """Run all local TTS tests"""
+    print("🎯 Local TTS Test Suite")
+    print("=" * 50)
+    test_backend_selection()
+    test_local_backend_runs_the_audio_pipeline()
+    test_silence_and_unavailable_backends_are_reported()
+    print("\n🎉 Local TTS tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for the quota-aware commentary model router
+Runs fully offline with a stub model and TTS (no Gemini/ElevenLabs calls)
+
+Usage:
+    python test_model_router.py
+    python -m pytest test_model_router.py
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from storage import MemoryClient
+from services.commentary_service import CommentaryService
+from services.model_router import ModelRouter, classify_error
+from services.response_cache import response_cache
+
+
+QUOTA = Exception("429 POST /v1beta/models/gemini-1.5-flash:generateContent: Resource has been exhausted (e.g. check quota).")
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class ThrottledModel:
+    """Rejects full prompts with a 429 while quota is exhausted; compressed prompts still fit"""
+
+    def __init__(self):
+        self.prompts = []
+        self.reject_all = False
+
+    def generate_content(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        if self.reject_all or 'Raw Play-by-Play Event' in prompt:
+            raise QUOTA
+        return StubResponse("Ayton slams it home!")
+
+
+class StubTTS:
+    def generate_audio(self, text, persona, voice_id=None, language=None):
+        return None
+
+
+def test_steps_down_and_recovers():
+    """Quota errors open a tier; after the cooldown one probe restores it"""
+    print("🚦 Testing tier step-down and recovery...")
+    router = ModelRouter(cooldown_seconds=0.05, min_samples=3, max_error_rate=0.5, tokens_per_minute=0)
+    assert classify_error(QUOTA) == 'quota' and classify_error(TimeoutError("timed out")) == 'timeout'
+
+    assert router.choose() == 'full'
+    router.record_failure('full', QUOTA)
+    assert router.choose() == 'compressed'
+    router.record_failure('compressed', QUOTA)
+    assert router.choose() == 'template'
+
+    time.sleep(0.06)
+    assert router.choose() == 'full'           # the probe
+    assert router.choose() == 'compressed'     # everyone else waits on the probe
+    router.record_success('full', 0.3, 500)
+    assert router.choose() == 'full'
+    stats = router.stats()
+    assert stats['step_downs'] == 2 and stats['recoveries'] == 1 and stats['tiers']['full']['state'] == 'closed'
+
+    # Sustained errors and slow answers trip a tier too
+    router = ModelRouter(cooldown_seconds=60, min_samples=3, max_error_rate=0.5, max_p95_seconds=4, tokens_per_minute=0)
+    for _ in range(3):
+        router.record_failure('full', RuntimeError("500 Internal"))
+    assert router.stats()['tiers']['full']['state'] == 'open'
+    for _ in range(3):
+        router.record_success('compressed', 9.0, 100)
+    assert router.choose() == 'template'
+    print("✅ Tiers step down on quota, errors and latency, and recover after a probe")
+
+
+def test_token_budget_prefers_compressed_prompts():
+    """Full prompts stop at 80% of the token budget, compressed ones at 100%"""
+    print("\n🪙 Testing token budget...")
+    router = ModelRouter(tokens_per_minute=1000, window_seconds=60)
+    router.record_success('full', 0.5, 850)
+    assert router.choose() == 'compressed'
+    router.record_success('compressed', 0.5, 200)
+    assert router.choose() == 'template'
+    assert router.stats()['tokens_in_window'] == 1050
+    print("✅ Token spend steps down before the quota is hit")
+
+
+def test_commentary_survives_throttling():
+    """Lines keep coming from the model on compressed prompts and report their tier"""
+    print("\n🎙️  Testing routed commentary...")
+    response_cache.clear()
+    service = CommentaryService()
+    service.db = MemoryClient().sports_commentator
+    service.game_service.get_game_summary = lambda game_id: None
+    service.tts_service = StubTTS()
+    service.model = ThrottledModel()
+    service.router = ModelRouter(cooldown_seconds=60)
+
+    line = service.generate_commentary('g1', persona='passionate', play_description="Ayton 2' Driving Dunk (8 PTS)")
+    assert line['tier'] == 'compressed' and line['text'] == "Ayton slams it home!" and not line.get('fallback')
+    assert len(service.model.prompts) == 2  # full prompt rejected, compressed retried at once
+    assert service.db.commentary.find_one({'game_id': 'g1'})['tier'] == 'compressed'
+
+    # Next play goes straight to the compressed tier
+    service.generate_commentary('g1', persona='nerdy', play_description="Murray 25' 3PT Jump Shot (11 PTS)")
+    assert len(service.model.prompts) == 3
+
+    service.model.reject_all = True
+    line = service.generate_commentary('g1', persona='passionate', play_description="Koloko STEAL (1 STL)")
+    assert line['tier'] == 'template' and line['fallback'] and 'Koloko' in line['text']
+    assert service.router.stats()['served'] == {'full': 0, 'compressed': 2, 'template': 1, 'cache': 0}
+    print("✅ Throttled model degrades to compressed prompts, then templates")
+
+
+def main():
+    """Run all model router tests"""
+    print("🎯 Model Router Test Suite")
+    print("=" * 50)
+    test_steps_down_and_recovers()
+    test_token_budget_prefers_compressed_prompts()
+    test_commentary_survives_throttling()
+    print("\n🎉 Model router tests completed!")
+
+
+if __name__ == "__main__":
+    main()
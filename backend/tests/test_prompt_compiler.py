@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Test script for the fragment-based prompt compiler
+Runs fully offline - prompts are compiled but never sent
+
+Usage:
+    python test_prompt_compiler.py
+    python -m pytest test_prompt_compiler.py
+"""
+
+import sys
+import os
+from datetime import datetime
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from config import Config
+from services import prompt_compiler as prompt_compiler_module
+from services.prompt_compiler import PromptCompiler, preferences_hash
+
+
+NOW = datetime(2025, 4, 13, 19, 42, 5)
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW
+
+
+GAMES = [
+    {
+        'game': {
+            'teams': {'away': {'name': 'Los Angeles Lakers'}, 'home': {'name': 'Portland Trail Blazers'}},
+            'score': {'away': 88, 'home': 90}, 'clock': '02:31', 'status': 'InProgress'
+        },
+        'top_scorers': [{'name': 'Davis', 'points': 20}, {'name': 'Simons', 'points': 18}, {'name': 'Grant', 'points': 12}]
+    },
+    # Stored game docs had no teams field and may have no leaders yet
+    {'game': {'score': {'away': 0, 'home': 2}}, 'top_scorers': []},
+]
+
+PERSONAS = [
+    {'style': 'energetic and enthusiastic', 'tone': 'exciting and dramatic'},
+    {'style': 'analytical and data-driven', 'tone': 'professional and statistical'},
+]
+
+CONTEXTS = [
+    {},
+    {'preferences': {}},
+    {
+        'preferences': {'energyLevel': 90, 'comedyLevel': 80, 'statFocus': 80, 'biasLevel': 80, 'favoriteTeam': {'name': 'Lakers'}},
+        'interests': ['defense', 'rookies'],
+        'fantasy_info': 'Owns Knecht',
+        'customInstructions': 'Call LeBron the King'
+    },
+    {'preferences': {'energyLevel': 65, 'comedyLevel': 45, 'statFocus': 50, 'biasLevel': 50, 'favoriteTeam': 'Blazers'}},
+    {'preferences': {'energyLevel': 20, 'comedyLevel': 10, 'statFocus': 10, 'biasLevel': 10, 'favoriteTeam': 'Lakers'}},
+]
+
+
+def _baseline_commentary_prompt(game_summary, persona_config, play_description, user_context, current_time):
+    """CommentaryService._create_commentary_prompt as it was before the compiler (logging removed)"""
+    game = game_summary['game']
+    top_scorers = game_summary['top_scorers']
+
+    if 'teams' in game:
+        away_team = game['teams']['away']['name']
+        home_team = game['teams']['home']['name']
+    else:
+        away_team = 'Los Angeles Lakers'
+        home_team = 'Portland Trail Blazers'
+
+    prompt = f"""You are an NBA sports commentator with a {persona_config['style']} style.
+
+Current Time: {current_time}
+CRITICAL TEMPORAL RULE: You are a LIVE commentator at {game.get('clock', '12:00')} in the game. You ONLY know what has happened up to this exact moment. 
+
+**FOR SPONTANEOUS COMMENTARY - ABSOLUTELY FORBIDDEN:**
+- NO predictions about future performance (e.g., "will get a triple-double", "chances of achieving")
+- NO speculation about what might happen later
+- NO mentioning potential outcomes or "if this continues" scenarios
+- NO historical trend analysis to predict future events
+
+**ONLY ALLOWED:**
+- Comment on what just happened in THIS play
+- React to current stats and performance SO FAR
+- Describe the action that already occurred
+
+**NOTE:** This is automatic commentary, not a response to user questions. Stay present-focused!
+
+Game Context:
+- {away_team} vs {home_team}
+- Score: {away_team} {game['score']['away']} - {home_team} {game['score']['home']}
+- Clock: {game.get('clock', '12:00')}
+- Status: {game.get('status', 'InProgress')}
+- Game time status: Only information up to {game.get('clock', '12:00')} is available"""
+
+    if top_scorers:
+        prompt += "\n\nTop Performers:"
+        for scorer in top_scorers[:2]:
+            name = scorer.get('name', 'Player')
+            points = scorer.get('points', 0)
+            prompt += f"\n- {name}: {points} points"
+
+    if user_context:
+        preferences = user_context.get('preferences', {})
+        if preferences:
+            prompt += "\n\n**MANDATORY USER PREFERENCES - THESE OVERRIDE ALL OTHER INSTRUCTIONS:**"
+
+            if preferences.get('energyLevel') is not None:
+                energy = preferences['energyLevel']
+                if energy >= 80:
+                    prompt += f"\n- MAXIMUM ENERGY ({energy}/100): EXPLOSIVE excitement! Use ALL CAPS for big moments, multiple exclamation points, and high-octane language! THIS IS MANDATORY!"
+                elif energy >= 60:
+                    prompt += f"\n- HIGH ENERGY ({energy}/100): Very enthusiastic! Show genuine excitement with animated descriptions and passionate reactions!"
+                elif energy >= 40:
+                    prompt += f"\n- MODERATE ENERGY ({energy}/100): Balanced excitement with steady engagement."
+                else:
+                    prompt += f"\n- LOW ENERGY ({energy}/100): Calm, measured, analytical approach. Stay composed and factual."
+
+            if preferences.get('comedyLevel') is not None:
+                comedy = preferences['comedyLevel']
+                if comedy >= 70:
+                    prompt += f"\n- HIGH COMEDY ({comedy}/100): Be genuinely funny! Add jokes, puns, witty observations, funny player nicknames, and humorous analogies! NO BORING COMMENTARY ALLOWED!"
+                elif comedy >= 40:
+                    prompt += f"\n- SOME HUMOR ({comedy}/100): Include light humor and playful commentary when appropriate."
+                else:
+                    prompt += f"\n- SERIOUS COMMENTARY ({comedy}/100): Professional, straightforward, no jokes or humor."
+
+            if preferences.get('statFocus') is not None:
+                stats = preferences['statFocus']
+                if stats >= 70:
+                    prompt += f"\n- HEAVY STATS ({stats}/100): Include detailed percentages, historical comparisons, advanced metrics, and analytical breakdowns!"
+                elif stats >= 40:
+                    prompt += f"\n- MODERATE STATS ({stats}/100): Mention key relevant statistics."
+                else:
+                    prompt += f"\n- EMOTION FOCUS ({stats}/100): Emphasize storylines, momentum, and feelings over numbers."
+
+            if preferences.get('biasLevel') is not None and preferences.get('favoriteTeam'):
+                bias = preferences['biasLevel']
+                team = preferences['favoriteTeam'].get('name', 'favorite team') if isinstance(preferences['favoriteTeam'], dict) else preferences['favoriteTeam']
+                if bias >= 70:
+                    prompt += f"\n- STRONG {team.upper()} FAN ({bias}/100): Show clear favoritism! Get EXTRA excited for {team} plays, use 'we/us', be defensive about criticism!"
+                elif bias >= 40:
+                    prompt += f"\n- {team} PREFERENCE ({bias}/100): Show noticeable but restrained favoritism toward {team}."
+                else:
+                    prompt += f"\n- NEUTRAL COVERAGE ({bias}/100): Balanced commentary between teams."
+
+        if user_context.get('interests'):
+            interests = user_context['interests']
+            prompt += f"\n\n**USER'S PRIMARY INTERESTS - ALWAYS PRIORITIZE:** {', '.join(interests)}"
+            prompt += "\n- Frame every comment through the lens of what the user cares about most"
+            prompt += "\n- Use references and examples that connect to their interests"
+
+        if user_context.get('fantasy_info'):
+            prompt += f"\n\n**FANTASY PRIORITY:** {user_context['fantasy_info']}"
+            prompt += "\n- ALWAYS mention fantasy implications for player performances"
+            prompt += "\n- Call out fantasy-relevant stats (points, rebounds, assists, steals, blocks)"
+            prompt += "\n- React to performances from a fantasy owner's perspective"
+
+        if user_context.get('customInstructions'):
+            prompt += f"\n\n**CUSTOM USER INSTRUCTIONS - ABSOLUTE PRIORITY - OVERRIDE EVERYTHING ELSE:**"
+            prompt += f"\n'{user_context['customInstructions']}'"
+            prompt += "\n- These instructions are more important than any other guidelines - follow them exactly!"
+
+    prompt += f"""
+
+Raw Play-by-Play Event: "{play_description}"
+
+Your task: Convert this raw play-by-play line into natural commentary that follows the user's preferences EXACTLY.
+
+**CRITICAL REQUIREMENTS:**
+1. **NO FUTURE PREDICTIONS** - Only comment on what JUST HAPPENED, never predict what will happen
+2. **FOLLOW USER PREFERENCES ABOVE ALL ELSE** - Their settings determine how you respond
+3. **Energy Level**: Match their exact energy setting (high energy = excited, low energy = calm)
+4. **Comedy Level**: Add humor ONLY if their comedy level is high
+5. **Stat Focus**: Include detailed stats ONLY if their stat focus is high
+6. **Team Bias**: Show favoritism ONLY if they have bias toward a team involved
+7. **Fantasy Focus**: Always mention fantasy implications if they have fantasy info
+8. **Custom Instructions**: These override everything else - follow them precisely
+9. **User Interests**: Connect to what they care about most
+
+**STYLE ENFORCEMENT FOR HIGH SETTINGS - ABSOLUTELY MANDATORY:**
+- If Energy ≥ 80: USE CAPS for big moments, multiple exclamation points!!!, explosive adjectives! BE EXPLOSIVE!
+- If Comedy ≥ 70: MUST include puns, jokes, or funny observations - NO BORING COMMENTARY WHATSOEVER!
+- If StatFocus ≥ 70: Include specific numbers, percentages, or comparisons
+
+**FOR THIS USER (Energy={user_context.get('preferences', {}).get('energyLevel', 'unknown')}, Comedy={user_context.get('preferences', {}).get('comedyLevel', 'unknown')}):**
+MAKE IT EXPLOSIVE AND FUNNY! Use caps, jokes, and high energy!
+
+**EXAMPLES OF HIGH ENERGY + HIGH COMEDY STYLE (PRESENT TENSE ONLY):**
+- "BOOM! That three-pointer was SPICIER than my grandma's hot sauce! 🔥"
+- "OH MY GOODNESS! He just COOKED that defender like Sunday dinner!"
+- "WOWZA! That dunk was so nasty it needs a parental advisory warning!"
+- "Murray's got 8 points already - he's COOKING with GAS tonight!"
+- "LeBron just picked up his 3rd assist - the King is DEALING right now!"
+
+**BAD EXAMPLES (NEVER DO THIS):**
+- "If this continues, LeBron will get a triple-double" ❌
+- "Murray's chances of a big game are looking good" ❌
+- "This trend suggests..." ❌
+
+Base persona style: {persona_config['style']} with tone: {persona_config['tone']}
+But ADAPT this persona to match their exact preference settings!
+
+Keep it about 1 max 2 sentences while being authentic to their personalized style.
+
+Commentary:"""
+
+    return prompt
+
+
+def test_unbudgeted_prompt_matches_the_baseline():
+    """With the budget off, compiled commentary prompts are byte-identical to the original renderer"""
+    print("🧬 Testing compiled prompts against the baseline...")
+    saved = (Config.PROMPT_BUDGET_ENABLED, prompt_compiler_module.datetime)
+    Config.PROMPT_BUDGET_ENABLED = False
+    prompt_compiler_module.datetime = FrozenDatetime
+    try:
+        compiler = PromptCompiler()
+        current_time = NOW.strftime("%Y-%m-%d %H:%M:%S")
+        checked = 0
+        for game_summary in GAMES:
+            for persona in PERSONAS:
+                for user_context in CONTEXTS:
+                    play = "Knecht 26' 3PT Jump Shot (9 PTS) (Reaves 2 AST)"
+                    compiled = compiler.compile_commentary(game_summary, persona, play, user_context)
+                    expected = _baseline_commentary_prompt(game_summary, persona, play, user_context, current_time)
+                    assert compiled.text.encode('utf-8') == expected.encode('utf-8'), (persona, user_context)
+                    checked += 1
+    finally:
+        Config.PROMPT_BUDGET_ENABLED, prompt_compiler_module.datetime = saved
+    print(f"✅ {checked} prompts identical to the baseline")
+
+
+def test_preference_fragments_are_cached_by_hash():
+    """A second prompt for the same preferences hash reuses the rendered fragment"""
+    print("\n🗃️ Testing the preference fragment cache...")
+    compiler = PromptCompiler()
+    fan = CONTEXTS[2]
+    same_fan = {**fan, 'user_id': 'someone-else'}  # fields outside the preference section don't change the hash
+    assert preferences_hash(fan) == preferences_hash(same_fan) != preferences_hash(CONTEXTS[3])
+
+    compiler.compile_commentary(GAMES[0], PERSONAS[0], 'Davis dunk', fan)
+    cache = compiler.stats()['preference_cache']
+    assert (cache['hits'], cache['misses'], cache['entries']) == (0, 1, 1)
+
+    compiler.compile_commentary(GAMES[1], PERSONAS[1], 'Simons three', same_fan)
+    cache = compiler.stats()['preference_cache']
+    assert (cache['hits'], cache['misses'], cache['entries']) == (1, 1, 1)
+    assert cache['hit_rate'] == 0.5
+
+    compiler.compile_commentary(GAMES[0], PERSONAS[0], 'Davis dunk', CONTEXTS[3])
+    assert compiler.stats()['preference_cache']['misses'] == 2
+    assert compiler.stats()['commentary']['prompts'] == 3
+    print("✅ Same preferences hash served from the fragment cache")
+
+
+def test_budgeted_prompt_fits_the_token_limit():
+    """Budgeted compiles stay within PROMPT_TOKEN_BUDGET_COMMENTARY, reducing sections as needed"""
+    print("\n📏 Testing the commentary token budget...")
+    saved = (Config.PROMPT_BUDGET_ENABLED, Config.PROMPT_TOKEN_BUDGET_COMMENTARY)
+    Config.PROMPT_BUDGET_ENABLED = True
+    try:
+        compiler = PromptCompiler()
+        for budget in (500, 300):
+            Config.PROMPT_TOKEN_BUDGET_COMMENTARY = budget
+            for user_context in CONTEXTS:
+                compiled = compiler.compile_commentary(GAMES[0], PERSONAS[0], 'Davis blocks Ayton at the rim', user_context)
+                assert compiled.tokens['total'] <= budget, (budget, compiled.tokens, compiled.reductions)
+                assert compiled.tokens['total'] < compiled.baseline_tokens
+        assert compiler.stats()['commentary']['max_tokens'] <= 500
+    finally:
+        Config.PROMPT_BUDGET_ENABLED, Config.PROMPT_TOKEN_BUDGET_COMMENTARY = saved
+    print("✅ Budgeted prompts stay within the token limit")
+
+
+def main():
+    """Run all prompt compiler tests"""
+    print("🎯 Prompt Compiler Test Suite")
+    print("=" * 50)
+    test_unbudgeted_prompt_matches_the_baseline()
+    test_preference_fragments_are_cached_by_hash()
+    test_budgeted_prompt_fits_the_token_limit()
+    print("\n🎉 Prompt compiler tests completed!")
+
+
+if __name__ == "__main__":
+    main()
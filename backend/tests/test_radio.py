@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for per-game radio streams (clips spliced into one live MP3 stream)
+Runs fully offline against the in-memory database and a temporary audio directory
+
+Usage:
+    python test_radio.py
+    python -m pytest test_radio.py
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from flask import Flask
+from config import Config
+from storage import MemoryClient
+from services import radio_service as radio_module
+from services.audio_cache import AudioCache
+from services.audio_utils import iter_mp3_frames, mp3_duration, parse_frame_header, silent_mp3
+
+
+FAST = {'RADIO_POLL_SECONDS': 0.05, 'RADIO_PREBUFFER_SECONDS': 0.5, 'RADIO_IDLE_SECONDS': 0.2}
+
+
+def _bitrates(audio):
+    return [parse_frame_header(frame)[1] for frame in iter_mp3_frames(audio)]
+
+
+def _collect(listener, seconds, into):
+    deadline = time.monotonic() + seconds
+    for chunk in listener:
+        into.append(chunk)
+        if time.monotonic() > deadline:
+            break
+    listener.close()
+
+
+def test_listeners_share_one_spliced_stream():
+    """A new line is picked up from the database, spliced between silence and sent to every listener"""
+    print("📻 Testing shared radio station...")
+    saved = {key: getattr(Config, key) for key in FAST}
+    saved_cache = radio_module.audio_cache
+    for key, value in FAST.items():
+        setattr(Config, key, value)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            radio_module.audio_cache = AudioCache(directory=directory)
+            database = MemoryClient().sports_commentator
+            station = radio_module.RadioStation('g1', 'nerdy', database=database)
+
+            received = [[], []]
+            threads = [threading.Thread(target=_collect, args=(station.listen(), 1.5, into)) for into in received]
+            for thread in threads:
+                thread.start()
+            time.sleep(0.3)
+
+            clip = silent_mp3(0.5, 96)
+            url = radio_module.audio_cache.put('clip', clip)
+            database.commentary.insert_one({'game_id': 'g1', 'persona': 'nerdy', 'timestamp': datetime.now(), 'audio_url': url, 'text': 'Davis slams it home!', 'play_id': '7', 'bucket': 'default', 'shared': True})
+            # Personal lines: a bucketed one, and one from /commentary/emit without a play_id (no bucket stored)
+            database.commentary.insert_one({'game_id': 'g1', 'persona': 'nerdy', 'timestamp': datetime.now(), 'audio_url': url, 'play_id': '7', 'bucket': 'a1b2c3'})
+            database.commentary.insert_one({'game_id': 'g1', 'persona': 'nerdy', 'timestamp': datetime.now(), 'audio_url': url, 'text': 'Roasting the Blazers for you'})
+            database.commentary.insert_one({'game_id': 'g1', 'persona': 'passionate', 'timestamp': datetime.now(), 'audio_url': url})
+            for thread in threads:
+                thread.join()
+
+            streams = [b''.join(chunks) for chunks in received]
+            for audio in streams:
+                bitrates = _bitrates(audio)
+                # Default silence until the line arrived, then the clip and silence in its format
+                assert bitrates[0] == 128 and 96 in bitrates and set(bitrates[bitrates.index(96):]) == {96}
+                assert mp3_duration(audio) < 1.5 + Config.RADIO_PREBUFFER_SECONDS + Config.RADIO_LEAD_SECONDS + 0.3  # paced in real time
+            stats = station.snapshot()
+            assert stats['clips'] == 1 and stats['clip_frames'] == len(list(iter_mp3_frames(clip)))  # spliced once for both
+            assert stats['listeners_total'] == 2 and stats['listeners'] == 0
+
+            deadline = time.monotonic() + 2
+            while station.snapshot()['running'] and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert not station.snapshot()['running']  # stops once nobody is listening
+    finally:
+        for key, value in saved.items():
+            setattr(Config, key, value)
+        radio_module.audio_cache = saved_cache
+    print(f"✅ Two listeners got the same spliced stream ({len(streams[0])} bytes each)")
+
+
+def test_backlog_is_trimmed_to_stay_live():
+    """Lines queued faster than they can be played drop the oldest so the stream stays near real time"""
+    print("\n⏩ Testing backlog trimming...")
+    station = radio_module.RadioStation('g2', 'raw', database=MemoryClient().sports_commentator)
+    for _ in range(10):
+        assert station.enqueue(silent_mp3(5.0)) > 0
+    stats = station.snapshot()
+    assert stats['clips_dropped'] == 10 - int(Config.RADIO_MAX_BACKLOG_SECONDS // 5)
+    assert stats['queued_seconds'] <= Config.RADIO_MAX_BACKLOG_SECONDS
+    assert station.enqueue(b'not audio') == 0
+    print(f"✅ {stats['clips_dropped']} stale lines dropped, {stats['queued_seconds']}s queued")
+
+
+def test_radio_route_streams_mp3():
+    """The route serves a chunked MP3 stream and rejects unknown personas"""
+    print("\n🎧 Testing radio route...")
+    from routes.radio_routes import radio_bp
+    app = Flask(__name__)
+    app.register_blueprint(radio_bp, url_prefix='/api/radio')
+    client = app.test_client()
+    assert client.get('/api/radio/g3', query_string={'persona': 'mystery'}).status_code == 400
+
+    response = client.get('/api/radio/g3', query_string={'persona': 'funny'}, buffered=False)
+    assert response.status_code == 200 and response.mimetype == 'audio/mpeg'
+    first = next(iter(response.response))
+    response.close()
+    assert _bitrates(first) and set(_bitrates(first)) == {128}
+    assert 'funny' in client.get('/api/radio/g3/status').get_json()['stations']
+    radio_module.radio_service.station('g3', 'funny').stop()
+    print("✅ Radio route streams playable frames")
+
+
+def main():
+    """Run all radio tests"""
+    print("🎯 Radio Test Suite")
+    print("=" * 50)
+    test_listeners_share_one_spliced_stream()
+    test_backlog_is_trimmed_to_stay_live()
+    test_radio_route_streams_mp3()
+    print("\n🎉 Radio tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Test script for the two-tier Gemini response cache
+Runs fully offline - the Redis tier is a stub client
+
+Usage:
+    python test_response_cache.py
+    python -m pytest test_response_cache.py
+"""
+
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from services import response_cache as response_cache_module
+from services.response_cache import ResponseCache, response_cache
+
+
+class FakeClock:
+    """Replaces the time module inside the cache so TTLs and backoff can be stepped through"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FailingRedis:
+    """Redis stub whose every call times out"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        raise TimeoutError("redis timed out")
+
+    def setex(self, key, ttl, value):
+        self.calls += 1
+        raise TimeoutError("redis timed out")
+
+
+class DictRedis:
+    """Redis stub backed by a dict"""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value.encode('utf-8')
+
+
+def _with_clock(test):
+    def run():
+        clock = FakeClock()
+        saved = response_cache_module.time
+        response_cache_module.time = clock
+        try:
+            test(clock)
+        finally:
+            response_cache_module.time = saved
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+
+def test_keys_ignore_argument_order():
+    """Keys hash the semantic inputs, not how they were passed"""
+    print("🔑 Testing cache keys...")
+    cache = ResponseCache(ttl_seconds=60, max_entries=4, redis_url='')
+    assert cache.make_key('voice', question='score', persona='a') == cache.make_key('voice', persona='a', question='score')
+    assert cache.make_key('voice', question='score') != cache.make_key('commentary', question='score')
+    print("✅ Keys are canonical")
+
+
+@_with_clock
+def test_lru_eviction(clock):
+    """The least recently used entry is evicted once max_entries is exceeded"""
+    print("\n🧹 Testing LRU eviction...")
+    cache = ResponseCache(ttl_seconds=60, max_entries=2, redis_url='')
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    assert cache.get('a') == 'A'  # 'a' is now the most recently used
+    cache.set('c', 'C')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A' and cache.get('c') == 'C'
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 1
+    print("✅ Least recently used entry evicted")
+
+
+@_with_clock
+def test_ttl_expiry(clock):
+    """Entries are served until their TTL passes, then dropped and counted as expired"""
+    print("\n⏳ Testing TTL expiry...")
+    cache = ResponseCache(ttl_seconds=30, max_entries=4, redis_url='')
+    cache.set('k', 'value')
+    clock.now += 30
+    assert cache.get('k') == 'value'
+    clock.now += 1
+    assert cache.get('k') is None
+
+    stats = cache.stats()
+    assert stats['expirations'] == 1 and stats['entries'] == 0
+    print("✅ Expired entries dropped")
+
+
+@_with_clock
+def test_hit_and_miss_counters(clock):
+    """Hits, misses, sets and hit rate add up across lookups; empty values are not cached"""
+    print("\n📊 Testing counters...")
+    cache = ResponseCache(ttl_seconds=60, max_entries=4, redis_url='')
+    assert cache.get('k') is None
+    cache.set('k', 'value')
+    cache.set('empty', '')
+    assert cache.get('k') == 'value'
+    assert cache.get('k') == 'value'
+    assert cache.get('empty') is None
+
+    stats = cache.stats()
+    assert (stats['l1_hits'], stats['l2_hits'], stats['misses'], stats['sets']) == (2, 0, 2, 1)
+    assert stats['hit_rate'] == 0.5
+    assert stats['redis_enabled'] is False
+    print("✅ Counters add up")
+
+
+@_with_clock
+def test_redis_tier_fills_local_tier(clock):
+    """An L2 hit is copied into L1 so the next lookup stays in process"""
+    print("\n🗄️ Testing the Redis tier...")
+    shared = DictRedis()
+    writer = ResponseCache(ttl_seconds=60, max_entries=4, redis_url='redis://stub')
+    reader = ResponseCache(ttl_seconds=60, max_entries=4, redis_url='redis://stub')
+    writer._redis = shared
+    reader._redis = shared
+
+    writer.set('k', 'value')
+    assert reader.get('k') == 'value'
+    assert reader.get('k') == 'value'
+    stats = reader.stats()
+    assert (stats['l2_hits'], stats['l1_hits']) == (1, 1)
+    print("✅ Redis hits shared across workers")
+
+
+@_with_clock
+def test_redis_backoff_after_failure(clock):
+    """A failing Redis is skipped for 30s instead of paying its timeout on every lookup"""
+    print("\n🔌 Testing Redis backoff...")
+    cache = ResponseCache(ttl_seconds=600, max_entries=4, redis_url='redis://stub')
+    redis = FailingRedis()
+    cache._redis = redis
+
+    assert cache.get('k') is None
+    assert redis.calls == 1 and cache.stats()['redis_errors'] == 1
+
+    # Within the backoff window neither reads nor writes touch Redis, even with a client at hand
+    cache._redis = redis
+    clock.now += 29
+    assert cache.get('k') is None
+    cache.set('k', 'value')
+    assert cache.get('k') == 'value'
+    assert redis.calls == 1
+
+    # Once the window has passed Redis is tried again
+    clock.now += 2
+    cache._redis = redis
+    assert cache.get('missing') is None
+    assert redis.calls == 2 and cache.stats()['redis_errors'] == 2
+    assert cache.stats()['misses'] == 3
+    print("✅ Redis skipped while backing off")
+
+
+def test_voice_cache_hit_skips_prompt_compile():
+    """Repeated voice questions are answered from cache before any prompt is compiled"""
+    print("\n🎙️ Testing the voice cache lookup order...")
+    from services import voice_service as voice_module
+    from services.voice_service import VoiceService
+
+    class _Model:
+        def __init__(self):
+            self.calls = 0
+
+        def generate_content(self, prompt, **kwargs):
+            self.calls += 1
+            return type('Response', (), {'text': 'The Blazers are up two.'})()
+
+    compiled = []
+    compile_voice = voice_module.prompt_compiler.compile_voice
+    voice_module.prompt_compiler.compile_voice = lambda *args, **kwargs: compiled.append(args) or compile_voice(*args, **kwargs)
+    try:
+        service = VoiceService()
+        service.model = _Model()
+        response_cache.clear()
+        persona = service.personas['passionate']
+        for transcript in ("Why are the Blazers up?", "why are the blazers up"):
+            assert service._generate_gemini_response(transcript, None, persona, {}) == 'The Blazers are up two.'
+    finally:
+        del voice_module.prompt_compiler.compile_voice
+        response_cache.clear()
+    assert service.model.calls == 1 and len(compiled) == 1
+    print("✅ Cache hit answered without compiling a prompt")
+
+
+def test_shared_instance_has_no_redis_by_default():
+    """The module-level cache only talks to Redis when RESPONSE_CACHE_REDIS is on"""
+    assert response_cache.namespace == 'gemini'
+    assert response_cache.stats()['redis_enabled'] == bool(response_cache.redis_url)
+
+
+def main():
+    """Run all response cache tests"""
+    print("🎯 Response Cache Test Suite")
+    print("=" * 50)
+    test_keys_ignore_argument_order()
+    test_lru_eviction()
+    test_ttl_expiry()
+    test_hit_and_miss_counters()
+    test_redis_tier_fills_local_tier()
+    test_redis_backoff_after_failure()
+    test_voice_cache_hit_skips_prompt_compile()
+    test_shared_instance_has_no_redis_by_default()
+    print("\n🎉 Response cache tests completed!")
+
+
+if __name__ == "__main__":
+    main()
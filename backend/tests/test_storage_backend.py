@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script for the embedded in-memory storage backend
+Runs fully offline - no MongoDB, Redis or API keys required
+
+Usage:
+    python test_storage_backend.py
+    python -m pytest test_storage_backend.py
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from storage import MemoryClient
+
+
+def _fresh_db():
+    db = MemoryClient().sports_commentator
+    db.games.create_index("game_id", unique=True)
+    db.statlines.create_index([("game_id", 1), ("player_id", 1)], unique=True)
+    db.commentary.create_index([("game_id", 1), ("timestamp", 1)])
+    return db
+
+
+def test_upsert_and_find_one():
+    """update_one upsert seeds from the filter and honours $setOnInsert"""
+    print("🗄️  Testing upsert/find_one...")
+    db = _fresh_db()
+
+    result = db.users.update_one(
+        {'_id': 'fan-1'},
+        {'$set': {'preferences': {'energyLevel': 90}}, '$setOnInsert': {'_id': 'fan-1'}},
+        upsert=True
+    )
+    assert result.upserted_id == 'fan-1'
+    assert result.matched_count == 0
+
+    result = db.users.update_one({'_id': 'fan-1'}, {'$set': {'preferences': {'energyLevel': 20}}}, upsert=True)
+    assert result.matched_count == 1 and result.modified_count == 1 and result.upserted_id is None
+
+    user = db.users.find_one({'_id': 'fan-1'})
+    assert user['preferences']['energyLevel'] == 20
+
+    # Returned documents are copies, like documents decoded from the wire
+    user['preferences']['energyLevel'] = 0
+    assert db.users.find_one({'_id': 'fan-1'})['preferences']['energyLevel'] == 20
+    print("✅ Upsert and find_one behave like MongoDB")
+
+
+def test_sorted_find_with_limit():
+    """find().sort().limit() matches GameService.get_game_summary usage"""
+    print("\n📊 Testing sorted find...")
+    db = _fresh_db()
+    for pid, pts in [(1, 8), (2, 6), (3, 0), (4, 12)]:
+        db.statlines.insert_one({'game_id': 'g1', 'player_id': pid, 'points': pts})
+    db.statlines.insert_one({'game_id': 'g2', 'player_id': 1, 'points': 40})
+
+    top = list(db.statlines.find({'game_id': 'g1'}).sort('points', -1).limit(3))
+    assert [s['player_id'] for s in top] == [4, 1, 2]
+    assert db.statlines.count_documents({'game_id': 'g1', 'points': {'$gte': 6}}) == 3
+    print("✅ Sorted find returns top scorers in order")
+
+
+def test_bulk_write_and_unique_index():
+    """bulk_write upserts respect the compound unique index"""
+    print("\n📦 Testing bulk writes...")
+    db = _fresh_db()
+    ops = [
+        UpdateOne({'game_id': 'g1', 'player_id': pid}, {'$set': {'points': pid * 2}}, upsert=True)
+        for pid in range(1, 6)
+    ]
+    result = db.statlines.bulk_write(ops, ordered=False)
+    assert result.upserted_count == 5
+
+    result = db.statlines.bulk_write(ops, ordered=False)
+    assert result.upserted_count == 0 and result.matched_count == 5
+    assert db.statlines.count_documents({}) == 5
+
+    try:
+        db.statlines.insert_one({'game_id': 'g1', 'player_id': 1})
+        assert False, "expected DuplicateKeyError"
+    except DuplicateKeyError:
+        pass
+    print("✅ Bulk upserts are idempotent and unique indexes are enforced")
+
+
+def test_partial_unique_index():
+    """A partial unique index only covers matching documents; bulk duplicates raise BulkWriteError like Mongo"""
+    print("\n🧩 Testing partial unique indexes...")
+    db = _fresh_db()
+    db.events.create_index(
+        [("game_id", 1), ("payload.play_id", 1)], name="play", unique=True,
+        partialFilterExpression={"payload.play_id": {"$type": "number"}}
+    )
+    # Events without a numeric play id are outside the index and never clash
+    db.events.insert_one({'game_id': 'g1', 'payload': {'play_id': None}})
+    db.events.insert_one({'game_id': 'g1', 'payload': {'play_id': None}})
+    db.events.insert_one({'game_id': 'g1', 'payload': {'play_id': 1}})
+    try:
+        db.events.insert_one({'game_id': 'g1', 'payload': {'play_id': 1}})
+        assert False, "expected DuplicateKeyError"
+    except DuplicateKeyError:
+        pass
+
+    ops = [InsertOne({'game_id': 'g1', 'payload': {'play_id': 1}}), UpdateOne({'game_id': 'g1', 'payload.play_id': 2}, {'$setOnInsert': {'payload': {'play_id': 2}}}, upsert=True)]
+    try:
+        db.events.bulk_write(ops, ordered=False)
+        assert False, "expected BulkWriteError"
+    except BulkWriteError as e:
+        assert [(error['index'], error['code']) for error in e.details['writeErrors']] == [(0, 11000)]
+        assert [u['index'] for u in e.details['upserted']] == [1]
+    assert db.events.count_documents({'game_id': 'g1'}) == 4
+    assert db.events.index_information()['play']['partialFilterExpression'] == {"payload.play_id": {"$type": "number"}}
+    print("✅ Partial unique index enforced on matching documents only")
+
+
+def test_ttl_index_expiry():
+    """Documents older than expireAfterSeconds disappear on read"""
+    print("\n⏱️  Testing TTL index...")
+    db = _fresh_db()
+    db.games.create_index("updated_at", expireAfterSeconds=60)
+    db.games.insert_one({'game_id': 'old', 'updated_at': datetime.now() - timedelta(minutes=5)})
+    db.games.insert_one({'game_id': 'new', 'updated_at': datetime.now()})
+
+    assert db.games.find_one({'game_id': 'old'}) is None
+    assert db.games.find_one({'game_id': 'new'}) is not None
+    print("✅ TTL index expires stale documents")
+
+
+def main():
+    """Run all storage backend tests"""
+    print("🎯 Storage Backend Test Suite")
+    print("=" * 50)
+    test_upsert_and_find_one()
+    test_sorted_find_with_limit()
+    test_bulk_write_and_unique_index()
+    test_partial_unique_index()
+    test_ttl_index_expiry()
+    print("\n🎉 Storage backend tests completed!")
+
+
+if __name__ == "__main__":
+    main()
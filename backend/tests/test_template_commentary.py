@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the local template commentary engine
+Runs fully offline - no MongoDB, Gemini or ElevenLabs calls
+
+Usage:
+    python test_template_commentary.py
+    python -m pytest test_template_commentary.py
+"""
+
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from storage import MemoryClient
+from services.commentary_service import CommentaryService
+from services.template_commentary import parse_play, template_commentary
+
+GAME = {'game': {
+    'score': {'home': 20, 'away': 24},
+    'teams': {'home': {'name': 'Portland Trail Blazers'}, 'away': {'name': 'Los Angeles Lakers'}}
+}}
+
+
+def test_play_lines_are_parsed_into_fields():
+    """Scorer, assister, distance and shot type come out of the feed text"""
+    print("🔍 Testing play parsing...")
+    play = parse_play("Rupert 26' 3PT Jump Shot (3 PTS) (Cissoko 1 AST)")
+    assert play['kind'] == 'shot' and play['shot'] == 'three' and play['made']
+    assert (play['player'], play['assister'], play['distance'], play['player_points']) == ('Rupert', 'Cissoko', 26, 3)
+    assert parse_play("MISS Murray Free Throw 1 of 2")['made'] is False
+    assert parse_play("Goodwin Bad Pass Turnover (P1.T3)")['reason'] == 'bad pass'
+    assert parse_play("TRAIL BLAZERS Rebound")['team'] == 'Trail Blazers'
+    print("✅ Play fields extracted")
+
+
+def test_render_is_factual_and_deterministic():
+    """Raw lines state the play and the score; repeated renders are identical"""
+    print("\n📝 Testing template rendering...")
+    line = template_commentary.render("Knecht 3PT Jump Shot (8 PTS) (James 2 AST)", 'raw', GAME)
+    assert line == "Knecht makes a three, assist by James. Los Angeles Lakers lead 24-20."
+    hype = template_commentary.render("Koloko 4' Cutting Dunk Shot (2 PTS)", 'passionate', GAME, run=8)
+    assert "Koloko throws it DOWN!" in hype and "8-0 run" in hype
+    assert hype == template_commentary.render("Koloko 4' Cutting Dunk Shot (2 PTS)", 'passionate', GAME, run=8)
+    print("✅ Template lines are factual and stable")
+
+
+def test_raw_persona_and_fallback_skip_the_model():
+    """The raw persona never calls Gemini and a failing model gets a play-specific line"""
+    print("\n⚡ Testing model-free paths...")
+
+    class FailingModel:
+        calls = 0
+
+        def generate_content(self, *args, **kwargs):
+            FailingModel.calls += 1
+            raise TimeoutError("Gemini call timed out")
+
+    class SilentTTS:
+        def generate_audio(self, text, persona, voice_id=None, language=None):
+            return None
+
+    service = CommentaryService()
+    service.db = MemoryClient().sports_commentator
+    service.game_service.get_game_summary = lambda game_id: GAME
+    service.tts_service = SilentTTS()
+    service.model = FailingModel()
+
+    raw = service.generate_commentary('g1', persona='raw', play_description="Koloko STEAL (1 STL)")
+    assert raw['text'] == "Koloko with the steal." and FailingModel.calls == 0
+
+    fallback = service.generate_commentary('g1', persona='nerdy', play_description="Koloko STEAL (1 STL)")
+    assert fallback['fallback'] and 'Koloko' in fallback['text'] and FailingModel.calls == 1
+    print("✅ Raw persona and fallbacks are served locally")
+
+
+def main():
+    """Run all template commentary tests"""
+    print("🎯 Template Commentary Test Suite")
+    print("=" * 50)
+    test_play_lines_are_parsed_into_fields()
+    test_render_is_factual_and_deterministic()
+    test_raw_persona_and_fallback_skip_the_model()
+    print("\n🎉 Template commentary tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming TTS proxy endpoint and parallel sentence synthesis
+Runs fully offline against the local fake ElevenLabs server and a stub provider
+
+Usage:
+    python test_tts_stream.py
+    python -m pytest test_tts_stream.py
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the module-level database offline
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from flask import Flask
+from config import Config
+from fakes import FaultProfile, start_fake_services
+from services.audio_cache import AudioCache
+from services.audio_utils import iter_mp3_frames, mp3_duration, parse_frame_header, silent_mp3
+from services.latency import latency
+from services import audio_formats
+from services import tts_service as tts_module
+from services.tts_service import TTSService
+
+
+def test_stream_proxies_chunks_and_fills_the_cache():
+    """First request streams from the provider and tees into the cache; the second is served from disk"""
+    print("🌊 Testing streaming TTS proxy...")
+    # Slow synthesis so the stream arrives in several timed slices
+    services = start_fake_services(elevenlabs_profile=FaultProfile(latency_ms=10, tokens_per_second=40))
+    saved = {k: getattr(Config, k) for k in ('ELEVENLABS_BASE_URL', 'ELEVENLABS_API_KEY')}
+    Config.ELEVENLABS_BASE_URL, Config.ELEVENLABS_API_KEY = services.elevenlabs_url, 'fake-key'
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            from routes import voice_routes
+            tts = TTSService()
+            tts.audio_cache = AudioCache(directory=directory)
+            voice_routes.voice_service.tts_service = tts
+            app = Flask(__name__)
+            app.register_blueprint(voice_routes.voice_bp, url_prefix='/api/voice')
+            client = app.test_client()
+            latency.reset()
+
+            text = "Knecht buries the three from the corner and the Lakers lead by four!"
+            started = time.monotonic()
+            response = client.get('/api/voice/tts/stream', query_string={'text': text, 'persona': 'nerdy'}, buffered=False)
+            assert response.status_code == 200 and response.headers['X-Audio-Cache'] == 'miss'
+            chunks = iter(response.response)
+            first = next(chunks)
+            first_chunk_seconds = time.monotonic() - started
+            audio = first + b''.join(chunks)
+            total_seconds = time.monotonic() - started
+            response.close()
+            assert first_chunk_seconds < total_seconds / 2  # playback can start long before synthesis ends
+            assert mp3_duration(audio) > 3 and tts.audio_cache.stats()['writes'] == 1
+            assert 'tts.stream_first_byte' in latency.stats()
+
+            again = client.get('/api/voice/tts/stream', query_string={'text': text, 'persona': 'nerdy'})
+            assert again.headers['X-Audio-Cache'] == 'hit' and again.data == audio
+            # The non-streaming endpoint reuses the clip the stream cached
+            assert client.post('/api/voice/tts', json={'text': text, 'persona': 'nerdy'}).get_json()['success']
+            assert tts.audio_cache.stats()['writes'] == 1
+            assert client.get('/api/voice/tts/stream').status_code == 400
+            print(f"✅ First audio after {first_chunk_seconds * 1000:.0f}ms of {total_seconds * 1000:.0f}ms; replay served from cache")
+    finally:
+        for key, value in saved.items():
+            setattr(Config, key, value)
+        services.shutdown()
+
+
+def test_low_bitrate_variants_are_negotiated_and_cached_side_by_side():
+    """Quality preferences and data-saver hints pick a smaller encoding stored next to the default clip"""
+    print("\n📶 Testing output format negotiation...")
+    assert audio_formats.negotiate() is None
+    assert audio_formats.negotiate('low') == 'mp3_44100_32' and audio_formats.negotiate('mp3_44100_64') == 'mp3_44100_64'
+    assert audio_formats.negotiate(save_data='on') == 'mp3_44100_32' and audio_formats.negotiate(ect='3g') == 'mp3_44100_64'
+    assert audio_formats.negotiate(ect='2g', accept='audio/ogg,audio/*;q=0.9') == 'opus_48000_32'
+    assert audio_formats.negotiate(ect='2g', accept='*/*') == 'mp3_44100_32'  # Opus only when asked for by name
+    assert audio_formats.negotiate('standard', save_data='on') is None
+
+    services = start_fake_services(elevenlabs_profile=FaultProfile(latency_ms=10, tokens_per_second=5000))
+    saved = {k: getattr(Config, k) for k in ('ELEVENLABS_BASE_URL', 'ELEVENLABS_API_KEY')}
+    Config.ELEVENLABS_BASE_URL, Config.ELEVENLABS_API_KEY = services.elevenlabs_url, 'fake-key'
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            from routes import voice_routes
+            tts = TTSService()
+            tts.audio_cache = AudioCache(directory=directory)
+            voice_routes.voice_service.tts_service = tts
+            app = Flask(__name__)
+            app.register_blueprint(voice_routes.voice_bp, url_prefix='/api/voice')
+            client = app.test_client()
+            text = "Simons pulls up from the logo and drains it!"
+
+            standard = client.post('/api/voice/tts', json={'text': text, 'persona': 'raw'}).get_json()['audio_url']
+            low = client.post('/api/voice/tts', json={'text': text, 'persona': 'raw'}, headers={'Save-Data': 'on'}).get_json()['audio_url']
+            streamed = client.get('/api/voice/tts/stream', query_string={'text': text, 'persona': 'raw', 'quality': 'low'})
+            assert streamed.headers['X-Audio-Cache'] == 'hit' and streamed.mimetype == 'audio/mpeg'
+
+            digest = os.path.basename(standard)[len('tts_'):-len('.mp3')]
+            assert os.path.basename(low) == f"tts_{digest}_mp3_44100_32.mp3"
+            sizes = {name: os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)}
+            assert len(sizes) == 2 and sizes[os.path.basename(low)] * 3 < sizes[os.path.basename(standard)]
+            assert {parse_frame_header(streamed.data[:4])[1]} == {32}
+            print(f"✅ 32 kbps variant is {sizes[os.path.basename(low)]} of {sizes[os.path.basename(standard)]} bytes, cached beside the default")
+    finally:
+        for key, value in saved.items():
+            setattr(Config, key, value)
+        services.shutdown()
+
+
+class SentenceProvider:
+    """Stub ElevenLabs: each sentence takes 0.2s and comes back at its own bitrate so order is visible"""
+    def __init__(self, bitrates):
+        self.bitrates = bitrates
+
+    def post(self, url, json=None, headers=None, stream=False):
+        time.sleep(0.2)
+        return type('Response', (), {'status_code': 200, 'content': silent_mp3(0.5, self.bitrates[json['text']])})()
+
+
+def test_long_text_is_voiced_per_sentence_in_parallel():
+    """Sentences are synthesized concurrently and reassembled in text order, as one clip or one stream"""
+    print("\n🧵 Testing parallel sentence synthesis...")
+    sentences = [
+        "Davis rises over Clingan for the thunderous two-handed slam.",
+        "That is his twentieth point of the night and the crowd is on its feet.",
+        "Portland calls timeout to stop a seven to nothing Lakers run.",
+        "Knecht checks back in with the hot hand from deep.",
+    ]
+    provider = SentenceProvider(dict(zip(sentences, (64, 96, 128, 160))))
+    saved_requests, saved_key = tts_module.requests, Config.ELEVENLABS_API_KEY
+    tts_module.requests, Config.ELEVENLABS_API_KEY = provider, 'test-key'
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            tts = TTSService()
+            tts.audio_cache = AudioCache(directory=directory)
+            text = ' '.join(sentences)
+
+            started = time.monotonic()
+            url = tts.generate_audio(text, 'nerdy')
+            elapsed = time.monotonic() - started
+            assert url and elapsed < 0.2 * len(sentences) * 0.75  # well under serial synthesis time
+            with open(os.path.join(directory, os.path.basename(url)), 'rb') as f:
+                audio = f.read()
+            bitrates = [parse_frame_header(frame)[1] for frame in iter_mp3_frames(audio)]
+            assert sorted(set(bitrates), key=bitrates.index) == [64, 96, 128, 160]
+
+            # Streaming a second voice starts with sentence one before the last sentence is done
+            chunks, cache = tts.stream_audio(text, 'passionate')
+            started = time.monotonic()
+            first = next(chunks)
+            first_seconds = time.monotonic() - started
+            rest = b''.join(chunks)
+            assert cache == 'miss' and parse_frame_header(first[:4])[1] == 64 and abs(mp3_duration(first + rest) - 2.0) < 0.1
+            assert tts.stream_audio(text, 'passionate')[1] == 'hit'
+            print(f"✅ {len(sentences)} sentences voiced in {elapsed * 1000:.0f}ms, first streamed sentence after {first_seconds * 1000:.0f}ms")
+    finally:
+        tts_module.requests, Config.ELEVENLABS_API_KEY = saved_requests, saved_key
+
+
+def test_streamed_sentences_in_other_formats_pass_through():
+    """Clips without MP3 frames are streamed and cached as they are; an empty stream caches nothing"""
+    print("\n🎚️ Testing non-MP3 sentence streams...")
+    from concurrent.futures import Future
+
+    def done(value):
+        future = Future()
+        future.set_result(value)
+        return future
+
+    pcm = [b'\x01\x02' * 200, b'\x03\x04' * 300]
+    with tempfile.TemporaryDirectory() as directory:
+        tts = TTSService()
+        tts.audio_cache = AudioCache(directory=directory)
+        tts._submit_sentences = lambda sentences, *args: [done(part) for part in pcm[:len(sentences)]]
+
+        chunks = list(tts._stream_sentences(['One.', 'Two.'], 'pcm-key', 'nerdy', 'v1', 'm1', None, {}, 'pcm_16000'))
+        assert chunks == pcm
+        assert tts.audio_cache.get('pcm-key') is not None and tts.audio_cache.stats()['writes'] == 1
+        with open(tts.audio_cache.path('pcm-key'), 'rb') as f:
+            assert f.read() == b''.join(pcm)
+
+        assert list(tts._stream_sentences([], 'empty-key', 'nerdy', 'v1', 'm1', None, {}, 'pcm_16000')) == []
+        assert tts.audio_cache.get('empty-key') is None and tts.audio_cache.stats()['writes'] == 1
+    print("✅ Non-MP3 sentences streamed and cached intact")
+
+
+def main():
+    """Run all streaming TTS tests"""
+    print("🎯 Streaming TTS Test Suite")
+    print("=" * 50)
+    test_stream_proxies_chunks_and_fills_the_cache()
+    test_low_bitrate_variants_are_negotiated_and_cached_side_by_side()
+    test_long_text_is_voiced_per_sentence_in_parallel()
+    test_streamed_sentences_in_other_formats_pass_through()
+    print("\n🎉 Streaming TTS tests completed!")
+
+
+if __name__ == "__main__":
+    main()
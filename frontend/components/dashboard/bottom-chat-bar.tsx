@@ -213,25 +213,22 @@ export function BottomChatBar() {
           const speakOn = pref === 'true'
           if (speakOn && answer) {
             // Gather user preferences to pass voice selection explicitly
-            let ttsOptions: any = { text: answer, persona }
+            let ttsOptions: Record<string, string> = { text: answer, persona }
             try {
               const userPreferences = localStorage.getItem('user-preferences')
               if (userPreferences) {
                 const preferences = JSON.parse(userPreferences)
                 if (preferences?.voiceId) ttsOptions.voice_id = preferences.voiceId
                 if (preferences?.language) ttsOptions.language = preferences.language
+                if (preferences?.audioQuality) ttsOptions.quality = preferences.audioQuality
               }
             } catch {}
             
-            const ttsResp = await apiClient.post('/api/voice/tts', ttsOptions)
-            const url: string | undefined = ttsResp.data?.audio_url
-            if (url) {
-              const base = (apiClient.defaults.baseURL as string) || ''
-              const full = url.startsWith('http') ? url : `${base}${url}`
-              const audio = new Audio(full)
-              audio.volume = 0.8
-              audio.play().catch(() => {})
-            }
+            // Streamed: playback starts with the first audio chunk, no second request for a file
+            const base = (apiClient.defaults.baseURL as string) || ''
+            const audio = new Audio(`${base}/api/voice/tts/stream?${new URLSearchParams(ttsOptions).toString()}`)
+            audio.volume = 0.8
+            audio.play().catch(() => {})
           }
         } catch (ttsError) {
           console.warn('Failed to speak chat response:', ttsError)
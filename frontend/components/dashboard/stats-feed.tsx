@@ -6,6 +6,7 @@ import { ScrollArea } from '@/components/ui/scroll-area'
 import { TrendingUp, TrendingDown, Clock, Zap } from 'lucide-react'
 import apiClient, { api } from '@/lib/api'
 import { useChat } from '@/components/providers/chat-provider'
+import { useSocket } from '@/components/providers/socket-provider'
 
 interface StatUpdate {
   id: string
@@ -20,50 +21,6 @@ interface StatUpdate {
 
 const initialStats: StatUpdate[] = []
 
-// Helper function to determine event type from play description for more specific commentary
-function getEventTypeFromDescription(description: string): string {
-  const desc = description.toLowerCase()
-  
-  if (desc.includes('3pt') || desc.includes('3-pt') || desc.includes('three')) {
-    return desc.includes('miss') ? 'missed_three' : 'made_three'
-  }
-  if (desc.includes('free throw')) {
-    return desc.includes('miss') ? 'missed_free_throw' : 'made_free_throw'
-  }
-  if (desc.includes('dunk')) {
-    return 'dunk'
-  }
-  if (desc.includes('layup')) {
-    return desc.includes('miss') ? 'missed_layup' : 'made_layup'
-  }
-  if (desc.includes('rebound')) {
-    return 'rebound'
-  }
-  if (desc.includes('steal')) {
-    return 'steal'
-  }
-  if (desc.includes('block')) {
-    return 'block'
-  }
-  if (desc.includes('turnover')) {
-    return 'turnover'
-  }
-  if (desc.includes('foul')) {
-    return 'foul'
-  }
-  if (desc.includes('timeout')) {
-    return 'timeout'
-  }
-  if (desc.includes('jump ball')) {
-    return 'jump_ball'
-  }
-  if (desc.includes('q1 start') || desc.includes('q2 start') || desc.includes('q3 start') || desc.includes('q4 start')) {
-    return 'quarter_start'
-  }
-  
-  return 'generic'
-}
-
 interface StatsFeedProps {
   clockSeconds?: number
   quarterIndex?: number
@@ -77,11 +34,12 @@ export function StatsFeed({ clockSeconds, quarterIndex }: StatsFeedProps) {
   const [useMock, setUseMock] = useState(false)
   const lastClockRef = useRef<number | null>(null)
   const lastQuarterRef = useRef<number | null>(null)
-  const lastCommentaryTimeRef = useRef<number>(0)
+  const { socket } = useSocket()
   
   // Use chat context to check if chat is answering
   const { isChatAnswering } = useChat()
-  const processedPlaysRef = useRef<Set<string>>(new Set())
+  const isChatAnsweringRef = useRef(isChatAnswering)
+  isChatAnsweringRef.current = isChatAnswering
   const [schedule, setSchedule] = useState<Array<{ id: string; quarter: number; at: number; play: { player: string; team: string; description: string; value?: string; type: 'score' | 'stat' } }>>([])
 
   const areRostersEqual = (a: Record<string, string>, b: Record<string, string>) => {
@@ -311,213 +269,83 @@ export function StatsFeed({ clockSeconds, quarterIndex }: StatsFeedProps) {
     lastClockRef.current = clockSeconds
   }, [clockSeconds, useMock, schedule, quarterIndex])
 
+  // Commentary is generated once per play on the server and pushed to the game's room; the feed only subscribes
   useEffect(() => {
-    const fetchAndAppend = async () => {
-      if (gameId) {
-        try {
-          // Fetch play-by-play data from backend
-          const gameSnapshot = await api.getGameSnapshot(gameId)
-          console.log('[StatsFeed] snapshot', {
-            success: gameSnapshot?.success,
-            plays: Array.isArray(gameSnapshot?.play_by_play) ? gameSnapshot.play_by_play.length : 'n/a',
-            clock: gameSnapshot?.game?.TimeRemainingMinutes + ':' + String(gameSnapshot?.game?.TimeRemainingSeconds).padStart(2, '0')
-          })
-          // Refresh roster opportunistically if present
-          if (gameSnapshot.success && gameSnapshot.box_score) {
-            const rawPlayers = gameSnapshot.box_score.players || gameSnapshot.box_score.Players || []
-            if (rawPlayers && (rawPlayers as any[]).length > 0) {
-              const mapping: Record<string, string> = {}
-              ;(rawPlayers as any[]).forEach((p: any) => {
-                const id = String(p.playerId ?? p.PlayerID ?? '')
-                const name = p.name ?? p.Name
-                if (id && name) mapping[id] = name
-              })
-              setRoster(mapping)
-            }
-          }
-          if (gameSnapshot.success && gameSnapshot.play_by_play) {
-            // Filter plays that should be visible based on game clock progression
-            const gm = gameSnapshot.game || gameSnapshot.Game || {}
-            const currentRemaining = (gm.TimeRemainingMinutes ?? 12) * 60 + (gm.TimeRemainingSeconds ?? 0)
-            
-            // Show plays that have already happened (clock time > current remaining time)
-            const visiblePlays = gameSnapshot.play_by_play.filter((play: any) => {
-              const clockStr = play.Clock || play.clock || '12:00'
-              const [m, s] = clockStr.split(':').map((x: string) => parseInt(x, 10))
-              const playRemaining = isNaN(m) || isNaN(s) ? 12 * 60 : (m * 60 + s)
-              return playRemaining > currentRemaining
-            })
-            
-            console.log('[StatsFeed] filtering plays', { 
-              total: gameSnapshot.play_by_play.length,
-              visible: visiblePlays.length,
-              currentRemaining,
-              firstPlay: visiblePlays[0]?.Clock,
-              lastPlay: visiblePlays[visiblePlays.length - 1]?.Clock
-            })
-            
-            // Take the most recent 10 visible plays to avoid overwhelming the feed
-            const recentPlays = visiblePlays.slice(-10)
-            
-            // Generate Gemini commentary for selected plays (throttled and filtered)
-            const now = Date.now()
-            let addedCommentary = false
-            
-            for (const play of recentPlays) {
-              const description = play.Description || play.description || play.playText || 'Play occurred'
-              const points = play.points ?? play.Points ?? inferPointsFromDescription(description)
-              const pid = String(play.PlayID ?? play.playId ?? Date.now())
-              
-              // Skip if we've already processed this play
-              if (processedPlaysRef.current.has(pid)) continue
-              
-              // Check if this play already exists in stats
-              const exists = stats.some(stat => stat.id === pid)
-              if (!exists) {
-                // Throttle commentary generation: only one every 5 seconds
-                const timeSinceLastCommentary = now - lastCommentaryTimeRef.current
-                const shouldGenerateCommentary = timeSinceLastCommentary >= 5000 && !addedCommentary
-                
-                // Check for significant plays (more inclusive)
-                const isSignificantPlay = points > 0 || 
-                                        description.toLowerCase().includes('foul') || 
-                                        description.toLowerCase().includes('turnover') ||
-                                        description.toLowerCase().includes('steal') ||
-                                        description.toLowerCase().includes('block') ||
-                                        description.toLowerCase().includes('rebound') ||
-                                        description.toLowerCase().includes('assist')
-                
-                console.log('[StatsFeed] Play check:', {
-                  pid,
-                  description: description.substring(0, 50),
-                  points,
-                  isSignificantPlay,
-                  shouldGenerateCommentary,
-                  timeSinceLastCommentary,
-                  addedCommentary
-                })
-                
-                // Generate commentary for significant plays if we're within throttle window
-                if (shouldGenerateCommentary && isSignificantPlay) {
-                try {
-                  // Determine specific event type from play description
-                  const eventType = getEventTypeFromDescription(description)
-                  
-                  // Get actual user preferences from localStorage
-                  let userContext: any = {}
-                  try {
-                    const userPreferences = localStorage.getItem('user-preferences')
-                    const userId = localStorage.getItem('user_id')
-                    if (userPreferences) {
-                      const preferences = JSON.parse(userPreferences)
-                      userContext = {
-                        user_id: userId || undefined,
-                        preferences,
-                        interests: preferences.favoriteTeam ? [preferences.favoriteTeam.name || preferences.favoriteTeam] : ['basketball'],
-                        fantasy_info: preferences.fantasyInfo ? `Fantasy: ${preferences.fantasyInfo.league || 'Unknown'} - ${preferences.fantasyInfo.notes || ''}` : undefined,
-                        customInstructions: preferences.customInstructions || undefined
-                      }
-                    }
-                  } catch (error) {
-                    console.warn('[StatsFeed] Error loading user preferences:', error)
-                    userContext = {
-                      interests: ['basketball'],
-                      preferences: { style: 'exciting' }
-                    }
-                  }
-                  
-                  // Determine persona based on user's energy level preference
-                  const persona: 'passionate' | 'nerdy' = (userContext.preferences?.energyLevel > 70) ? 'passionate' : 'nerdy'
-                  
-                  // Generate natural commentary using Gemini with the actual play description
-                  const commentaryResponse = await api.emitCommentary(gameId, eventType, persona, description, userContext)
-                  
-                  if (commentaryResponse.success && commentaryResponse.commentary) {
-                    // Extract text from commentary response object
-                    const commentaryText = typeof commentaryResponse.commentary === 'string' 
-                      ? commentaryResponse.commentary 
-                      : commentaryResponse.commentary.text || 'Commentary generated'
-                    
-                    const newStat: StatUpdate = {
-                      id: pid,
-                      type: points > 0 ? 'score' : 'stat',
-                      player: '', // No player name needed for commentary
-                      team: '', // No team needed for commentary
-                      description: commentaryText,
-                      value: '',
-                      timestamp: new Date(),
-                      isNew: true
-                    }
-
-                    setStats(prevStats => {
-                      const updated = [newStat, ...prevStats.slice(0, 19)] // Keep only 20 most recent
-                      // Remove the "new" flag after 3 seconds
-                      setTimeout(() => {
-                        setStats(current => 
-                          current.map(stat => 
-                            stat.id === newStat.id ? { ...stat, isNew: false } : stat
-                          )
-                        )
-                      }, 3000)
-                      
-                      return updated
-                    })
-                    
-                    // Mark that we've added commentary and update the timing
-                    addedCommentary = true
-                    lastCommentaryTimeRef.current = now
-                    processedPlaysRef.current.add(pid)
-
-                    // Speak via ElevenLabs if toggled on (but not if chat is answering)
-                    try {
-                      const pref = (typeof window !== 'undefined') ? localStorage.getItem('speak_live_updates') : 'false'
-                      const speakOn = pref === 'true'
-                      if (speakOn && commentaryText && !isChatAnswering) {
-                        // Gather user preferences to pass voice selection explicitly
-                        let options: any = { text: commentaryText, persona }
-                        try {
-                          const userPreferences = localStorage.getItem('user-preferences')
-                          if (userPreferences) {
-                            const preferences = JSON.parse(userPreferences)
-                            if (preferences?.voiceId) options.voice_id = preferences.voiceId
-                            if (preferences?.language) options.language = preferences.language
-                          }
-                        } catch {}
-                        const ttsResp = await apiClient.post('/api/voice/tts', options)
-                        const url: string | undefined = ttsResp.data?.audio_url
-                        if (url) {
-                          const base = (apiClient.defaults.baseURL as string) || ''
-                          const full = url.startsWith('http') ? url : `${base}${url}`
-                          const audio = new Audio(full)
-                          audio.volume = 0.8
-                          audio.play().catch(() => {})
-                        }
-                      }
-                    } catch {}
-                  }
-                } catch (error) {
-                  console.error('[StatsFeed] Error generating commentary:', error)
-                  // Mark as processed even if failed to avoid retrying
-                  processedPlaysRef.current.add(pid)
-                }
-              } else {
-                // For non-commentary plays, just mark as processed without adding to feed
-                // Only Gemini commentary should appear in Live Updates
-                processedPlaysRef.current.add(pid)
-              }
-              }
-            }
-          }
-        } catch (error) {
-          console.error('[StatsFeed] Error fetching play-by-play data:', error)
-        }
+    if (!socket || !gameId) return
+
+    const joinGame = () => socket.emit('join_game', { game_id: gameId })
+
+    const handleCommentary = async (data: any) => {
+      if (!data?.text || String(data.game_id) !== String(gameId)) return
+
+      let preferences: any = {}
+      try {
+        preferences = JSON.parse(localStorage.getItem('user-preferences') || '{}') || {}
+      } catch {}
+
+      // Every persona is pushed for each play; show the one matching the user's energy level
+      const persona: 'passionate' | 'nerdy' = (preferences.energyLevel > 70) ? 'passionate' : 'nerdy'
+      if (data.persona !== persona) return
+
+      const pid = String(data.play_id ?? data.timestamp)
+      const newStat: StatUpdate = {
+        id: pid,
+        type: inferPointsFromDescription(data.play_description) > 0 ? 'score' : 'stat',
+        player: '', // No player name needed for commentary
+        team: '', // No team needed for commentary
+        description: data.text,
+        value: '',
+        timestamp: new Date(),
+        isNew: true
       }
+
+      setStats(prevStats => {
+        if (prevStats.some(stat => stat.id === pid)) return prevStats
+        const updated = [newStat, ...prevStats.slice(0, 19)] // Keep only 20 most recent
+        // Remove the "new" flag after 3 seconds
+        setTimeout(() => {
+          setStats(current => 
+            current.map(stat => 
+              stat.id === newStat.id ? { ...stat, isNew: false } : stat
+            )
+          )
+        }, 3000)
+        return updated
+      })
+
+      // Speak if toggled on (but not if chat is answering); the server already voiced the line
+      try {
+        const speakOn = localStorage.getItem('speak_live_updates') === 'true'
+        if (!speakOn || isChatAnsweringRef.current) return
+        let url: string | undefined = data.audio_url
+        if (preferences.voiceId || preferences.language || preferences.audioQuality) {
+          // A personal voice, language or encoding is streamed straight from the TTS proxy
+          const options: Record<string, string> = { text: data.text, persona }
+          if (preferences.voiceId) options.voice_id = preferences.voiceId
+          if (preferences.language) options.language = preferences.language
+          if (preferences.audioQuality) options.quality = preferences.audioQuality
+          url = `/api/voice/tts/stream?${new URLSearchParams(options).toString()}`
+        }
+        if (url) {
+          const base = (apiClient.defaults.baseURL as string) || ''
+          const full = url.startsWith('http') ? url : `${base}${url}`
+          const audio = new Audio(full)
+          audio.volume = 0.8
+          audio.play().catch(() => {})
+        }
+      } catch {}
     }
 
-    // Polling interval only (avoid immediate rapid loops on mount)
-    const interval = setInterval(fetchAndAppend, 5000)
-    return () => clearInterval(interval)
-  }, [gameId, useMock])
+    joinGame()
+    // Rooms are per connection, so rejoin after a reconnect
+    socket.on('connect', joinGame)
+    socket.on('new_commentary', handleCommentary)
+    return () => {
+      socket.off('connect', joinGame)
+      socket.off('new_commentary', handleCommentary)
+      socket.emit('leave_game', { game_id: gameId })
+    }
+  }, [socket, gameId])
 
   const getStatIcon = (type: string) => {
     switch (type) {
@@ -25,6 +25,7 @@ export interface OnboardingData {
   language?: 'en' | 'es' | 'fr' | 'de' | 'it' | 'pt' | 'hi' | 'ja' | 'ko' | 'zh';
   voiceId?: string; // explicit ElevenLabs voice id
   voiceName?: string; // display name for selection
+  audioQuality?: 'standard' | 'medium' | 'low' | 'opus'; // TTS encoding; unset lets the server pick from network hints
   customInstructions: string;
   liveQA: boolean;
   backgroundAudio: boolean;